@@ -6,15 +6,19 @@ Webhook backend dla Google Apps Script.
 ARCHITEKTURA (ta wersja):
   /webhook → natychmiast 200 accepted → daemon thread wykonuje pipeline
 
-KOLEJNOŚĆ SEKCJI (stała, niezależna od GAS):
-  nawiazanie → analiza → zwykly → smierc → generator_pdf → biznes → scrabble → emocje
+KOLEJNOŚĆ SEKCJI (niezależna od GAS):
+  fixed: nawiazanie → analiza → zwykly → smierc → generator_pdf → biznes → scrabble → emocje
+  performance.section_order.policy = shortest_first|priority (opt-in, domyślnie fixed)
+  — core/section_scheduler.py
 """
 
 import os
+import hmac
 import html
 import json
 import re
 import threading
+import time
 import urllib.parse
 import traceback  # [POPRAWKA] Przeniesiono z dołu na górę, aby działał wewnątrz funkcji webhook
 from datetime import datetime
@@ -26,6 +30,7 @@ from flask import (
     current_app,
     send_from_directory,
     make_response,
+    g,
 )
 import requests as http_requests
 
@@ -35,11 +40,17 @@ from drive_utils import (
     save_to_history_sheet,
 )
 from core.logging_reporter import init_logger, get_logger
+from core import metrics
+from core.metrics import deepseek_cache_stats
+from core import section_memory
+from core import budget, checkpoint, drain
+from core.tracing import recent_traces
 
 # Importy core
 from core.hf_token_manager import hf_tokens
 from core.responder_manager import ResponderManager, PipelineBuilder
 from core.job_runner import run_pipeline_async, build_section_order
+from core.process_isolation import section_fn
 from core.resource_manager import ResourceManager
 from core.validator import Validator
 from core.sheets_logger import log_odebrano, log_wyslano, log_przyjeto
@@ -88,6 +99,15 @@ resource_manager = ResourceManager(
     max_concurrent=responder_manager.config.get("performance", {}).get(
         "max_concurrent_pipelines", 5
     ),
+    section_peak_defaults_mb=responder_manager.config.get("performance", {}).get(
+        "section_peak_defaults_mb"
+    ),
+    sheddable_sections=responder_manager.config.get("performance", {}).get(
+        "sheddable_sections", []
+    ),
+    max_delay_sec=responder_manager.config.get("performance", {}).get(
+        "admission_max_delay_sec", 120
+    ),
 )
 
 
@@ -152,10 +172,12 @@ def health_check():
             "status": "active",
             "version": "Tyler v6",
             "active_pipelines": _active_pipelines,
+            "waiting_pipelines": resource_manager.waiting_pipelines(),
             "memory_usage_mb": mem_extra["rss_mb"],
             "memory_percent": mem_extra["proc_percent"],
             "uptime": uptime_str,
             "total_emails_processed": total_emails_processed,
+            "deepseek_cache": deepseek_cache_stats(),
             "timestamp": datetime.now().isoformat(),
             "mem_extra": mem_extra,
             "last_error": (
@@ -320,6 +342,9 @@ Ostatnia aktualizacja: {now_str} &nbsp;|&nbsp; <a href="/debug">🔍 Debug pipel
 def system_status():
     """Zwraca szczegółowy status systemu w formacie JSON."""
     try:
+        from core import wykrywaczplci
+        from responders import scrabble
+
         mem_info = resource_manager.get_memory_usage()
         uptime = datetime.now() - start_time
         uptime_seconds = int(uptime.total_seconds())
@@ -334,6 +359,14 @@ def system_status():
             "uptime": uptime_str,
             "total_emails_processed": total_emails_processed,
             "timestamp": datetime.now().isoformat(),
+            "section_memory": section_memory.ranking(),
+            "admission": resource_manager.forecast_stats(),
+            "checkpoints": checkpoint.stats(),
+            "budgets": budget.overrun_rates(),
+            "identity": wykrywaczplci.stats(),
+            "crossword_cache": scrabble.cache_stats(),
+            "deepseek_cache": deepseek_cache_stats(),
+            "draining": drain.draining(),
             "last_error": (
                 {
                     "time": last_error_time.isoformat() if last_error_time else None,
@@ -363,6 +396,74 @@ def system_status():
         return no_cache_response(response)
 
 
+# ── Metryki Prometheus ──────────────────────────────────────────────────────
+@app.before_request
+def _metrics_start():
+    g._metrics_t0 = time.monotonic()
+
+
+@app.after_request
+def _metrics_observe(response):
+    t0 = getattr(g, "_metrics_t0", None)
+    if t0 is not None:
+        metrics.HTTP_SECONDS.observe(
+            time.monotonic() - t0,
+            endpoint=request.endpoint or "404",
+            code=response.status_code,
+        )
+    return response
+
+
+def _process_rss_bytes():
+    import psutil
+
+    return psutil.Process().memory_info().rss
+
+
+def _hf_tokens_alive():
+    return sum(1 for t in hf_tokens.status_report() if t.get("alive"))
+
+
+metrics.gauge_fn(
+    "autoresponder_pipelines_active",
+    "Pipeline'y w toku (kolejka wątków w tle).",
+    lambda: _active_pipelines,
+)
+metrics.gauge_fn(
+    "autoresponder_hf_tokens_alive", "Żywe tokeny HF (po warm-upie).", _hf_tokens_alive
+)
+metrics.gauge_fn(
+    "autoresponder_process_resident_memory_bytes", "RSS procesu.", _process_rss_bytes
+)
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Metryki w formacie tekstowym Prometheus."""
+    resp = make_response(metrics.render_prometheus(), 200)
+    resp.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    return no_cache_response(resp)
+
+
+# ── Ranking pamięci sekcji ──────────────────────────────────────────────────
+@app.route("/memory", methods=["GET"])
+def memory_report():
+    """
+    Responderzy wg szczytu RSS w trakcie sekcji (core/section_memory.py).
+    ?hours=N — tylko ostatnie N godzin; ?json=1 — surowe dane.
+    """
+    try:
+        hours = float(request.args.get("hours", 0))
+    except ValueError:
+        hours = 0
+    rows = section_memory.ranking(since_sec=hours * 3600 if hours > 0 else None)
+    if request.args.get("json") == "1":
+        return no_cache_response(make_response(jsonify(rows), 200))
+    resp = make_response(section_memory.format_ranking(rows) + "\n", 200)
+    resp.headers["Content-Type"] = "text/plain; charset=utf-8"
+    return no_cache_response(resp)
+
+
 # ── Favicon ──────────────────────────────────────────────────────────────────
 @app.route("/favicon.ico", methods=["GET"])
 def favicon():
@@ -406,18 +507,23 @@ _processed_message_ids: set = set()
 _processed_ids_lock = _threading.Lock()
 
 
-def _pipeline_start():
+def _pipeline_start(admission=None, logger=None, delayed=False):
     global _active_pipelines
     with _pipeline_lock:
         _active_pipelines += 1
-    resource_manager.pipeline_start()
+    return resource_manager.pipeline_start(admission, logger=logger, delayed=delayed)
+
 
+def _pipelines_in_flight():
+    """Pipeline'y w toku plus przyjęte z decyzją delay, czekające na pamięć."""
+    return _active_pipelines + resource_manager.waiting_pipelines()
 
-def _pipeline_done():
+
+def _pipeline_done(ticket=None):
     global _active_pipelines
     with _pipeline_lock:
         _active_pipelines = max(0, _active_pipelines - 1)
-    resource_manager.pipeline_end()
+    resource_manager.pipeline_end(ticket)
 
 
 def _state_pipeline_start(message_id, sender, sender_name, subject, body, sections):
@@ -437,6 +543,11 @@ def _state_pipeline_start(message_id, sender, sender_name, subject, body, sectio
                     "sections": list(_pipeline_state.get("sections", {}).keys()),
                     "status": _pipeline_state.get("status"),
                     "emails_sent": _pipeline_state.get("emails_sent", 0),
+                    "memory_peak_delta_mb": {
+                        k: v["memory"]["peak_delta_mb"]
+                        for k, v in _pipeline_state.get("sections", {}).items()
+                        if isinstance(v, dict) and v.get("memory")
+                    },
                 },
             )
             _pipeline_state["history"] = _pipeline_state["history"][:10]
@@ -513,6 +624,12 @@ def _state_section_error(section_key, error_msg):
         s["error"] = str(error_msg)[:500]
 
 
+def _state_section_memory(section_key, mem):
+    with _pipeline_state_lock:
+        s = _pipeline_state["sections"].setdefault(section_key, {})
+        s["memory"] = mem
+
+
 def _state_section_empty(section_key):
     with _pipeline_state_lock:
         s = _pipeline_state["sections"].setdefault(section_key, {})
@@ -670,15 +787,30 @@ def webhook():
     """
     Odbiera email od GAS, natychmiast wraca 200, a potem w tle puszcza pipeline.
     """
+    # Wymuszenie JSONa niezależnie od Content-Type (GAS czasem nie wysyła nagłówka)
+    data = request.get_json(force=True, silent=True)
+    if not data:
+        app.logger.warning("[webhook] Brak poprawnych danych JSON w żądaniu")
+        return jsonify({"accepted": False, "error": "Brak danych JSON"}), 400
+    return _accept_pipeline(data)
+
+
+def _accept_pipeline(data: dict, resume: bool = False):
+    """
+    Wspólna ścieżka webhooka i wznowienia po restarcie (_resume_checkpoints):
+    walidacja, plan sekcji, checkpoint, start pipeline'u w tle.
+    resume=True — tylko istniejący checkpoint (nie zaczynaj od zera).
+    """
     from smtp_wysylka import wyslij_odpowiedz, zbierz_zalaczniki_z_response
 
-    try:
-        # Wymuszenie JSONa niezależnie od Content-Type (GAS czasem nie wysyła nagłówka)
-        data = request.get_json(force=True, silent=True)
-        if not data:
-            app.logger.warning("[webhook] Brak poprawnych danych JSON w żądaniu")
-            return jsonify({"accepted": False, "error": "Brak danych JSON"}), 400
+    # SIGTERM — czekamy na pracę w toku, nowej nie bierzemy (GAS ponowi po restarcie)
+    if drain.draining():
+        app.logger.warning("[webhook] Drenaż przed restartem — odrzucam")
+        return jsonify({"accepted": False, "error": "Draining"}), 503
 
+    _accepted_at = time.time()
+    _checkpoint = None
+    try:
         # Wyciąganie pól
         message_id = data.get("message_id", "")
         sender = data.get("sender", "")
@@ -838,12 +970,14 @@ def webhook():
             _imie    = imie     # samo imię lub "__BRAK__"
             _nazwisko = nazwisko  # samo nazwisko lub "__BRAK__"
 
+            # Ciężkie sekcje przez section_fn — w procesie potomnym, jeśli są
+            # w ISOLATE_SECTIONS (core/process_isolation.py)
             if name == "zwykly":
-
-                def fn():
-                    from responders.zwykly import build_zwykly_section
-
-                    return build_zwykly_section(
+                return section_fn(
+                    name,
+                    "responders.zwykly",
+                    "build_zwykly_section",
+                    dict(
                         body=_body,
                         previous_body=_prev_body,
                         sender_email=_sender,
@@ -851,15 +985,14 @@ def webhook():
                         test_mode=_disable_flux,
                         attachments=_attachments,
                         gender=_gender,
-                    )
-
-                return fn
+                    ),
+                )
             elif name == "smierc":
-
-                def fn():
-                    from responders.smierc import build_smierc_section
-
-                    return build_smierc_section(
+                return section_fn(
+                    name,
+                    "responders.smierc",
+                    "build_smierc_section",
+                    dict(
                         sender_email=_sender,
                         body=_body,
                         etap=_smierc_data.get("etap", 1),
@@ -870,9 +1003,8 @@ def webhook():
                         data=_data,
                         test_mode=_disable_flux,
                         gender=_gender,
-                    )
-
-                return fn
+                    ),
+                )
             elif name == "biznes":
 
                 def fn():
@@ -904,15 +1036,12 @@ def webhook():
 
                 return fn
             elif name == "generator_pdf":
-
-                def fn():
-                    from responders.generator_pdf import build_generator_pdf_section
-
-                    return build_generator_pdf_section(
-                        body=_body, sender_name=_sender_name
-                    )
-
-                return fn
+                return section_fn(
+                    name,
+                    "responders.generator_pdf",
+                    "build_generator_pdf_section",
+                    dict(body=_body, sender_name=_sender_name),
+                )
             elif name == "nawiazanie":
 
                 def fn():
@@ -938,6 +1067,7 @@ def webhook():
                     return build_analiza_section(
                         body=_body,
                         sender_email=_sender,
+                        sender_name=_sender_name,
                         attachments=_attachments,
                         data=_data,
                         gender=_gender,
@@ -958,6 +1088,21 @@ def webhook():
             app.logger.info("[webhook] Brak zadań do wykonania dla tego emaila.")
             return jsonify({"accepted": False, "error": "Brak zadań"}), 200
 
+        # Checkpoint — nowy albo wznowienie (ten sam message_id po restarcie)
+        try:
+            _checkpoint = checkpoint.open_checkpoint(
+                message_id, data, resume_only=resume
+            )
+        except checkpoint.CheckpointBusy:
+            app.logger.warning(
+                "[webhook] message_id=%s w toku w innym procesie — pomijam", message_id
+            )
+            return (
+                jsonify({"accepted": True, "duplicate": True, "message_id": message_id}),
+                200,
+            )
+        _resumed = _checkpoint is not None and _checkpoint.resumed
+
         # Inicjalizacja loggera sekcji
         # session_id = skrót message_id + sender żeby log był identyfikowalny
         _session_id = (message_id or "")[:16] + "_" + (sender or "").split("@")[0][:12]
@@ -966,8 +1111,19 @@ def webhook():
             sender=sender, subject=subject, body=body, sender_name=sender_name
         )
 
-        # Logowanie "ODEBRANO" do arkusza (opcjonalne)
-        if history_sheet_id:
+        # Kontrola przyjęć — prognoza szczytu pamięci z listy sekcji
+        admission = resource_manager.admit(list(tasks.keys()), logger=logger)
+        if admission["shed"]:
+            app.logger.warning(
+                "[webhook] Prognoza %.0f MB > %d MB — pomijam ciężkie sekcje: %s",
+                admission["projected_all_mb"],
+                resource_manager.memory_threshold_mb,
+                ", ".join(admission["shed"]),
+            )
+            tasks = {k: v for k, v in tasks.items() if k not in admission["shed"]}
+
+        # Logowanie "ODEBRANO" do arkusza (opcjonalne; przy wznowieniu już jest)
+        if history_sheet_id and not _resumed:
             try:
                 log_odebrano(history_sheet_id, message_id, sender, subject, body)
             except Exception as e:
@@ -979,7 +1135,7 @@ def webhook():
         # Pipeline może trwać kilka minut (FLUX, DeepSeek) — ten wpis chroni przed
         # wielokrotnym przetwarzaniem tej samej wiadomości.
         # log_przyjeto() wpisuje do kol. E (status_gas = PRZYJETO), NIE do kol. F.
-        if history_sheet_id and message_id:
+        if history_sheet_id and message_id and not _resumed:
             try:
                 log_przyjeto(history_sheet_id, message_id)
             except Exception as e:
@@ -989,7 +1145,28 @@ def webhook():
         _state_pipeline_start(
             message_id, sender, sender_name, subject, body, list(tasks.keys())
         )
-        _pipeline_start()
+        # delay — bilet (i rezerwacja pamięci) dopiero po doczekaniu się w wątku;
+        # do tego czasu liczony jako oczekujący (limit wątków, drenaż SIGTERM)
+        if admission["decision"] == "delay":
+            resource_manager.pipeline_delayed()
+        _admission = {
+            "decision": admission["decision"],
+            "ticket": (
+                None
+                if admission["decision"] == "delay"
+                else _pipeline_start(admission, logger)
+            ),
+        }
+
+        def _on_section_memory(section_key, mem):
+            _state_section_memory(section_key, mem)
+            if _admission["ticket"] is not None:
+                resource_manager.record_section_memory(_admission["ticket"], mem)
+
+        def _on_pipeline_done(combined_html, emails_sent):
+            _state_pipeline_done(combined_html, emails_sent)
+            # Jeszcze przed logger.finalize() — błąd prognozy w logu pipeline'u
+            resource_manager.report_forecast(_admission["ticket"], logger)
 
         _pipeline_kwargs = {
             "flask_app": app,
@@ -1012,7 +1189,16 @@ def webhook():
             "on_section_done": _state_section_done,
             "on_section_error": _state_section_error,
             "on_section_empty": _state_section_empty,
-            "on_pipeline_done": _state_pipeline_done,
+            "on_pipeline_done": _on_pipeline_done,
+            "on_section_memory": _on_section_memory,
+            "checkpoint": _checkpoint,
+            "section_budgets": responder_manager.config.get("performance", {}).get(
+                "section_budgets_sec"
+            ),
+            "section_order": responder_manager.config.get("performance", {}).get(
+                "section_order"
+            ),
+            "accepted_at": _accepted_at,
         }
 
         def _pipeline_wrapper(**kwargs):
@@ -1021,6 +1207,16 @@ def webhook():
 
             _tlog = _logging.getLogger("pipeline_thread")
             try:
+                if _admission["ticket"] is None:
+                    _tlog.warning("[thread] Prognoza pamięci — czekam na zwolnienie")
+                    decision = resource_manager.wait_for_admission(
+                        list(kwargs["tasks"].keys()), logger=kwargs["logger"]
+                    )
+                    for _shed in decision["shed"]:
+                        kwargs["tasks"].pop(_shed, None)
+                    _admission["ticket"] = _pipeline_start(
+                        decision, kwargs["logger"], delayed=True
+                    )
                 _tlog.error(
                     "[thread] START WĄTKU — tasks: %s",
                     list(kwargs.get("tasks", {}).keys()),
@@ -1034,7 +1230,12 @@ def webhook():
                         "[thread] BŁĄD: %s\n%s", _ex, _tb.format_exc()
                     )
             finally:
-                _pipeline_done()
+                if _admission["ticket"] is not None:
+                    _pipeline_done(_admission["ticket"])
+                elif _admission["decision"] == "delay":
+                    resource_manager.delay_abandoned()
+                if kwargs["checkpoint"] is not None:
+                    kwargs["checkpoint"].release()
 
         thread = threading.Thread(
             target=_pipeline_wrapper,
@@ -1050,6 +1251,8 @@ def webhook():
         # [POPRAWKA] traceback.format_exc() zadziała poprawnie
         app.logger.error("[webhook] Błąd krytyczny: %s\n%s", e, traceback.format_exc())
         log_error(str(e))
+        if _checkpoint is not None:
+            _checkpoint.release()
         return jsonify({"accepted": False, "error": str(e)}), 500
 
 
@@ -1065,6 +1268,7 @@ def debug_pipeline():
     if "application/json" in request.headers.get("Accept", ""):
         with _pipeline_state_lock:
             state = dict(_pipeline_state)
+        state["traces"] = recent_traces(3)
         resp_body = json.dumps(state, ensure_ascii=False, indent=2, default=str)
         return (
             app.response_class(resp_body, mimetype="application/json; charset=utf-8"),
@@ -1131,6 +1335,51 @@ def debug_pipeline():
             f'background:#fff;margin:6px 0 0 0;" sandbox="allow-same-origin"></iframe>'
         )
 
+    def _waterfall(trace):
+        """Waterfall spanów jednego śladu — pasek = [start, koniec] względem początku."""
+        spans = trace["spans"][:200]
+        if not spans:
+            return ""
+        t0 = min(sp["start"] for sp in spans)
+        t1 = max(sp["end"] or sp["start"] for sp in spans)
+        total = max(t1 - t0, 1e-6)
+        parents = {sp["span_id"]: sp["parent_id"] for sp in spans}
+
+        def _depth(sp):
+            d, p = 0, sp["parent_id"]
+            while p in parents and d < 10:
+                d, p = d + 1, parents[p]
+            return d
+
+        colors = {"ok": "#4a90d9", "error": "#dc3545", "empty": "#ffc107"}
+        rows = ""
+        for sp in spans:
+            left = (sp["start"] - t0) / total * 100
+            width = max(sp["duration_sec"] / total * 100, 0.3)
+            tip = html.escape(
+                json.dumps(sp.get("attrs") or {}, ensure_ascii=False, default=str)[:300]
+                + (f" | {sp['error']}" if sp.get("error") else "")
+            )
+            rows += (
+                f'<div style="display:flex;align-items:center;font-size:11px;height:18px" title="{tip}">'
+                f'<span style="width:38%;padding-left:{_depth(sp) * 10}px;white-space:nowrap;'
+                f'overflow:hidden;text-overflow:ellipsis;font-family:monospace">{html.escape(sp["name"])}</span>'
+                f'<span style="position:relative;flex:1;height:10px;background:#f4f4f4">'
+                f'<span style="position:absolute;left:{left:.2f}%;width:{width:.2f}%;height:10px;'
+                f'background:{colors.get(sp["status"], "#999")};border-radius:2px"></span></span>'
+                f'<span style="width:60px;text-align:right;color:#888">{sp["duration_sec"]:.2f}s</span>'
+                f"</div>"
+            )
+        root = trace.get("root") or {}
+        attrs = root.get("attrs") or {}
+        title = (
+            f'{html.escape(str(attrs.get("sender", "")))} — {total:.1f} s'
+            + ("" if root else " (w toku)")
+        )
+        return (
+            f'<div style="font-size:12px;color:#555;margin:8px 0 4px">{title}</div>{rows}'
+        )
+
     # ── Główna karta: status pipeline ────────────────────────────────────────
     status_val = state.get("status", "idle")
     main_rows = (
@@ -1174,6 +1423,16 @@ def debug_pipeline():
                 ),
             )
         )
+        mem = sv.get("memory")
+        if mem:
+            sec_rows += _row(
+                "Pamięć",
+                _esc(
+                    f'szczyt +{mem["peak_delta_mb"]} MB '
+                    f'(RSS {mem["rss_before_mb"]} → {mem["rss_after_mb"]}, '
+                    f'max {mem["rss_peak_mb"]})'
+                ),
+            )
         atts = sv.get("attachments", [])
         if atts:
             sec_rows += _row("Załączniki", _esc(", ".join(str(a) for a in atts)))
@@ -1208,6 +1467,12 @@ def debug_pipeline():
         history_rows = '<div style="color:#aaa;font-style:italic;padding:6px 0">Brak historii</div>'
     history_card = _card("Historia (ostatnie pipeline'y)", history_rows, "🕓")
 
+    # ── Waterfall śladów (core/tracing.py) ───────────────────────────────────
+    traces_html = "".join(_waterfall(t) for t in recent_traces(3))
+    traces_card = (
+        _card("Ślady (waterfall spanów)", traces_html, "⏱️") if traces_html else ""
+    )
+
     now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     full_html = f"""<!DOCTYPE html>
 <html lang="pl">
@@ -1234,6 +1499,7 @@ h1{{font-size:1.25em;margin-bottom:4px}}
 {main_card}
 {body_card}
 {sections_html}
+{traces_card}
 {combined_card}
 {history_card}
 <div class="footer">
@@ -1275,6 +1541,98 @@ def admin_hf_reset():
     )
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# Admin — profiler próbkujący (core/profiler.py)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _admin_authorized() -> bool:
+    """ADMIN_TOKEN z env porównany z nagłówkiem X-Admin-Token lub ?token=."""
+    expected = os.getenv("ADMIN_TOKEN", "").strip()
+    if not expected:
+        return False
+    given = request.headers.get("X-Admin-Token") or request.args.get("token", "")
+    return hmac.compare_digest(given.encode("utf-8"), expected.encode("utf-8"))
+
+
+@app.route("/admin/profile", methods=["GET", "POST"])
+def admin_profile():
+    """
+    Próbkuje stosy wszystkich wątków przez ?seconds=N (domyślnie 10) z ?hz=
+    (domyślnie 50) i zwraca collapsed stacks do flame graphu:
+
+        curl -H "X-Admin-Token: $ADMIN_TOKEN" \
+             "https://.../admin/profile?seconds=20" | flamegraph.pl > flame.svg
+
+    ?idle=1 — także stosy bez kodu projektu (bezczynne wątki).
+    Wymaga ADMIN_TOKEN w env — bez niego endpoint jest wyłączony.
+    """
+    from core.profiler import ProfilerBusy, collapsed, sample
+
+    if not _admin_authorized():
+        return jsonify({"status": "error", "message": "Brak uprawnień"}), 403
+    try:
+        seconds = float(request.args.get("seconds", 10))
+        hz = int(request.args.get("hz", 50))
+    except ValueError:
+        return jsonify({"status": "error", "message": "Złe seconds/hz"}), 400
+    idle = request.args.get("idle") == "1"
+
+    try:
+        result = sample(seconds, hz=hz, idle=idle)
+    except ProfilerBusy as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+
+    resp = make_response(collapsed(result["stacks"]), 200)
+    resp.headers["Content-Type"] = "text/plain; charset=utf-8"
+    resp.headers["X-Profile-Samples"] = str(result["samples"])
+    resp.headers["X-Profile-Seconds"] = str(result["seconds"])
+    resp.headers["X-Profile-Hz"] = str(result["hz"])
+    return no_cache_response(resp)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Restart — drenaż na SIGTERM i wznowienie z checkpointów
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _resume_checkpoints():
+    """Osierocone pipeline'y (proces zginął w trakcie) — ta sama ścieżka co webhook."""
+    time.sleep(checkpoint.RESUME_DELAY_SEC)
+    for message_id, data in checkpoint.pending():
+        try:
+            with app.app_context():
+                resp, code = _accept_pipeline(data, resume=True)
+            app.logger.warning(
+                "[checkpoint] Wznowienie %s → %s %s", message_id, code, resp.get_json()
+            )
+        except Exception as e:
+            app.logger.error("[checkpoint] Nie wznowiono %s: %s", message_id, e)
+
+
+_worker_lock = threading.Lock()
+_worker_pid = None
+
+
+def start_worker_services():
+    """
+    Drenaż SIGTERM i (z CHECKPOINT_RESUME=1) wznowienie checkpointów — raz na
+    proces workera. Wołane z gunicorn.conf.py (post_worker_init) i z __main__,
+    nigdy przy imporcie: import w teście, skrypcie, forkserverze czy masterze
+    gunicorna z preload_app nie może wznawiać pipeline'ów i wysyłać maili.
+    """
+    global _worker_pid
+    with _worker_lock:
+        if _worker_pid == os.getpid():
+            return
+        _worker_pid = os.getpid()
+    drain.install(_pipelines_in_flight, on_timeout=checkpoint.mark_all_interrupted)
+    if checkpoint.RESUME_ENABLED:
+        threading.Thread(
+            target=_resume_checkpoints, daemon=True, name="checkpoint-resume"
+        ).start()
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # Uruchomienie
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -1283,4 +1641,5 @@ if __name__ == "__main__":
     # Import traceback na dole jest już niepotrzebny, bo jest na górze pliku
     port = int(os.getenv("PORT", 5000))
     debug_mode = os.getenv("FLASK_DEBUG", "0") == "1"
+    start_worker_services()
     app.run(host="0.0.0.0", port=port, debug=debug_mode)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_biznes_topic.py
+Lokalny indeks tematów biznes (core/topic_index.py) na oznaczonej próbce
+benchmarks/data/biznes_topic_sample.jsonl (tematy TOPIC_MAP + UNKNOWN).
+
+Raportuje:
+  - pokrycie — odsetek maili rozstrzygniętych lokalnie (bez DeepSeek),
+  - trafność lokalnych decyzji (precision),
+  - trafność top-1 indeksu na całej próbce (gdyby nie było progu),
+  - czas budowy indeksu i µs na klasyfikację,
+  - oszczędzony czas: lokalne decyzje × czas wywołania detektora DeepSeek.
+    Z API_KEY_DEEPSEEK mierzony na próbce, bez klucza — z argumentu
+    (domyślnie 2.5 s, typowy czas krótkiej odpowiedzi deepseek-chat).
+
+Użycie:
+    python benchmarks/bench_biznes_topic.py [sek_llm]
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from responders import biznes  # noqa: E402
+
+PROBKA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "biznes_topic_sample.jsonl")
+
+
+def main():
+    sek_llm = float(sys.argv[1]) if len(sys.argv) > 1 else 2.5
+    with open(PROBKA, encoding="utf-8") as f:
+        probka = [json.loads(linia) for linia in f if linia.strip()]
+
+    with Flask("bench").app_context():
+        t0 = time.perf_counter()
+        index = biznes.topic_index()
+        budowa_ms = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        wyniki = [index.classify(p["body"]) for p in probka]
+        us = (time.perf_counter() - t0) / len(probka) * 1e6
+
+        zmierzone = ""
+        if os.getenv("API_KEY_DEEPSEEK"):
+            t0 = time.perf_counter()
+            for p in probka[:5]:
+                biznes.detect_topic_llm(p["body"])
+            sek_llm = (time.perf_counter() - t0) / 5
+            zmierzone = " (zmierzone)"
+
+    lokalne = [(p, m) for p, m in zip(probka, wyniki) if m.confident]
+    trafne_lokalne = sum(1 for p, m in lokalne if m.topic == p["topic"])
+    znane = [(p, m) for p, m in zip(probka, wyniki) if p["topic"] != "UNKNOWN"]
+    top1 = sum(1 for p, m in znane if m.topic == p["topic"])
+    unknown_lokalnie = sum(1 for p, m in lokalne if p["topic"] == "UNKNOWN")
+
+    print(f"Próbka: {len(probka)} maili ({len(znane)} z tematem, {len(probka) - len(znane)} UNKNOWN)")
+    print(f"Indeks: {len(index.topics)} tematów, {len(index.idf)} termów, budowa {budowa_ms:.0f} ms")
+    print(f"Klasyfikacja: {us:.0f} µs/mail")
+    print(
+        f"Pokrycie lokalne: {len(lokalne)}/{len(probka)} = {len(lokalne) / len(probka):.0%} "
+        f"(próg score>={index.min_score}, przewaga>={index.min_margin})"
+    )
+    if lokalne:
+        print(
+            f"Trafność decyzji lokalnych: {trafne_lokalne}/{len(lokalne)} = "
+            f"{trafne_lokalne / len(lokalne):.0%} (UNKNOWN przypisane tematowi: {unknown_lokalnie})"
+        )
+    print(f"Top-1 bez progu (maile z tematem): {top1}/{len(znane)} = {top1 / len(znane):.0%}")
+    print(
+        f"Oszczędność: {len(lokalne)} × {sek_llm:.2f} s{zmierzone} = "
+        f"{len(lokalne) * sek_llm:.1f} s na {len(probka)} maili "
+        f"({len(lokalne) / len(probka) * sek_llm:.2f} s średnio na mail biznes)"
+    )
+    for p, m in zip(probka, wyniki):
+        if (m.confident and m.topic != p["topic"]) or "-v" in sys.argv:
+            print(f"  ! {p['topic'][:25]:25} → {str(m.topic)[:25]:25} {m.score:.2f}/{m.margin:.2f}  {p['body'][:50]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_crossword_grid.py
+Siatka krzyżówki: FlatGrid (bytearray + dziennik cofnięć,
+responders/KRZYZOWKA/flat_grid.py) wobec CrosswordGrid (lista list).
+
+1. Wpisanie/cofnięcie — ta sama sekwencja poprawnych umieszczeń na 15x15:
+   FlatGrid.place + undo wobec backtrackingu na CrosswordGrid, gdzie
+   cofnięcie = powrót do kopii sprzed wpisania (copy + place_word).
+   Raport: umieszczeń/s, szczyt pamięci i bloki pozostawione na jedno
+   przeszukanie (tracemalloc; release CPython nie liczy pojedynczych
+   alokacji, więc szczyt pamięci to miara kopii trzymanych na stosie).
+2. CrosswordGeneratorNew.generate na FlatGrid: prób/s (CPU) i szczyt
+   pamięci na próbę.
+
+Słowa: wyrazy README.md (jak sekcja scrabble), stały seed.
+
+Użycie:
+    python benchmarks/bench_crossword_grid.py [przeszukan]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from responders.KRZYZOWKA.crossword_grid import CrosswordGrid, Direction  # noqa: E402
+from responders.KRZYZOWKA.crossword_new import CrosswordGeneratorNew  # noqa: E402
+from responders.KRZYZOWKA.flat_grid import FlatGrid  # noqa: E402
+from responders.scrabble import EmailWordSource, _extract_email_words  # noqa: E402
+
+README = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "README.md")
+DIM = 15
+
+
+def _sekwencja(slowa):
+    """Umieszczenia (word, row, col, vertical) wybrane przez CrosswordGeneratorNew."""
+    gen = CrosswordGeneratorNew(EmailWordSource(slowa), seed=1)
+    gen.width = gen.height = DIM
+    gen._all_words = None
+    gen._prep_grid()
+    wyrazy = gen._prepare_wordlist()
+    wynik = [(wyrazy[0], DIM // 2, 0, False)]
+    gen._set_word(*wynik[0])
+    for w in wyrazy[1:]:
+        miejsce = gen._get_coords(w)
+        if miejsce:
+            gen._set_word(w, *miejsce)
+            wynik.append((w, *miejsce))
+    return wynik
+
+
+def _flat(seq, zakodowane, flat):
+    for w, r, c, v in seq:
+        flat.place(zakodowane[w], r, c, v)
+    for _ in seq:
+        flat.undo()
+
+
+def _kopie(seq):
+    stos = [CrosswordGrid(DIM, DIM)]
+    for w, r, c, v in seq:
+        g = stos[-1].copy()
+        g.place_word(w, r, c, Direction.VERTICAL if v else Direction.HORIZONTAL, "")
+        stos.append(g)
+    while len(stos) > 1:
+        stos.pop()
+
+
+def _pomiar(fn, n):
+    t0 = time.process_time()
+    for _ in range(n):
+        fn()
+    dt = time.process_time() - t0
+    tracemalloc.start()
+    bloki0 = sys.getallocatedblocks()
+    fn()
+    bloki = sys.getallocatedblocks() - bloki0
+    _, szczyt = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return dt, szczyt, bloki
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with open(README, encoding="utf-8") as f:
+        slowa = _extract_email_words(f.read()[:3000])
+
+    seq = _sekwencja(slowa)
+    flat = FlatGrid(DIM, DIM)
+    zakodowane = {w: flat.encode(w) for w, *_ in seq}
+    umieszczen = len(seq) * n
+
+    dt_f, szczyt_f, bloki_f = _pomiar(lambda: _flat(seq, zakodowane, flat), n)
+    dt_k, szczyt_k, bloki_k = _pomiar(lambda: _kopie(seq), n)
+    assert flat.filled == 0 and flat.words == 0
+
+    print(f"Sekwencja: {len(seq)} wyrazów na {DIM}x{DIM}, {n} przeszukań (wpisz wszystkie, cofnij wszystkie)")
+    print(f"FlatGrid place/undo:  {umieszczen / dt_f:10.0f} umieszczeń/s, "
+          f"szczyt {szczyt_f / 1024:6.1f} KiB, bloki po przeszukaniu {bloki_f:+d}")
+    print(f"CrosswordGrid copy:   {umieszczen / dt_k:10.0f} umieszczeń/s, "
+          f"szczyt {szczyt_k / 1024:6.1f} KiB, bloki po przeszukaniu {bloki_k:+d}  "
+          f"({dt_k / dt_f:.1f}× wolniej)")
+
+    source = EmailWordSource(slowa)
+    proby = cpu = 0.0
+    wyrazy = []
+    for seed in range(5):
+        gen = CrosswordGeneratorNew(source, seed=seed)
+        gen.generate(DIM, DIM, time_limit=1.0, stall_attempts=None)
+        proby += gen.last_stats["attempts"]
+        cpu += gen.last_stats["cpu_sec"]
+        wyrazy.append(gen.last_stats["words"])
+    gen = CrosswordGeneratorNew(source, seed=0)
+    gen.generate(DIM, DIM, time_limit=0.2, stall_attempts=None)  # Rozgrzewka: kody liter
+    tracemalloc.start()
+    gen.generate(DIM, DIM, time_limit=0.5, stall_attempts=None)
+    _, szczyt_g = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"CrosswordGeneratorNew: {proby / cpu:.0f} prób/s CPU, wyrazów (seed 0-4): {wyrazy}, "
+          f"szczyt pamięci generate {szczyt_g / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
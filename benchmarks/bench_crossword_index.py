@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_crossword_index.py
+Wyszukiwanie wyrazów krzyżówki po wzorcu ("?A??E"): PatternIndex
+(responders/KRZYZOWKA/pattern_index.py) wobec dotychczasowego skanu —
+get_words_by_length po całym słowniku + porównanie litera po literze.
+
+Raportuje wyszukiwania/s obu metod, czas budowy indeksu i czas ładowania
+z cache binarnego (<plik>.idx) wobec parsowania pliku słów.
+
+Bez argumentu — syntetyczna baza (litery wg częstości w polszczyźnie,
+długości 2-15, stały seed) w katalogu tymczasowym. Z argumentem — własny
+plik w formacie dane.txt ("WYRAZ definicja").
+
+Użycie:
+    python benchmarks/bench_crossword_index.py [dane.txt] [slow] [wzorcow]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from responders.KRZYZOWKA.pattern_index import PatternIndex, words_key  # noqa: E402
+from responders.KRZYZOWKA.word_source import WordSource  # noqa: E402
+
+LITERY = "AIEOZNRWSCTKYDPMUJLŁBGĘHĄÓŻŚĆFŃŹ"
+WAGI = [
+    89, 82, 77, 77, 56, 55, 47, 47, 43, 40, 40, 35, 38, 33, 31, 28, 25, 23, 21,
+    18, 15, 14, 11, 11, 10, 9, 8, 7, 4, 3, 2, 1,
+]
+
+
+def _baza(path: str, n: int) -> None:
+    rng = random.Random(42)
+    slowa = set()
+    while len(slowa) < n:
+        dl = min(15, max(2, int(rng.gauss(7, 2.5))))
+        slowa.add("".join(rng.choices(LITERY, WAGI, k=dl)))
+    with open(path, "w", encoding="utf-8") as f:
+        for w in sorted(slowa):
+            f.write(f"{w} definicja {w.lower()}\n")
+
+
+def _wzorce(slowa, n: int):
+    """Wzorce jak w generatorze: 1-3 znane litery (przecięcia), reszta '?'."""
+    rng = random.Random(7)
+    wynik = []
+    for _ in range(n):
+        w = rng.choice(slowa)
+        znane = set(rng.sample(range(len(w)), min(len(w), rng.randint(1, 3))))
+        wynik.append("".join(c if i in znane else "?" for i, c in enumerate(w)))
+    return wynik
+
+
+def _skan(source: WordSource, pattern: str):
+    """Dotychczasowa ścieżka: wszystkie słowa → filtr długości → litery."""
+    n = len(pattern)
+    return [
+        w for w in source.words
+        if len(w) == n and all(p == "?" or p == c for p, c in zip(pattern, w))
+    ]
+
+
+def _na_sekunde(fn, wzorce, min_sek=1.0):
+    i, t0 = 0, time.perf_counter()
+    while True:
+        fn(wzorce[i % len(wzorce)])
+        i += 1
+        dt = time.perf_counter() - t0
+        if dt >= min_sek and i >= len(wzorce):
+            return i / dt, i
+
+
+def main():
+    n_slow = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    n_wzorcow = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tmp, "dane.txt")
+        if len(sys.argv) <= 1:
+            _baza(path, n_slow)
+
+        t0 = time.perf_counter()
+        source = WordSource(path)
+        parsowanie_ms = (time.perf_counter() - t0) * 1000
+        slowa = list(source.words)
+
+        t0 = time.perf_counter()
+        index = PatternIndex(slowa)
+        budowa_ms = (time.perf_counter() - t0) * 1000
+
+        cache = os.path.join(tmp, "bench.idx")
+        index.save(cache)
+        t0 = time.perf_counter()
+        z_cache = PatternIndex.load(cache, words_key(slowa))
+        ladowanie_ms = (time.perf_counter() - t0) * 1000
+        assert z_cache is not None
+
+        wzorce = _wzorce(slowa, n_wzorcow)
+        for p in wzorce:
+            assert index.find(p) == _skan(source, p), p
+        trafien = sum(index.count(p) for p in wzorce) / len(wzorce)
+
+        skan_s, _ = _na_sekunde(lambda p: _skan(source, p), wzorce)
+        index_s, _ = _na_sekunde(index.find, wzorce)
+        licz_s, _ = _na_sekunde(index.count, wzorce)
+        kib = os.path.getsize(path) / 1024
+
+    print(f"Baza: {len(slowa)} słów, {len(index.bits)} bitsetów (długość, pozycja, litera)")
+    print(f"Parsowanie pliku słów: {parsowanie_ms:.0f} ms")
+    print(f"Budowa indeksu: {budowa_ms:.0f} ms, ładowanie z cache: {ladowanie_ms:.0f} ms "
+          f"({kib:.0f} KiB tekstu)")
+    print(f"Wzorce: {len(wzorce)}, średnio {trafien:.0f} trafień")
+    print(f"Skan (dotychczas): {skan_s:10.0f} wyszukiwań/s")
+    print(f"PatternIndex.find: {index_s:10.0f} wyszukiwań/s  ({index_s / skan_s:.0f}×)")
+    print(f"PatternIndex.count:{licz_s:10.0f} wyszukiwań/s  ({licz_s / skan_s:.0f}×)")
+
+
+if __name__ == "__main__":
+    main()
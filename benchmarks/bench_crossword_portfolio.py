@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_crossword_portfolio.py
+MultiStrategyGenerator: tryb sekwencyjny (generate_all_strategies — sześć
+strategii po kolei) wobec portfolio (generate_portfolio — pula procesów,
+wspólna flaga anulowania i najlepszy wynik, stop na target_density lub
+time_budget).
+
+Rozmiary siatek — scenariusze sizes_to_test z
+responders/KRZYZOWKA/test_sizing.py (czytane przez ast: test_sizing
+importuje orchestrator spoza pakietu i nie da się go zaimportować).
+Słowa — biblioteka/slowa_*.txt (ok. 1700 polskich wyrazów) w tymczasowym
+pliku w formacie baza.txt.
+
+Na maszynie z 1 CPU portfolio nie zyskuje na równoległości — zostaje
+wcześniejszy stop; liczba rdzeni jest w raporcie.
+
+Użycie:
+    python benchmarks/bench_crossword_portfolio.py [target_density] [time_budget] [rozmiarow]
+"""
+
+import ast
+import glob
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from responders.KRZYZOWKA.crossword_strategies import MultiStrategyGenerator  # noqa: E402
+from responders.KRZYZOWKA.word_source import WordSource  # noqa: E402
+
+TEST_SIZING = os.path.join(ROOT, "responders", "KRZYZOWKA", "test_sizing.py")
+
+
+def _rozmiary():
+    with open(TEST_SIZING, encoding="utf-8") as f:
+        drzewo = ast.parse(f.read())
+    for wezel in drzewo.body:
+        if isinstance(wezel, ast.Assign) and any(
+            getattr(t, "id", None) == "sizes_to_test" for t in wezel.targets
+        ):
+            return ast.literal_eval(wezel.value)
+    raise RuntimeError("Brak sizes_to_test w test_sizing.py")
+
+
+def _baza(katalog: str) -> str:
+    slowa = set()
+    for plik in glob.glob(os.path.join(ROOT, "biblioteka", "slowa_*.txt")):
+        with open(plik, encoding="utf-8") as f:
+            slowa |= {w.upper() for w in re.findall(r"[A-Za-zĄĆĘŁŃÓŚŹŻąćęłńóśźż]{2,}", f.read())}
+    sciezka = os.path.join(katalog, "baza.txt")
+    with open(sciezka, "w", encoding="utf-8") as f:
+        f.writelines(f"{w} wyraz z biblioteki\n" for w in sorted(slowa))
+    return sciezka
+
+
+def _najlepszy(wyniki):
+    if not wyniki:
+        return 0.0, 0
+    r = max(wyniki, key=lambda r: r.density)
+    return r.density, r.word_count
+
+
+def main():
+    target = float(sys.argv[1]) if len(sys.argv) > 1 else 95.0
+    budzet = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    rozmiary = _rozmiary()[: int(sys.argv[3])] if len(sys.argv) > 3 else _rozmiary()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = WordSource(_baza(tmp))
+        gen = MultiStrategyGenerator(source)
+        print(f"CPU: {multiprocessing.cpu_count()}, słów: {len(source.words)}, "
+              f"target_density={target}%, time_budget={budzet}s")
+        print(f"{'siatka':>7} | {'sekw. s':>7} {'gęst.%':>6} {'wyr.':>4} | "
+              f"{'portf. s':>8} {'gęst.%':>6} {'wyr.':>4} {'stop':>11} {'gotowe':>6}")
+        suma_s = suma_p = 0.0
+        for w, h in rozmiary:
+            t0 = time.perf_counter()
+            sekw = gen.generate_all_strategies(w, h)
+            dt_s = time.perf_counter() - t0
+            d_s, n_s = _najlepszy(sekw)
+
+            port = gen.generate_portfolio(w, h, target_density=target, time_budget=budzet)
+            info = gen.last_portfolio
+            d_p, n_p = _najlepszy(port)
+            suma_s += dt_s
+            suma_p += info["wall_sec"]
+            print(f"{w:>3}x{h:<3} | {dt_s:7.2f} {d_s:6.1f} {n_s:4d} | "
+                  f"{info['wall_sec']:8.2f} {d_p:6.1f} {n_p:4d} {info['stop_reason']:>11} "
+                  f"{info['finished']:>3}/{len(gen.strategies)}")
+        print(f"Razem: sekwencyjnie {suma_s:.1f} s, portfolio {suma_p:.1f} s "
+              f"({suma_s / suma_p:.1f}×)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_deepseek_stream.py
+Strumieniowanie DeepSeek (SSE + IncrementalJSONReader) vs zwykłe call_deepseek
+na przykładzie tryptyku: 7 promptów FLUX, każdy od razu przetwarzany przez
+konsumenta (symulowany FLUX o stałym czasie).
+
+Nie wymaga API — uruchamia lokalny serwer udający /chat/completions, który
+wysyła odpowiedź token po tokenie z zadanym tempem (domyślnie 60 tok/s).
+
+Mierzy: czas do pierwszego tokenu, do pierwszego elementu, do końca odpowiedzi
+oraz czas całego etapu (odpowiedź + 7× konsument).
+
+Użycie:
+    python benchmarks/bench_deepseek_stream.py [tokeny_na_sek] [sek_na_panel]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROMPT = (
+    "Fight Club 1999, a bruised man in a torn shirt kneeling in a flooded "
+    "basement, surrounded by broken chairs and scattered soap bars, flickering "
+    "fluorescent light, 35mm film grain, gritty, underexposed, Fincher green "
+    "tint, close-up on bloody knuckles, cigarette smoke, peeling paint, "
+    "nihilistic stare into the lens, wet concrete floor, handheld camera"
+)
+ODPOWIEDZ = json.dumps(
+    {"prompts": [f"Panel {i}: {PROMPT}" for i in range(1, 8)]}, ensure_ascii=False
+)
+ZNAKI_NA_TOKEN = 4
+
+
+def _handler_factory(tokeny_na_sek: float):
+    opoznienie = 1.0 / tokeny_na_sek
+    tokeny = [
+        ODPOWIEDZ[i:i + ZNAKI_NA_TOKEN] for i in range(0, len(ODPOWIEDZ), ZNAKI_NA_TOKEN)
+    ]
+    usage = {
+        "prompt_tokens": 400,
+        "completion_tokens": len(tokeny),
+        "total_tokens": 400 + len(tokeny),
+        "prompt_cache_hit_tokens": 384,
+        "prompt_cache_miss_tokens": 16,
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            dlugosc = int(self.headers.get("Content-Length", 0))
+            zadanie = json.loads(self.rfile.read(dlugosc) or b"{}")
+            if zadanie.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                time.sleep(0.3)  # czas do pierwszego tokenu (prefill)
+                for tok in tokeny:
+                    event = {"choices": [{"index": 0, "delta": {"content": tok}}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(opoznienie)
+                koniec = {"choices": [], "usage": usage}
+                self.wfile.write(f"data: {json.dumps(koniec)}\n\ndata: [DONE]\n\n".encode())
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            time.sleep(0.3 + opoznienie * len(tokeny))
+            body = json.dumps(
+                {
+                    "choices": [{"message": {"content": ODPOWIEDZ}}],
+                    "usage": usage,
+                }
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def main():
+    tokeny_na_sek = float(sys.argv[1]) if len(sys.argv) > 1 else 60.0
+    sek_na_panel = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    serwer = ThreadingHTTPServer(("127.0.0.1", 0), _handler_factory(tokeny_na_sek))
+    threading.Thread(target=serwer.serve_forever, daemon=True).start()
+    os.environ["DEEPSEEK_URL"] = f"http://127.0.0.1:{serwer.server_port}/chat/completions"
+    os.environ.setdefault("API_KEY_DEEPSEEK", "bench")
+
+    from flask import Flask
+
+    from core.ai_client import DeepSeekJSONStream, call_deepseek
+
+    app = Flask(__name__)
+
+    # ── Zwykłe wywołanie: czekamy na całość, potem 7 paneli ──────────────────
+    with app.app_context():
+        t0 = time.monotonic()
+        raw = call_deepseek("system", "user", "deepseek-chat", max_tokens=2000)
+        t_odp = time.monotonic() - t0
+        prompts = json.loads(raw)["prompts"]
+        for _ in prompts:
+            time.sleep(sek_na_panel)
+        t_calosc = time.monotonic() - t0
+
+    # ── Strumień: panel rusza, gdy tylko jego prompt się domknie ─────────────
+    t0 = time.monotonic()
+    stream = DeepSeekJSONStream(
+        "system", "user", "deepseek-chat", klucz_listy="prompts", max_tokens=2000
+    ).start()
+    i = 0
+    while stream.get(i) is not None:
+        time.sleep(sek_na_panel)
+        i += 1
+    t_calosc_s = time.monotonic() - t0
+    st = stream.staty
+
+    print(
+        f"Odpowiedź: {len(ODPOWIEDZ)} znaków, ~{len(ODPOWIEDZ) // ZNAKI_NA_TOKEN} tokenów, "
+        f"{tokeny_na_sek:.0f} tok/s, konsument {sek_na_panel:.1f}s/panel"
+    )
+    print(f"{'':<12} {'1. token':>9} {'1. prompt':>10} {'odpowiedź':>10} {'etap':>8}")
+    print(f"{'zwykle':<12} {'-':>9} {t_odp:>9.2f}s {t_odp:>9.2f}s {t_calosc:>7.2f}s")
+    print(
+        f"{'strumień':<12} {st['ttft_sec']:>8.2f}s {st['ttfi_sec']:>9.2f}s "
+        f"{st['total_sec']:>9.2f}s {t_calosc_s:>7.2f}s"
+    )
+    print(
+        f"Strumień: {st['items']} promptów, etap krótszy o "
+        f"{t_calosc - t_calosc_s:.2f}s ({(1 - t_calosc_s / t_calosc) * 100:.0f}%)"
+    )
+    serwer.shutdown()
+
+
+if __name__ == "__main__":
+    main()
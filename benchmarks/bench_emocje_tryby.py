@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_emocje_tryby.py
+Porównanie trybów responders/emocje: "osobno" (8 zapytań) vs "zbiorczo"
+(1 zapytanie JSON + dogenerowanie metod, które nie przeszły walidacji).
+
+Mierzy: czas całkowity, tokeny wejściowe/wyjściowe, liczbę wywołań i 429.
+Wymaga API_KEY_DEEPSEEK (prawdziwe wywołania API).
+
+Użycie:
+    python benchmarks/bench_emocje_tryby.py [liczba_powtorzen]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from responders.emocje import (  # noqa: E402
+    ALL_METODY_KEYS,
+    _generuj_metody,
+    _load_prompt,
+    _nowe_staty,
+)
+
+MAIL = (
+    "Czesc, pisze bo juz nie daje rady. Od trzech miesiecy szukam pracy, "
+    "wyslalem ponad sto CV i nikt nie odpowiada. Rodzina mowi, ze sie nie "
+    "staram, a ja kazdego dnia siedze przy komputerze od rana do nocy. "
+    "Czuje sie niewidzialny i coraz bardziej zly na siebie. Nie wiem juz, "
+    "czy to ma jakikolwiek sens. Marek"
+)
+
+
+def _przebieg(tryb: str, prompt_data: dict) -> dict:
+    staty = _nowe_staty()
+    t0 = time.time()
+    wyniki = _generuj_metody(MAIL, "Marek", prompt_data, tryb=tryb, staty=staty)
+    staty["sciana_sec"] = time.time() - t0
+    staty["metody_ok"] = sum(1 for k in ALL_METODY_KEYS if wyniki.get(k))
+    return staty
+
+
+def main():
+    if not os.getenv("API_KEY_DEEPSEEK"):
+        print("Brak API_KEY_DEEPSEEK — benchmark wymaga prawdziwego API.")
+        sys.exit(1)
+
+    powtorzenia = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    prompt_data = _load_prompt()
+    podsumowanie = {}
+
+    for tryb in ("osobno", "zbiorczo"):
+        przebiegi = []
+        for i in range(powtorzenia):
+            s = _przebieg(tryb, prompt_data)
+            przebiegi.append(s)
+            print(
+                f"[{tryb:<8}] #{i + 1}: {s['sciana_sec']:6.1f}s | "
+                f"wywołań {s['wywolania']} | prompt_tokens {s['prompt_tokens']} | "
+                f"completion_tokens {s['completion_tokens']} | "
+                f"429: {s['rate_limit_429']} | metod OK {s['metody_ok']}/8"
+            )
+        podsumowanie[tryb] = {
+            k: sum(p[k] for p in przebiegi) / len(przebiegi)
+            for k in ("sciana_sec", "wywolania", "prompt_tokens",
+                      "completion_tokens", "rate_limit_429", "metody_ok")
+        }
+
+    print("\n" + "=" * 72)
+    print(f"{'średnio':<20}{'osobno':>16}{'zbiorczo':>16}{'zmiana':>16}")
+    print("=" * 72)
+    for k in ("sciana_sec", "wywolania", "prompt_tokens",
+              "completion_tokens", "rate_limit_429", "metody_ok"):
+        a = podsumowanie["osobno"][k]
+        b = podsumowanie["zbiorczo"][k]
+        zmiana = f"{(b - a) / a * 100:+.0f}%" if a else "-"
+        print(f"{k:<20}{a:>16.1f}{b:>16.1f}{zmiana:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_isolation.py
+RSS workera po serii pipeline'ów — sekcje w procesie vs w procesach potomnych
+(core/process_isolation.py).
+
+Sekcja syntetyczna odwzorowuje ciężkie respondery: obrazy Pillow (jak FLUX),
+PDF z reportlab (jak generator_pdf) i duże stringi base64 załączników. Każdy
+tryb biegnie w świeżym interpreterze, żeby nie dziedziczyć sterty poprzedniego.
+Wynik: RSS po rozgrzewce, po wszystkich pipeline'ach i maksimum w trakcie.
+
+Użycie:
+    python benchmarks/bench_isolation.py [pipeline'ow]
+"""
+
+import base64
+import gc
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+KATALOG = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, KATALOG)
+
+N_PIPELINE = 50
+ROZGRZEWKA = 3
+
+
+def ciezka_sekcja(seed: int, obrazow: int = 4) -> dict:
+    """Obrazy PNG + PDF z nimi + base64 — jak zwykly/generator_pdf."""
+    from PIL import Image, ImageDraw
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    rnd = random.Random(seed)
+    zalaczniki = []
+    pdf_buf = io.BytesIO()
+    c = canvas.Canvas(pdf_buf, pagesize=A4)
+    for i in range(obrazow):
+        # Rozmiary zmienne jak w odpowiedziach FLUX — różne klasy alokacji
+        bok = rnd.choice((896, 1024, 1152, 1280))
+        img = Image.new("RGB", (bok, bok))
+        d = ImageDraw.Draw(img)
+        for _ in range(200):
+            x, y = rnd.randrange(bok), rnd.randrange(bok)
+            d.ellipse(
+                (x, y, x + rnd.randrange(5, 200), y + rnd.randrange(5, 200)),
+                fill=(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)),
+            )
+        png = io.BytesIO()
+        img.save(png, format="PNG")
+        zalaczniki.append(
+            {"filename": f"obraz_{i}.png", "base64": base64.b64encode(png.getvalue()).decode()}
+        )
+        c.drawImage(ImageReader(img), 40, 200, width=500, height=500)
+        c.showPage()
+    c.save()
+    zalaczniki.append(
+        {"filename": "raport.pdf", "base64": base64.b64encode(pdf_buf.getvalue()).decode()}
+    )
+    return {"reply_html": "<p>ok</p>", "attachments": zalaczniki}
+
+
+def _dziecko(tryb: str, n: int):
+    """Jeden tryb w świeżym interpreterze — wypisuje JSON z pomiarami RSS."""
+    import psutil
+
+    from core import process_isolation
+    from core.logging_reporter import ExecutionLogger, bind_logger
+
+    process_isolation.ISOLATION_PRELOAD = ["PIL.Image", "reportlab.pdfgen.canvas"]
+    if tryb == "izolacja":
+        process_isolation.ISOLATE_SECTIONS = {"ciezka"}
+    else:
+        process_isolation.ISOLATE_SECTIONS = set()
+
+    proc = psutil.Process()
+    rss = lambda: proc.memory_info().rss / 1024 / 1024  # noqa: E731
+    przebiegi = []
+    t0 = time.perf_counter()
+    for i in range(n):
+        lg = ExecutionLogger(session_id=f"bench-{i}", upload_to_drive=False)
+        with bind_logger(lg):
+            fn = process_isolation.section_fn(
+                "ciezka", "bench_isolation", "ciezka_sekcja", {"seed": i}
+            )
+            wynik = fn()
+            assert wynik["attachments"]
+        lg._close()
+        del wynik, lg
+        gc.collect()
+        przebiegi.append(rss())
+    print(
+        json.dumps(
+            {
+                "tryb": tryb,
+                "po_rozgrzewce_mb": przebiegi[min(ROZGRZEWKA, n) - 1],
+                "koniec_mb": przebiegi[-1],
+                "max_mb": max(przebiegi),
+                "sek_na_pipeline": (time.perf_counter() - t0) / n,
+            }
+        )
+    )
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--tryb":
+        _dziecko(sys.argv[2], int(sys.argv[3]))
+        return
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else N_PIPELINE
+    print(f"{n} pipeline'ów, sekcja: 4 obrazy Pillow + PDF reportlab + base64\n")
+    print(f"{'tryb':<10} {'po rozgrzewce':>14} {'koniec':>10} {'max':>10} {'s/pipeline':>11}")
+    for tryb in ("proces", "izolacja"):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--tryb", tryb, str(n)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(
+            f"{tryb:<10} {r['po_rozgrzewce_mb']:>12.1f}MB {r['koniec_mb']:>8.1f}MB "
+            f"{r['max_mb']:>8.1f}MB {r['sek_na_pipeline']:>10.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
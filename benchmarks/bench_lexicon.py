@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_lexicon.py
+Przepustowość core/lexicon_analyzer.py: czas kompilacji słowników, µs na
+mail i maile/s — wobec naiwnego skanowania (każdy wpis słownika osobno
+wyszukiwany w tekście, jak robiłby to prosty `in`).
+
+Maile syntetyczne: słowa ze słowników przemieszane ze słowami spoza nich
+(ok. 1/5 trafień), stały seed — wyniki porównywalne między przebiegami.
+
+Użycie:
+    python benchmarks/bench_lexicon.py [maili] [slow_na_mail]
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.lexicon_analyzer import BIBLIOTEKA_DIR, LexiconAnalyzer  # noqa: E402
+
+WYPELNIACZ = (
+    "dzień dobry piszę ponieważ wczoraj byłem w mieście i widziałem dom sąsiada "
+    "który zawsze rano wychodzi z psem na spacer potem idzie do pracy autobusem "
+    "a wieczorem wraca zmęczony kupuje chleb mleko i gazetę czyta ją przy herbacie"
+).split()
+
+
+def _maile(analyzer_src: dict, n: int, slow: int):
+    rng = random.Random(42)
+    slownik = [w for wpisy in analyzer_src.values() for w in wpisy]
+    return [
+        " ".join(
+            rng.choice(slownik) if rng.random() < 0.2 else rng.choice(WYPELNIACZ)
+            for _ in range(slow)
+        )
+        for _ in range(n)
+    ]
+
+
+def _naiwnie(lexicons: dict, text: str) -> dict:
+    tekst = " " + " ".join(re.findall(r"[^\W\d_]+", text.lower())) + " "
+    return {
+        kat: sum(tekst.count(" " + w.lower()) for w in wpisy)
+        for kat, wpisy in lexicons.items()
+    }
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    slow = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    t0 = time.perf_counter()
+    analyzer = LexiconAnalyzer.from_directory()
+    kompilacja_ms = (time.perf_counter() - t0) * 1000
+
+    lexicons = {}
+    for nazwa in sorted(os.listdir(BIBLIOTEKA_DIR)):
+        if nazwa.startswith("slowa_"):
+            with open(os.path.join(BIBLIOTEKA_DIR, nazwa), encoding="utf-8") as f:
+                lexicons[nazwa[6:-4]] = [w.strip() for w in f if w.strip() and w[0] != "#"]
+    maile = _maile(lexicons, n, slow)
+    bajty = sum(len(m.encode("utf-8")) for m in maile)
+
+    for m in maile[:50]:  # rozgrzewka cache tematów snowballa
+        analyzer.analyze(m)
+    t0 = time.perf_counter()
+    for m in maile:
+        analyzer.analyze(m)
+    ac = time.perf_counter() - t0
+
+    probka = maile[: max(1, n // 10)]
+    t0 = time.perf_counter()
+    for m in probka:
+        _naiwnie(lexicons, m)
+    naiwnie = (time.perf_counter() - t0) / len(probka) * n
+
+    print(
+        f"Słowniki: {len(analyzer.categories)} kategorii, {analyzer.patterns} wzorców, "
+        f"{len(analyzer._goto)} węzłów — kompilacja {kompilacja_ms:.1f} ms"
+    )
+    print(f"Maile: {n} × {slow} słów ({bajty / 1e6:.2f} MB)")
+    print(
+        f"  Aho-Corasick (tematy): {ac / n * 1e6:8.1f} µs/mail  "
+        f"{n / ac:9.0f} maili/s  {bajty / 1e6 / ac:6.2f} MB/s"
+    )
+    print(
+        f"  naiwne skanowanie:     {naiwnie / n * 1e6:8.1f} µs/mail  "
+        f"{n / naiwnie:9.0f} maili/s  (x{naiwnie / ac:.1f} wolniej)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_scrabble_render.py
+Renderowanie PNG w responders/scrabble.py: render_scrabble_image (tekst na
+planszy) i _render_crossword_grid_image (krzyżówka 15x15).
+
+"zimny" — przed każdym renderem _reset_render_cache(): plansza.csv,
+czcionki, każde pole i tło rysowane od nowa prymitywami PIL (jak przed
+sprite'ami). "ciepły" — kopia tła z pamięci + paste sprite'ów kafelków.
+Osobno czas samego kodowania PNG (img.save), wspólny dla obu trybów.
+
+Użycie:
+    python benchmarks/bench_scrabble_render.py [renderow]
+"""
+
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask  # noqa: E402
+
+from responders import scrabble  # noqa: E402
+
+
+def _ms(fn, n, zimny):
+    t = 0.0
+    for _ in range(n):
+        if zimny:
+            scrabble._reset_render_cache()
+        t0 = time.perf_counter()
+        fn()
+        t += time.perf_counter() - t0
+    return t / n * 1000
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    with open(os.path.join(ROOT, "README.md"), encoding="utf-8") as f:
+        tresc = f.read()[:3000]
+    tekst = tresc[: scrabble.BOARD_DIM ** 2]
+    slowa = scrabble._extract_email_words(tresc)
+    grid = scrabble.CrosswordGeneratorNew(scrabble.EmailWordSource(slowa), seed=1).generate(
+        scrabble.BOARD_DIM, scrabble.BOARD_DIM, time_limit=1.0
+    )
+
+    with Flask("bench").app_context():
+        przypadki = [
+            ("plansza", lambda: scrabble.render_scrabble_image(tekst)),
+            ("krzyżówka", lambda: scrabble._render_crossword_grid_image(grid)),
+        ]
+        img = scrabble._background("board").copy()
+        png = _ms(lambda: img.save(io.BytesIO(), format="PNG"), n, False)
+
+        print(f"{n} renderów, {len(tekst)} znaków na planszy, "
+              f"{len(grid.placed_words)} wyrazów w krzyżówce")
+        print(f"{'':>10} | {'zimny ms':>8} {'ciepły ms':>9} {'zysk':>5} | {'w tym PNG ms':>12}")
+        for nazwa, fn in przypadki:
+            zimny = _ms(fn, n, True)
+            fn()  # Rozgrzewka sprite'ów
+            cieply = _ms(fn, n, False)
+            print(f"{nazwa:>10} | {zimny:8.1f} {cieply:9.1f} {zimny / cieply:4.1f}× | {png:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_tracing.py
+Narzut core/tracing.py: koszt jednego spanu (z eksportem JSONL) i jego udział
+w czasie typowej sekcji.
+
+Sekcja symulowana jak zwykly: ~30 wywołań (DeepSeek, FLUX, Drive, Sheets,
+Gmail) po kilkadziesiąt ms każde (time.sleep — odpowiedź sieci). Porównuje
+czas sekcji ze spanami i bez (TRACING_ENABLED=False).
+
+Użycie:
+    python benchmarks/bench_tracing.py [wywolan_na_sekcje] [ms_na_wywolanie]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import tracing  # noqa: E402
+from core.tracing import span  # noqa: E402
+
+N_SPANOW = 20000
+
+
+def _koszt_spanu() -> float:
+    """Średni koszt pary span()+eksport w mikrosekundach."""
+    with span("pipeline"):
+        t0 = time.perf_counter()
+        for i in range(N_SPANOW):
+            with span("deepseek", model="deepseek-chat", i=i):
+                pass
+        return (time.perf_counter() - t0) / N_SPANOW * 1e6
+
+
+def _sekcja(wywolan: int, sek_na_wywolanie: float) -> float:
+    t0 = time.perf_counter()
+    with span("pipeline"):
+        with span("section.zwykly"):
+            for i in range(wywolan):
+                with span("deepseek", i=i):
+                    time.sleep(sek_na_wywolanie)
+    return time.perf_counter() - t0
+
+
+def main():
+    wywolan = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    ms = float(sys.argv[2]) if len(sys.argv) > 2 else 50.0
+
+    tracing.TRACE_JSONL_PATH = os.path.join(tempfile.mkdtemp(), "traces.jsonl")
+    koszt_us = _koszt_spanu()
+
+    tracing.TRACING_ENABLED = False
+    bez = min(_sekcja(wywolan, ms / 1000) for _ in range(3))
+    tracing.TRACING_ENABLED = True
+    z = min(_sekcja(wywolan, ms / 1000) for _ in range(3))
+
+    narzut_spanow = koszt_us * (wywolan + 2) / 1e6
+    print(f"Koszt spanu (z eksportem JSONL): {koszt_us:.1f} µs")
+    print(f"Sekcja: {wywolan} wywołań × {ms:.0f} ms")
+    print(f"  bez tracingu: {bez:.3f}s   z tracingiem: {z:.3f}s")
+    print(
+        f"  narzut liczony z kosztu spanu: {narzut_spanow * 1000:.2f} ms "
+        f"= {narzut_spanow / bez * 100:.3f}% czasu sekcji (cel < 1%)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,8 @@ OPTYMALIZACJE PAMIĘCI (512 MB):
 import os
 import json
 import time
+import contextvars
+import threading
 import requests
 from flask import current_app
 import logging
@@ -19,11 +21,24 @@ import re
 
 
 
+from core import budget
 from core.logging_reporter import get_logger
+from core.metrics import (
+    DEEPSEEK_SECONDS,
+    DEEPSEEK_TOKENS,
+    record_deepseek_usage,
+    szablon_z_promptu,
+)
+from core.tracing import set_attr, span, traced
 
 API_KEY_DEEPSEEK = os.getenv("API_KEY_DEEPSEEK")
 MODEL_BIZ = os.getenv("MODEL_BIZ", "deepseek-chat")
 MODEL_TYLER = os.getenv("MODEL_TYLER", "deepseek-chat")
+DEEPSEEK_URL = os.getenv("DEEPSEEK_URL", "https://api.deepseek.com/chat/completions")
+# Strumieniowanie SSE (DeepSeekJSONStream) — domyślnie wyłączone
+DEEPSEEK_STREAMING = os.getenv("DEEPSEEK_STREAMING", "0") == "1"
+
+_log = logging.getLogger(__name__)
 
 def sanitize_model_output(raw_text: str) -> str:
     """
@@ -89,6 +104,8 @@ def extract_clean_text(text: str) -> str:
         return txt
 
 
+@traced("deepseek", puste_to_blad=True)
+@DEEPSEEK_SECONDS.timed(puste_to_blad=True)
 def call_deepseek(
     system_prompt: str,
     user_msg: str,
@@ -97,18 +114,23 @@ def call_deepseek(
     max_retries: int = 1,
     retry_delay: float = 2.0,
     max_tokens: int = 3000,
+    szablon: str = None,
 ):
     """
     Wywołanie modelu przez API DeepSeek.
     Zwraca czysty tekst lub None przy błędzie.
 
+    szablon — nazwa szablonu promptu w statystykach cache prefiksów
+    (core/metrics.py). Domyślnie skrót system promptu.
+
     OPTYMALIZACJA: resp.close() po każdym żądaniu, del na pośrednich zmiennych.
     """
     if not API_KEY_DEEPSEEK:
         current_app.logger.error("Brak API_KEY_DEEPSEEK")
         return None
 
-    url = "https://api.deepseek.com/chat/completions"
+    set_attr(szablon=szablon or szablon_z_promptu(system_prompt), max_tokens=max_tokens)
+    url = DEEPSEEK_URL
     headers = {
         "Authorization": f"Bearer {API_KEY_DEEPSEEK}",
         "Content-Type": "application/json",
@@ -127,7 +149,11 @@ def call_deepseek(
         resp = None
         try:
             resp = requests.post(
-                url, headers=headers, json=payload, timeout=(5, 200), stream=False
+                url,
+                headers=headers,
+                json=payload,
+                timeout=budget.timeout((5, 200)),
+                stream=False,
             )
 
             if resp.status_code == 429:
@@ -140,7 +166,7 @@ def call_deepseek(
                 if attempt < max_retries:
                     wait = min(retry_delay * attempt, 30.0)
                     current_app.logger.warning("Czekam %.0fs przed kolejną próbą", wait)
-                    time.sleep(wait)
+                    budget.sleep(wait)
                     continue
                 current_app.logger.error(
                     "API rate limit po %d próbach — rezygnuję", max_retries
@@ -170,6 +196,13 @@ def call_deepseek(
             resp.close()
             resp = None
 
+            usage = data.get("usage") if isinstance(data, dict) else None
+            record_deepseek_usage(
+                szablon or szablon_z_promptu(system_prompt),
+                usage,
+                opis=system_prompt[:80],
+            )
+
             # Wyciągnij content z danych i od razu usuń cały obiekt data
             content = None
             try:
@@ -185,7 +218,7 @@ def call_deepseek(
             finally:
                 del data  # zwolnij cały response JSON
 
-            _log_api(model_name, True)
+            _log_api(model_name, True, usage=usage)
             result = sanitize_model_output(content)
             del content
             return result
@@ -199,7 +232,7 @@ def call_deepseek(
             )
             _log_api(model_name, False, str(e))
             if attempt < max_retries:
-                time.sleep(retry_delay)
+                budget.sleep(retry_delay)
             else:
                 current_app.logger.error(
                     "API niedostępne po %d próbach: %s", max_retries, e
@@ -223,13 +256,327 @@ def call_deepseek(
     return None
 
 
-def _log_api(model_name: str, success: bool, error: str = None):
+def _log_api(model_name: str, success: bool, error: str = None, usage: dict = None):
     """Pomocnik — loguje wywołanie API bez powtarzania kodu."""
     try:
         logger = get_logger()
         kwargs = {"model": model_name, "success": success}
         if error:
             kwargs["error"] = error
+        if usage:
+            kwargs["tokens_used"] = usage.get("total_tokens", 0)
+            for kind in ("prompt", "completion"):
+                DEEPSEEK_TOKENS.inc(
+                    usage.get(f"{kind}_tokens") or 0, model=model_name, kind=kind
+                )
+        set_attr(**kwargs)
         logger.log_api_call("deepseek", **kwargs)
     except Exception:
         pass
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# STRUMIENIOWANIE SSE + PRZYROSTOWY CZYTNIK JSON
+# ═══════════════════════════════════════════════════════════════════════════════
+# Długie odpowiedzi (6500–10000 tokenów) przychodzą przez kilkadziesiąt sekund.
+# Przy stream=True DeepSeek wysyła kolejne fragmenty jako zdarzenia SSE
+# ("data: {...}"), a IncrementalJSONReader oddaje gotowe elementy JSON, gdy
+# tylko się domkną — konsument (np. FLUX w tryptyku) może ruszyć wcześniej.
+
+class IncrementalJSONReader:
+    """
+    Czyta JSON kawałkami i zwraca elementy najwyższego poziomu, gdy się domkną.
+
+    - korzeń to lista                  → elementy listy
+    - korzeń to obiekt + klucz_listy   → elementy listy spod tego klucza
+    - korzeń to obiekt bez klucz_listy → pary (klucz, wartość)
+
+    Tekst przed pierwszym { lub [ (np. ```json) jest pomijany.
+    """
+
+    def __init__(self, klucz_listy: str = None):
+        self.klucz_listy = klucz_listy
+        self._buf = ""
+        self._pos = 0
+        self._stos = []  # otwarte nawiasy
+        self._w_stringu = False
+        self._escape = False
+        self._str_start = None
+        self._cel = None  # głębokość, na której leżą elementy
+        self._item_start = None
+        self._ostatni_klucz = None
+        self._czeka_na_wartosc = False
+        self.zakonczony = False
+
+    def feed(self, tekst: str) -> list:
+        """Dokłada fragment tekstu, zwraca listę elementów domkniętych w tym fragmencie."""
+        self._buf += tekst
+        gotowe = []
+        buf = self._buf
+        while self._pos < len(buf) and not self.zakonczony:
+            c = buf[self._pos]
+            if self._w_stringu:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._w_stringu = False
+                    self._koniec_stringu(gotowe)
+                self._pos += 1
+                continue
+
+            glebokosc = len(self._stos)
+            if not self._stos and c not in "{[":
+                self._pos += 1
+                continue
+
+            if c == '"':
+                self._w_stringu = True
+                self._str_start = self._pos
+                if glebokosc == self._cel and self._item_start is None and self._jest_wartoscia():
+                    self._item_start = self._pos
+            elif c in "{[":
+                if glebokosc == self._cel and self._item_start is None and self._jest_wartoscia():
+                    self._item_start = self._pos
+                self._stos.append(c)
+                self._ustal_cel(c)
+            elif c in "}]":
+                if glebokosc == self._cel:
+                    self._zamknij_skalar(gotowe)
+                if self._stos:
+                    self._stos.pop()
+                if len(self._stos) == self._cel and self._item_start is not None:
+                    self._oddaj(buf[self._item_start:self._pos + 1], gotowe)
+                if not self._stos:
+                    self.zakonczony = True
+                elif self._cel is not None and len(self._stos) < self._cel:
+                    self._cel = None  # lista z elementami się zamknęła
+            elif c == ":" and glebokosc == 1 and self._stos[0] == "{":
+                self._czeka_na_wartosc = True
+            elif c == ",":
+                if glebokosc == self._cel:
+                    self._zamknij_skalar(gotowe)
+                if glebokosc == 1 and self._stos[0] == "{":
+                    self._czeka_na_wartosc = False
+            elif not c.isspace():
+                if glebokosc == self._cel and self._item_start is None and self._jest_wartoscia():
+                    self._item_start = self._pos  # liczba / true / false / null
+            self._pos += 1
+        return gotowe
+
+    # ── pomocnicze ────────────────────────────────────────────────────────────
+
+    def _tryb_par(self) -> bool:
+        return self._stos[:1] == ["{"] and self.klucz_listy is None
+
+    def _jest_wartoscia(self) -> bool:
+        """W trybie par stringi na poziomie 1 to klucze — wartością jest tylko to po ':'."""
+        return not self._tryb_par() or self._czeka_na_wartosc
+
+    def _ustal_cel(self, c: str):
+        if self._cel is not None:
+            return
+        glebokosc = len(self._stos)
+        if glebokosc == 1:
+            if c == "[":
+                self._cel = 1
+            elif self.klucz_listy is None:
+                self._cel = 1
+        elif (
+            glebokosc == 2
+            and c == "["
+            and self._stos[0] == "{"
+            and self._ostatni_klucz == self.klucz_listy
+        ):
+            self._cel = 2
+
+    def _koniec_stringu(self, gotowe: list):
+        glebokosc = len(self._stos)
+        s = self._buf[self._str_start:self._pos + 1]
+        if glebokosc == 1 and self._stos[0] == "{" and not self._czeka_na_wartosc:
+            try:
+                self._ostatni_klucz = json.loads(s)
+            except ValueError:
+                self._ostatni_klucz = None
+            return
+        if glebokosc == self._cel and self._item_start == self._str_start:
+            self._oddaj(s, gotowe)
+
+    def _zamknij_skalar(self, gotowe: list):
+        if self._item_start is not None:
+            self._oddaj(self._buf[self._item_start:self._pos].strip(), gotowe)
+
+    def _oddaj(self, fragment: str, gotowe: list):
+        self._item_start = None
+        try:
+            wartosc = json.loads(fragment)
+        except ValueError:
+            _log.warning("[stream-json] Nieparsowalny element: %.120s", fragment)
+            return
+        if self._tryb_par():
+            gotowe.append((self._ostatni_klucz, wartosc))
+            self._czeka_na_wartosc = False
+        else:
+            gotowe.append(wartosc)
+
+
+def _iter_sse_deltas(lines, staty: dict):
+    """
+    Zamienia linie SSE z /chat/completions (stream=True) na fragmenty tekstu.
+    Usage z ostatniego zdarzenia trafia do staty["usage"].
+    """
+    for line in lines:
+        if not line:
+            continue
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        if not line.startswith("data:"):
+            continue  # komentarze keep-alive (": ...") i inne pola SSE
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        try:
+            event = json.loads(data)
+        except ValueError:
+            continue
+        if event.get("usage"):
+            staty["usage"] = event["usage"]
+        for choice in event.get("choices") or []:
+            delta = (choice.get("delta") or {}).get("content")
+            if delta:
+                yield delta
+
+
+class DeepSeekJSONStream:
+    """
+    Wywołanie DeepSeek ze stream=True. Iteracja zwraca elementy JSON
+    (patrz IncrementalJSONReader) w miarę ich nadejścia.
+
+    start() czyta strumień w wątku w tle; get(i) czeka na i-ty element.
+    Po zakończeniu: .tekst (cała odpowiedź), .items, .blad, .staty z czasami:
+    ttft_sec (pierwszy token), ttfi_sec (pierwszy element), total_sec.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        user_msg: str,
+        model_name: str,
+        klucz_listy: str = None,
+        max_tokens: int = 3000,
+        timeout: tuple = (5, 60),
+        szablon: str = None,
+    ):
+        self.system_prompt = system_prompt
+        self.user_msg = user_msg
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.szablon = szablon or szablon_z_promptu(system_prompt)
+        self.reader = IncrementalJSONReader(klucz_listy)
+        self.tekst = ""
+        self.items = []
+        self.blad = None
+        self.staty = {"ttft_sec": None, "ttfi_sec": None, "total_sec": None, "items": 0}
+        self._zakonczony = False
+        self._cond = threading.Condition()
+        self._watek = None
+
+    def __iter__(self):
+        t0 = time.monotonic()
+        resp = None
+        czesci = []
+        try:
+            if not API_KEY_DEEPSEEK:
+                raise RuntimeError("Brak API_KEY_DEEPSEEK")
+            resp = requests.post(
+                DEEPSEEK_URL,
+                headers={
+                    "Authorization": f"Bearer {API_KEY_DEEPSEEK}",
+                    "Content-Type": "application/json",
+                    "Accept": "text/event-stream",
+                },
+                json={
+                    "model": self.model_name,
+                    "messages": [
+                        {"role": "system", "content": self.system_prompt},
+                        {"role": "user", "content": self.user_msg},
+                    ],
+                    "temperature": 0.0,
+                    "max_tokens": self.max_tokens,
+                    "stream": True,
+                    "stream_options": {"include_usage": True},
+                },
+                timeout=budget.timeout(self.timeout),
+                stream=True,
+            )
+            if resp.status_code != 200:
+                raise RuntimeError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+
+            for delta in _iter_sse_deltas(resp.iter_lines(), self.staty):
+                if self.staty["ttft_sec"] is None:
+                    self.staty["ttft_sec"] = round(time.monotonic() - t0, 3)
+                czesci.append(delta)
+                for item in self.reader.feed(delta):
+                    if self.staty["ttfi_sec"] is None:
+                        self.staty["ttfi_sec"] = round(time.monotonic() - t0, 3)
+                    self._dodaj(item)
+                    yield item
+            _log_api(self.model_name, True, usage=self.staty.get("usage"))
+        except (Exception, budget.BudgetExceeded) as e:
+            # Budżet sekcji w wątku strumienia — koniec strumienia, nie wyjątek wątku
+            self.blad = str(e) or type(e).__name__
+            _log.warning("[deepseek-stream] %s", self.blad)
+            _log_api(self.model_name, False, str(e))
+        finally:
+            if resp is not None:
+                resp.close()
+            self.tekst = "".join(czesci)
+            self.staty["total_sec"] = round(time.monotonic() - t0, 3)
+            self.staty["items"] = len(self.items)
+            record_deepseek_usage(
+                self.szablon, self.staty.get("usage"), opis=self.system_prompt[:80]
+            )
+            with self._cond:
+                self._zakonczony = True
+                self._cond.notify_all()
+
+    def _dodaj(self, item):
+        with self._cond:
+            self.items.append(item)
+            self._cond.notify_all()
+
+    def start(self) -> "DeepSeekJSONStream":
+        """Czyta strumień w wątku w tle."""
+        def _czytaj():
+            with span("deepseek.stream", model=self.model_name, szablon=self.szablon):
+                for _ in self:
+                    pass
+                set_attr(**{k: v for k, v in self.staty.items() if k != "usage"})
+
+        # Kopia kontekstu — _log_api w wątku trafia do loggera bieżącego pipeline'u
+        ctx = contextvars.copy_context()
+        self._watek = threading.Thread(
+            target=ctx.run, args=(_czytaj,), daemon=True, name="deepseek-stream"
+        )
+        self._watek.start()
+        return self
+
+    def get(self, index: int, timeout: float = None):
+        """Czeka na element o danym indeksie. None, gdy strumień skończył się wcześniej."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while len(self.items) <= index and not self._zakonczony:
+                pozostalo = None if deadline is None else deadline - time.monotonic()
+                if pozostalo is not None and pozostalo <= 0:
+                    return None
+                self._cond.wait(pozostalo)
+            return self.items[index] if index < len(self.items) else None
+
+    def wait(self, timeout: float = None) -> bool:
+        """Czeka na koniec strumienia. Zwraca True, jeśli się zakończył."""
+        with self._cond:
+            if not self._zakonczony:
+                self._cond.wait_for(lambda: self._zakonczony, timeout)
+            return self._zakonczony
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+core/budget.py
+Budżety czasowe sekcji z kooperacyjnym przerwaniem.
+
+Każda sekcja dostaje twardy limit (config_responders.json →
+performance.section_budgets_sec). Budżet siedzi w contextvars, więc widzą go
+wszystkie kroki sekcji — także w wątkach TaskGraph i strumieniu DeepSeek:
+
+    requests.post(url, ..., timeout=budget.timeout((5, 200)))   # ≤ reszta budżetu
+    deadline = budget.clamp_deadline(time.monotonic() + 75)      # pętle FLUX
+    budget.check()                                               # punkt przerwania
+    budget.sleep(delay)                                          # backoff ≤ reszta
+
+    with budget.budget("zwykly.panele", 75):   # pod-krok: min(75 s, reszta sekcji)
+        ...
+
+Po przekroczeniu timeout()/check()/sleep() rzucają BudgetExceeded. To
+BaseException (jak asyncio.CancelledError) — szerokie `except Exception`
+w responderach go nie połkną, więc przerwanie dochodzi do run_section().
+
+Wynik zdegradowany (run_section → SectionOverrun.degraded_result()):
+  - sekcja zdążyła wywołać publish_partial(wynik) → wysyłamy ten częściowy
+    wynik z notką na górze reply_html i polem "degraded": "budget",
+  - nie zdążyła → sekcja liczy się jako pusta (bez maila), status "overrun".
+
+Sekcja, która nie dochodzi do żadnego punktu przerwania (zawieszone wywołanie
+bez timeoutu), jest porzucana po budżecie + BUDGET_GRACE_SEC — jej wątek
+dokończy się w tle, a pipeline idzie dalej.
+
+Metryka autoresponder_section_budget_total{section,outcome=ok|error|overrun|abandoned};
+odsetek przekroczeń per sekcja — overrun_rates() (/status) albo w PromQL.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from core.metrics import Counter
+
+BUDGET_GRACE_SEC = float(os.getenv("BUDGET_GRACE_SEC", "15"))
+MIN_TIMEOUT_SEC = 0.5  # krótszy timeout sieciowy nie ma sensu — lepiej przerwać
+
+NOTKA_DEGRADED = (
+    '<div style="background:#fff3cd;border:1px solid #ffc107;border-radius:4px;'
+    'padding:10px;margin:10px 0;font-size:13px;color:#856404;">'
+    "<strong>⏱ Uwaga:</strong> ta część odpowiedzi nie zmieściła się w limicie "
+    "czasu — wysyłamy to, co zdążyło powstać.</div>"
+)
+
+SECTION_BUDGET = Counter(
+    "autoresponder_section_budget_total",
+    "Sekcje wg wyniku względem budżetu czasu (ok/error/overrun/abandoned).",
+    ("section", "outcome"),
+)
+
+
+class BudgetExceeded(BaseException):
+    """Budżet wyczerpany — przerwanie kooperacyjne (BaseException, jak CancelledError)."""
+
+
+class SectionOverrun(Exception):
+    """Sekcja przekroczyła budżet. partial — wynik opublikowany przed przerwaniem."""
+
+    def __init__(self, section: str, budget_sec: float, partial=None, abandoned=False):
+        super().__init__(
+            f"{section}: przekroczony budżet {budget_sec:.0f} s"
+            + (" (porzucona)" if abandoned else "")
+        )
+        self.section = section
+        self.budget_sec = budget_sec
+        self.partial = partial
+        self.abandoned = abandoned
+
+    def degraded_result(self) -> Optional[dict]:
+        """Częściowy wynik z notką albo None (sekcja pusta)."""
+        if not isinstance(self.partial, dict):
+            return None
+        wynik = dict(self.partial)
+        wynik["reply_html"] = NOTKA_DEGRADED + (wynik.get("reply_html") or "")
+        wynik["degraded"] = "budget"
+        return wynik
+
+
+class Budget:
+    """Termin (time.monotonic) z nazwą; dzieci dziedziczą termin rodzica."""
+
+    __slots__ = ("name", "deadline", "parent", "partial")
+
+    def __init__(self, name: str, deadline: float, parent: Optional["Budget"] = None):
+        self.name = name
+        self.deadline = deadline
+        self.parent = parent
+        self.partial = None
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def root(self) -> "Budget":
+        b = self
+        while b.parent is not None:
+            b = b.parent
+        return b
+
+
+_biezacy: ContextVar[Optional[Budget]] = ContextVar("section_budget", default=None)
+
+
+def current() -> Optional[Budget]:
+    return _biezacy.get()
+
+
+@contextmanager
+def budget(name: str, seconds: Optional[float]):
+    """Budżet (pod-)kroku: termin = min(teraz + seconds, termin rodzica)."""
+    rodzic = _biezacy.get()
+    if seconds is None:
+        yield rodzic
+        return
+    termin = time.monotonic() + seconds
+    if rodzic is not None:
+        termin = min(termin, rodzic.deadline)
+    token = _biezacy.set(Budget(name, termin, rodzic))
+    try:
+        yield _biezacy.get()
+    finally:
+        _biezacy.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Sekundy do końca budżetu (None — brak budżetu)."""
+    b = _biezacy.get()
+    return None if b is None else b.remaining()
+
+
+def check() -> None:
+    """Punkt przerwania — rzuca BudgetExceeded po terminie."""
+    b = _biezacy.get()
+    if b is not None and b.remaining() <= 0:
+        raise BudgetExceeded(b.name)
+
+
+def timeout(t):
+    """
+    Timeout sieciowy przycięty do reszty budżetu. t — liczba albo
+    krotka (connect, read) jak w requests. Po terminie rzuca BudgetExceeded.
+    """
+    zostalo = remaining()
+    if zostalo is None:
+        return t
+    if zostalo < MIN_TIMEOUT_SEC:
+        raise BudgetExceeded(_biezacy.get().name)
+    if isinstance(t, tuple):
+        return tuple(None if x is None else min(x, zostalo) for x in t)
+    return zostalo if t is None else min(t, zostalo)
+
+
+def clamp_deadline(deadline: float) -> float:
+    """Lokalny termin (time.monotonic) nie dłuższy niż budżet sekcji."""
+    b = _biezacy.get()
+    return deadline if b is None else min(deadline, b.deadline)
+
+
+def sleep(seconds: float) -> None:
+    """time.sleep nie dłuższy niż reszta budżetu; po terminie BudgetExceeded."""
+    zostalo = remaining()
+    if zostalo is not None:
+        seconds = min(seconds, max(0.0, zostalo))
+    time.sleep(seconds)
+    check()
+
+
+def publish_partial(result: Any) -> None:
+    """Wynik do wysłania, gdyby sekcja nie zdążyła (zapisywany w budżecie sekcji)."""
+    b = _biezacy.get()
+    if b is not None:
+        b.root().partial = result
+
+
+# ── Uruchomienie sekcji z budżetem ────────────────────────────────────────────
+
+
+def run_section(fn, section: str, seconds: Optional[float], grace: float = None):
+    """
+    Wykonuje fn() z budżetem sekcji. Rzuca SectionOverrun po przekroczeniu
+    (kooperacyjnie albo po budżecie + grace — wtedy wątek sekcji jest porzucany).
+    seconds=None — bez budżetu, zwykłe wywołanie.
+    """
+    if not seconds:
+        return fn()
+    grace = BUDGET_GRACE_SEC if grace is None else grace
+    b = Budget(section, time.monotonic() + seconds)
+    wynik: Dict[str, Any] = {}
+
+    def _cel():
+        _biezacy.set(b)
+        try:
+            wynik["result"] = fn()
+        except BaseException as e:
+            wynik["error"] = e
+
+    # Kopia kontekstu — logger, span i app context sekcji jadą do wątku
+    ctx = contextvars.copy_context()
+    watek = threading.Thread(
+        target=ctx.run, args=(_cel,), daemon=True, name=f"section-{section}"
+    )
+    watek.start()
+    watek.join(seconds + grace)
+    if watek.is_alive():
+        SECTION_BUDGET.inc(section=section, outcome="abandoned")
+        raise SectionOverrun(section, seconds, b.partial, abandoned=True)
+    blad = wynik.get("error")
+    if isinstance(blad, BudgetExceeded):
+        SECTION_BUDGET.inc(section=section, outcome="overrun")
+        raise SectionOverrun(section, seconds, b.partial) from None
+    if blad is not None:
+        SECTION_BUDGET.inc(section=section, outcome="error")
+        raise blad
+    SECTION_BUDGET.inc(section=section, outcome="ok")
+    return wynik.get("result")
+
+
+def overrun_rates() -> Dict[str, Dict[str, float]]:
+    """Per sekcja: liczba uruchomień i odsetek przekroczeń (overrun + abandoned)."""
+    with SECTION_BUDGET._lock:
+        wartosci = dict(SECTION_BUDGET._wartosci)
+    per: Dict[str, Dict[str, float]] = {}
+    for (sekcja, wynik), n in wartosci.items():
+        d = per.setdefault(sekcja, {"runs": 0, "overrun": 0})
+        d["runs"] += n
+        if wynik in ("overrun", "abandoned"):
+            d["overrun"] += n
+    for d in per.values():
+        d["overrun_rate"] = round(d["overrun"] / d["runs"], 3) if d["runs"] else 0.0
+    return per
@@ -48,3 +48,34 @@ EMOCJA_MAP = {
     "spokoj": "twarz_spokoj",
 }
 FALLBACK_EMOT = "error"
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ZAPYTANIA ZBIORCZE — małe artefakty (ankieta, horoskop, karta RPG, plakat,
+# gra, wyjaśnienie) mogą iść jednym wywołaniem DeepSeek zamiast sześcioma.
+# True = artefakt trafia do zapytania zbiorczego, False = osobne zapytanie.
+# Artefakt, którego część odpowiedzi nie przejdzie walidacji, jest ponawiany
+# osobno — pozostałe nie.
+# ─────────────────────────────────────────────────────────────────────────────
+ZWYKLY_BATCH_ARTEFAKTY = {
+    "ankieta": True,
+    "horoskop": True,
+    "karta_rpg": True,
+    "plakat": True,
+    "gra": False,  # ~3500 tokenów wyjścia — zjada prawie cały limit grupy
+    "wyjasnienie": True,
+}
+# Szacowana długość odpowiedzi (tokeny) — z niej składane są grupy
+ZWYKLY_BATCH_TOKENY_WYJSCIA = {
+    "ankieta": 2500,
+    "horoskop": 2000,
+    "karta_rpg": 1200,
+    "plakat": 300,
+    "gra": 3500,
+    "wyjasnienie": 1500,
+}
+# deepseek-chat ucina odpowiedź na 8192 tokenach — grupa musi się zmieścić
+ZWYKLY_BATCH_MAX_TOKENS = 8000
+# Odsetek pipeline'ów budujących wszystkie artefakty osobno (bez zapytania
+# zbiorczego) — próbki czasu i tokenów osobnych wywołań, z którymi porównujemy
+# zapytanie zbiorcze. 0 = bez próbek (oszczędność czasu/tokenów nieznana).
+ZWYKLY_BATCH_PROBKA_OSOBNO = 0.05
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+core/drain.py
+Łagodne wygaszanie na SIGTERM (deploy / restart Render).
+
+    drain.install(_pipelines_in_flight, on_timeout=checkpoint.mark_all_interrupted)
+
+Po SIGTERM:
+  1. draining() → True — webhook przestaje przyjmować pracę (503),
+  2. czekamy, aż active_fn() spadnie do zera, najwyżej DRAIN_TIMEOUT_SEC,
+  3. po przekroczeniu czasu on_timeout() (zapis momentu przerwania
+     w checkpointach — wznowienie po restarcie),
+  4. oddajemy sygnał poprzedniemu handlerowi (gunicorn) albo kończymy proces.
+
+DRAIN_TIMEOUT_SEC domyślnie 25 s — poniżej 30 s, po których Render i gunicorn
+(graceful_timeout) dobijają proces SIGKILL-em.
+"""
+
+import logging
+import os
+import signal
+import threading
+import time
+from typing import Callable, Optional
+
+_log = logging.getLogger(__name__)
+
+DRAIN_TIMEOUT_SEC = float(os.getenv("DRAIN_TIMEOUT_SEC", "25"))
+DRAIN_POLL_SEC = 0.5
+
+_draining = threading.Event()
+
+
+def draining() -> bool:
+    """True od pierwszego SIGTERM — nie przyjmujemy nowych pipeline'ów."""
+    return _draining.is_set()
+
+
+def drain(
+    active_fn: Callable[[], int],
+    timeout: Optional[float] = None,
+    on_timeout: Optional[Callable[[], object]] = None,
+) -> bool:
+    """
+    Wstrzymuje przyjęcia i czeka na zakończenie pracy w toku.
+    Zwraca True, gdy wszystko się skończyło przed czasem.
+    """
+    _draining.set()
+    timeout = DRAIN_TIMEOUT_SEC if timeout is None else timeout
+    t0 = time.monotonic()
+    _log.warning("[drain] Start — w toku: %d, limit %.0f s", active_fn(), timeout)
+    while active_fn() > 0:
+        if time.monotonic() - t0 >= timeout:
+            _log.warning(
+                "[drain] Limit czasu — przerywam %d pipeline'ów (wznowią się z checkpointu)",
+                active_fn(),
+            )
+            if on_timeout:
+                try:
+                    on_timeout()
+                except Exception as e:
+                    _log.warning("[drain] on_timeout: %s", e)
+            return False
+        time.sleep(DRAIN_POLL_SEC)
+    _log.warning("[drain] Czysto po %.1f s", time.monotonic() - t0)
+    return True
+
+
+def install(
+    active_fn: Callable[[], int], on_timeout: Optional[Callable[[], object]] = None
+) -> bool:
+    """
+    Instaluje handler SIGTERM (tylko z głównego wątku; inaczej False).
+    Poprzedni handler (np. workera gunicorna) jest wołany po drenażu.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return False
+    poprzedni = signal.getsignal(signal.SIGTERM)
+
+    def _handler(signum, frame):
+        if not draining():
+            drain(active_fn, on_timeout=on_timeout)
+        if callable(poprzedni):
+            poprzedni(signum, frame)
+        elif poprzedni != signal.SIG_IGN:
+            raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, _handler)
+    return True
+
+
+def reset() -> None:
+    """Zdejmuje flagę drenażu (testy)."""
+    _draining.clear()
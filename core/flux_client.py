@@ -32,12 +32,14 @@ from __future__ import annotations
 
 import io
 import logging
+import os
 import threading
 import time
 
 from huggingface_hub import InferenceClient
 from huggingface_hub.errors import HfHubHTTPError  # re-eksport dla responderów
 
+from core import budget
 from core.config import (
     HF_MODEL_FLUX,
     HF_PROVIDER,
@@ -45,6 +47,8 @@ from core.config import (
     HF_PROVIDER_HEALTHCHECK_TIMEOUT,
     HF_PROVIDER_PRIORITY,
 )
+from core.metrics import FLUX_ATTEMPTS
+from core.tracing import set_attr, traced
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +67,14 @@ def _get_provider_candidates(explicit_provider: str | None = None) -> list[str]:
     return list(HF_PROVIDER_PRIORITY)
 
 
+def _token_label(token: str) -> str:
+    """Nazwa zmiennej HF_TOKEN* z tym tokenem — do śladu zamiast fragmentu sekretu."""
+    for name in ["HF_TOKEN"] + [f"HF_TOKEN{i}" for i in range(1, 100)]:
+        if os.getenv(name, "").strip() == token:
+            return name
+    return "inny"
+
+
 def _summarize_error(exc: Exception) -> str:
     message = str(exc)
     if not message:
@@ -124,6 +136,7 @@ def get_working_provider(token: str, model_name: str = HF_MODEL_FLUX) -> str | N
     return None
 
 
+@traced("flux")
 def generate_flux_bytes(
     prompt: str,
     token: str,
@@ -147,6 +160,7 @@ def generate_flux_bytes(
 
     selected_provider = provider or get_working_provider(token, HF_MODEL_FLUX)
     if not selected_provider:
+        FLUX_ATTEMPTS.inc(provider="none", outcome="no_provider")
         raise HfHubHTTPError(
             "No working HF image provider available",
             response=None,
@@ -164,7 +178,7 @@ def generate_flux_bytes(
             client = InferenceClient(
                 provider=candidate,
                 api_key=token,
-                timeout=timeout,
+                timeout=budget.timeout(timeout),
             )
             kwargs = {}
             if seed is not None:
@@ -178,8 +192,10 @@ def generate_flux_bytes(
             if height:
                 kwargs["height"] = height
 
+            set_attr(provider=candidate, token=_token_label(token), steps=steps)
             image = client.text_to_image(prompt, model=HF_MODEL_FLUX, **kwargs)
 
+            FLUX_ATTEMPTS.inc(provider=candidate, outcome="ok")
             with _ACTIVE_PROVIDER_LOCK:
                 _ACTIVE_PROVIDER_CACHE[token] = (candidate, time.monotonic())
 
@@ -187,6 +203,7 @@ def generate_flux_bytes(
             image.save(buf, format="PNG")
             return buf.getvalue()
         except AttributeError as exc:
+            FLUX_ATTEMPTS.inc(provider=candidate, outcome="connection_error")
             # BUGFIX (2026-08-22): obserwowane w logach jako
             # "'NoneType' object has no attribute 'headers'". Dzieje się
             # WEWNĄTRZ huggingface_hub/InferenceClient, gdy request do
@@ -211,6 +228,10 @@ def generate_flux_bytes(
             )
         except Exception as exc:
             last_error = exc
+            status = getattr(getattr(exc, "response", None), "status_code", None)
+            FLUX_ATTEMPTS.inc(
+                provider=candidate, outcome=f"http_{status}" if status else "error"
+            )
             logger.warning(
                 "[FLUX] Provider '%s' podczas generowania zwrócił błąd: %s. Przełączam na następny...",
                 candidate,
@@ -396,6 +396,50 @@ class HFTokenManager:
                 for s in self._tokens.values()
             ]
 
+    def export_state(self) -> Optional[dict]:
+        """
+        Stan tokenów dla procesu potomnego (core/process_isolation.py) —
+        bez wartości tokenów, te potomek czyta z env. None przed warm-upem.
+        """
+        if not self._warmed_up:
+            return None
+        with self._lock:
+            return {
+                s.name: {
+                    "alive": s.alive,
+                    "dead_reason": s.dead_reason,
+                    "remaining": s.remaining,
+                }
+                for s in self._tokens.values()
+            }
+
+    def import_state(self, state: Optional[dict]) -> None:
+        """Przyjmuje stan z export_state() zamiast warm-upu (proces potomny)."""
+        if state is None:
+            return
+        states = {s.name: s for s in self._load_from_env() if s.name in state}
+        now = time.monotonic()
+        for name, st in states.items():
+            st.alive = state[name]["alive"]
+            st.dead_reason = state[name]["dead_reason"]
+            st.remaining = state[name]["remaining"]
+            st.dead_at = 0.0 if st.alive else now
+        with self._lock:
+            self._tokens = states
+            self._warmed_up = True
+            self._last_warmup_at = now
+            self._all_dead_since = (
+                now if not any(s.alive for s in states.values()) else 0.0
+            )
+
+    def merge_state(self, state: Optional[dict]) -> None:
+        """Przenosi martwe tokeny i limity z procesu potomnego do tego procesu."""
+        for name, st in (state or {}).items():
+            if not st["alive"]:
+                self.mark_dead(name, st["dead_reason"] or "proces potomny")
+            if st["remaining"] is not None:
+                self.mark_remaining(name, st["remaining"])
+
     def reset(self) -> None:
         """
         Resetuje stan — wymusza ponowny warm-up przy następnym użyciu.
@@ -4,17 +4,19 @@ core/job_runner.py
 Asynchroniczny pipeline — każda sekcja: wykonaj → wyślij → drive → sheets → del.
 
 OPTYMALIZACJE PAMIĘCI (512 MB):
-  - log.txt generowany strumieniowo i natychmiast zapisywany, bez trzymania w RAM
+  - log.txt: wpisy strumieniowane do pliku tymczasowego, w RAM tylko ogon (logging_reporter)
   - log_svg usunięty całkowicie (największy pożeracz pamięci)
   - del + gc.collect() po każdej sekcji (było, wzmocnione)
   - base64 plików kasowane natychmiast po uploadzie do Drive
-  - logger.entries czyszczone po wygenerowaniu log.txt
+  - logger.entries to ograniczony ogon ostatnich wpisów
   - Brak importów na poziomie modułu — lazy import wewnątrz funkcji
 """
 
 import gc
 import os
+import time
 import traceback
+from contextlib import contextmanager
 
 from drive_utils import (
     upload_file_to_drive,
@@ -23,6 +25,7 @@ from drive_utils import (
 )
 from core.sheets_logger import log_wyslano
 from core.retry_manager import retry_on_failure
+from core.checkpoint import ZAKONCZONE
 
 SECTION_ORDER = [
     "nawiazanie",
@@ -36,8 +39,39 @@ SECTION_ORDER = [
 ]
 
 
-def build_section_order(requested: list) -> list:
-    return [s for s in SECTION_ORDER if s in requested]
+# Sekcje obsługiwane wewnętrznie przez zwykly — nie wysyłają osobnego emaila
+# (zwykly już zawiera emocje/scrabble/analiza w swoim reply_html); drugie
+# wywołanie respondera bierze wynik z core/pipeline_memo.py
+_SUBSEKCJE_ZWYKLEGO = {"emocje", "scrabble", "analiza"}
+
+
+def _plan_sections(requested: list, section_order: dict = None):
+    """(kolejność, oczekiwane czasy, polityka) — core/section_scheduler.py."""
+    from core.section_scheduler import expected_durations, order_sections
+
+    cfg = section_order or {}
+    policy = cfg.get("policy", "fixed")
+    if policy == "fixed":
+        return [s for s in SECTION_ORDER if s in requested], {}, policy
+    expected = expected_durations(requested, cfg.get("expected_sec"))
+    order = order_sections(
+        requested,
+        SECTION_ORDER,
+        policy=policy,
+        expected=expected,
+        priority=cfg.get("priority"),
+        bez_maila=_SUBSEKCJE_ZWYKLEGO if "zwykly" in requested else (),
+    )
+    return order, expected, policy
+
+
+def build_section_order(requested: list, section_order: dict = None) -> list:
+    """
+    Kolejność sekcji. section_order — performance.section_order z configu
+    ({"policy": fixed|shortest_first|priority, "priority", "expected_sec"});
+    bez niego stała SECTION_ORDER.
+    """
+    return _plan_sections(requested, section_order)[0]
 
 
 def _file_exists_in_dir(dir_path: str, filename: str) -> bool:
@@ -144,6 +178,11 @@ def run_pipeline_async(
     on_section_error=None,
     on_section_empty=None,
     on_pipeline_done=None,
+    on_section_memory=None,
+    checkpoint=None,
+    section_budgets=None,
+    section_order=None,
+    accepted_at=None,
 ):
     """
     Wykonuje sekcje sekwencyjnie w tle (daemon thread).
@@ -151,15 +190,72 @@ def run_pipeline_async(
     Na końcu: wyślij JEDEN zbiorczy email.
 
     WAŻNE: log_wyslano zapisywany po każdej próbie wysyłki (sukces lub porażka).
+
+    checkpoint (core/checkpoint.py) — stan sekcji na dysku: zakończone sekcje
+    są pomijane, policzone-niewysłane biorą wynik z dysku (wznowienie po restarcie).
+
+    section_budgets — {sekcja: sekundy, "default": sekundy} (core/budget.py).
+    Sekcja po budżecie daje wynik zdegradowany albo pusty; następne idą dalej.
+
+    section_order — polityka kolejności sekcji (build_section_order).
+    accepted_at — time.time() przyjęcia webhooka; od niego liczymy czas do
+    pierwszego i ostatniego maila (metryki autoresponder_time_to_*_email_seconds).
     """
     # Lazy import — nie ładuj modułów smtp przy starcie serwera
     from smtp_wysylka import wyslij_odpowiedz, zbierz_zalaczniki_z_response
+    from core import pipeline_memo
+    from core.budget import SectionOverrun, run_section
+    from core.logging_reporter import bind_logger
+    from core.metrics import SECTION_SECONDS, TIME_TO_FIRST_EMAIL, TIME_TO_LAST_EMAIL
+    from core.section_memory import measure_section
+    from core.tracing import span
+
+    # Wątek pipeline'u startuje z pustym kontekstem — przypinamy mu logger sesji,
+    # żeby get_logger() w modułach sekcji trafiał do tego loggera, a nie do innego webhooka
+    # Span "pipeline" to korzeń śladu — sekcje i wywołania API są jego dziećmi
+    # Checkpoint: zamek zwalniany przy każdym wyjściu — po wyjątku zostaje do wznowienia
+    # Memo: emocje/analiza/scrabble liczone raz — przez zwykly albo własną sekcję
+    with flask_app.app_context(), bind_logger(logger), _checkpoint_lock(
+        checkpoint
+    ), pipeline_memo.scope() as memo, span(
+        "pipeline", message_id=message_id, sender=sender, sections=list(tasks)
+    ):
+        ordered_keys, _expected, _policy = _plan_sections(list(tasks.keys()), section_order)
+        logger.log_debug_info(
+            "SECTION_ORDER",
+            {"policy": _policy, "order": ordered_keys, "expected_sec": _expected},
+        )
+        # Cechy leksykalne maila (lokalnie, bez tokenów) — do porównania z ocenami LLM
+        try:
+            from core.lexicon_analyzer import features
 
-    with flask_app.app_context():
-        ordered_keys = build_section_order(list(tasks.keys()))
+            _cechy = features((data or {}).get("body", ""))
+            _cechy.pop("counts", None)
+            logger.log_debug_info("LEXICON_FEATURES", _cechy)
+        except Exception as e:
+            flask_app.logger.warning("[async] Analiza leksykalna: %s", e)
+        budgets = section_budgets or {}
         sections_done = []
         combined_results = {}  # Łączymy wszystkie wyniki sekcji
         emails_sent = 0  # Licznik wysłanych emaili
+        _przyjeto = accepted_at or time.time()
+        _pierwszy_email = _ostatni_email = None
+
+        if checkpoint is not None and checkpoint.resumed:
+            logger.log_debug_info("CHECKPOINT_RESUME", checkpoint.resume_report, "WARNING")
+            flask_app.logger.warning(
+                "[async] Wznowienie %s — pomijam: %s | z dysku: %s | od nowa: %s (%.1f s)",
+                message_id,
+                checkpoint.resume_report.get("skipped"),
+                checkpoint.resume_report.get("reused"),
+                checkpoint.resume_report.get("redone"),
+                checkpoint.resume_report.get("redone_sec", 0.0),
+            )
+
+        def _on_memory(sekcja, mem):
+            logger.log_debug_info("SECTION_MEMORY", mem)
+            if on_section_memory:
+                on_section_memory(sekcja, mem)
 
         for section_key in ordered_keys:
             fn = tasks.get(section_key)
@@ -167,26 +263,93 @@ def run_pipeline_async(
                 continue
 
             result = None
+            import time as _time
+
+            # ── Checkpoint: sekcja zakończona przed restartem albo wynik na dysku ──
+            _stan = checkpoint.section_status(section_key) if checkpoint else None
+            if _stan in ZAKONCZONE:
+                flask_app.logger.info(
+                    "[async] CHECKPOINT: %s (%s przed restartem) — pomijam",
+                    section_key,
+                    _stan,
+                )
+                if _stan == "done":
+                    sections_done.append(section_key)
+                continue
+            if _stan == "computed":
+                result = checkpoint.load_result(section_key)
+                if result is not None:
+                    flask_app.logger.info(
+                        "[async] CHECKPOINT: %s — wynik z dysku, tylko wysyłka",
+                        section_key,
+                    )
+                    if on_section_done:
+                        on_section_done(section_key, result, 0.0)
+
+            _t0 = _time.time()
             try:
-                flask_app.logger.info("[async] START: %s", section_key)
-                if on_section_start:
-                    on_section_start(section_key)
-                import time as _time
-
-                _t0 = _time.time()
-                result = fn()
-                _duration = _time.time() - _t0
-                flask_app.logger.info("[async] OK:    %s", section_key)
-                logger.log_section_result(section_key, success=True)
-                if on_section_done and result:
-                    on_section_done(section_key, result, _duration)
-                elif on_section_empty:
-                    on_section_empty(section_key)
+                if result is None:
+                    flask_app.logger.info("[async] START: %s", section_key)
+                    if on_section_start:
+                        on_section_start(section_key)
+                    if checkpoint is not None:
+                        checkpoint.start_section(section_key)
+                    _t0 = _time.time()
+                    _overrun = None
+                    _budzet = budgets.get(section_key, budgets.get("default"))
+                    with span(
+                        f"section.{section_key}", budget_sec=_budzet
+                    ) as _span, measure_section(section_key, on_done=_on_memory):
+                        try:
+                            result = run_section(fn, section_key, _budzet)
+                        except SectionOverrun as e:
+                            # Wynik zdegradowany (częściowy z notką) albo pusty
+                            _overrun = e
+                            result = e.degraded_result()
+                        if _span is not None and _overrun is not None:
+                            _span.status = "overrun"
+                        elif _span is not None and not result:
+                            _span.status = "empty"
+                    _duration = _time.time() - _t0
+                    if _overrun is not None:
+                        flask_app.logger.warning("[async] BUDŻET: %s", _overrun)
+                        logger.log_debug_info(
+                            "SECTION_OVERRUN",
+                            {
+                                "section": section_key,
+                                "budget_sec": _budzet,
+                                "duration_sec": round(_duration, 3),
+                                "abandoned": _overrun.abandoned,
+                                "degraded": result is not None,
+                            },
+                            "WARNING",
+                        )
+                    SECTION_SECONDS.observe(
+                        _duration,
+                        section=section_key,
+                        status=(
+                            "overrun" if _overrun is not None
+                            else "ok" if result else "empty"
+                        ),
+                    )
+                    flask_app.logger.info("[async] OK:    %s", section_key)
+                    logger.log_section_result(section_key, success=True)
+                    if on_section_done and result:
+                        on_section_done(section_key, result, _duration)
+                    elif on_section_empty:
+                        on_section_empty(section_key)
+                    if checkpoint is not None and result:
+                        checkpoint.save_result(section_key, result, _duration)
             except Exception as e:
+                SECTION_SECONDS.observe(
+                    _time.time() - _t0, section=section_key, status="error"
+                )
                 flask_app.logger.error(
                     "[async] BŁĄD '%s': %s\n%s", section_key, e, traceback.format_exc()
                 )
                 logger.log_section_result(section_key, success=False)
+                if checkpoint is not None:
+                    checkpoint.finish_section(section_key, "error")
                 if on_section_error:
                     on_section_error(section_key, e)
                 if history_sheet_id and message_id:
@@ -204,6 +367,8 @@ def run_pipeline_async(
 
             if not result:
                 logger.log_section_result(section_key, success=False)
+                if checkpoint is not None:
+                    checkpoint.finish_section(section_key, "empty")
                 if history_sheet_id and message_id:
                     try:
                         log_wyslano(
@@ -219,8 +384,6 @@ def run_pipeline_async(
             sections_done.append(section_key)
 
             # Sekcje obsługiwane wewnętrznie przez zwykly — nie wysyłaj osobnego emaila
-            # (zwykly już zawiera emocje/scrabble/analiza w swoim reply_html)
-            _SUBSEKCJE_ZWYKLEGO = {"emocje", "scrabble", "analiza"}
             _skip_send = section_key in _SUBSEKCJE_ZWYKLEGO and "zwykly" in ordered_keys
 
             if _skip_send:
@@ -244,6 +407,10 @@ def run_pipeline_async(
                     )
                     if sent:
                         emails_sent += 1
+                        _ostatni_email = time.time() - _przyjeto
+                        if _pierwszy_email is None:
+                            _pierwszy_email = _ostatni_email
+                            TIME_TO_FIRST_EMAIL.observe(_pierwszy_email)
                 except Exception as e:
                     flask_app.logger.error(
                         "[async] Błąd wysyłki '%s': %s", section_key, e
@@ -281,7 +448,32 @@ def run_pipeline_async(
 
             # ── Zbieramy wyniki — nie wysyłamy osobnych maili per sekcja ────────
             # Wszystkie sekcje zostaną połączone w jeden email na końcu.
-            pass
+
+            # ── Checkpoint: wysłane i zapisane — po restarcie nie powtarzamy ────
+            if checkpoint is not None:
+                checkpoint.finish_section(section_key, "done")
+
+        if _ostatni_email is not None:
+            TIME_TO_LAST_EMAIL.observe(_ostatni_email)
+            logger.log_debug_info(
+                "EMAIL_LATENCY",
+                {
+                    "policy": _policy,
+                    "first_email_sec": round(_pierwszy_email, 2),
+                    "last_email_sec": round(_ostatni_email, 2),
+                    "emails_sent": emails_sent,
+                },
+            )
+
+        memo_raport = memo.report()
+        logger.log_debug_info("PIPELINE_MEMO", memo_raport)
+        if memo_raport["avoided_calls"]:
+            flask_app.logger.info(
+                "[async] Memo: uniknięto %d wywołań (%.1f s) — %s",
+                memo_raport["avoided_calls"],
+                memo_raport["saved_sec"],
+                memo_raport["hits"],
+            )
 
         if on_pipeline_done:
             on_pipeline_done("", emails_sent)
@@ -319,6 +511,17 @@ def run_pipeline_async(
             sender,
             ", ".join(sections_done) if sections_done else "brak",
         )
+        if checkpoint is not None:
+            checkpoint.complete()
+
+
+@contextmanager
+def _checkpoint_lock(checkpoint):
+    try:
+        yield
+    finally:
+        if checkpoint is not None:
+            checkpoint.release()
 
 
 def _token_refresh(get_token_fn, flask_app, section_key):
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+core/lexicon_analyzer.py
+Lokalna analiza tekstu na słownikach z biblioteka/slowa_*.txt — zero tokenów.
+
+23 kategorie (formalne, wspolczucie, prawne_oskarzenie, ...) kompilowane raz
+na proces do jednego automatu Aho-Corasick nad tematami słów (snowballstemmer,
+polish). Alfabetem automatu są tematy, nie znaki — frazy wielowyrazowe
+("niemniej jednak", "lub też") i pojedyncze słowa łapie jedno przejście
+po mailu, niezależnie od liczby wzorców.
+
+    from core.lexicon_analyzer import analyze, features, prompt_hint
+
+    analyze(body)       # {"tokens": 212, "counts": {"formalne": 4, ...}, "density": {...}}
+    features(body)      # dominujące kategorie, osie tonu, flaga formalności
+    prompt_hint(body)   # jedna linia do promptu LLM zamiast pytania o ton/styl
+
+Tekst i wpisy słowników przechodzą tę samą normalizację: małe litery, słowa
+z liter (bez cyfr), temat snowball. Wpis słownika będący już tematem
+("niniejsz", "poklepyw") trafia w słowa o tym samym temacie. Bez
+snowballstemmer (opcjonalny) — dopasowanie dokładnych form.
+
+Benchmark przepustowości: benchmarks/bench_lexicon.py.
+"""
+
+import logging
+import os
+import re
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_log = logging.getLogger(__name__)
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BIBLIOTEKA_DIR = os.path.join(_BASE_DIR, "biblioteka")
+
+# Pary przeciwstawnych kategorii → oś tonu w [-1, 1] (pierwsza = +1)
+OSIE = {
+    "intensywnosc": ("intensywnosc_wysoka", "intensywnosc_niska"),
+    "moralnosc": ("moralnosc_pozytywna", "moralnosc_negatywna"),
+    "pewnosc": ("pewnosc", "watpliwosc"),
+    "dominacja": ("dominacja", "uleglosc"),
+    "bliskosc": ("bliskosc", "dystans"),
+    "prawne": ("prawne_oskarzenie", "prawne_obrona"),
+}
+PROG_FORMALNY = 2.0  # trafień "formalne" na 100 słów
+TOP_KATEGORII = 3
+MIN_TEMAT = 3  # krótsze tematy ("na", "i") dają same fałszywe trafienia
+MAX_CACHE_TEMATOW = 50000  # słowo → temat; snowball w czystym Pythonie to ~90% czasu
+
+_SLOWO = re.compile(r"[^\W\d_]+")
+
+
+def _stemmer():
+    try:
+        import snowballstemmer
+    except ImportError:
+        _log.warning("[lexicon] Brak snowballstemmer — dopasowanie dokładnych form")
+        return None
+    return snowballstemmer.stemmer("polish")
+
+
+class LexiconAnalyzer:
+    """Automat Aho-Corasick nad tematami słów; wyjście = kategorie wzorca."""
+
+    def __init__(self, lexicons: Dict[str, Sequence[str]], stemmer=None):
+        self._stemmer = stemmer
+        self._stem_lock = threading.Lock()  # Stemmer snowballa nie jest thread-safe
+        self._tematy: Dict[str, str] = {}
+        self.categories: Tuple[str, ...] = tuple(sorted(lexicons))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[Tuple[str, ...]] = [()]
+        self.patterns = 0
+        for kat, wpisy in lexicons.items():
+            for wpis in wpisy:
+                tematy = self.stems(wpis)
+                if not tematy or (len(tematy) == 1 and len(tematy[0]) < MIN_TEMAT):
+                    continue
+                self._dodaj(tematy, kat)
+        self._fail = self._zbuduj_fail()
+
+    @classmethod
+    def from_directory(cls, path: str = BIBLIOTEKA_DIR, stemmer=None) -> "LexiconAnalyzer":
+        lexicons = {}
+        for nazwa in sorted(os.listdir(path)):
+            if nazwa.startswith("slowa_") and nazwa.endswith(".txt"):
+                with open(os.path.join(path, nazwa), encoding="utf-8") as f:
+                    lexicons[nazwa[len("slowa_") : -len(".txt")]] = [
+                        w.strip() for w in f if w.strip() and not w.lstrip().startswith("#")
+                    ]
+        return cls(lexicons, stemmer if stemmer is not None else _stemmer())
+
+    # ── Budowa automatu ───────────────────────────────────────────────────────
+
+    def _dodaj(self, tematy: Sequence[str], kat: str) -> None:
+        wezel = 0
+        for t in tematy:
+            nast = self._goto[wezel].get(t)
+            if nast is None:
+                nast = len(self._goto)
+                self._goto[wezel][t] = nast
+                self._goto.append({})
+                self._out.append(())
+            wezel = nast
+        if kat not in self._out[wezel]:
+            self._out[wezel] += (kat,)
+            self.patterns += 1
+
+    def _zbuduj_fail(self) -> List[int]:
+        fail = [0] * len(self._goto)
+        kolejka = deque(self._goto[0].values())
+        while kolejka:
+            wezel = kolejka.popleft()
+            for t, dziecko in self._goto[wezel].items():
+                kolejka.append(dziecko)
+                f = fail[wezel]
+                while f and t not in self._goto[f]:
+                    f = fail[f]
+                cel = self._goto[f].get(t, 0)
+                fail[dziecko] = cel if cel != dziecko else 0
+                # Wyjścia sufiksów — "jednak" w środku "niemniej jednak"
+                self._out[dziecko] += tuple(
+                    k for k in self._out[fail[dziecko]] if k not in self._out[dziecko]
+                )
+        return fail
+
+    # ── Analiza ───────────────────────────────────────────────────────────────
+
+    def stems(self, text: str) -> List[str]:
+        slowa = _SLOWO.findall((text or "").lower())
+        if self._stemmer is None or not slowa:
+            return slowa
+        cache = self._tematy
+        brak = {w for w in slowa if w not in cache}
+        if brak:
+            with self._stem_lock:
+                cache = self._tematy
+                if len(cache) + len(brak) > MAX_CACHE_TEMATOW:
+                    # Nowy słownik zamiast clear() — czytający bez zamka mają stary
+                    cache = self._tematy = {}
+                    brak = set(slowa)
+                for w in brak:
+                    if w not in cache:
+                        cache[w] = self._stemmer.stemWord(w)
+        return [cache[w] for w in slowa]
+
+    def analyze(self, text: str) -> Dict[str, object]:
+        """Liczba trafień i gęstość (na 100 słów) per kategoria."""
+        tematy = self.stems(text)
+        counts: Dict[str, int] = {}
+        goto, fail, out = self._goto, self._fail, self._out
+        wezel = 0
+        for t in tematy:
+            while wezel and t not in goto[wezel]:
+                wezel = fail[wezel]
+            wezel = goto[wezel].get(t, 0)
+            for kat in out[wezel]:
+                counts[kat] = counts.get(kat, 0) + 1
+        n = len(tematy)
+        return {
+            "tokens": n,
+            "counts": counts,
+            "density": {k: round(100.0 * v / n, 2) for k, v in counts.items()} if n else {},
+        }
+
+
+_lock = threading.Lock()
+_analyzer: Optional[LexiconAnalyzer] = None
+
+
+def get_analyzer() -> LexiconAnalyzer:
+    """Automat z biblioteka/ — kompilowany raz na proces."""
+    global _analyzer
+    with _lock:
+        if _analyzer is None:
+            _analyzer = LexiconAnalyzer.from_directory()
+            _log.info(
+                "[lexicon] Skompilowano %d wzorców w %d kategoriach",
+                _analyzer.patterns,
+                len(_analyzer.categories),
+            )
+        return _analyzer
+
+
+def analyze(text: str) -> Dict[str, object]:
+    return get_analyzer().analyze(text)
+
+
+def features(text: str) -> Dict[str, object]:
+    """
+    Cechy do promptów i decyzji bez LLM:
+      dominant — do TOP_KATEGORII kategorii o największej liczbie trafień,
+      axes     — osie tonu (OSIE): (a - b) / (a + b), 0 gdy brak trafień,
+      formal   — gęstość "formalne" >= PROG_FORMALNY.
+    """
+    wynik = analyze(text)
+    counts = wynik["counts"]
+    osie = {}
+    for nazwa, (plus, minus) in OSIE.items():
+        a, b = counts.get(plus, 0), counts.get(minus, 0)
+        osie[nazwa] = round((a - b) / (a + b), 2) if a + b else 0.0
+    return {
+        "tokens": wynik["tokens"],
+        "dominant": [
+            k for k, _ in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:TOP_KATEGORII]
+        ],
+        "axes": osie,
+        "formal": wynik["density"].get("formalne", 0.0) >= PROG_FORMALNY,
+        "counts": counts,
+    }
+
+
+def prompt_hint(text: str) -> str:
+    """Jedna linia cech leksykalnych do dołączenia w prompcie LLM."""
+    f = features(text)
+    czesci = ["styl formalny" if f["formal"] else "styl potoczny"]
+    if f["dominant"]:
+        czesci.append("dominują: " + ", ".join(f["dominant"]))
+    osie = [f"{k} {v:+.1f}" for k, v in f["axes"].items() if v]
+    if osie:
+        czesci.append("osie: " + ", ".join(osie))
+    return "Cechy leksykalne (analiza lokalna): " + "; ".join(czesci) + "."
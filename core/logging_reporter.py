@@ -1,20 +1,44 @@
 """
 core/logging_reporter.py
 
-Logi trzymane są W PAMIĘCI (bez zapisu lokalnego — Render free ma read-only FS).
-Na końcu sesji (finalize()) log wysyłany jest jako plik .txt do Google Drive
-do folderu DRIVE_FOLDER_ID, przez ten sam OAuth co reszta projektu (drive_utils).
+Każdy wpis od razu trafia jako jedna linia JSON do pliku tymczasowego
+(katalog tempfile — na Render /tmp jest zapisywalny). W pamięci zostaje tylko
+ogon ostatnich wpisów i krótkie podsumowanie (wywołania API, błędy).
+Na końcu sesji (finalize()) plik jest renderowany strumieniowo do czytelnego
+log_{session_id}.txt, wysyłany do Google Drive do folderu DRIVE_FOLDER_ID
+(przez ten sam OAuth co reszta projektu — drive_utils) i kasowany.
+
+Logger jest przypięty do kontekstu (contextvars), a nie do procesu:
+bind_logger() przypina logger bieżącego pipeline'u na czas bloku with,
+a get_logger() zwraca pośrednika, który przy każdym wywołaniu sięga po logger
+z kontekstu. Dzięki temu moduły trzymające `get_logger()` w zmiennej
+modułowej (zwykly, dociekliwy, retry_manager) logują do właściwego pipeline'u
+także przy kilku webhookach naraz. Nowe wątki nie dziedziczą kontekstu —
+kto odpala wątek w pipeline, przekazuje mu contextvars.copy_context().
 """
 
 import os
 import json
 import time
 import logging
+import tempfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, Optional
 
 _mod_logger = logging.getLogger(__name__)
 
+# Ile ostatnich wpisów trzymamy w pamięci (logger.entries) — reszta jest w pliku
+MAX_WPISOW_W_PAMIECI = 50
+# Limity list w podsumowaniu log.txt
+MAX_API_W_PODSUMOWANIU = 500
+MAX_BLEDOW_W_PODSUMOWANIU = 100
+# Powyżej tego rozmiaru pliku kolejne wpisy są tylko liczone (ochrona dysku)
+MAX_BAJTOW_LOGU = int(os.getenv("EXECUTION_LOG_MAX_BYTES", str(20 * 1024 * 1024)))
+
 
 class ExecutionLogger:
     """Rejestruje szczegółowy przebieg wykonania programu."""
@@ -24,22 +48,26 @@ class ExecutionLogger:
         output_dir: str = "logs",  # ignorowany — dla kompatybilności
         session_id: str = "",
         upload_to_drive: bool = True,
+        spill: bool = True,
     ):
-        self.entries: List[Dict[str, Any]] = []
-        self._log_lines: List[str] = []
+        self.entries: deque = deque(maxlen=MAX_WPISOW_W_PAMIECI)
         self.start_time = time.time()
         self.start_datetime = datetime.now()
         self.session_id = session_id or self.start_datetime.strftime("%Y%m%d_%H%M%S")
         self.metadata: Dict[str, Any] = {}
         self.upload_to_drive = upload_to_drive
-
-        self._log_lines.append("=" * 80)
-        self._log_lines.append("RAPORT WYKONANIA PROGRAMU")
-        self._log_lines.append(
-            f"Data/Czas: {self.start_datetime.strftime('%Y-%m-%d %H:%M:%S')}"
-        )
-        self._log_lines.append("=" * 80)
-        self._log_lines.append("")
+        # spill=False — tylko ogon w pamięci, bez pliku (logger procesu)
+        self._spill = spill
+
+        self.liczba_wpisow = 0
+        self.pominiete_wpisy = 0
+        self._api_calls: deque = deque(maxlen=MAX_API_W_PODSUMOWANIU)
+        self._errors: deque = deque(maxlen=MAX_BLEDOW_W_PODSUMOWANIU)
+        self._liczba_bledow = 0
+        self._bajty = 0
+        self._lock = threading.Lock()
+        self._plik = None  # otwierany przy pierwszym wpisie
+        self._zamkniety = False
 
     # ── Kompatybilność z logging.Logger ────────────────────────────────────────
 
@@ -288,56 +316,153 @@ class ExecutionLogger:
             "timestamp": time.time() - self.start_time,
             "data": data,
         }
-        self.entries.append(entry)
-        self._write_entry_to_buffer(entry)
-
-    def _write_entry_to_buffer(self, entry: Dict[str, Any]):
+        linia = json.dumps(
+            entry, ensure_ascii=False, separators=(",", ":"), default=str
+        )
+        with self._lock:
+            if self._zamkniety:
+                _mod_logger.debug("[LOGGER] wpis %s po finalize() — pomijam", log_type)
+                return
+            self.liczba_wpisow += 1
+            self.entries.append(entry)
+            if log_type == "API_CALL":
+                self._api_calls.append(
+                    (bool(data.get("success")), data.get("api", "unknown"))
+                )
+            elif log_type == "ERROR":
+                self._liczba_bledow += 1
+                self._errors.append(
+                    (data.get("error_type", "?"), data.get("message", ""))
+                )
+            if not self._spill:
+                return
+            if self._bajty >= MAX_BAJTOW_LOGU:
+                self.pominiete_wpisy += 1
+                return
+            try:
+                if self._plik is None:
+                    self._plik = tempfile.NamedTemporaryFile(
+                        "w+",
+                        encoding="utf-8",
+                        buffering=1,  # linia po linii — log przetrwa awarię wątku
+                        prefix=f"log_{self.session_id}_",
+                        suffix=".jsonl",
+                        delete=False,
+                    )
+                self._plik.write(linia + "\n")
+                self._bajty += len(linia) + 1
+            except OSError as e:
+                self.pominiete_wpisy += 1
+                _mod_logger.warning("[LOGGER] Błąd zapisu logu do pliku: %s", e)
+
+    @property
+    def spill_path(self) -> Optional[str]:
+        """Ścieżka pliku tymczasowego z wpisami (None, dopóki nic nie zapisano)."""
+        return self._plik.name if self._plik is not None else None
+
+    def _iter_entries(self) -> Iterator[Dict[str, Any]]:
+        """Czyta wpisy z pliku tymczasowego, jeden po drugim."""
+        if self._plik is None:
+            return
+        self._plik.flush()
+        with open(self._plik.name, encoding="utf-8") as f:
+            for linia in f:
+                if linia.strip():
+                    yield json.loads(linia)
+
+    @staticmethod
+    def _format_entry(entry: Dict[str, Any]) -> str:
         ts = entry.get("timestamp", 0)
         time_str = f"[{int(ts)//60:02d}:{int(ts)%60:02d}]"
-        self._log_lines.append(f"{time_str} {entry['type']}")
+        lines = [f"{time_str} {entry['type']}"]
         data = entry.get("data", {})
-        if data:
+        if isinstance(data, dict):
             for key, value in data.items():
                 if isinstance(value, (dict, list)):
-                    self._log_lines.append(
+                    lines.append(
                         f"  {key}: {json.dumps(value, ensure_ascii=False, indent=2)}"
                     )
                 else:
-                    self._log_lines.append(f"  {key}: {value}")
-        self._log_lines.append("")
+                    lines.append(f"  {key}: {value}")
+        lines.append("")
+        return "\n".join(lines) + "\n"
+
+    def _iter_log_text(self) -> Iterator[str]:
+        """Czytelny log.txt kawałek po kawałku — nagłówek, wpisy, podsumowanie."""
+        yield "\n".join(
+            [
+                "=" * 80,
+                "RAPORT WYKONANIA PROGRAMU",
+                f"Data/Czas: {self.start_datetime.strftime('%Y-%m-%d %H:%M:%S')}",
+                "=" * 80,
+                "",
+                "",
+            ]
+        )
+        with self._lock:
+            for entry in self._iter_entries():
+                yield self._format_entry(entry)
+            api_calls = list(self._api_calls)
+            errors = list(self._errors)
 
-    def _build_log_text(self) -> str:
         total_time = time.time() - self.start_time
-        lines = list(self._log_lines)
-        lines += [
+        lines = [
             "=" * 80,
             "PODSUMOWANIE",
             "=" * 80,
             f"Całkowity czas: {total_time:.2f} sekund",
-            f"Liczba wpisów: {len(self.entries)}",
+            f"Liczba wpisów: {self.liczba_wpisow}",
         ]
+        if self.pominiete_wpisy:
+            lines.append(f"Pominięte wpisy (limit pliku): {self.pominiete_wpisy}")
 
-        api_calls = [e for e in self.entries if e["type"] == "API_CALL"]
         if api_calls:
             lines.append("\nWywołania API:")
-            for c in api_calls:
-                s = "✓" if c["data"].get("success") else "✗"
-                lines.append(f"  {s} {c['data'].get('api', 'unknown')}")
+            for success, api in api_calls:
+                lines.append(f"  {'✓' if success else '✗'} {api}")
 
-        errors = [e for e in self.entries if e["type"] == "ERROR"]
         if errors:
-            lines.append(f"\nBłędy ({len(errors)}):")
-            for e in errors:
-                lines.append(
-                    f"  ✗ {e['data'].get('error_type','?')}: {e['data'].get('message','')}"
-                )
+            lines.append(f"\nBłędy ({self._liczba_bledow}):")
+            for error_type, message in errors:
+                lines.append(f"  ✗ {error_type}: {message}")
 
         lines.append("\n" + "=" * 80)
-        return "\n".join(lines)
+        yield "\n".join(lines)
+
+    def _build_log_text(self) -> str:
+        return "".join(self._iter_log_text())
+
+    def _write_log_file(self) -> "tempfile.SpooledTemporaryFile":
+        """Renderuje log.txt do pliku (binarnie, UTF-8) i przewija na początek."""
+        out = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+b")
+        for kawalek in self._iter_log_text():
+            out.write(kawalek.encode("utf-8"))
+        out.seek(0)
+        return out
+
+    def _close(self):
+        """Zamyka i kasuje plik tymczasowy. Kolejne wpisy są ignorowane."""
+        with self._lock:
+            self._zamkniety = True
+            plik, self._plik = self._plik, None
+        if plik is None:
+            return
+        try:
+            plik.close()
+            os.unlink(plik.name)
+        except OSError as e:
+            _mod_logger.warning("[LOGGER] Nie udało się usunąć %s: %s", plik.name, e)
 
     def finalize(self):
-        """Zakończ sesję i wyślij log jako .txt do DRIVE_FOLDER_ID."""
-        log_text = self._build_log_text()
+        """Zakończ sesję, wyślij log jako .txt do DRIVE_FOLDER_ID i skasuj plik tymczasowy."""
+        try:
+            self._upload()
+        finally:
+            self._close()
+
+    def _upload(self):
+        if self._zamkniety:
+            return
 
         if not self.upload_to_drive:
             _mod_logger.info("[LOGGER] upload_to_drive=False — pomijam wysyłkę logu")
@@ -353,12 +478,13 @@ class ExecutionLogger:
         try:
             from drive_utils import upload_file_to_drive
 
-            result = upload_file_to_drive(
-                file_data=log_text.encode("utf-8"),
-                filename=f"log_{self.session_id}.txt",
-                mime_type="text/plain",
-                folder_id=drive_folder_id,
-            )
+            with self._write_log_file() as log_file:
+                result = upload_file_to_drive(
+                    file_data=log_file,
+                    filename=f"log_{self.session_id}.txt",
+                    mime_type="text/plain",
+                    folder_id=drive_folder_id,
+                )
             if result:
                 _mod_logger.info(
                     f"[LOGGER] ✓ Log wysłany na Drive: {result.get('url', result.get('id'))}"
@@ -373,21 +499,71 @@ class ExecutionLogger:
         self.finalize()
 
 
-# ── Singleton globalny ─────────────────────────────────────────────────────────
+# ── Logger bieżącego pipeline'u (contextvars) ──────────────────────────────────
 
+_biezacy: ContextVar[Optional[ExecutionLogger]] = ContextVar(
+    "execution_logger", default=None
+)
+# Logger procesu — dla kodu uruchomionego poza pipeline'em (start, testy).
+# Żyje tyle co proces i nikt go nie finalizuje, więc nie pisze do pliku:
+# zostaje ogon w pamięci, a info/warning/error i tak idą do logging.
 _global_logger: Optional[ExecutionLogger] = None
+_global_lock = threading.Lock()
 
 
-def get_logger() -> ExecutionLogger:
+def current_logger() -> ExecutionLogger:
+    """Logger przypięty do bieżącego kontekstu albo logger procesu."""
+    logger = _biezacy.get()
+    if logger is not None:
+        return logger
     global _global_logger
-    if _global_logger is None:
-        _global_logger = ExecutionLogger()
-    return _global_logger
+    with _global_lock:
+        if _global_logger is None:
+            _global_logger = ExecutionLogger(
+                session_id="proces", upload_to_drive=False, spill=False
+            )
+        return _global_logger
+
+
+class _ContextLogger:
+    """Pośrednik — każde odwołanie trafia do current_logger()."""
+
+    __slots__ = ()
+
+    def __getattr__(self, name: str):
+        return getattr(current_logger(), name)
+
+    def __repr__(self) -> str:
+        return f"<ContextLogger → {current_logger().session_id}>"
+
+
+_context_logger = _ContextLogger()
+
+
+def get_logger() -> ExecutionLogger:
+    """
+    Zwraca pośrednika do loggera bieżącego pipeline'u. Można go bezpiecznie
+    zapamiętać w zmiennej modułowej — rozstrzyga logger przy każdym wywołaniu.
+    """
+    return _context_logger
+
+
+@contextmanager
+def bind_logger(logger: ExecutionLogger):
+    """Przypina logger do bieżącego kontekstu na czas bloku with."""
+    token = _biezacy.set(logger)
+    try:
+        yield logger
+    finally:
+        _biezacy.reset(token)
 
 
 def init_logger(
     output_dir: str = "logs", session_id: str = "", upload_to_drive: bool = True
 ) -> ExecutionLogger:
-    global _global_logger
-    _global_logger = ExecutionLogger(output_dir, session_id, upload_to_drive)
-    return _global_logger
+    """
+    Tworzy logger nowej sesji — bez przypinania do kontekstu. Przypina
+    bind_logger() na czas bloku with; samo set() bez reset() zostawiłoby
+    w wątku obsługi żądań (używanym ponownie) logger zakończonego pipeline'u.
+    """
+    return ExecutionLogger(output_dir, session_id, upload_to_drive)
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+core/metrics.py
+Liczniki w pamięci procesu — wspólne dla wszystkich pipeline'ów.
+
+Cache prefiksów DeepSeek: każda odpowiedź call_deepseek niesie w "usage"
+prompt_cache_hit_tokens / prompt_cache_miss_tokens. Zbieramy je per szablon
+promptu (nazwa podana przez wywołującego albo skrót system promptu), żeby
+w /status było widać, który szablon faktycznie korzysta z cache.
+count_deepseek_tokens() sumuje zmierzone tokeny wywołań w bloku with (np.
+zapytanie zbiorcze zwykly wobec osobnych wywołań).
+
+Metryki Prometheus (/metrics): Counter i Histogram z etykietami, agregowane
+w procesie. Każda metryka ma własny lock trzymany tylko na czas dodania liczby
+(bez I/O i alokacji poza pierwszą kombinacją etykiet), a scrape kopiuje stan
+i formatuje tekst już poza lockiem — odczyt nie blokuje pipeline'ów.
+Wartości liczone w chwili scrape'a (RSS, żywe tokeny HF, pipeline'y w toku)
+rejestruje się przez gauge_fn().
+"""
+
+import bisect
+import contextlib
+import contextvars
+import functools
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+_log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_deepseek_szablony: Dict[str, Dict[str, Any]] = {}
+# Liczniki count_deepseek_tokens() aktywne w bieżącym kontekście (zagnieżdżone)
+_liczniki_tokenow: contextvars.ContextVar[tuple] = contextvars.ContextVar(
+    "deepseek_token_counters", default=()
+)
+
+
+def szablon_z_promptu(system_prompt: str) -> str:
+    """Domyślna nazwa szablonu — skrót system promptu (stała dla tego samego promptu)."""
+    h = hashlib.sha1((system_prompt or "").encode("utf-8")).hexdigest()[:8]
+    return f"sys-{h}"
+
+
+def record_deepseek_usage(
+    szablon: str, usage: Optional[dict], opis: str = ""
+) -> None:
+    """Dolicza usage jednej odpowiedzi DeepSeek do statystyk szablonu."""
+    if not isinstance(usage, dict):
+        return
+    hit = int(usage.get("prompt_cache_hit_tokens") or 0)
+    miss = int(usage.get("prompt_cache_miss_tokens") or 0)
+    completion = int(usage.get("completion_tokens") or 0)
+    prompt = int(usage.get("prompt_tokens") or (hit + miss))
+    for licznik in _liczniki_tokenow.get():
+        licznik["wywolania"] += 1
+        licznik["prompt_tokens"] += prompt
+        licznik["completion_tokens"] += completion
+    with _lock:
+        s = _deepseek_szablony.setdefault(
+            szablon,
+            {
+                "wywolania": 0,
+                "cache_hit_tokens": 0,
+                "cache_miss_tokens": 0,
+                "completion_tokens": 0,
+                "opis": opis[:80],
+            },
+        )
+        s["wywolania"] += 1
+        s["cache_hit_tokens"] += hit
+        s["cache_miss_tokens"] += miss
+        s["completion_tokens"] += completion
+
+
+@contextlib.contextmanager
+def count_deepseek_tokens():
+    """
+    Sumuje usage odpowiedzi DeepSeek w bloku with: {"wywolania",
+    "prompt_tokens", "completion_tokens"}. Obejmuje też wątki uruchomione
+    z kopią kontekstu (strumień DeepSeekJSONStream, run_section).
+    """
+    licznik = {"wywolania": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    token = _liczniki_tokenow.set(_liczniki_tokenow.get() + (licznik,))
+    try:
+        yield licznik
+    finally:
+        _liczniki_tokenow.reset(token)
+
+
+def _hit_ratio(hit: int, miss: int) -> float:
+    return round(hit / (hit + miss), 3) if (hit + miss) else 0.0
+
+
+def deepseek_cache_stats() -> Dict[str, Any]:
+    """
+    Zwraca {"szablony": {nazwa: {..., hit_ratio}}, "razem": {...}}.
+    Szablony posortowane malejąco po liczbie tokenów wejścia.
+    """
+    with _lock:
+        kopia = {k: dict(v) for k, v in _deepseek_szablony.items()}
+    razem = {"wywolania": 0, "cache_hit_tokens": 0, "cache_miss_tokens": 0}
+    for s in kopia.values():
+        s["hit_ratio"] = _hit_ratio(s["cache_hit_tokens"], s["cache_miss_tokens"])
+        for k in razem:
+            razem[k] += s[k]
+    razem["hit_ratio"] = _hit_ratio(razem["cache_hit_tokens"], razem["cache_miss_tokens"])
+    szablony = dict(
+        sorted(
+            kopia.items(),
+            key=lambda kv: -(kv[1]["cache_hit_tokens"] + kv[1]["cache_miss_tokens"]),
+        )
+    )
+    return {"szablony": szablony, "razem": razem}
+
+
+def reset() -> None:
+    """Czyści wszystkie liczniki (testy, restart statystyk)."""
+    with _lock:
+        _deepseek_szablony.clear()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Prometheus — Counter / Histogram / gauge_fn i eksport tekstowy
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_REJESTR: List["_Metryka"] = []
+_GAUGE_FN: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+SEKUNDY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BAJTY_BUCKETS = (10e3, 50e3, 100e3, 500e3, 1e6, 5e6, 10e6, 25e6)
+EMAIL_SEKUNDY_BUCKETS = (5, 10, 30, 60, 120, 180, 300, 600, 900, 1800)
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def _etykiety(nazwy: Sequence[str], wartosci: Tuple[str, ...]) -> str:
+    if not nazwy:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(nazwy, wartosci)) + "}"
+
+
+class _Metryka:
+    typ = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _REJESTR.append(self)
+
+    def _klucz(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _linie(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.typ}"] + self._linie()
+
+
+class Counter(_Metryka):
+    """Licznik rosnący z etykietami."""
+
+    typ = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._wartosci: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        k = self._klucz(labels)
+        with self._lock:
+            self._wartosci[k] = self._wartosci.get(k, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._wartosci.get(self._klucz(labels), 0)
+
+    def _linie(self):
+        with self._lock:
+            kopia = list(self._wartosci.items())
+        return [f"{self.name}{_etykiety(self.labelnames, k)} {_fmt(v)}" for k, v in kopia]
+
+    def _reset(self):
+        with self._lock:
+            self._wartosci.clear()
+
+
+class Histogram(_Metryka):
+    """Histogram z kubełkami (liczniki niekumulatywne, kumulowane przy eksporcie)."""
+
+    typ = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=SEKUNDY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # klucz → [liczniki kubełków..., +Inf, suma]
+        self._wartosci: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        k = self._klucz(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            w = self._wartosci.get(k)
+            if w is None:
+                w = self._wartosci[k] = [0] * (len(self.buckets) + 2)
+            w[i] += 1
+            w[-1] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            w = self._wartosci.get(self._klucz(labels))
+            return int(sum(w[:-1])) if w else 0
+
+    def _linie(self):
+        with self._lock:
+            kopia = [(k, list(w)) for k, w in self._wartosci.items()]
+        linie = []
+        nazwy_le = self.labelnames + ("le",)
+        for k, w in kopia:
+            narastajaco = 0
+            for granica, n in zip(self.buckets + (float("inf"),), w[:-1]):
+                narastajaco += n
+                le = "+Inf" if granica == float("inf") else f"{granica:g}"
+                linie.append(
+                    f"{self.name}_bucket{_etykiety(nazwy_le, k + (le,))} {_fmt(narastajaco)}"
+                )
+            etyk = _etykiety(self.labelnames, k)
+            linie.append(f"{self.name}_sum{etyk} {_fmt(w[-1])}")
+            linie.append(f"{self.name}_count{etyk} {_fmt(narastajaco)}")
+        return linie
+
+    def _reset(self):
+        with self._lock:
+            self._wartosci.clear()
+
+    def timed(self, puste_to_blad: bool = False, **labels):
+        """
+        Dekorator — czas wywołania z etykietą status=ok/error (jeśli metryka
+        ją ma). puste_to_blad=True: wynik None/False liczony jako error.
+        """
+
+        def deco(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                t0 = time.monotonic()
+                status = "error"
+                try:
+                    wynik = fn(*args, **kwargs)
+                    if not (puste_to_blad and (wynik is None or wynik is False)):
+                        status = "ok"
+                    return wynik
+                finally:
+                    extra = {"status": status} if "status" in self.labelnames else {}
+                    self.observe(time.monotonic() - t0, **labels, **extra)
+
+            return wrapper
+
+        return deco
+
+
+def gauge_fn(name: str, help: str, fn: Callable[[], float]) -> None:
+    """Rejestruje gauge liczony w chwili scrape'a (ponowna rejestracja nadpisuje)."""
+    _GAUGE_FN[name] = (help, fn)
+
+
+def render_prometheus() -> str:
+    """Wszystkie metryki w formacie tekstowym Prometheus 0.0.4."""
+    linie: List[str] = []
+    for m in list(_REJESTR):
+        linie += m.render()
+    for name, (help, fn) in list(_GAUGE_FN.items()):
+        try:
+            wartosc = float(fn())
+        except Exception as e:
+            _log.debug("[metrics] gauge %s: %s", name, e)
+            continue
+        linie += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {_fmt(wartosc)}"]
+    # Cache prefiksów DeepSeek (liczone wyżej, per szablon)
+    with _lock:
+        szablony = {k: dict(v) for k, v in _deepseek_szablony.items()}
+    if szablony:
+        linie += [
+            "# HELP autoresponder_deepseek_prompt_cache_tokens_total Tokeny wejścia DeepSeek wg cache prefiksów.",
+            "# TYPE autoresponder_deepseek_prompt_cache_tokens_total counter",
+        ]
+        for nazwa, st in szablony.items():
+            for wynik, klucz in (("hit", "cache_hit_tokens"), ("miss", "cache_miss_tokens")):
+                linie.append(
+                    "autoresponder_deepseek_prompt_cache_tokens_total"
+                    f"{_etykiety(('szablon', 'result'), (nazwa, wynik))} {st[klucz]}"
+                )
+    return "\n".join(linie) + "\n"
+
+
+# ── Metryki aplikacji ──────────────────────────────────────────────────────────
+
+HTTP_SECONDS = Histogram(
+    "autoresponder_http_request_seconds",
+    "Czas obsługi żądania HTTP (webhook wraca od razu, pipeline leci w tle).",
+    ("endpoint", "code"),
+)
+SECTION_SECONDS = Histogram(
+    "autoresponder_section_seconds",
+    "Czas wykonania sekcji (respondera) w pipeline.",
+    ("section", "status"),
+)
+DEEPSEEK_SECONDS = Histogram(
+    "autoresponder_deepseek_seconds",
+    "Czas wywołania call_deepseek (z ponowieniami).",
+    ("status",),
+)
+DEEPSEEK_TOKENS = Counter(
+    "autoresponder_deepseek_tokens_total",
+    "Tokeny DeepSeek wg modelu i rodzaju (prompt/completion).",
+    ("model", "kind"),
+)
+FLUX_ATTEMPTS = Counter(
+    "autoresponder_flux_attempts_total",
+    "Próby generowania FLUX wg providera i wyniku.",
+    ("provider", "outcome"),
+)
+GOOGLE_SECONDS = Histogram(
+    "autoresponder_google_call_seconds",
+    "Czas wywołań Google API (drive upload, sheets append).",
+    ("api", "status"),
+)
+TIME_TO_FIRST_EMAIL = Histogram(
+    "autoresponder_time_to_first_email_seconds",
+    "Od przyjęcia webhooka do pierwszego wysłanego maila pipeline'u.",
+    buckets=EMAIL_SEKUNDY_BUCKETS,
+)
+TIME_TO_LAST_EMAIL = Histogram(
+    "autoresponder_time_to_last_email_seconds",
+    "Od przyjęcia webhooka do ostatniego wysłanego maila pipeline'u.",
+    buckets=EMAIL_SEKUNDY_BUCKETS,
+)
+EMAIL_BYTES = Histogram(
+    "autoresponder_email_bytes",
+    "Rozmiar wysyłanej wiadomości MIME (z załącznikami).",
+    buckets=BAJTY_BUCKETS,
+)
+
+
+def reset_prometheus() -> None:
+    """Zeruje Counter/Histogram (testy)."""
+    for m in _REJESTR:
+        m._reset()
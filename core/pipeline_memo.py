@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+core/pipeline_memo.py
+Wspólne wyniki responderów w obrębie jednego pipeline'u.
+
+zwykly w środku woła emocje, dociekliwy (analiza) i scrabble, a job_runner
+uruchamia je też jako osobne sekcje, gdy są zaznaczone — bez memo to
+podwójne 8 zapytań emocji, podwójna gra Eryka i podwójna krzyżówka.
+
+    @pipeline_memo.memoize("emocje", "body", "sender_name", "sender_email", "gender", "tryb")
+    def build_emocje_section(body, sender_name="", ...): ...
+
+    with pipeline_memo.scope() as memo:      # run_pipeline_async
+        ...                                  # kto pierwszy, ten liczy
+    memo.report()   # {"avoided_calls": 2, "saved_sec": 41.3, "hits": {...}}
+
+Klucz = responder + argumenty, od których zależy wynik (po apply_defaults,
+więc brak argumentu == wartość domyślna). Parametry tylko do logów
+(attachments, test_mode, data) nie wchodzą do klucza.
+
+Memo żyje w contextvars, więc widzą go wątki sekcji (run_section) i
+TaskGraph. Poza scope() dekorator nic nie zmienia. Błąd i wynik zdegradowany
+(budżet) nie są zapamiętywane — następny wywołujący liczy sam. Każdy
+wywołujący dostaje płytką kopię dict-a.
+
+Sekcja w procesie potomnym (core/process_isolation.py) dostaje wpisy rodzica
+(export_state) i oddaje swoje (merge_state) — jak stan tokenów HF.
+
+Metryka autoresponder_memo_avoided_calls_total{responder}.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from core.metrics import Counter
+
+MEMO_AVOIDED = Counter(
+    "autoresponder_memo_avoided_calls_total",
+    "Wywołania responderów zastąpione wynikiem z memo pipeline'u.",
+    ("responder",),
+)
+
+_CZEKANIE_POLL_SEC = 0.5
+
+
+class PipelineMemo:
+    """Wyniki responderów jednego pipeline'u + licznik uniknięć."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wyniki: Dict[str, Dict[str, Any]] = {}
+        self._w_toku: Dict[str, threading.Event] = {}
+        self.hits: Dict[str, int] = {}
+        self.saved_sec = 0.0
+
+    def get_or_compute(self, responder: str, klucz: str, fn):
+        from core import section_memory
+
+        while True:
+            with self._lock:
+                wpis = self._wyniki.get(klucz)
+                if wpis is not None:
+                    self.hits[responder] = self.hits.get(responder, 0) + 1
+                    self.saved_sec += wpis["duration_sec"]
+                    MEMO_AVOIDED.inc(responder=responder)
+                    section_memory.record_memo_hit(responder)
+                    return dict(wpis["result"])
+                zdarzenie = self._w_toku.get(klucz)
+                if zdarzenie is None:
+                    zdarzenie = self._w_toku[klucz] = threading.Event()
+                    break
+            # Ten sam responder liczy się w innym wątku — czekamy na jego wynik
+            from core import budget
+
+            while not zdarzenie.wait(_CZEKANIE_POLL_SEC):
+                budget.check()
+
+        t0 = time.monotonic()
+        try:
+            wynik = fn()
+            if isinstance(wynik, dict) and not wynik.get("degraded"):
+                with self._lock:
+                    self._wyniki[klucz] = {
+                        "result": wynik,
+                        "duration_sec": round(time.monotonic() - t0, 3),
+                    }
+                return dict(wynik)
+            return wynik
+        finally:
+            with self._lock:
+                self._w_toku.pop(klucz, None)
+            zdarzenie.set()
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "avoided_calls": sum(self.hits.values()),
+                "saved_sec": round(self.saved_sec, 2),
+                "hits": dict(self.hits),
+            }
+
+    def export_state(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return dict(self._wyniki)
+
+    def merge_state(self, stan: Optional[Dict[str, Dict[str, Any]]]) -> None:
+        if not stan:
+            return
+        with self._lock:
+            for klucz, wpis in stan.items():
+                self._wyniki.setdefault(klucz, wpis)
+
+    def add_hits(self, raport: Optional[Dict[str, Any]]) -> None:
+        """Dolicza uniknięcia z procesu potomnego (report() potomka)."""
+        from core import section_memory
+
+        if not raport:
+            return
+        with self._lock:
+            for responder, n in raport.get("hits", {}).items():
+                self.hits[responder] = self.hits.get(responder, 0) + n
+                MEMO_AVOIDED.inc(n, responder=responder)
+            self.saved_sec += raport.get("saved_sec", 0.0)
+        for responder, n in raport.get("hits", {}).items():
+            if n:
+                section_memory.record_memo_hit(responder)
+
+
+_biezace: ContextVar[Optional[PipelineMemo]] = ContextVar("pipeline_memo", default=None)
+
+
+def current() -> Optional[PipelineMemo]:
+    return _biezace.get()
+
+
+@contextmanager
+def scope(memo: Optional[PipelineMemo] = None):
+    """Memo na czas pipeline'u (albo procesu potomnego z przekazanym stanem)."""
+    memo = memo or PipelineMemo()
+    token = _biezace.set(memo)
+    try:
+        yield memo
+    finally:
+        _biezace.reset(token)
+
+
+def _klucz(responder: str, args: Dict[str, Any]) -> str:
+    surowy = json.dumps(args, sort_keys=True, ensure_ascii=False, default=str)
+    return responder + ":" + hashlib.sha1(surowy.encode("utf-8")).hexdigest()
+
+
+def memoize(responder: str, *key_params: str):
+    """
+    Dekorator responderów: wynik współdzielony w memo pipeline'u.
+    key_params — nazwy argumentów, od których zależy wynik.
+    """
+
+    def deco(fn):
+        sygnatura = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            memo = _biezace.get()
+            if memo is None:
+                return fn(*args, **kwargs)
+            zwiazane = sygnatura.bind(*args, **kwargs)
+            zwiazane.apply_defaults()
+            klucz = _klucz(responder, {p: zwiazane.arguments.get(p) for p in key_params})
+            return memo.get_or_compute(
+                responder, klucz, functools.partial(fn, *args, **kwargs)
+            )
+
+        return wrapper
+
+    return deco
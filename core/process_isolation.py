@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+core/process_isolation.py
+Ciężkie sekcje w krótko żyjących procesach potomnych.
+
+Pillow, reportlab, python-docx i duże stringi base64 fragmentują stertę
+CPythona — gc.collect() zwalnia obiekty, ale RSS długo żyjącego workera
+gunicorna zostaje wysoki. Sekcja uruchomiona w procesie potomnym oddaje całą
+pamięć systemowi, gdy potomek się kończy.
+
+Potomkowie powstają z serwera forkserver (multiprocessing), który raz na
+start importuje moduły responderów (ISOLATION_PRELOAD) — fork z niego jest
+tani i nie dziedziczy sterty workera. Wynik sekcji (dict z base64
+załączników) wraca przez plik pickle w katalogu tymczasowym, razem z wpisami
+loggera potomka, stanem tokenów HF, wpisami memo pipeline'u
+(core/pipeline_memo.py) i szczytowym RSS potomka.
+
+    ISOLATE_SECTIONS=zwykly,smierc,generator_pdf   # domyślnie puste = wyłączone
+
+    fn = section_fn("zwykly", "responders.zwykly", "build_zwykly_section", kwargs)
+    result = fn()   # w procesie albo w potomku — zależnie od ISOLATE_SECTIONS
+
+Argumenty i wynik sekcji muszą dać się zpicklować (dict/list/str/bytes).
+Spany tracingu z potomka nie wracają do rodzica — w śladzie sekcja jest
+jednym spanem z atrybutami child_peak_rss_mb i exitcode. Szczyt potomka
+trafia też do pomiaru sekcji (core/section_memory.py) — bez tego historia
+miałaby ~0 MB dla najcięższych sekcji, a prognoza przyjęć by je przepuszczała.
+"""
+
+import importlib
+import logging
+import multiprocessing
+import os
+import pickle
+import resource
+import tempfile
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict
+
+from core import budget, pipeline_memo, section_memory
+
+_log = logging.getLogger(__name__)
+
+ISOLATE_SECTIONS = {
+    s.strip() for s in os.getenv("ISOLATE_SECTIONS", "").split(",") if s.strip()
+}
+ISOLATION_TIMEOUT_SEC = float(os.getenv("ISOLATION_TIMEOUT_SEC", "900"))
+ISOLATION_PRELOAD = [
+    "core.logging_reporter",
+    "core.ai_client",
+    "core.flux_client",
+    "responders.zwykly",
+    "responders.smierc",
+    "responders.generator_pdf",
+]
+
+_ctx_lock = threading.Lock()
+_ctx = None
+
+
+class IsolatedSectionError(RuntimeError):
+    """Sekcja w procesie potomnym zakończyła się błędem lub nie zwróciła wyniku."""
+
+
+def _kontekst():
+    """Kontekst forkserver z preloadem — tworzony raz na proces."""
+    global _ctx
+    with _ctx_lock:
+        if _ctx is None:
+            ctx = multiprocessing.get_context("forkserver")
+            ctx.set_forkserver_preload(ISOLATION_PRELOAD)
+            _ctx = ctx
+        return _ctx
+
+
+def _peak_rss_mb() -> float:
+    # Linux: ru_maxrss w KB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _child_main(module: str, func: str, kwargs: dict, out_path: str, meta: dict):
+    """Wnętrze procesu potomnego: app context, logger, wywołanie, zapis wyniku."""
+    from flask import Flask
+
+    from core.hf_token_manager import hf_tokens
+    from core.logging_reporter import ExecutionLogger, bind_logger
+
+    hf_tokens.import_state(meta.get("hf_state"))
+    memo = pipeline_memo.PipelineMemo()
+    memo.merge_state(meta.get("memo_state"))
+    app = Flask(f"section-{func}")
+    lg = ExecutionLogger(session_id=meta.get("session_id", ""), upload_to_drive=False)
+    t0 = time.monotonic()
+    # Reszta budżetu sekcji rodzica — timeouty sieciowe potomka też się do niej tną
+    with app.app_context(), bind_logger(lg), pipeline_memo.scope(memo), budget.budget(
+        meta.get("section", func), meta.get("budget_sec")
+    ):
+        try:
+            result = getattr(importlib.import_module(module), func)(**kwargs)
+            payload: Dict[str, Any] = {"ok": True, "result": result}
+        except budget.BudgetExceeded:
+            payload = {"ok": False, "budget_exceeded": True, "error": "BudgetExceeded"}
+            payload["partial"] = budget.current().partial
+        except Exception as e:
+            payload = {
+                "ok": False,
+                "error": f"{type(e).__name__}: {e}",
+                "traceback": traceback.format_exc(),
+            }
+    payload["duration_sec"] = round(time.monotonic() - t0, 3)
+    payload["log_entries"] = list(lg._iter_entries())
+    lg._close()
+    payload["hf_state"] = hf_tokens.export_state()
+    payload["memo_state"] = memo.export_state()
+    payload["memo_report"] = memo.report()
+    payload["peak_rss_mb"] = _peak_rss_mb()
+
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, out_path)
+
+
+def run_isolated(
+    section: str, module: str, func: str, kwargs: dict, timeout: float = None
+) -> Any:
+    """
+    Uruchamia module.func(**kwargs) w procesie potomnym i zwraca jego wynik.
+    Wpisy loggera potomka trafiają do loggera bieżącego pipeline'u.
+    """
+    from core.hf_token_manager import hf_tokens
+    from core.logging_reporter import current_logger
+    from core.tracing import set_attr
+
+    logger = current_logger()
+    memo = pipeline_memo.current()
+    fd, out_path = tempfile.mkstemp(prefix=f"section_{section}_", suffix=".pkl")
+    os.close(fd)
+    os.unlink(out_path)  # potomek tworzy plik atomowo (os.replace)
+    meta = {
+        "session_id": logger.session_id,
+        "hf_state": hf_tokens.export_state(),
+        "section": section,
+        "budget_sec": budget.remaining(),
+        "memo_state": memo.export_state() if memo is not None else None,
+    }
+
+    proc = _kontekst().Process(
+        target=_child_main,
+        args=(module, func, kwargs, out_path, meta),
+        name=f"section-{section}",
+        daemon=True,
+    )
+    limit = budget.timeout(ISOLATION_TIMEOUT_SEC if timeout is None else timeout)
+    t0 = time.monotonic()
+    proc.start()
+    proc.join(limit)
+    if proc.is_alive():
+        proc.kill()
+        proc.join()
+        _usun(out_path)
+        budget.check()
+        raise IsolatedSectionError(f"{section}: przekroczono czas w procesie potomnym")
+
+    try:
+        with open(out_path, "rb") as f:
+            payload = pickle.load(f)
+    except FileNotFoundError:
+        raise IsolatedSectionError(
+            f"{section}: proces potomny zakończył się bez wyniku (exitcode={proc.exitcode})"
+        )
+    finally:
+        _usun(out_path)
+
+    # RSS rodzica nie widzi pamięci potomka — szczyt do pomiaru sekcji (historia, prognoza)
+    section_memory.record_child_peak(payload.get("peak_rss_mb"))
+    for entry in payload.get("log_entries", ()):
+        logger._append_log(entry["type"], entry["data"])
+    hf_tokens.merge_state(payload.get("hf_state"))
+    if memo is not None:
+        memo.merge_state(payload.get("memo_state"))
+        memo.add_hits(payload.get("memo_report"))
+
+    info = {
+        "section": section,
+        "pid": proc.pid,
+        "exitcode": proc.exitcode,
+        "duration_sec": round(time.monotonic() - t0, 3),
+        "child_peak_rss_mb": payload.get("peak_rss_mb"),
+    }
+    logger.log_debug_info("ISOLATED_SECTION", info)
+    set_attr(isolated=True, **info)
+
+    if payload.get("budget_exceeded"):
+        # Przekroczenie w potomku — częściowy wynik do budżetu sekcji rodzica
+        budget.publish_partial(payload.get("partial"))
+        raise budget.BudgetExceeded(section)
+    if not payload.get("ok"):
+        logger.log_error(
+            "IsolatedSection", payload.get("error", ""), payload.get("traceback", "")
+        )
+        raise IsolatedSectionError(f"{section}: {payload.get('error')}")
+    return payload["result"]
+
+
+def _usun(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def section_fn(section: str, module: str, func: str, kwargs: dict) -> Callable[[], Any]:
+    """
+    Zadanie sekcji dla run_pipeline_async: w procesie potomnym, jeśli sekcja
+    jest w ISOLATE_SECTIONS, inaczej zwykłe wywołanie (z leniwym importem).
+    """
+    if section in ISOLATE_SECTIONS:
+        return lambda: run_isolated(section, module, func, kwargs)
+
+    def fn():
+        return getattr(importlib.import_module(module), func)(**kwargs)
+
+    return fn
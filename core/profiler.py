@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+core/profiler.py
+Próbkujący profiler na żądanie — bez zewnętrznych agentów.
+
+Co 1/hz sekundy zrzuca stosy wszystkich wątków (sys._current_frames()) i liczy
+identyczne stosy. Wynik w formacie "collapsed stacks" (Brendan Gregg):
+
+    wątek;plik.py:funkcja;plik.py:funkcja 42
+
+gotowy dla flamegraph.pl / speedscope / inferno. Próbkowanie jest
+zegarowe (wall-clock), więc widać zarówno gorące pętle CPU
+(CrosswordGeneratorNew.generate, reportlab), jak i czekanie na locki
+i semafory (threading.py:wait pod ramką respondera).
+
+Domyślnie pomijamy stosy bez żadnej ramki z kodu projektu (bezczynne wątki
+serwera, pule czekające na zadania) — idle=True je zostawia.
+
+Limity: hz ≤ PROFILER_MAX_HZ, czas ≤ PROFILER_MAX_SEKUND, jedna sesja naraz.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+PROFILER_MAX_HZ = 200
+PROFILER_MAX_SEKUND = 60
+MAX_GLEBOKOSC = 64
+
+_KATALOG_PROJEKTU = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_sesja = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Inna sesja profilowania już trwa."""
+
+
+def _czy_projekt(filename: str) -> bool:
+    return filename.startswith(_KATALOG_PROJEKTU) and "site-packages" not in filename
+
+
+def _zwin(frame, nazwa_watku: str, idle: bool) -> Optional[str]:
+    """Stos od korzenia do liścia jako 'wątek;plik:funkcja;...' (None = pominięty)."""
+    ramki = []
+    projekt = False
+    while frame is not None and len(ramki) < MAX_GLEBOKOSC:
+        code = frame.f_code
+        projekt = projekt or _czy_projekt(code.co_filename)
+        ramki.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    if not projekt and not idle:
+        return None
+    ramki.append(nazwa_watku.replace(";", "_").replace(" ", "_"))
+    return ";".join(reversed(ramki))
+
+
+def sample(seconds: float, hz: int = 50, idle: bool = False) -> Dict[str, object]:
+    """
+    Próbkuje stosy wszystkich wątków przez `seconds` sekund z częstotliwością `hz`.
+    Zwraca {"stacks": Counter, "samples", "seconds", "hz"}.
+    Rzuca ProfilerBusy, gdy trwa inna sesja.
+    """
+    hz = max(1, min(int(hz), PROFILER_MAX_HZ))
+    seconds = max(0.1, min(float(seconds), PROFILER_MAX_SEKUND))
+    if not _sesja.acquire(blocking=False):
+        raise ProfilerBusy("Profilowanie już trwa")
+    try:
+        wlasny = threading.get_ident()
+        okres = 1.0 / hz
+        stosy: Counter = Counter()
+        probki = 0
+        t_start = time.monotonic()
+        nastepna = t_start
+        while True:
+            teraz = time.monotonic()
+            if teraz - t_start >= seconds:
+                break
+            nazwy = {t.ident: t.name for t in threading.enumerate()}
+            ramki = sys._current_frames()
+            for ident, frame in ramki.items():
+                if ident == wlasny:
+                    continue
+                stos = _zwin(frame, nazwy.get(ident, f"thread-{ident}"), idle)
+                if stos:
+                    stosy[stos] += 1
+            # Nie trzymaj ramek między próbkami (trzymałyby locale wątków)
+            ramki = frame = None
+            probki += 1
+            nastepna += okres
+            # Spóźnione próbki pomijamy zamiast nadrabiać seriami
+            time.sleep(max(0.0, nastepna - time.monotonic()))
+            if nastepna < time.monotonic():
+                nastepna = time.monotonic()
+        return {
+            "stacks": stosy,
+            "samples": probki,
+            "seconds": round(time.monotonic() - t_start, 3),
+            "hz": hz,
+        }
+    finally:
+        _sesja.release()
+
+
+def collapsed(stacks: Counter) -> str:
+    """Format collapsed stacks — jedna linia na stos, malejąco po liczbie próbek."""
+    return "".join(f"{stos} {n}\n" for stos, n in stacks.most_common())
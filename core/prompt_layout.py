@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+core/prompt_layout.py
+Składanie promptów pod cache prefiksów DeepSeek.
+
+DeepSeek liczy taniej (i odpowiada szybciej) za początek promptu, który jest
+bajt w bajt identyczny jak w poprzednich wywołaniach. Dlatego prompt składamy
+zawsze w tej samej kolejności:
+
+    1. bloki statyczne  — instrukcje, schematy, zasady (identyczne dla każdego maila)
+    2. bloki zmienne    — email, imię nadawcy, dane z wcześniejszych sekcji
+    3. zakończenie      — krótkie stałe przypomnienie (opcjonalne)
+
+Blok to albo gotowy string, albo para (nagłówek, treść) renderowana jako
+"NAGŁÓWEK:\\ntreść". Puste bloki są pomijane, więc warunkowe fragmenty nie
+zostawiają pustych linii, które rozjechałyby prefiks.
+"""
+
+import json
+from typing import Iterable, Tuple, Union
+
+Blok = Union[str, Tuple[str, str], None]
+
+
+def _render(blok: Blok) -> str:
+    if blok is None:
+        return ""
+    if isinstance(blok, tuple):
+        naglowek, tresc = blok
+        if tresc is None or not str(tresc).strip():
+            return ""
+        return f"{naglowek}:\n{tresc}"
+    return blok.strip("\n") if blok.strip() else ""
+
+
+def schemat(schema) -> str:
+    """Stabilny zapis schematu JSON (ta sama kolejność i wcięcia przy każdym wywołaniu)."""
+    return json.dumps(schema, ensure_ascii=False, indent=2)
+
+
+def zloz_prompt(
+    statyczne: Iterable[Blok],
+    zmienne: Iterable[Blok] = (),
+    zakonczenie: str = "",
+) -> str:
+    """
+    Zwraca prompt: bloki statyczne, potem zmienne, potem zakończenie.
+    Bloki rozdzielane pustą linią.
+    """
+    czesci = [_render(b) for b in statyczne]
+    czesci += [_render(b) for b in zmienne]
+    if zakonczenie:
+        czesci.append(zakonczenie.strip("\n"))
+    return "\n\n".join(c for c in czesci if c)
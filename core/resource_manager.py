@@ -1,26 +1,77 @@
 #!/usr/bin/env python3
 """
 core/resource_manager.py
-Monitorowanie zasobów systemowych (pamięć, CPU).
+Monitorowanie zasobów systemowych (pamięć, CPU) i kontrola przyjęć pipeline'ów.
+
+Kontrola przyjęć (admit): prognoza szczytu pamięci pipeline'u z listy sekcji.
+Sekcje w pipeline idą po kolei, więc szczyt pipeline'u to największy szczyt
+jednej sekcji plus to, co zostaje w RSS po sekcjach (retained). Szczyt sekcji
+to p95 peak_delta_mb z historii core/section_memory.py (co najmniej
+MIN_POMIAROW pomiarów), a bez historii — section_peak_defaults_mb z configu.
+
+    prognoza = RSS teraz + niewykorzystana część prognoz pipeline'ów w toku
+               + prognoza nowego
+
+RSS teraz zawiera już to, co pipeline'y w toku zajęły (ich dotychczasowy szczyt
+ponad RSS startu), więc rezerwujemy tylko resztę ich prognozy.
+
+Decyzja: start (mieści się w memory_threshold_mb), shed (mieści się po
+odrzuceniu ciężkich sekcji z sheddable_sections), delay (nie mieści się,
+ale coś jeszcze trwa — czekamy aż się zwolni). Po ostatniej sekcji
+report_forecast() porównuje prognozę z faktycznym szczytem i loguje błąd.
+
+logger= w admit/wait_for_admission/pipeline_start/report_forecast — logger
+pipeline'u podany wprost. Webhook i wątek pipeline'u nie mają go przypiętego
+w kontekście przez cały czas (pipeline_end idzie już po finalize()), a bez
+niego wpisy trafiłyby do loggera procesu, którego nikt nie czyta.
 """
 
 import psutil
 import gc
+import itertools
 import threading
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Iterable, List, Optional
 
 from core.logging_reporter import get_logger
+from core.metrics import Counter
+
+MIN_POMIAROW = 3
+DOMYSLNY_SZCZYT_MB = 50
+
+ADMISSION_DECISIONS = Counter(
+    "autoresponder_admission_decisions_total",
+    "Decyzje kontroli przyjęć pipeline'ów (start/shed/delay).",
+    ("decision",),
+)
 
 
 class ResourceManager:
     """Monitoruje i zarządza zasobami systemowymi."""
 
-    def __init__(self, memory_threshold_mb: int = 400, max_concurrent: int = 5):
+    def __init__(
+        self,
+        memory_threshold_mb: int = 400,
+        max_concurrent: int = 5,
+        section_peak_defaults_mb: Optional[Dict[str, float]] = None,
+        sheddable_sections: Iterable[str] = (),
+        max_delay_sec: float = 120,
+    ):
         self.memory_threshold_mb = memory_threshold_mb
         self.max_concurrent = max_concurrent
+        self.section_peak_defaults_mb = dict(section_peak_defaults_mb or {})
+        self.sheddable_sections = list(sheddable_sections)
+        self.max_delay_sec = max_delay_sec
         self.logger = get_logger()
         self._active_pipelines = 0
+        # delay — przyjęte, czekają w wątku na pamięć (bez biletu i rezerwacji)
+        self._oczekujace = 0
         self._lock = threading.Lock()
+        self._zwolniono = threading.Condition(self._lock)
+        self._bilety = itertools.count(1)
+        # bilet → {"forecast_mb", "rss_start_mb", "peak_mb", "sections"}
+        self._rezerwacje: Dict[int, Dict[str, Any]] = {}
+        self._bledy_prognozy: List[float] = []
 
     def get_memory_usage(self) -> Dict[str, float]:
         """Zwraca użycie pamięci w MB."""
@@ -45,23 +96,239 @@ class ResourceManager:
     def can_start_pipeline(self) -> bool:
         """Sprawdza czy można uruchomić nowy pipeline."""
         with self._lock:
-            return self._active_pipelines < self.max_concurrent
+            return self._active_pipelines + self._oczekujace < self.max_concurrent
+
+    def pipeline_delayed(self):
+        """Pipeline z decyzją delay przyjęty — liczony do limitu i drenażu, zanim wystartuje."""
+        with self._lock:
+            self._oczekujace += 1
+
+    def delay_abandoned(self):
+        """Pipeline z decyzją delay nie wystartował (wyjątek przed pipeline_start)."""
+        with self._lock:
+            self._oczekujace = max(0, self._oczekujace - 1)
 
-    def pipeline_start(self):
-        """Rejestruje rozpoczęcie pipeline'u."""
+    def waiting_pipelines(self) -> int:
         with self._lock:
+            return self._oczekujace
+
+    def pipeline_start(
+        self,
+        admission: Optional[Dict[str, Any]] = None,
+        logger=None,
+        delayed: bool = False,
+    ) -> int:
+        """
+        Rejestruje rozpoczęcie pipeline'u. Z decyzją admit() rezerwuje jego
+        prognozę pamięci. Zwraca bilet dla record_section_memory/pipeline_end.
+        delayed=True — pipeline czekał (pipeline_delayed); przechodzi do aktywnych
+        pod jednym zamkiem, bez chwili, w której nie jest liczony nigdzie.
+        """
+        rss_start = self.get_memory_usage()["rss_mb"]
+        with self._lock:
+            if delayed:
+                self._oczekujace = max(0, self._oczekujace - 1)
             self._active_pipelines += 1
-            self.logger.log_debug_info(
-                "pipeline", f"Pipeline start: active={self._active_pipelines}"
-            )
+            bilet = next(self._bilety)
+            if admission:
+                self._rezerwacje[bilet] = {
+                    "forecast_mb": admission["forecast_mb"],
+                    "rss_start_mb": rss_start,
+                    "peak_mb": 0.0,
+                    "sections": list(admission["sections"]),
+                    "decision": admission["decision"],
+                    "reported": False,
+                }
+            aktywne = self._active_pipelines
+        (logger or self.logger).log_debug_info(
+            "pipeline", f"Pipeline start: active={aktywne}"
+        )
+        return bilet
+
+    def record_section_memory(self, bilet: int, mem: Dict[str, Any]):
+        """Dolicza szczyt RSS sekcji do pipeline'u (do porównania z prognozą)."""
+        with self._lock:
+            r = self._rezerwacje.get(bilet)
+            if r is not None:
+                r["peak_mb"] = max(r["peak_mb"], mem.get("rss_peak_mb", 0.0))
 
-    def pipeline_end(self):
-        """Rejestruje zakończenie pipeline'u."""
+    def report_forecast(self, bilet: Optional[int], logger=None) -> Optional[float]:
+        """
+        Błąd prognozy (prognoza − faktyczny szczyt) do statystyk i do loggera
+        pipeline'u — wołać po ostatniej sekcji, przed logger.finalize().
+        Raz na bilet; None, gdy nie ma czego porównać.
+        """
+        with self._lock:
+            r = self._rezerwacje.get(bilet)
+            if r is None or r["reported"] or not r["peak_mb"]:
+                return None
+            r["reported"] = True
+            actual = max(0.0, r["peak_mb"] - r["rss_start_mb"])
+            blad = round(r["forecast_mb"] - actual, 1)
+            self._bledy_prognozy = (self._bledy_prognozy + [blad])[-200:]
+        (logger or self.logger).log_debug_info(
+            "ADMISSION_FORECAST",
+            {
+                "sections": r["sections"],
+                "decision": r["decision"],
+                "forecast_mb": r["forecast_mb"],
+                "actual_peak_delta_mb": round(actual, 1),
+                "error_mb": blad,
+            },
+        )
+        return blad
+
+    def pipeline_end(self, bilet: Optional[int] = None):
+        """
+        Rejestruje zakończenie pipeline'u i zwalnia rezerwację. Błąd prognozy
+        nie zgłoszony przez report_forecast() (np. po wyjątku) trafia tylko
+        do statystyk i loggera procesu.
+        """
+        self.report_forecast(bilet)
         with self._lock:
             self._active_pipelines = max(0, self._active_pipelines - 1)
-            self.logger.log_debug_info(
-                "pipeline", f"Pipeline end: active={self._active_pipelines}"
+            self._rezerwacje.pop(bilet, None)
+            aktywne = self._active_pipelines
+            self._zwolniono.notify_all()
+        self.logger.log_debug_info("pipeline", f"Pipeline end: active={aktywne}")
+
+    # ── Prognoza pamięci i kontrola przyjęć ────────────────────────────────────
+
+    def section_peak_mb(self, section: str) -> Dict[str, float]:
+        """Szczyt i retained sekcji (MB) — z historii pomiarów albo z configu."""
+        from core import section_memory
+
+        wpisy = section_memory.history(section)
+        if len(wpisy) >= MIN_POMIAROW:
+            delty = sorted(w["peak_delta_mb"] for w in wpisy)
+            p95 = delty[min(len(delty) - 1, int(round(0.95 * (len(delty) - 1))))]
+            retained = sum(max(0.0, w["delta_mb"]) for w in wpisy) / len(wpisy)
+            return {"peak_mb": max(0.0, p95), "retained_mb": retained, "source": "history"}
+        return {
+            "peak_mb": float(
+                self.section_peak_defaults_mb.get(section, DOMYSLNY_SZCZYT_MB)
+            ),
+            "retained_mb": 0.0,
+            "source": "config",
+        }
+
+    def forecast_pipeline_mb(self, sections: Iterable[str]) -> float:
+        """Prognozowany przyrost RSS pipeline'u: max szczyt sekcji + suma retained."""
+        prognozy = [self.section_peak_mb(s) for s in sections]
+        if not prognozy:
+            return 0.0
+        return round(
+            max(p["peak_mb"] for p in prognozy)
+            + sum(p["retained_mb"] for p in prognozy),
+            1,
+        )
+
+    def admit(
+        self, sections: Iterable[str], logger=None, record: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Decyzja dla nowego pipeline'u: {"decision": start|shed|delay,
+        "sections" (po odrzuceniu), "shed", "forecast_mb", "projected_mb", ...}.
+        record=False — bez licznika i wpisu w logu (ponowne sprawdzenia
+        w wait_for_admission).
+        """
+        sekcje = wszystkie = list(sections)
+        rss = self.get_memory_usage()["rss_mb"]
+        with self._lock:
+            zarezerwowane = sum(
+                max(0.0, r["forecast_mb"] - max(0.0, r["peak_mb"] - r["rss_start_mb"]))
+                for r in self._rezerwacje.values()
+            )
+            w_toku = self._active_pipelines
+
+        def _projekcja(lista):
+            return round(rss + zarezerwowane + self.forecast_pipeline_mb(lista), 1)
+
+        odrzucone: List[str] = []
+        decyzja = "start"
+        if _projekcja(sekcje) > self.memory_threshold_mb:
+            # Odrzucaj najcięższe sekcje z listy sheddable, aż się zmieści
+            ciezkie = sorted(
+                (s for s in sekcje if s in self.sheddable_sections),
+                key=lambda s: -self.section_peak_mb(s)["peak_mb"],
             )
+            kandydat = list(sekcje)
+            for s in ciezkie:
+                if len(kandydat) <= 1:
+                    break
+                kandydat.remove(s)
+                odrzucone.append(s)
+                if _projekcja(kandydat) <= self.memory_threshold_mb:
+                    break
+            if _projekcja(kandydat) <= self.memory_threshold_mb:
+                decyzja, sekcje = "shed", kandydat
+            else:
+                odrzucone = []
+                # Nic nie trwa — nie ma na co czekać, startujemy (prognoza bywa ostrożna)
+                decyzja = "delay" if w_toku else "start"
+
+        wynik = {
+            "decision": decyzja,
+            "sections": sekcje,
+            "shed": odrzucone,
+            "forecast_mb": self.forecast_pipeline_mb(sekcje),
+            "projected_mb": _projekcja(sekcje),
+            "projected_all_mb": _projekcja(wszystkie),
+            "rss_mb": round(rss, 1),
+            "reserved_mb": round(zarezerwowane, 1),
+            "limit_mb": self.memory_threshold_mb,
+        }
+        if record:
+            self._zapisz_decyzje(wynik, logger)
+        return wynik
+
+    def _zapisz_decyzje(self, wynik: Dict[str, Any], logger=None, reason: str = ""):
+        ADMISSION_DECISIONS.inc(decision=wynik["decision"])
+        (logger or self.logger).log_decision(
+            "admission",
+            f"projected {wynik['projected_mb']} MB vs limit {wynik['limit_mb']} MB",
+            wynik["decision"],
+            reason=reason or (f"shed={wynik['shed']}" if wynik["shed"] else ""),
+        )
+
+    def wait_for_admission(
+        self, sections: Iterable[str], timeout: Optional[float] = None, logger=None
+    ) -> Dict[str, Any]:
+        """
+        Dla decyzji delay: czeka na koniec innych pipeline'ów i ponawia admit().
+        Po timeout (domyślnie max_delay_sec) zwraca ostatnią decyzję jako start.
+        Pierwsze delay policzył już admit() wywołującego — ponowienia idą bez
+        zapisu, licznik i log dostają tylko decyzję końcową.
+        """
+        sekcje = list(sections)
+        koniec = time.monotonic() + (self.max_delay_sec if timeout is None else timeout)
+        while True:
+            decyzja = self.admit(sekcje, logger=logger, record=False)
+            if decyzja["decision"] != "delay":
+                self._zapisz_decyzje(decyzja, logger)
+                return decyzja
+            pozostalo = koniec - time.monotonic()
+            if pozostalo <= 0:
+                decyzja = dict(decyzja, decision="start")
+                self._zapisz_decyzje(decyzja, logger, reason="czekanie przekroczone")
+                return decyzja
+            with self._lock:
+                self._zwolniono.wait(timeout=min(pozostalo, 5.0))
+
+    def forecast_stats(self) -> Dict[str, Any]:
+        """Błąd prognozy (prognoza − faktyczny szczyt) z ostatnich pipeline'ów."""
+        with self._lock:
+            bledy = list(self._bledy_prognozy)
+            rezerwacje = len(self._rezerwacje)
+        if not bledy:
+            return {"pipelines": 0, "active_reservations": rezerwacje}
+        return {
+            "pipelines": len(bledy),
+            "mean_abs_error_mb": round(sum(abs(b) for b in bledy) / len(bledy), 1),
+            "under_forecasts": sum(1 for b in bledy if b < 0),
+            "last_error_mb": bledy[-1],
+            "active_reservations": rezerwacje,
+        }
 
     def monitor_resources(self):
         """Loguje aktualne użycie zasobów."""
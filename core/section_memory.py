@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+core/section_memory.py
+Pamięć per sekcja — który responder pcha instancję w stronę 512 MB.
+
+    with measure_section("smierc", on_done=callback) as pomiar:
+        result = fn()
+    pomiar.wynik  # {"rss_before_mb", "rss_after_mb", "rss_peak_mb", "peak_delta_mb", ...}
+
+RSS przed i po sekcji czytamy z psutil, szczyt w trakcie — z jednego wątku
+próbkującego (co MEMORY_SAMPLE_SEC), wspólnego dla wszystkich trwających
+pomiarów. RSS jest wspólny dla procesu: przy kilku pipeline'ach naraz szczyt
+sekcji zawiera też pamięć sąsiadów (pole "concurrent" mówi, ilu ich było).
+
+Sekcja w procesie potomnym (core/process_isolation.py) nie rośnie w RSS
+rodzica — run_isolated zgłasza szczyt potomka przez record_child_peak(),
+a pomiar liczy wtedy szczyt jako RSS rodzica przed sekcją + szczyt potomka.
+
+Sekcja, której wynik podał pipeline_memo (np. emocje po zwykly), kończy się
+w ~0 s — record_memo_hit() oznacza pomiar "memo_hit", żeby taki przebieg nie
+zaniżał oczekiwanych czasów w core/section_scheduler.py.
+
+MEMORY_TRACEMALLOC=1 — dodatkowo szczyt sterty Pythona i top miejsc alokacji
+(tracemalloc, porównanie snapshotów przed/po). Kosztuje ~2× wolniejsze
+alokacje, więc domyślnie wyłączone.
+
+Wyniki trafiają do historii w pamięci i do MEMORY_HISTORY_PATH (JSONL),
+z której ranking() liczy responderów wg szczytu pamięci w czasie. Plik po
+przekroczeniu 2×MAX_HISTORIA linii jest przycinany do ostatnich MAX_HISTORIA.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+import psutil
+
+_log = logging.getLogger(__name__)
+
+MEMORY_SAMPLE_SEC = float(os.getenv("MEMORY_SAMPLE_SEC", "0.05"))
+MEMORY_TRACEMALLOC = os.getenv("MEMORY_TRACEMALLOC", "0") == "1"
+MEMORY_HISTORY_PATH = os.getenv(
+    "MEMORY_HISTORY_PATH",
+    os.path.join(tempfile.gettempdir(), "autoresponder_section_memory.jsonl"),
+)
+MAX_HISTORIA = 500
+TOP_ALOKACJI = 10
+
+_MB = 1024 * 1024
+_proces = psutil.Process()
+
+
+def rss_mb() -> float:
+    return _proces.memory_info().rss / _MB
+
+
+# ── Wspólny wątek próbkujący RSS ───────────────────────────────────────────────
+
+
+class _Probnik:
+    """Jeden wątek dla wszystkich trwających pomiarów; kończy się, gdy nic nie mierzy."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._aktywne: set = set()
+        self._watek: Optional[threading.Thread] = None
+
+    def dodaj(self, pomiar: "SectionMemory"):
+        with self._lock:
+            self._aktywne.add(pomiar)
+            if self._watek is None:
+                self._watek = threading.Thread(
+                    target=self._petla, daemon=True, name="section-memory"
+                )
+                self._watek.start()
+
+    def usun(self, pomiar: "SectionMemory"):
+        with self._lock:
+            self._aktywne.discard(pomiar)
+
+    def liczba_aktywnych(self) -> int:
+        with self._lock:
+            return len(self._aktywne)
+
+    def _petla(self):
+        while True:
+            teraz = rss_mb()
+            with self._lock:
+                if not self._aktywne:
+                    self._watek = None
+                    return
+                for p in self._aktywne:
+                    if teraz > p.rss_peak_mb:
+                        p.rss_peak_mb = teraz
+            time.sleep(MEMORY_SAMPLE_SEC)
+
+
+_probnik = _Probnik()
+
+
+# ── tracemalloc (opcjonalnie) ──────────────────────────────────────────────────
+
+_tm_lock = threading.Lock()
+_tm_uzytkownicy = 0
+
+
+def _tm_start():
+    global _tm_uzytkownicy
+    with _tm_lock:
+        if _tm_uzytkownicy == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+        _tm_uzytkownicy += 1
+        tracemalloc.reset_peak()
+        return tracemalloc.take_snapshot()
+
+
+def _tm_stop(snap_przed) -> Dict[str, Any]:
+    global _tm_uzytkownicy
+    with _tm_lock:
+        _, szczyt = tracemalloc.get_traced_memory()
+        snap_po = tracemalloc.take_snapshot()
+        _tm_uzytkownicy -= 1
+        if _tm_uzytkownicy == 0:
+            tracemalloc.stop()
+    roznice = snap_po.compare_to(snap_przed, "lineno")[:TOP_ALOKACJI]
+    return {
+        "py_peak_mb": round(szczyt / _MB, 2),
+        "top_allocations": [
+            {
+                "site": f"{r.traceback[0].filename}:{r.traceback[0].lineno}",
+                "size_diff_kb": round(r.size_diff / 1024, 1),
+                "count_diff": r.count_diff,
+            }
+            for r in roznice
+        ],
+    }
+
+
+# ── Pomiar sekcji ──────────────────────────────────────────────────────────────
+
+# Pomiar trwający w bieżącym kontekście (run_section kopiuje kontekst do wątku sekcji)
+_pomiar_biezacy: ContextVar[Optional["SectionMemory"]] = ContextVar(
+    "section_memory", default=None
+)
+
+
+def record_child_peak(peak_rss_mb: Optional[float]) -> None:
+    """Szczyt RSS procesu potomnego sekcji — do bieżącego pomiaru (jeśli jest)."""
+    pomiar = _pomiar_biezacy.get()
+    if pomiar is not None and peak_rss_mb:
+        pomiar.child_peak_mb = max(pomiar.child_peak_mb, float(peak_rss_mb))
+
+
+def record_memo_hit(responder: str) -> None:
+    """Wynik sekcji z pipeline_memo — oznacza bieżący pomiar tej sekcji (jeśli jest)."""
+    pomiar = _pomiar_biezacy.get()
+    if pomiar is not None and pomiar.section == responder:
+        pomiar.memo_hit = True
+
+
+class SectionMemory:
+    """Kontekst mierzący RSS sekcji. Wynik w .wynik po wyjściu z bloku."""
+
+    def __init__(
+        self,
+        section: str,
+        on_done: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        tracemalloc_enabled: Optional[bool] = None,
+    ):
+        self.section = section
+        self.on_done = on_done
+        self.tracemalloc_enabled = (
+            MEMORY_TRACEMALLOC if tracemalloc_enabled is None else tracemalloc_enabled
+        )
+        self.rss_before_mb = 0.0
+        self.rss_peak_mb = 0.0
+        self.child_peak_mb = 0.0
+        self.memo_hit = False
+        self.wynik: Dict[str, Any] = {}
+        self._t0 = 0.0
+        self._snap = None
+        self._rownolegle = 0
+        self._token = None
+
+    def __enter__(self) -> "SectionMemory":
+        if self.tracemalloc_enabled:
+            self._snap = _tm_start()
+        self.rss_before_mb = self.rss_peak_mb = rss_mb()
+        self._t0 = time.monotonic()
+        self._rownolegle = _probnik.liczba_aktywnych()
+        _probnik.dodaj(self)
+        self._token = _pomiar_biezacy.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _pomiar_biezacy.reset(self._token)
+        _probnik.usun(self)
+        po = rss_mb()
+        self.rss_peak_mb = max(self.rss_peak_mb, po)
+        if self.child_peak_mb:
+            # Potomek i rodzic naraz: RSS rodzica sprzed sekcji + szczyt potomka
+            self.rss_peak_mb = max(
+                self.rss_peak_mb, self.rss_before_mb + self.child_peak_mb
+            )
+        self.wynik = {
+            "section": self.section,
+            "ts": round(time.time(), 3),
+            "duration_sec": round(time.monotonic() - self._t0, 3),
+            "rss_before_mb": round(self.rss_before_mb, 1),
+            "rss_after_mb": round(po, 1),
+            "rss_peak_mb": round(self.rss_peak_mb, 1),
+            "delta_mb": round(po - self.rss_before_mb, 1),
+            "peak_delta_mb": round(self.rss_peak_mb - self.rss_before_mb, 1),
+            "concurrent": self._rownolegle,
+            "status": "error" if exc_type else "ok",
+        }
+        if self.child_peak_mb:
+            self.wynik["child_peak_rss_mb"] = round(self.child_peak_mb, 1)
+        if self.memo_hit:
+            self.wynik["memo_hit"] = True
+        if self._snap is not None:
+            try:
+                self.wynik.update(_tm_stop(self._snap))
+            except Exception as e:
+                _log.warning("[section-memory] tracemalloc: %s", e)
+            self._snap = None
+        record(self.wynik)
+        if self.on_done:
+            try:
+                self.on_done(self.section, self.wynik)
+            except Exception as e:
+                _log.warning("[section-memory] on_done(%s): %s", self.section, e)
+        return False
+
+
+def measure_section(section: str, on_done=None, tracemalloc_enabled=None):
+    return SectionMemory(section, on_done, tracemalloc_enabled)
+
+
+# ── Historia i ranking ─────────────────────────────────────────────────────────
+
+_hist_lock = threading.Lock()
+_historia: deque = deque(maxlen=MAX_HISTORIA)
+_wczytana = False
+_linie_w_pliku = 0
+
+
+def _ogon_pliku() -> deque:
+    """Ostatnie MAX_HISTORIA linii pliku; liczy przy okazji wszystkie linie."""
+    global _linie_w_pliku
+    ogon: deque = deque(maxlen=MAX_HISTORIA)
+    _linie_w_pliku = 0
+    with open(MEMORY_HISTORY_PATH, encoding="utf-8") as f:
+        for linia in f:
+            _linie_w_pliku += 1
+            ogon.append(linia)
+    return ogon
+
+
+def _przytnij():
+    """
+    Przepisuje plik do ostatnich MAX_HISTORIA linii (tmp + os.replace).
+    Czyta plik, nie pamięć — zostają też wpisy innych workerów.
+    """
+    global _linie_w_pliku
+    try:
+        ogon = _ogon_pliku()
+        tmp = f"{MEMORY_HISTORY_PATH}.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(ogon)
+        os.replace(tmp, MEMORY_HISTORY_PATH)
+        _linie_w_pliku = len(ogon)
+    except OSError as e:
+        _log.warning("[section-memory] Nie przycięto historii: %s", e)
+
+
+def _wczytaj():
+    """Leniwie wczytuje historię z pliku (ostatnie MAX_HISTORIA wpisów)."""
+    global _wczytana
+    if _wczytana:
+        return
+    _wczytana = True
+    try:
+        for linia in _ogon_pliku():
+            try:
+                _historia.append(json.loads(linia))
+            except ValueError:
+                continue
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        _log.warning("[section-memory] Nie wczytano historii: %s", e)
+
+
+def record(wynik: Dict[str, Any]) -> None:
+    """Dopisuje pomiar do historii (pamięć + JSONL, bez top_allocations w pliku)."""
+    global _linie_w_pliku
+    wpis = {k: v for k, v in wynik.items() if k != "top_allocations"}
+    with _hist_lock:
+        _wczytaj()
+        _historia.append(wpis)
+        try:
+            with open(MEMORY_HISTORY_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(wpis, ensure_ascii=False) + "\n")
+            _linie_w_pliku += 1
+        except OSError as e:
+            _log.warning("[section-memory] Błąd zapisu historii: %s", e)
+        if _linie_w_pliku > 2 * MAX_HISTORIA:
+            _przytnij()
+
+
+def history(section: Optional[str] = None) -> List[Dict[str, Any]]:
+    with _hist_lock:
+        _wczytaj()
+        wpisy = list(_historia)
+    return [w for w in wpisy if section is None or w.get("section") == section]
+
+
+def _percentyl(wartosci: List[float], p: float) -> float:
+    s = sorted(wartosci)
+    return s[min(len(s) - 1, int(round(p * (len(s) - 1))))]
+
+
+def ranking(since_sec: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Responderzy posortowani malejąco po maksymalnym przyroście RSS w trakcie
+    sekcji (peak_delta_mb). since_sec — tylko pomiary z ostatnich N sekund.
+    """
+    granica = time.time() - since_sec if since_sec else 0
+    per_sekcja: Dict[str, List[Dict[str, Any]]] = {}
+    for w in history():
+        if w.get("ts", 0) >= granica:
+            per_sekcja.setdefault(w["section"], []).append(w)
+    wynik = []
+    for sekcja, wpisy in per_sekcja.items():
+        delty = [w["peak_delta_mb"] for w in wpisy]
+        wynik.append(
+            {
+                "section": sekcja,
+                "runs": len(wpisy),
+                "peak_delta_max_mb": max(delty),
+                "peak_delta_p95_mb": _percentyl(delty, 0.95),
+                "peak_delta_avg_mb": round(sum(delty) / len(delty), 1),
+                "rss_peak_max_mb": max(w["rss_peak_mb"] for w in wpisy),
+                "retained_avg_mb": round(
+                    sum(w["delta_mb"] for w in wpisy) / len(wpisy), 1
+                ),
+                "last_ts": max(w["ts"] for w in wpisy),
+            }
+        )
+    return sorted(wynik, key=lambda r: -r["peak_delta_max_mb"])
+
+
+def format_ranking(rows: List[Dict[str, Any]]) -> str:
+    """Ranking jako tabela tekstowa (do /memory i logów)."""
+    linie = [
+        f"{'sekcja':<16} {'runs':>5} {'peakΔ max':>10} {'p95':>8} {'avg':>8} "
+        f"{'RSS max':>9} {'zostaje':>8}"
+    ]
+    for r in rows:
+        linie.append(
+            f"{r['section']:<16} {r['runs']:>5} {r['peak_delta_max_mb']:>8.1f}MB "
+            f"{r['peak_delta_p95_mb']:>6.1f}MB {r['peak_delta_avg_mb']:>6.1f}MB "
+            f"{r['rss_peak_max_mb']:>7.1f}MB {r['retained_avg_mb']:>6.1f}MB"
+        )
+    return "\n".join(linie)
+
+
+def reset() -> None:
+    """Czyści historię w pamięci (testy). Pliku nie rusza."""
+    global _wczytana, _linie_w_pliku
+    with _hist_lock:
+        _historia.clear()
+        _wczytana = True
+        _linie_w_pliku = 0
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+core/section_scheduler.py
+Kolejność sekcji pipeline'u wg oczekiwanego czasu — pierwszy mail jak najwcześniej.
+
+Polityki (config_responders.json → performance.section_order.policy):
+  fixed           — SECTION_ORDER z core/job_runner.py (domyślna)
+  shortest_first  — rosnąco po oczekiwanym czasie sekcji
+  priority        — rosnąco po section_order.priority (brak = 100), remis → krótsza
+
+shortest_first i priority są opt-in — config domyślnie ma fixed; priority
+i expected_sec w configu działają dopiero po zmianie policy.
+
+Oczekiwany czas = mediana duration_sec ostatnich udanych przebiegów sekcji
+z historii core/section_memory.py (JSONL, przeżywa restart), bez przebiegów
+obsłużonych z pipeline_memo ("memo_hit" — ~0 s po zwykly). Przy mniej niż
+MIN_PRZEBIEGOW pomiarach — wartość z section_order.expected_sec.
+
+W shortest_first i priority sekcje, które nie wysyłają własnego maila
+(bez_maila — np. emocje/scrabble/analiza obok zwykly), idą na koniec:
+nie przybliżają pierwszej odpowiedzi.
+"""
+
+from statistics import median
+from typing import Dict, Iterable, List, Optional
+
+POLITYKI = ("fixed", "shortest_first", "priority")
+MIN_PRZEBIEGOW = 3
+OKNO_HISTORII = 50
+DOMYSLNY_CZAS_SEC = 60.0
+DOMYSLNY_PRIORYTET = 100
+
+
+def expected_durations(
+    sections: Iterable[str], priors: Optional[Dict[str, float]] = None
+) -> Dict[str, float]:
+    """Oczekiwany czas każdej sekcji w sekundach (historia albo prior)."""
+    from core.section_memory import history
+
+    priors = priors or {}
+    per: Dict[str, List[float]] = {}
+    for w in history():
+        if w.get("status") == "ok" and "duration_sec" in w and not w.get("memo_hit"):
+            per.setdefault(w["section"], []).append(w["duration_sec"])
+    wynik = {}
+    for s in sections:
+        czasy = per.get(s, [])[-OKNO_HISTORII:]
+        if len(czasy) >= MIN_PRZEBIEGOW:
+            wynik[s] = round(median(czasy), 2)
+        else:
+            wynik[s] = float(priors.get(s, DOMYSLNY_CZAS_SEC))
+    return wynik
+
+
+def order_sections(
+    requested: Iterable[str],
+    fixed_order: List[str],
+    policy: str = "fixed",
+    expected: Optional[Dict[str, float]] = None,
+    priority: Optional[Dict[str, int]] = None,
+    bez_maila: Iterable[str] = (),
+) -> List[str]:
+    """
+    Kolejność sekcji wg polityki. Sekcje spoza fixed_order są pomijane
+    (jak w build_section_order). Nieznana polityka = fixed.
+    """
+    wybrane = [s for s in fixed_order if s in set(requested)]
+    if policy not in POLITYKI or policy == "fixed":
+        return wybrane
+    expected = expected or {}
+    priority = priority or {}
+    bez_maila = set(bez_maila)
+    pozycja = {s: i for i, s in enumerate(fixed_order)}
+
+    def klucz(s):
+        czas = expected.get(s, DOMYSLNY_CZAS_SEC)
+        prio = priority.get(s, DOMYSLNY_PRIORYTET) if policy == "priority" else 0
+        # Remisy rozstrzyga stała kolejność — wynik deterministyczny
+        return (s in bez_maila, prio, czas, pozycja[s])
+
+    return sorted(wybrane, key=klucz)
@@ -24,6 +24,9 @@ ARCHITEKTURA RETRY (v13):
 import logging
 from datetime import datetime, timezone, timedelta
 
+from core.metrics import GOOGLE_SECONDS
+from core.tracing import traced
+
 logger = logging.getLogger(__name__)
 
 WARSAW_TZ = timezone(timedelta(hours=2))  # UTC+2 CEST
@@ -38,6 +41,8 @@ def _get_sheets_service():
     return build("sheets", "v4", credentials=creds)
 
 
+@traced("sheets.append", puste_to_blad=True)
+@GOOGLE_SECONDS.timed(puste_to_blad=True, api="sheets")
 def _append_row(sheet_id: str, values: list) -> bool:
     try:
         svc = _get_sheets_service()
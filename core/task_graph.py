@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+core/task_graph.py
+Graf zależności zadań — każde zadanie deklaruje, na wynikach których
+wcześniejszych zadań polega. Zadania gotowe (wszystkie zależności
+zakończone) wykonują się równolegle w puli wątków.
+
+Limity współbieżności (np. DeepSeek, FLUX) to zwykłe semafory przekazywane
+przy add(limit=...). Semafor zdefiniowany na poziomie modułu respondera jest
+współdzielony przez wszystkie równoległe pipeline'y w procesie.
+
+Wątki robocze dostają kontekst aplikacji Flask, jeśli run() został wywołany
+wewnątrz app_context() — sekcje mogą dalej używać current_app.logger —
+oraz kopię contextvars (m.in. logger pipeline'u z core.logging_reporter).
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from core import budget
+from core.tracing import span
+
+_log = logging.getLogger(__name__)
+
+
+class _Task:
+    __slots__ = ("name", "fn", "deps", "limit", "default")
+
+    def __init__(self, name, fn, deps, limit, default):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.limit = limit
+        self.default = default
+
+
+class TaskGraph:
+    """Wykonuje zadania w kolejności wyznaczonej przez zależności."""
+
+    def __init__(self, name: str = "graph", max_workers: int = 4):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        self.total_sec = 0.0
+        self._tasks: Dict[str, _Task] = {}
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[[Dict[str, Any]], Any],
+        deps: Iterable[str] = (),
+        limit: Optional[threading.Semaphore] = None,
+        default: Any = None,
+    ) -> "TaskGraph":
+        """
+        Rejestruje zadanie. fn dostaje dict {nazwa_zależności: wynik}.
+        Wyjątek w fn jest logowany, a wynikiem zadania staje się default.
+        """
+        if name in self._tasks:
+            raise ValueError(f"Zadanie '{name}' już istnieje w grafie {self.name}")
+        self._tasks[name] = _Task(name, fn, deps, limit, default)
+        return self
+
+    def _validate(self):
+        for task in self._tasks.values():
+            for dep in task.deps:
+                if dep not in self._tasks:
+                    raise ValueError(
+                        f"Zadanie '{task.name}' zależy od nieznanego '{dep}'"
+                    )
+
+    def run(self) -> Dict[str, Any]:
+        """Uruchamia graf i zwraca dict {nazwa: wynik}."""
+        self._validate()
+        app = _current_flask_app()
+        t_start = time.monotonic()
+        pending = dict(self._tasks)
+        running = {}
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix=self.name
+        ) as pool:
+            while pending or running:
+                ready = [
+                    t
+                    for t in pending.values()
+                    if all(d in self.results for d in t.deps)
+                ]
+                if ready:
+                    # Punkt przerwania — po budżecie sekcji nie startujemy nowych zadań
+                    budget.check()
+                for task in ready:
+                    del pending[task.name]
+                    dep_results = {d: self.results[d] for d in task.deps}
+                    # Każde zadanie dostaje kopię kontekstu (logger pipeline'u itp.)
+                    fut = pool.submit(
+                        contextvars.copy_context().run,
+                        self._execute, task, dep_results, app, t_start,
+                    )
+                    running[fut] = task
+
+                if not running:
+                    raise RuntimeError(
+                        f"Cykl zależności w grafie {self.name}: {sorted(pending)}"
+                    )
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    task = running.pop(fut)
+                    self.results[task.name] = fut.result()
+
+        self.total_sec = time.monotonic() - t_start
+        return self.results
+
+    def _execute(self, task: _Task, dep_results: dict, app, t_start: float):
+        t_ready = time.monotonic()
+        if task.limit is not None:
+            task.limit.acquire()
+        t_begin = time.monotonic()
+        status = "ok"
+        try:
+            with span(f"{self.name}.{task.name}", wait_sec=round(t_begin - t_ready, 3)):
+                if app is not None:
+                    with app.app_context():
+                        result = task.fn(dep_results)
+                else:
+                    result = task.fn(dep_results)
+        except Exception as e:
+            _log.error("[%s] zadanie '%s' błąd: %s", self.name, task.name, e)
+            status = "error"
+            result = task.default
+        finally:
+            if task.limit is not None:
+                task.limit.release()
+        t_end = time.monotonic()
+        self.timings[task.name] = {
+            "start_sec": round(t_begin - t_start, 3),
+            "end_sec": round(t_end - t_start, 3),
+            "duration_sec": round(t_end - t_begin, 3),
+            "wait_sec": round(t_begin - t_ready, 3),
+            "deps": list(task.deps),
+            "status": status,
+        }
+        return result
+
+    def format_timings(self) -> List[str]:
+        """Zwraca czytelne linie z rozbiciem czasów (do pliku debug _.txt)."""
+        lines = [
+            f"Graf: {self.name} | zadań: {len(self.timings)} | "
+            f"całość: {self.total_sec:.2f}s | suma sekcji: "
+            f"{sum(t['duration_sec'] for t in self.timings.values()):.2f}s",
+        ]
+        for name, t in sorted(self.timings.items(), key=lambda kv: kv[1]["start_sec"]):
+            deps = ", ".join(t["deps"]) or "-"
+            lines.append(
+                f"  {name:<20} {t['start_sec']:>7.2f}s → {t['end_sec']:>7.2f}s "
+                f"({t['duration_sec']:.2f}s, czekanie na limit {t['wait_sec']:.2f}s) "
+                f"[{t['status']}] zależy od: {deps}"
+            )
+        return lines
+
+
+def _current_flask_app():
+    """Zwraca bieżącą aplikację Flask albo None (brak kontekstu / brak Flaska)."""
+    try:
+        from flask import current_app, has_app_context
+    except ImportError:
+        return None
+    if not has_app_context():
+        return None
+    return current_app._get_current_object()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+core/topic_index.py
+Mały klasyfikator tematów TF-IDF — bez LLM, bez zależności.
+
+    index = TopicIndex(
+        {"darowizna_...": "tekst PDF ...", ...},
+        keywords={"darowizna_...": ["darowiz"], ...},
+    )
+    m = index.classify(body)      # TopicMatch(topic, score, margin, confident)
+
+Normalizacja dla polszczyzny bez stemmera: małe litery, bez znaków
+diakrytycznych (PDF-y z pdf_biznes są pisane bez ogonków), słowa od 3 liter,
+term = pierwsze PREFIKS liter ("mieszkania"/"mieszkanie" → "mieszk").
+Przy 5 literach "internetowym" wpadało w "intercyza"; końcówek krótszych
+słów ("spadku"/"spadek") prefiks nie skleja — dlatego słowa kluczowe liczą
+się osobno, jako prefiksy słów maila, jak w dotychczasowym TOPIC_MAP.
+
+score = cosinus(TF-IDF maila, TF-IDF tematu) + KEYWORD_WEIGHT × odsetek
+trafionych słów kluczowych tematu. Pewny wynik: score >= min_score
+i przewaga nad drugim tematem >= min_margin — inaczej decyduje LLM.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+PREFIKS = 6
+KEYWORD_WEIGHT = 0.5
+MIN_SCORE = 0.3
+MIN_MARGIN = 0.1
+
+_SLOWO = re.compile(r"[a-z]{3,}")
+_STOP = frozenset(
+    "ale ani bez bo by czy dla jak jest jestem jego jej juz lub ich oraz pan pani "
+    "prosze sie ten tez tym tak to w we za ze zeby ktory ktora ktore nie na do od po "
+    "przy pod nad czym gdy ma mam mamy moze bardzo dzien dobry pozdrawiam witam".split()
+)
+
+
+class TopicMatch(NamedTuple):
+    topic: Optional[str]
+    score: float
+    margin: float
+    confident: bool
+
+
+def normalize(text: str) -> str:
+    """małe litery, bez ogonków (ł → l)."""
+    text = (text or "").lower().replace("ł", "l")
+    return "".join(
+        c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c)
+    )
+
+
+def _slowa(text: str) -> List[str]:
+    return [w for w in _SLOWO.findall(normalize(text)) if w not in _STOP]
+
+
+def _terms(slowa: Sequence[str]) -> Counter:
+    return Counter(w[:PREFIKS] for w in slowa)
+
+
+class TopicIndex:
+    """TF-IDF (1 + log tf, wygładzone idf, norma L2) + słowa kluczowe."""
+
+    def __init__(
+        self,
+        docs: Dict[str, str],
+        keywords: Optional[Dict[str, Sequence[str]]] = None,
+        min_score: float = MIN_SCORE,
+        min_margin: float = MIN_MARGIN,
+    ):
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.topics = list(docs)
+        self.keywords = {
+            t: [normalize(k) for k in (keywords or {}).get(t, ())] for t in self.topics
+        }
+        tf = {t: _terms(_slowa(docs[t])) for t in self.topics}
+        df = Counter(term for c in tf.values() for term in c)
+        n = len(self.topics)
+        self.idf = {term: math.log((n + 1) / (d + 1)) + 1 for term, d in df.items()}
+        self._wektory = {t: self._wektor(c) for t, c in tf.items()}
+
+    def _wektor(self, tf: Counter) -> Dict[str, float]:
+        w = {
+            term: (1 + math.log(c)) * self.idf[term]
+            for term, c in tf.items()
+            if term in self.idf
+        }
+        norma = math.sqrt(sum(v * v for v in w.values())) or 1.0
+        return {term: v / norma for term, v in w.items()}
+
+    def scores(self, text: str) -> Dict[str, float]:
+        slowa = _slowa(text)
+        q = self._wektor(_terms(slowa))
+        wynik = {}
+        for t in self.topics:
+            d = self._wektory[t]
+            cos = sum(v * d.get(term, 0.0) for term, v in q.items())
+            kws = self.keywords[t]
+            if kws:
+                trafione = sum(1 for k in kws if any(s.startswith(k) for s in slowa))
+                cos += KEYWORD_WEIGHT * trafione / len(kws)
+            wynik[t] = round(cos, 4)
+        return wynik
+
+    def classify(self, text: str) -> TopicMatch:
+        ranking = sorted(self.scores(text).items(), key=lambda kv: -kv[1])
+        if not ranking:
+            return TopicMatch(None, 0.0, 0.0, False)
+        top, score = ranking[0]
+        margin = score - (ranking[1][1] if len(ranking) > 1 else 0.0)
+        pewny = score >= self.min_score and margin >= self.min_margin
+        return TopicMatch(top, score, round(margin, 4), pewny)
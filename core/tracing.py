@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+core/tracing.py
+Lekki tracing w procesie — zagnieżdżone spany (start, koniec, atrybuty, status).
+
+    with span("section.zwykly", sender=sender):
+        ...                              # spany w środku są dziećmi tego spanu
+
+    @traced("drive.upload", puste_to_blad=True)
+    def upload_file_to_drive(...): ...
+
+Bieżący span siedzi w contextvars, więc dzieci znajdują rodzica same — także
+w wątkach roboczych, jeśli dostały kopię kontekstu (TaskGraph, strumień
+DeepSeek). Span bez rodzica zaczyna nowy ślad (trace) — w praktyce jeden ślad
+na pipeline (span "pipeline" w core/job_runner.py).
+
+Zakończone spany:
+  - trafiają do pamięci (ostatnie TRACE_MAX_SLADOW śladów) — waterfall na /debug,
+  - są dopisywane jako linie JSON do TRACE_JSONL_PATH (rotacja po TRACE_MAX_BYTES).
+
+TRACING_ENABLED=0 wyłącza wszystko — span() zwraca wtedy pusty kontekst.
+Koszt jednego spanu to kilka mikrosekund (benchmarks/bench_tracing.py).
+"""
+
+import functools
+import itertools
+import json
+import logging
+import os
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+_log = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") != "0"
+TRACE_JSONL_PATH = os.getenv(
+    "TRACE_JSONL_PATH",
+    os.path.join(tempfile.gettempdir(), "autoresponder_traces.jsonl"),
+)
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_MAX_SLADOW = 10
+TRACE_MAX_SPANOW = 2000  # na ślad — ochrona pamięci przy pętlach
+
+
+class Span:
+    """Jeden odcinek pracy w śladzie."""
+
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "start",
+        "end",
+        "attrs",
+        "status",
+        "error",
+        "thread",
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attrs):
+        self.trace_id = trace_id
+        self.span_id = f"{next(_licznik):x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attrs: Dict[str, Any] = attrs
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.thread = threading.current_thread().name
+
+    def set_attr(self, **attrs) -> "Span":
+        self.attrs.update(attrs)
+        return self
+
+    def set_error(self, error) -> "Span":
+        self.status = "error"
+        self.error = str(error)[:300]
+        return self
+
+    @property
+    def duration_sec(self) -> float:
+        koniec = self.end if self.end is not None else time.time()
+        return koniec - self.start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "end": round(self.end, 6) if self.end is not None else None,
+            "duration_sec": round(self.duration_sec, 6),
+            "status": self.status,
+            "error": self.error,
+            "thread": self.thread,
+            "attrs": self.attrs,
+        }
+
+
+_licznik = itertools.count(1)
+_biezacy: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+_lock = threading.Lock()
+_slady: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+_plik = None
+
+
+def current_span() -> Optional[Span]:
+    """Bieżący span z kontekstu (None poza śledzonym kodem)."""
+    return _biezacy.get()
+
+
+def set_attr(**attrs) -> None:
+    """Dokłada atrybuty do bieżącego spanu (no-op, gdy go nie ma)."""
+    s = _biezacy.get()
+    if s is not None:
+        s.attrs.update(attrs)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Otwiera span — dziecko bieżącego albo korzeń nowego śladu."""
+    if not TRACING_ENABLED:
+        yield None
+        return
+    rodzic = _biezacy.get()
+    if rodzic is not None:
+        s = Span(name, rodzic.trace_id, rodzic.span_id, attrs)
+    else:
+        s = Span(name, secrets.token_hex(8), None, attrs)
+    token = _biezacy.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.set_error(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _biezacy.reset(token)
+        s.end = time.time()
+        _zapisz(s)
+
+
+def traced(name: str, puste_to_blad: bool = False):
+    """
+    Dekorator — całe wywołanie funkcji jako span.
+    puste_to_blad=True: wynik None/False oznacza błąd (funkcje, które
+    zamiast rzucać wyjątkiem zwracają False/None).
+    """
+
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name) as s:
+                wynik = fn(*args, **kwargs)
+                if puste_to_blad and s is not None and (wynik is None or wynik is False):
+                    s.status = "error"
+                return wynik
+
+        return wrapper
+
+    return deco
+
+
+# ── Przechowywanie i eksport ───────────────────────────────────────────────────
+
+
+def _zapisz(s: Span) -> None:
+    d = s.to_dict()
+    linia = json.dumps(d, ensure_ascii=False, separators=(",", ":"), default=str)
+    with _lock:
+        spany = _slady.get(s.trace_id)
+        if spany is None:
+            spany = _slady[s.trace_id] = []
+            while len(_slady) > TRACE_MAX_SLADOW:
+                _slady.popitem(last=False)
+        if len(spany) < TRACE_MAX_SPANOW:
+            spany.append(d)
+        _eksportuj(linia)
+
+
+def _eksportuj(linia: str) -> None:
+    """Dopisuje linię do TRACE_JSONL_PATH (wywoływane pod _lock)."""
+    global _plik
+    try:
+        if _plik is None:
+            _plik = open(TRACE_JSONL_PATH, "a", encoding="utf-8", buffering=1)
+        _plik.write(linia + "\n")
+        if _plik.tell() > TRACE_MAX_BYTES:
+            _plik.close()
+            _plik = None
+            os.replace(TRACE_JSONL_PATH, TRACE_JSONL_PATH + ".1")
+    except OSError as e:
+        _log.warning("[tracing] Błąd zapisu %s: %s", TRACE_JSONL_PATH, e)
+        _plik = None
+
+
+def get_trace(trace_id: str) -> List[Dict[str, Any]]:
+    """Zakończone spany śladu, posortowane po starcie."""
+    with _lock:
+        spany = list(_slady.get(trace_id, ()))
+    return sorted(spany, key=lambda d: d["start"])
+
+
+def recent_traces(limit: int = 3) -> List[Dict[str, Any]]:
+    """
+    Ostatnie ślady, od najnowszego: {"trace_id", "root", "spans"}.
+    root — span korzeniowy (None, jeśli ślad jeszcze trwa).
+    """
+    with _lock:
+        ids = list(_slady)[-limit:][::-1]
+    wynik = []
+    for trace_id in ids:
+        spany = get_trace(trace_id)
+        root = next((d for d in spany if d["parent_id"] is None), None)
+        wynik.append({"trace_id": trace_id, "root": root, "spans": spany})
+    return wynik
+
+
+def reset() -> None:
+    """Czyści ślady w pamięci i zamyka plik eksportu (testy)."""
+    global _plik
+    with _lock:
+        _slady.clear()
+        if _plik is not None:
+            _plik.close()
+            _plik = None
@@ -5,10 +5,28 @@ Detekcja tożsamości nadawcy emaila: imię, nazwisko, płeć.
 
 ARCHITEKTURA:
   1. Reguły (zero tokenów) — wyciągnij kandydatów z FROM, podpisu, treści, emaila lokalnego
-  2. DeepSeek #1 — ekstrakcja i ranking kandydatów
-  3. DeepSeek #2 — weryfikacja, wybór, płeć
-  4. Zapis raportu TXT na Google Drive (folder DRIVE_FOLDER_ID)
-  5. Zwraca dict gotowy do nadpisania sender_name i gender w pipeline app.py
+  2. Cache tożsamości (adres + hash podpisu) — trafienie kończy detekcję
+  3. Leksykon imion (data/imiona_pl.txt) — pewne przypadki bez DeepSeek
+  4. DeepSeek #1 — ekstrakcja i ranking kandydatów
+  5. DeepSeek #2 — weryfikacja, wybór, płeć
+  6. Zapis raportu TXT na Google Drive (folder DRIVE_FOLDER_ID) — tylko po DeepSeek
+  7. Zwraca dict gotowy do nadpisania sender_name i gender w pipeline app.py
+
+CACHE (IDENTITY_CACHE_PATH, JSON, przeżywa restart):
+  klucz = znormalizowany adres (małe litery, bez +tagu) + sha1 podpisu z reguł.
+  Nowy podpis tego samego nadawcy = nowa detekcja. Wpisy starsze niż
+  IDENTITY_CACHE_TTL_SEC wygasają. Nie zapamiętujemy wyniku, gdy DeepSeek
+  nie odpowiedział (brak klucza, błąd HTTP) — następny mail spróbuje znowu.
+
+LEKSYKON:
+  pierwszy wyraz kandydata (autoprzedstawienie, podpis, FROM, email lokalny)
+  szukany w leksykonie. Pewność = waga najlepszego źródła + 5 za każde
+  zgodne kolejne; sprzeczne imiona/płcie albo imię niejednoznaczne (?)
+  → DeepSeek. Próg: WYKRYWACZ_LEKSYKON_PROG (domyślnie 80 — sam email
+  lokalny nie wystarcza).
+
+Metryki: autoresponder_identity_lookups_total{outcome=cache|lexicon|llm},
+autoresponder_identity_llm_calls_avoided_total; stats() → /status.
 
 WYWOŁANIE z app.py (po odebraniu emaila, przed uruchomieniem pipeline):
     from core.wykrywaczplci import detect_sender_identity
@@ -24,17 +42,52 @@ WYWOŁANIE z app.py (po odebraniu emaila, przed uruchomieniem pipeline):
 import os
 import re
 import json
+import hashlib
 import logging
+import tempfile
+import threading
 import time
 from datetime import datetime, timezone, timedelta
 
 import requests
 
+from core import budget
+from core.metrics import Counter
+
 logger = logging.getLogger(__name__)
 
 # ── Ścieżki ───────────────────────────────────────────────────────────────────
 _BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 _PROMPT_JSON = os.path.join(_BASE_DIR, "prompts", "wykrywaczplci.json")
+_LEKSYKON_TXT = os.path.join(_BASE_DIR, "data", "imiona_pl.txt")
+
+# ── Cache tożsamości ──────────────────────────────────────────────────────────
+IDENTITY_CACHE_PATH = os.getenv(
+    "IDENTITY_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "autoresponder_identity_cache.json"),
+)
+IDENTITY_CACHE_TTL_SEC = float(os.getenv("IDENTITY_CACHE_TTL_SEC", str(30 * 86400)))
+IDENTITY_CACHE_MAX = 5000
+
+# ── Leksykon imion ────────────────────────────────────────────────────────────
+LEKSYKON_PROG = int(os.getenv("WYKRYWACZ_LEKSYKON_PROG", "80"))
+_WAGI_ZRODEL = {
+    "autoprzedstawienie": 90,
+    "podpis_koniec": 85,
+    "pole_from": 80,
+    "email_lokalny": 65,
+}
+_DEEPSEEK_WYWOLAN = 2  # ekstrakcja + weryfikacja
+
+IDENTITY_LOOKUPS = Counter(
+    "autoresponder_identity_lookups_total",
+    "Detekcje tożsamości nadawcy wg źródła wyniku (cache/lexicon/llm).",
+    ("outcome",),
+)
+IDENTITY_LLM_AVOIDED = Counter(
+    "autoresponder_identity_llm_calls_avoided_total",
+    "Wywołania DeepSeek pominięte dzięki cache albo leksykonowi imion.",
+)
 
 # ── DeepSeek ──────────────────────────────────────────────────────────────────
 _DEEPSEEK_KEY = os.getenv("API_KEY_DEEPSEEK", "").strip()
@@ -81,7 +134,7 @@ def _deepseek_call(system: str, user: str, max_tokens: int = 800) -> str | None:
                 "max_tokens": max_tokens,
                 "temperature": 0.2,
             },
-            timeout=45,
+            timeout=budget.timeout(45),
         )
         if resp.status_code == 200:
             return resp.json()["choices"][0]["message"]["content"].strip()
@@ -189,6 +242,163 @@ def _extract_self_intro(body: str) -> str:
     return "__BRAK__"
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# CACHE TOŻSAMOŚCI
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_cache_lock = threading.Lock()
+_cache: dict | None = None
+
+
+def _normalize_address(sender_email: str) -> str:
+    """jan.Kowalski+news@X.pl → jan.kowalski@x.pl"""
+    adres = re.sub(r".*<([^>]+)>.*", r"\1", (sender_email or "").strip()).lower()
+    local, _, domena = adres.partition("@")
+    return local.split("+", 1)[0] + ("@" + domena if domena else "")
+
+
+def _cache_key(sender_email: str, podpis: str) -> str:
+    podpis_norm = re.sub(r"\s+", " ", (podpis or "__BRAK__").strip().lower())
+    h = hashlib.sha1(podpis_norm.encode("utf-8")).hexdigest()[:16]
+    return f"{_normalize_address(sender_email)}|{h}"
+
+
+def _cache_load() -> dict:
+    """Leniwie wczytuje cache z pliku (wywoływać pod _cache_lock)."""
+    global _cache
+    if _cache is None:
+        try:
+            with open(IDENTITY_CACHE_PATH, encoding="utf-8") as f:
+                _cache = json.load(f)
+        except FileNotFoundError:
+            _cache = {}
+        except (OSError, ValueError) as e:
+            logger.warning("[wykrywaczplci] Nie wczytano cache: %s", e)
+            _cache = {}
+    return _cache
+
+
+def _cache_get(key: str) -> dict | None:
+    with _cache_lock:
+        wpis = _cache_load().get(key)
+    if not wpis or time.time() - wpis.get("ts", 0) > IDENTITY_CACHE_TTL_SEC:
+        return None
+    return dict(wpis["identity"])
+
+
+def _cache_put(key: str, identity: dict) -> None:
+    with _cache_lock:
+        cache = _cache_load()
+        cache[key] = {"ts": time.time(), "identity": identity}
+        if len(cache) > IDENTITY_CACHE_MAX:
+            for stary in sorted(cache, key=lambda k: cache[k].get("ts", 0))[
+                : len(cache) - IDENTITY_CACHE_MAX
+            ]:
+                del cache[stary]
+        tmp = IDENTITY_CACHE_PATH + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False)
+            os.replace(tmp, IDENTITY_CACHE_PATH)
+        except OSError as e:
+            logger.warning("[wykrywaczplci] Błąd zapisu cache: %s", e)
+
+
+def stats() -> dict:
+    """Trafienia cache i pominięte wywołania DeepSeek (do /status)."""
+    wyniki = {o: IDENTITY_LOOKUPS.value(outcome=o) for o in ("cache", "lexicon", "llm")}
+    razem = sum(wyniki.values())
+    with _cache_lock:
+        wpisow = len(_cache_load())
+    return {
+        "lookups": int(razem),
+        "cache_hit_rate": round(wyniki["cache"] / razem, 3) if razem else 0.0,
+        "lexicon_rate": round(wyniki["lexicon"] / razem, 3) if razem else 0.0,
+        "llm_calls_avoided": int(IDENTITY_LLM_AVOIDED.value()),
+        "cache_entries": wpisow,
+    }
+
+
+def reset() -> None:
+    """Czyści cache w pamięci (testy). Plik zostaje."""
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LEKSYKON IMION (zero tokenów)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_leksykon: dict | None = None
+
+
+def _load_leksykon() -> dict:
+    """imię (małe litery) → "K" / "M" / "?" z data/imiona_pl.txt."""
+    global _leksykon
+    if _leksykon is None:
+        lex = {}
+        try:
+            with open(_LEKSYKON_TXT, encoding="utf-8") as f:
+                for linia in f:
+                    linia = linia.strip()
+                    if not linia or linia.startswith("#"):
+                        continue
+                    imie, _, plec = linia.partition(";")
+                    lex[imie.strip().lower()] = plec.strip().upper() or "?"
+        except OSError as e:
+            logger.error("[wykrywaczplci] Błąd ładowania leksykonu imion: %s", e)
+        _leksykon = lex
+    return _leksykon
+
+
+def _lexicon_identity(rule_candidates: dict) -> dict | None:
+    """
+    Tożsamość z leksykonu, gdy pewność >= LEKSYKON_PROG, inaczej None
+    (wtedy decyduje DeepSeek).
+    """
+    lex = _load_leksykon()
+    trafienia = []  # (waga, źródło, imię, nazwisko, płeć)
+    for zrodlo, waga in _WAGI_ZRODEL.items():
+        kandydat = rule_candidates.get(zrodlo, "__BRAK__")
+        if not kandydat or kandydat == "__BRAK__":
+            continue
+        slowa = [w.strip(".,;:!?-–—\"'") for w in kandydat.split()]
+        slowa = [w for w in slowa if w]
+        if not slowa:
+            continue
+        plec = lex.get(slowa[0].lower())
+        if plec is None:
+            continue
+        if plec not in ("K", "M"):
+            return None  # imię niejednoznaczne
+        nazwisko = "__BRAK__"
+        if len(slowa) > 1 and slowa[1].isalpha() and slowa[1].lower() not in lex:
+            nazwisko = slowa[1].capitalize()
+        trafienia.append((waga, zrodlo, slowa[0].capitalize(), nazwisko, plec))
+
+    if not trafienia:
+        return None
+    if len({t[2].lower() for t in trafienia}) > 1 or len({t[4] for t in trafienia}) > 1:
+        return None  # sprzeczni kandydaci — niech rozstrzyga DeepSeek
+    trafienia.sort(reverse=True)
+    waga, zrodlo, imie, _, plec = trafienia[0]
+    pewnosc = min(99, waga + 5 * (len(trafienia) - 1))
+    if pewnosc < LEKSYKON_PROG:
+        return None
+    nazwisko = next((t[3] for t in trafienia if t[3] != "__BRAK__"), "__BRAK__")
+    return {
+        "sender_name": imie if nazwisko == "__BRAK__" else f"{imie} {nazwisko}",
+        "gender": plec,
+        "imie": imie,
+        "nazwisko": nazwisko,
+        "pewnosc": pewnosc,
+        "zrodlo": f"leksykon:{zrodlo}",
+        "drive_url": "",
+        "fallback_used": False,
+    }
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # KROK 1 — DEEPSEEK EKSTRAKCJA
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -412,6 +622,26 @@ def detect_sender_identity(
     }
     logger.info("[wykrywaczplci] Kandydaci z reguł: %s", rule_candidates)
 
+    # ── Cache: ten sam nadawca z tym samym podpisem ───────────────────────────
+    klucz = _cache_key(sender_email, rule_candidates["podpis_koniec"])
+    identity = _cache_get(klucz)
+    if identity is not None:
+        IDENTITY_LOOKUPS.inc(outcome="cache")
+        IDENTITY_LLM_AVOIDED.inc(_DEEPSEEK_WYWOLAN)
+        identity["drive_url"] = ""
+        logger.info("[wykrywaczplci] Cache — %s", identity)
+        return identity
+
+    # ── Leksykon imion: pewne przypadki bez DeepSeek ──────────────────────────
+    identity = _lexicon_identity(rule_candidates)
+    if identity is not None:
+        IDENTITY_LOOKUPS.inc(outcome="lexicon")
+        IDENTITY_LLM_AVOIDED.inc(_DEEPSEEK_WYWOLAN)
+        _cache_put(klucz, identity)
+        logger.info("[wykrywaczplci] Leksykon — %s", identity)
+        return identity
+    IDENTITY_LOOKUPS.inc(outcome="llm")
+
     # ── Krok 1: DeepSeek ekstrakcja ───────────────────────────────────────────
     ekstrakcja = _deepseek_ekstrakcja(
         prompt_cfg, sender_email, sender_name, body, rule_candidates
@@ -473,7 +703,7 @@ def detect_sender_identity(
         plec=gender_final,
     )
 
-    return {
+    identity = {
         "sender_name": sender_name_final,
         "gender": gender_final,
         "imie": imie,
@@ -483,3 +713,7 @@ def detect_sender_identity(
         "drive_url": drive_url,
         "fallback_used": fallback_used,
     }
+    # DeepSeek nie odpowiedział — nie utrwalamy fallbacku
+    if ekstrakcja or weryfikacja:
+        _cache_put(klucz, identity)
+    return identity
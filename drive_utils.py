@@ -33,6 +33,9 @@ from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseUpload
 from google.oauth2 import service_account
 from google.oauth2.credentials import Credentials as OAuthCredentials
+from core import budget
+from core.metrics import GOOGLE_SECONDS
+from core.tracing import traced
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -62,7 +65,7 @@ def _load_oauth_credentials():
                 "refresh_token": DRIVE_REFRESH_TOKEN,
                 "grant_type": "refresh_token",
             },
-            timeout=15,
+            timeout=budget.timeout(15),
         )
         resp.raise_for_status()
         token_info = resp.json()
@@ -147,12 +150,14 @@ def get_drive_service():
         return None
 
 
+@traced("drive.upload", puste_to_blad=True)
+@GOOGLE_SECONDS.timed(puste_to_blad=True, api="drive")
 def upload_file_to_drive(file_data, filename, mime_type, folder_id=None):
     """
     Uploads a file to Google Drive.
 
     Args:
-        file_data: bytes or base64 string
+        file_data: bytes, base64 string or binary file object (czytany strumieniowo)
         filename: str
         mime_type: str (e.g., 'image/png', 'application/pdf')
         folder_id: str (optional, ID folderu w Drive)
@@ -168,9 +173,8 @@ def upload_file_to_drive(file_data, filename, mime_type, folder_id=None):
         if isinstance(file_data, str):
             file_data = base64.b64decode(file_data)
 
-        media = MediaIoBaseUpload(
-            io.BytesIO(file_data), mimetype=mime_type, resumable=True
-        )
+        stream = file_data if hasattr(file_data, "read") else io.BytesIO(file_data)
+        media = MediaIoBaseUpload(stream, mimetype=mime_type, resumable=True)
 
         file_metadata = {"name": filename}
         if folder_id:
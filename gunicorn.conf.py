@@ -0,0 +1,16 @@
+"""
+gunicorn.conf.py
+Konfiguracja gunicorna — czytana automatycznie z katalogu roboczego
+(gunicorn app:app / gunicorn wsgi:app).
+
+post_worker_init: drenaż SIGTERM i wznowienie checkpointów startują
+w każdym workerze po forku, w jego głównym wątku (signal.signal działa
+tylko tam) — a nie przy imporcie app, który przy preload_app dzieje się
+w masterze.
+"""
+
+
+def post_worker_init(worker):
+    from app import start_worker_services
+
+    start_worker_services()
@@ -8,6 +8,7 @@ import random
 from typing import List, Optional, Tuple
 from .word_source import WordSource
 from .crossword_grid import CrosswordGrid, Direction
+from .pattern_index import slot_pattern
 
 
 class CrosswordGenerator:
@@ -198,31 +199,25 @@ class CrosswordGenerator:
         """
         candidates = []
         
+        # Komórki od (row, col) do krawędzi; każda długość to jeden wzorzec
+        # ("K??A") rozwiązywany w indeksie zamiast can_place_word na całej bazie
         if direction == Direction.HORIZONTAL:
-            # Znajduje słowa, które mogą być umieszczone w wierszu row zaczynając od col
-            # i przecinają się z istniejącymi literami
-            for word_len in range(2, grid.width - col + 1):
-                for word in self.word_source.get_words_by_length(word_len):
-                    if grid.can_place_word(word, row, col, direction):
-                        # Oblicz wynik: ile liter przecina
-                        intersections = self._count_intersections(
-                            grid, word, row, col, direction
-                        )
-                        # Bonus: preferuj dłuższe słowa
-                        length_bonus = max(0, word_len - 4)
-                        score = intersections * 10 + length_bonus
-                        candidates.append((word, score, intersections))
+            cells = grid.grid[row][col:]
+        else:
+            cells = [grid.grid[r][col] for r in range(row, grid.height)]
+        if None in cells:
+            cells = cells[:cells.index(None)]  # Słowo nie przejdzie przez czarne pole
         
-        else:  # VERTICAL
-            for word_len in range(2, grid.height - row + 1):
-                for word in self.word_source.get_words_by_length(word_len):
-                    if grid.can_place_word(word, row, col, direction):
-                        intersections = self._count_intersections(
-                            grid, word, row, col, direction
-                        )
-                        length_bonus = max(0, word_len - 4)
-                        score = intersections * 10 + length_bonus
-                        candidates.append((word, score, intersections))
+        for word_len in range(2, len(cells) + 1):
+            for word in self.word_source.find_pattern(slot_pattern(cells[:word_len])):
+                # Oblicz wynik: ile liter przecina
+                intersections = self._count_intersections(
+                    grid, word, row, col, direction
+                )
+                # Bonus: preferuj dłuższe słowa
+                length_bonus = max(0, word_len - 4)
+                score = intersections * 10 + length_bonus
+                candidates.append((word, score, intersections))
         
         # Sortuj malejąco po wynikowi (przecinającymi literami + bonus długości)
         candidates.sort(key=lambda x: x[1], reverse=True)
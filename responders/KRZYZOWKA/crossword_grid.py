@@ -5,7 +5,6 @@ crossword_grid.py — Struktura danych i logika siatki krzyżówki
 
 from typing import List, Dict, Optional, Set, Tuple
 from enum import Enum
-import copy
 
 
 class Direction(Enum):
@@ -50,11 +49,17 @@ class CrosswordGrid:
         self.next_clue_number = 1
     
     def copy(self) -> 'CrosswordGrid':
-        """Głębokie kopie siatki."""
-        g = CrosswordGrid(self.width, self.height)
+        """
+        Niezależna kopia siatki. placed_words to krotki napisów/liczb,
+        clue_numbers — krotki → liczby: wystarczy kopia list i słownika,
+        bez deepcopy. Do backtrackingu bez kopii: flat_grid.FlatGrid.
+        """
+        g = CrosswordGrid.__new__(CrosswordGrid)
+        g.width = self.width
+        g.height = self.height
         g.grid = [row[:] for row in self.grid]
-        g.placed_words = copy.deepcopy(self.placed_words)
-        g.clue_numbers = copy.deepcopy(self.clue_numbers)
+        g.placed_words = list(self.placed_words)
+        g.clue_numbers = dict(self.clue_numbers)
         g.next_clue_number = self.next_clue_number
         return g
     
@@ -6,18 +6,28 @@ Algorytm (wg genxword):
 1. Siatka wypełniona pustymi cellami ('' = białe)
 2. Umieść pierwszy wyraz losowo
 3. Dla każdego wyrazu szukaj na PRZECIĘCIACH z już umieszczonymi
-4. Zbiór let_coords mapuje każdą literę na jej pozycje
+4. Pozycje liter na siatce: FlatGrid (bytearray, cells.find)
 5. Scoring przewiduje czy wyraz może być umieszczony
 6. Czarne pola = obszary między wyrazami (naturalnie powstaną)
 7. Wiele prób, wybierz najlepszą z największą ilością wyrazów
+8. Stop przed limitem czasu: wszystkie wyrazy / cel / brak poprawy
 """
 
 import random
 import time
 from typing import List, Optional, Tuple
-from collections import defaultdict
 from .word_source import WordSource
 from .crossword_grid import CrosswordGrid
+from .flat_grid import FlatGrid
+
+# Zmieniaj przy każdej zmianie algorytmu umieszczania — klucz cache krzyżówek
+# (responders/scrabble.py) zawiera wersję, stare wpisy przestają pasować
+GENERATOR_VERSION = "flat-1"
+MAX_WORDS = 60  # Wyrazów losowanych do jednej próby
+# Prób bez poprawy, po których generate() kończy przed time_limit. Pomiar
+# (plansza 15x15, 15-125 wyrazów z maila): późniejsze poprawy to zwykle
+# +1 wyraz po ~1-3 s, a 400 prób to ~0.1-0.7 s CPU.
+STALL_ATTEMPTS = 400
 
 
 class CrosswordGeneratorNew:
@@ -25,33 +35,63 @@ class CrosswordGeneratorNew:
     Prawidłowy generator krzyżówek oparty na genxword.
     """
     
-    def __init__(self, word_source: WordSource):
+    def __init__(self, word_source: WordSource, seed: Optional[int] = None):
         self.word_source = word_source
         self.empty = ''  # Marker pola pustego
-        self.let_coords = defaultdict(list)  # {letter: [(row, col, vertical), ...]}
-        self.grid = None
+        self.flat: Optional[FlatGrid] = None  # Siatka robocza, wspólna dla prób
         self.height = 0
         self.width = 0
+        # Własny generator — ten sam seed daje tę samą krzyżówkę (benchmarki)
+        self.rng = random.Random(seed)
+        self.last_stats = {}
     
-    def generate(self, width: int, height: int, time_limit: float = 3.0) -> CrosswordGrid:
+    def generate(
+        self,
+        width: int,
+        height: int,
+        time_limit: float = 3.0,
+        target_words: Optional[int] = None,
+        target_density: Optional[float] = None,
+        stall_attempts: Optional[int] = STALL_ATTEMPTS,
+    ) -> CrosswordGrid:
         """
         Wygeneruj krzyżówkę w ciągu time_limit sekund.
         Zwraca najlepszą z największą ilością wyrazów.
+        
+        Kończy wcześniej, gdy:
+        - umieszczono wszystkie wylosowane wyrazy (lepiej się nie da),
+        - najlepsza próba ma >= target_words wyrazów,
+        - najlepsza próba zapełnia >= target_density planszy,
+        - stall_attempts kolejnych prób nic nie poprawiło (None = bez limitu).
+        
+        Przebieg ostatniego wywołania w self.last_stats (próby, CPU, powód
+        stopu). Z seedem wynik jest powtarzalny, o ile nie zatrzymał go
+        time_limit.
         """
         self.width = width
         self.height = height
         
         best_wordlist = []
-        best_grid = None
+        best_cells = None
+        best_filled = 0
+        
+        self._all_words = None
+        attempts = 0
+        since_best = 0
+        stop_reason = "time_limit"
+        cells = width * height
         
         start_time = time.time()
+        start_cpu = time.thread_time()
         
         while (time.time() - start_time) < time_limit:
             self._prep_grid()  # Czyszczenie dla nowej próby
             
             wordlist = self._prepare_wordlist()
             if not wordlist:
-                continue
+                stop_reason = "no_words"
+                break
+            attempts += 1
             
             # Umieść pierwszy wyraz losowo
             if wordlist:
@@ -64,17 +104,40 @@ class CrosswordGeneratorNew:
             # Jeśli lepsze rozwiązanie, zapamiętaj
             if len(self.current_wordlist) > len(best_wordlist):
                 best_wordlist = list(self.current_wordlist)
-                best_grid = [row[:] for row in self.grid]
+                best_cells = bytes(self.flat.cells)
+                best_filled = self.flat.filled
+                since_best = 0
+            else:
+                since_best += 1
+            
+            # Kryteria zbieżności
+            if len(best_wordlist) >= len(wordlist):
+                stop_reason = "all_placed"
+                break
+            if target_words and len(best_wordlist) >= target_words:
+                stop_reason = "target_words"
+                break
+            if target_density and best_filled >= target_density * cells:
+                stop_reason = "target_density"
+                break
+            if stall_attempts and since_best >= stall_attempts:
+                stop_reason = "stall"
+                break
+        
+        self.last_stats = {
+            "attempts": attempts,
+            "words": len(best_wordlist),
+            "density": round(best_filled / cells, 3) if cells else 0.0,
+            "cpu_sec": round(time.thread_time() - start_cpu, 4),
+            "wall_sec": round(time.time() - start_time, 4),
+            "stop_reason": stop_reason,
+        }
         
         # Zwróć krzyżówkę
         result = CrosswordGrid(width, height)
-        if best_grid:
-            # Zamień puste pola ("") na czarne (None)
-            for r in range(height):
-                for c in range(width):
-                    if best_grid[r][c] == self.empty:
-                        best_grid[r][c] = None
-            result.grid = best_grid
+        if best_cells:
+            # Puste pola → czarne (None)
+            result.grid = self.flat.to_rows(best_cells, empty=None)
             
             # Wyodrębnij wyrazy z siatki
             self._extract_words_from_grid(result)
@@ -82,28 +145,31 @@ class CrosswordGeneratorNew:
         return result
     
     def _prep_grid(self):
-        """Przygotuj grę do nowej próby."""
-        self.grid = [[self.empty] * self.width for _ in range(self.height)]
+        """Przygotuj grę do nowej próby (ta sama siatka, wyczyszczona)."""
+        flat = self.flat
+        if flat is None or (flat.width, flat.height) != (self.width, self.height):
+            self.flat = FlatGrid(self.width, self.height)
+        else:
+            flat.clear()
         self.current_wordlist = []
-        self.let_coords.clear()
     
     def _prepare_wordlist(self) -> List[str]:
-        """Pobierz słowa, posortuj od najdłuższych."""
-        all_words = []
-        
-        max_length = max(self.width, self.height)
-        # Zbierz wszystkie dostępne słowa dopasowane do wymiarów planszy
-        for length in range(2, max_length + 1):
-            words = self.word_source.get_words_by_length(length)
-            all_words.extend(words)
-        
-        if not all_words:
+        """Pobierz słowa (raz na generate), wymieszaj, max MAX_WORDS."""
+        if self._all_words is None:
+            all_words = []
+            max_length = max(self.width, self.height)
+            # Zbierz wszystkie dostępne słowa dopasowane do wymiarów planszy
+            for length in range(2, max_length + 1):
+                words = self.word_source.get_words_by_length(length)
+                all_words.extend(words)
+            self._all_words = all_words
+        
+        if not self._all_words:
             return []
         
-        # Posortuj od najdłuższych, wymieszaj
-        all_words.sort(key=len, reverse=True)
-        random.shuffle(all_words)
-        return all_words[:60]  # Max 60 słów
+        all_words = list(self._all_words)
+        self.rng.shuffle(all_words)
+        return all_words[:MAX_WORDS]
     
     def _place_first_word(self, word: str):
         """Umieść pierwszy wyraz losowo."""
@@ -111,20 +177,20 @@ class CrosswordGeneratorNew:
         if len(word) > self.height and len(word) > self.width:
             return
         
-        vertical = random.choice([True, False])
+        vertical = self.rng.choice([True, False])
         
         if vertical:
             # Sprawdzenie czy wyraz mieści się pionowo
             if len(word) <= self.height:
-                row = random.randint(0, max(0, self.height - len(word)))
+                row = self.rng.randint(0, max(0, self.height - len(word)))
             else:
                 return  # Nie mieści się pionowo
-            col = random.randint(0, max(0, self.width - 1))
+            col = self.rng.randint(0, max(0, self.width - 1))
         else:
             # Sprawdzenie czy wyraz mieści się poziomo
-            row = random.randint(0, max(0, self.height - 1))
+            row = self.rng.randint(0, max(0, self.height - 1))
             if len(word) <= self.width:
-                col = random.randint(0, max(0, self.width - len(word)))
+                col = self.rng.randint(0, max(0, self.width - len(word)))
             else:
                 return  # Nie mieści się poziomo
         
@@ -149,157 +215,58 @@ class CrosswordGeneratorNew:
         Dla każdej litery w wyrazie szukaj gdzie jest na siatce,
         potem sprawdzaj czy można tam umieścić wyraz.
         """
+        flat = self.flat
+        cells = flat.cells
+        width, height = flat.width, flat.height
+        encoded = flat.encode(word)
+        n = len(encoded)
+        last = n - 1
         best_placement = None
         best_score = 0
         
         # Dla każdej litery w wyrazie
-        for word_idx, word_letter in enumerate(word):
+        for word_idx, code in enumerate(encoded):
+            prev_code = encoded[word_idx - 1] if word_idx else 0
+            next_code = encoded[word_idx + 1] if word_idx < last else 0
             # Szukaj tej litery na siatce
-            if word_letter in self.let_coords:
-                for grid_row, grid_col, grid_vertical in self.let_coords[word_letter]:
-                    # Spróbuj POZIOMO
-                    placement_h = self._check_placement(
-                        word, grid_row, grid_col - word_idx, False
-                    )
-                    if placement_h:
-                        score = placement_h[3]
-                        if score > best_score:
-                            best_score = score
-                            best_placement = (placement_h[0], placement_h[1], False)
-                    
-                    # Spróbuj PIONOWO
-                    placement_v = self._check_placement(
-                        word, grid_row - word_idx, grid_col, True
-                    )
-                    if placement_v:
-                        score = placement_v[3]
-                        if score > best_score:
-                            best_score = score
-                            best_placement = (placement_v[0], placement_v[1], True)
+            p = cells.find(code)
+            while p >= 0:
+                grid_row, grid_col = divmod(p, width)
+                # Sąsiedzi przecięcia w linii wyrazu muszą być pusci albo
+                # równi sąsiednim literom wyrazu — odrzuca większość
+                # kandydatów bez pełnego sprawdzania
+                
+                # Spróbuj POZIOMO
+                start = grid_col - word_idx
+                if (
+                    start >= 0 and start + n <= width
+                    and (not grid_col or cells[p - 1] in (0, prev_code))
+                    and (grid_col == width - 1 or cells[p + 1] in (0, next_code))
+                ):
+                    score = flat.check(encoded, grid_row, start, False)
+                    if score > best_score:
+                        best_score = score
+                        best_placement = (grid_row, start, False)
+                
+                # Spróbuj PIONOWO
+                start = grid_row - word_idx
+                if (
+                    start >= 0 and start + n <= height
+                    and (not grid_row or cells[p - width] in (0, prev_code))
+                    and (grid_row == height - 1 or cells[p + width] in (0, next_code))
+                ):
+                    score = flat.check(encoded, start, grid_col, True)
+                    if score > best_score:
+                        best_score = score
+                        best_placement = (start, grid_col, True)
+                p = cells.find(code, p + 1)
         
         return best_placement
     
-    def _check_placement(
-        self,
-        word: str,
-        start_row: int,
-        start_col: int,
-        vertical: bool
-    ) -> Optional[Tuple[int, int, bool, int]]:
-        """
-        Sprawdź czy można umieścić wyraz na danej pozycji.
-        Zwróć (row, col, vertical, score) lub None.
-        """
-        if vertical:
-            score = self._check_vertical(word, start_row, start_col)
-        else:
-            score = self._check_horizontal(word, start_row, start_col)
-        
-        if score > 0:
-            return (start_row, start_col, vertical, score)
-        
-        return None
-    
-    def _check_horizontal(self, word: str, row: int, col: int) -> int:
-        """
-        Sprawdź możliwość umieszczenia POZIOMO.
-        
-        Reguły:
-        - Nie poza granice
-        - Lewa i prawa strona muszą być puste lub nie istnieć
-        - Każda komórka: albo pusta (bez sąsiadów w/d), albo ta sama litera
-        
-        Zwróć score (liczba przecięć) lub 0.
-        """
-        # Granice
-        if col < 0 or col + len(word) > self.width:
-            return 0
-        
-        # Lewa strona
-        if col > 0 and self.grid[row][col - 1] != self.empty:
-            return 0
-        
-        # Prawa strona
-        if col + len(word) < self.width and self.grid[row][col + len(word)] != self.empty:
-            return 0
-        
-        score = 0
-        
-        for i, letter in enumerate(word):
-            c = col + i
-            cell = self.grid[row][c]
-            
-            if cell == self.empty:
-                # Komórka pusta: nie może mieć sąsiadów w górę/dół
-                if row > 0 and self.grid[row - 1][c] != self.empty:
-                    return 0
-                if row < self.height - 1 and self.grid[row + 1][c] != self.empty:
-                    return 0
-            elif cell == letter:
-                # Przecięcie - zawsze OK
-                score += 1
-            else:
-                # Konflikt
-                return 0
-        
-        return max(1, score)
-    
-    def _check_vertical(self, word: str, row: int, col: int) -> int:
-        """
-        Sprawdź możliwość umieszczenia PIONOWO.
-        """
-        # Granice
-        if row < 0 or row + len(word) > self.height:
-            return 0
-        
-        # Góra
-        if row > 0 and self.grid[row - 1][col] != self.empty:
-            return 0
-        
-        # Dół
-        if row + len(word) < self.height and self.grid[row + len(word)][col] != self.empty:
-            return 0
-        
-        score = 0
-        
-        for i, letter in enumerate(word):
-            r = row + i
-            cell = self.grid[r][col]
-            
-            if cell == self.empty:
-                # Komórka pusta: nie może mieć sąsiadów w lewo/prawo
-                if col > 0 and self.grid[r][col - 1] != self.empty:
-                    return 0
-                if col < self.width - 1 and self.grid[r][col + 1] != self.empty:
-                    return 0
-            elif cell == letter:
-                # Przecięcie - OK
-                score += 1
-            else:
-                # Konflikt
-                return 0
-        
-        return max(1, score)
-    
     def _set_word(self, word: str, row: int, col: int, vertical: bool):
-        """
-        Umieść wyraz na siatce.
-        Zaktualizuj let_coords.
-        """
+        """Umieść wyraz na siatce."""
         self.current_wordlist.append(word)
-        
-        if vertical:
-            for i, letter in enumerate(word):
-                r = row + i
-                self.grid[r][col] = letter
-                if (r, col, vertical) not in self.let_coords[letter]:
-                    self.let_coords[letter].append((r, col, vertical))
-        else:
-            for i, letter in enumerate(word):
-                c = col + i
-                self.grid[row][c] = letter
-                if (row, c, vertical) not in self.let_coords[letter]:
-                    self.let_coords[letter].append((row, c, vertical))
+        self.flat.place(self.flat.encode(word), row, col, vertical)
     
     def _extract_words_from_grid(self, grid: CrosswordGrid) -> None:
         """
@@ -14,13 +14,28 @@ Każda strategia próbuje umieścić wyrazy przestrzegając reguł Scrabble:
 - Wyrazy muszą się przecinać
 - Wszystkie przecięcia muszą tworzyć poprawne słowa
 - Brak pustych pół w samym tekście (mogą być na brzegach)
+
+Tryb portfolio (MultiStrategyGenerator.generate_portfolio): strategie
+równolegle w puli procesów, ze wspólną flagą anulowania i wspólnym
+najlepszym wynikiem — koniec, gdy któraś osiągnie target_density albo
+minie time_budget. Porównanie z trybem sekwencyjnym:
+benchmarks/bench_crossword_portfolio.py.
 """
 
+import multiprocessing
 import random
-from typing import List, Tuple, Optional, Dict, Set
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, List, Tuple, Optional, Dict, Set
 from enum import Enum
 from .word_source import WordSource
 from .crossword_grid import CrosswordGrid, Direction
+from .pattern_index import slot_pattern
+
+
+PORTFOLIO_TIME_BUDGET_SEC = 30.0
+# Po anulowaniu strategie kończą bieżącą iterację i oddają najlepszą siatkę
+PORTFOLIO_GRACE_SEC = 2.0
 
 
 class StartingStrategy(Enum):
@@ -95,6 +110,7 @@ class MultiStrategyGenerator:
     def __init__(self, word_source: WordSource):
         self.word_source = word_source
         self.strategies = self._create_strategies()
+        self.last_portfolio: Dict[str, object] = {}
     
     def _create_strategies(self) -> List[StrategyConfig]:
         """Utwórz listę strategii do próby."""
@@ -143,6 +159,27 @@ class MultiStrategyGenerator:
             ),
         ]
     
+    @staticmethod
+    def _make_result(
+        grid: CrosswordGrid,
+        strategy_name: str,
+        width: int,
+        height: int
+    ) -> StrategyResult:
+        """Metryki siatki jednej strategii."""
+        return StrategyResult(
+            grid=grid,
+            strategy_name=strategy_name,
+            density=grid.get_density(),
+            word_count=len(grid.placed_words),
+            filled_cells=grid.get_filled_count(),
+            total_cells=width * height,
+            letter_count=sum(
+                1 for r in grid.grid for cell in r
+                if cell and cell not in ["", None]
+            )
+        )
+    
     def generate_all_strategies(
         self,
         width: int,
@@ -174,35 +211,159 @@ class MultiStrategyGenerator:
                 strategy_config
             )
             grid = generator.generate(width, height)
+            results.append(self._make_result(grid, strategy_config.name, width, height))
+        
+        # Sortuj po gęstości (malejąco) jeśli requested
+        if sort_by_density:
+            results.sort(key=lambda r: r.density, reverse=True)
+        
+        return results
+
+    def generate_portfolio(
+        self,
+        width: int,
+        height: int,
+        target_density: Optional[float] = None,
+        time_budget: float = PORTFOLIO_TIME_BUDGET_SEC,
+        max_workers: Optional[int] = None,
+        progress_callback=None,
+        sort_by_density: bool = True
+    ) -> List[StrategyResult]:
+        """
+        Wszystkie strategie naraz, w puli procesów.
+        
+        Args:
+            width, height: Wymiary siatki
+            target_density: Gęstość w % (jak get_density()) kończąca całe
+                portfolio, gdy osiągnie ją dowolna strategia. None = bez celu.
+            time_budget: Globalny limit czasu w sekundach
+            max_workers: Rozmiar puli (None = liczba strategii, max CPU)
+            progress_callback: Funkcja(strategy_name, current, total) po
+                zakończeniu każdej strategii
+            sort_by_density: Jak w generate_all_strategies
+        
+        Returns:
+            StrategyResult strategii, które zdążyły oddać siatkę. Przebieg
+            (powód końca, czas, wspólny najlepszy wynik) w self.last_portfolio.
+        """
+        start = time.time()
+        deadline = start + time_budget
+        total = len(self.strategies)
+        ctx = _portfolio_context()
+        cancel = ctx.Event()
+        best = ctx.Value("d", 0.0)
+        workers = max_workers or min(total, multiprocessing.cpu_count())
+        
+        results = []
+        stop_reason = "all_done"
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_portfolio_init,
+            initargs=(self.word_source, cancel, best),
+        )
+        try:
+            pending = {
+                pool.submit(_portfolio_run, config, width, height, target_density, deadline)
+                for config in self.strategies
+            }
             
-            # Oblicz metryki
-            filled = grid.get_filled_count()
-            total_cells = width * height
-            density = grid.get_density()
-            word_count = len(grid.placed_words)
-            letter_count = sum(
-                1 for r in grid.grid for cell in r
-                if cell and cell not in ["", None]
-            )
+            def collect(done):
+                for future in done:
+                    try:
+                        name, grid = future.result()
+                    except Exception as e:
+                        print(f"[Portfolio] Strategia nie zwróciła wyniku: {e}")
+                        continue
+                    if grid.placed_words:
+                        results.append(self._make_result(grid, name, width, height))
+                    if progress_callback:
+                        progress_callback(name, len(results), total)
             
-            result = StrategyResult(
-                grid=grid,
-                strategy_name=strategy_config.name,
-                density=density,
-                word_count=word_count,
-                filled_cells=filled,
-                total_cells=total_cells,
-                letter_count=letter_count
-            )
-            results.append(result)
+            while pending:
+                done, pending = wait(
+                    pending,
+                    timeout=max(0.0, deadline - time.time()),
+                    return_when=FIRST_COMPLETED,
+                )
+                collect(done)
+                if cancel.is_set():
+                    stop_reason = "target"
+                    break
+                if time.time() >= deadline:
+                    stop_reason = "time_budget"
+                    break
+            
+            if pending:
+                cancel.set()
+                done, pending = wait(pending, timeout=PORTFOLIO_GRACE_SEC)
+                collect(done)
+        finally:
+            cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        self.last_portfolio = {
+            "stop_reason": stop_reason,
+            "wall_sec": round(time.time() - start, 3),
+            "best_density": round(best.value, 2),
+            "finished": len(results),
+            "workers": workers,
+        }
         
-        # Sortuj po gęstości (malejąco) jeśli requested
         if sort_by_density:
             results.sort(key=lambda r: r.density, reverse=True)
+        else:
+            order = {config.name: i for i, config in enumerate(self.strategies)}
+            results.sort(key=lambda r: order[r.strategy_name])
         
         return results
 
 
+# ── Portfolio: stan procesu roboczego ────────────────────────────────────────
+
+_worker_source: Optional[WordSource] = None
+_worker_cancel = None
+_worker_best = None
+
+
+def _portfolio_context():
+    """forkserver jak w core/process_isolation; spawn tam, gdzie go brak (Windows)."""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _portfolio_init(word_source: WordSource, cancel, best) -> None:
+    """Initializer puli — źródło słów i wspólny stan raz na proces."""
+    global _worker_source, _worker_cancel, _worker_best
+    _worker_source = word_source
+    _worker_cancel = cancel
+    _worker_best = best
+
+
+def _portfolio_run(
+    config: "StrategyConfig",
+    width: int,
+    height: int,
+    target_density: Optional[float],
+    deadline: float
+) -> Tuple[str, CrosswordGrid]:
+    """Jedna strategia w procesie roboczym; przerywana flagą lub terminem."""
+    def should_stop() -> bool:
+        return _worker_cancel.is_set() or time.time() >= deadline
+    
+    def on_best(density: float) -> None:
+        with _worker_best.get_lock():
+            if density > _worker_best.value:
+                _worker_best.value = density
+        if target_density is not None and density >= target_density:
+            _worker_cancel.set()
+    
+    generator = StrategyBasedGenerator(_worker_source, config)
+    grid = generator.generate(width, height, should_stop=should_stop, on_best=on_best)
+    return config.name, grid
+
+
 class StrategyBasedGenerator:
     """
     Generator używający konkretnej strategii umieszczania wyrazów.
@@ -213,13 +374,30 @@ class StrategyBasedGenerator:
         self.config = config
         self.best_grid = None
         self.best_density = 0.0
+        self._should_stop = None
     
-    def generate(self, width: int, height: int) -> CrosswordGrid:
-        """Wygeneruj krzyżówkę używając konfigurowanej strategii."""
+    def generate(
+        self,
+        width: int,
+        height: int,
+        should_stop: Optional[Callable[[], bool]] = None,
+        on_best: Optional[Callable[[float], None]] = None
+    ) -> CrosswordGrid:
+        """
+        Wygeneruj krzyżówkę używając konfigurowanej strategii.
+        
+        should_stop — sprawdzane przed każdą iteracją i w każdym kroku
+        _backtrack (anulowanie portfolio — długi backtracking nie przeciąga
+        się poza PORTFOLIO_GRACE_SEC), on_best(density) — po każdej poprawie
+        najlepszej siatki.
+        """
         self.best_grid = None
         self.best_density = 0.0
+        self._should_stop = should_stop
         
         for attempt in range(self.config.max_iterations):
+            if should_stop and should_stop():
+                break
             grid = CrosswordGrid(width, height)
             
             # Umieść wyraz startowy
@@ -237,6 +415,8 @@ class StrategyBasedGenerator:
             if density > self.best_density:
                 self.best_density = density
                 self.best_grid = grid
+                if on_best:
+                    on_best(density)
         
         return self.best_grid or CrosswordGrid(width, height)
     
@@ -327,6 +507,8 @@ class StrategyBasedGenerator:
         """
         if depth >= self.config.backtrack_depth:
             return 0
+        if self._should_stop is not None and self._should_stop():
+            return 0
         
         # Pobierz puste komórki
         empty_cells = grid.get_empty_cells()
@@ -350,6 +532,8 @@ class StrategyBasedGenerator:
         placed_count = 0
         
         for row, col in empty_cells[:check_limit]:
+            if self._should_stop is not None and self._should_stop():
+                break
             # Próbuj poziomo
             h_words = self._find_matching_words(grid, row, col, Direction.HORIZONTAL)
             for word in h_words[:2]:  # Zmniejsz z 3 do 2 kandydatów
@@ -396,20 +580,22 @@ class StrategyBasedGenerator:
     ) -> List[str]:
         """Znajdź słowa mogące być umieszczone w danej pozycji."""
         candidates = []
-        max_len = (
-            grid.width - col if direction == Direction.HORIZONTAL
-            else grid.height - row
-        )
-        
-        for word_len in range(2, min(15, max_len + 1)):
-            for word in self.word_source.get_words_by_length(word_len):
-                if grid.can_place_word(word, row, col, direction):
-                    intersections = self._count_intersections(
-                        grid, word, row, col, direction
-                    )
-                    # Preferuj słowa z przecięciami
-                    score = intersections * 10 + max(0, word_len - 4)
-                    candidates.append((word, score))
+        if direction == Direction.HORIZONTAL:
+            cells = grid.grid[row][col:]
+        else:
+            cells = [grid.grid[r][col] for r in range(row, grid.height)]
+        if None in cells:
+            cells = cells[:cells.index(None)]  # Słowo nie przejdzie przez czarne pole
+        
+        for word_len in range(2, min(15, len(cells) + 1)):
+            # Wzorzec z siatki ("K??A") → indeks, bez skanu całej bazy
+            for word in self.word_source.find_pattern(slot_pattern(cells[:word_len])):
+                intersections = self._count_intersections(
+                    grid, word, row, col, direction
+                )
+                # Preferuj słowa z przecięciami
+                score = intersections * 10 + max(0, word_len - 4)
+                candidates.append((word, score))
         
         # Sortuj po wynikach
         candidates.sort(key=lambda x: x[1], reverse=True)
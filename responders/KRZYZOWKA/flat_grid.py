@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+flat_grid.py — Zwarta siatka krzyżówki: bytearray + dziennik cofnięć
+
+Komórka (row, col) to bajt cells[row * width + col]: 0 = puste pole,
+1..254 = kod litery (nadawany przy pierwszym wystąpieniu litery).
+Wyrazy koduje encode() (cache słowo → bytes), więc sprawdzanie i
+wpisywanie porównuje bajty, bez napisów i list list.
+
+    flat = FlatGrid(15, 15)
+    kot = flat.encode("KOT")
+    if flat.check(kot, 7, 3, vertical=False):
+        flat.place(kot, 7, 3, vertical=False)
+    flat.undo()                      # cofa ostatni wyraz
+
+place()/undo() są O(długość wyrazu) i nic nie alokują: dziennik to
+prealokowane array — każda komórka może zostać zapisana raz od pustej,
+więc w*h pozycji zawsze wystarcza. Pozycje liter znajduje cells.find()
+(C), bez słownika let_coords do utrzymywania.
+
+Benchmark: benchmarks/bench_crossword_grid.py.
+"""
+
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+EMPTY = 0
+MAX_CODE = 254
+
+
+class FlatGrid:
+    """Siatka width×height w jednym bytearray z cofaniem wyrazów."""
+
+    __slots__ = (
+        "width", "height", "size", "cells", "filled", "words",
+        "_zero", "_log", "_marks", "_top", "_codes", "_letters", "_encoded",
+    )
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.cells = bytearray(self.size)
+        self.filled = 0  # Niepuste komórki
+        self.words = 0  # Wyrazy na stosie cofnięć
+        self._zero = bytes(self.size)
+        self._log = array("i", bytes(4 * self.size))  # Komórki zapisane przez place()
+        self._marks = array("i", bytes(4 * (self.size + 1)))  # Wierzchołek _log przed wyrazem
+        self._top = 0
+        self._codes: Dict[str, int] = {}
+        self._letters: List[str] = [""]
+        self._encoded: Dict[str, bytes] = {}
+
+    # ── Kodowanie ─────────────────────────────────────────────────────────────
+
+    def encode(self, word: str) -> bytes:
+        """Wyraz → kody liter (cache per siatka)."""
+        b = self._encoded.get(word)
+        if b is None:
+            codes = []
+            for letter in word:
+                code = self._codes.get(letter)
+                if code is None:
+                    code = len(self._letters)
+                    if code > MAX_CODE:
+                        raise ValueError(f"Za dużo różnych liter w siatce: {letter!r}")
+                    self._codes[letter] = code
+                    self._letters.append(letter)
+                codes.append(code)
+            b = self._encoded[word] = bytes(codes)
+        return b
+
+    def letter(self, code: int) -> str:
+        return self._letters[code]
+
+    # ── Sprawdzanie i wpisywanie ──────────────────────────────────────────────
+
+    def check(self, word: bytes, row: int, col: int, vertical: bool) -> int:
+        """
+        Czy wyraz mieści się w (row, col)? Reguły jak w CrosswordGeneratorNew:
+        w granicach, puste pola przed i za wyrazem, pusta komórka bez sąsiadów
+        w poprzek, zajęta — ta sama litera. Zwraca liczbę przecięć (min. 1)
+        albo 0 gdy się nie da.
+        """
+        n = len(word)
+        w = self.width
+        cells = self.cells
+        if vertical:
+            if row < 0 or row + n > self.height or not 0 <= col < w:
+                return 0
+            step = w
+            before = row > 0
+            after = row + n < self.height
+            side_a = col > 0  # Sąsiad z lewej
+            side_b = col < w - 1  # Sąsiad z prawej
+            cross = 1
+        else:
+            if col < 0 or col + n > w or not 0 <= row < self.height:
+                return 0
+            step = 1
+            before = col > 0
+            after = col + n < w
+            side_a = row > 0  # Sąsiad z góry
+            side_b = row < self.height - 1  # Sąsiad z dołu
+            cross = w
+        p = row * w + col
+        if before and cells[p - step]:
+            return 0
+        if after and cells[p + n * step]:
+            return 0
+        score = 0
+        for code in word:
+            cell = cells[p]
+            if not cell:
+                if side_a and cells[p - cross]:
+                    return 0
+                if side_b and cells[p + cross]:
+                    return 0
+            elif cell == code:
+                score += 1
+            else:
+                return 0
+            p += step
+        return score or 1
+
+    def place(self, word: bytes, row: int, col: int, vertical: bool) -> None:
+        """Wpisz wyraz (bez sprawdzania) i zapamiętaj zapisane komórki."""
+        step = self.width if vertical else 1
+        p = row * self.width + col
+        cells, log = self.cells, self._log
+        top = self._top
+        self._marks[self.words] = top
+        for code in word:
+            if not cells[p]:
+                cells[p] = code
+                log[top] = p
+                top += 1
+            p += step
+        self.filled += top - self._top
+        self._top = top
+        self.words += 1
+
+    def undo(self) -> None:
+        """Cofnij ostatni wyraz — zeruje tylko komórki, które on zapisał."""
+        if not self.words:
+            return
+        self.words -= 1
+        mark = self._marks[self.words]
+        cells, log = self.cells, self._log
+        for i in range(mark, self._top):
+            cells[log[i]] = EMPTY
+        self.filled -= self._top - mark
+        self._top = mark
+
+    def clear(self) -> None:
+        """Pusta siatka do nowej próby (kody liter zostają)."""
+        self.cells[:] = self._zero  # Ta sama długość — kopia w miejscu
+        self.filled = self.words = self._top = 0
+
+    # ── Odczyt ────────────────────────────────────────────────────────────────
+
+    def positions(self, code: int) -> Iterator[int]:
+        """Indeksy komórek z daną literą."""
+        cells = self.cells
+        p = cells.find(code)
+        while p >= 0:
+            yield p
+            p = cells.find(code, p + 1)
+
+    def to_rows(self, cells: Optional[bytes] = None, empty=None) -> List[List[Optional[str]]]:
+        """Lista list liter jak CrosswordGrid.grid; puste pole → empty."""
+        cells = self.cells if cells is None else cells
+        letters = self._letters
+        w = self.width
+        return [
+            [letters[c] if c else empty for c in cells[r * w:(r + 1) * w]]
+            for r in range(self.height)
+        ]
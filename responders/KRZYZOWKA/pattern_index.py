@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+pattern_index.py — Indeks wzorców do wyszukiwania wyrazów krzyżówki
+
+Wzorzec to wyraz z '?' w miejscu nieznanych liter: "?A??E" = 5 liter,
+A na pozycji 1, E na pozycji 4.
+
+Dla każdej długości wyrazy dostają kolejne id (w kolejności źródła), a dla
+każdej trójki (długość, pozycja, litera) trzymamy bitset id — int Pythona.
+Wzorzec = AND bitsetów znanych liter, bez przeglądania listy słów:
+
+    index = PatternIndex(["KOT", "KOSZ", "LAS"])
+    index.find("KO??")         # ["KOSZ"]
+    index.count("?A?")         # 1
+
+Cache binarny (marshal) obok pliku słów — ładowanie bez budowania bitsetów.
+Klucz cache to sha1 listy słów; inna lista lub wersja formatu = przebudowa.
+
+Benchmark: benchmarks/bench_crossword_index.py.
+"""
+
+import hashlib
+import marshal
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+WILDCARD = "?"
+CACHE_MAGIC = b"KRZIDX1\n"
+
+
+def words_key(words: Iterable[str]) -> str:
+    """sha1 listy słów — klucz ważności cache."""
+    h = hashlib.sha1()
+    for w in words:
+        h.update(w.encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def _bity(bitset: int) -> List[int]:
+    """Numery ustawionych bitów, rosnąco."""
+    s = bin(bitset)[:1:-1]  # Bit 0 na początku napisu
+    wynik = []
+    i = s.find("1")
+    while i >= 0:
+        wynik.append(i)
+        i = s.find("1", i + 1)
+    return wynik
+
+
+class PatternIndex:
+    """(długość, pozycja, litera) → bitset id wyrazów tej długości."""
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.by_length: Dict[int, List[str]] = {}
+        self.bits: Dict[Tuple[int, int, str], int] = {}
+        self.key = ""
+        self._build(list(words))
+
+    def _build(self, words: List[str]) -> None:
+        self.key = words_key(words)
+        ids: Dict[Tuple[int, int, str], List[int]] = {}
+        for word in words:
+            bucket = self.by_length.setdefault(len(word), [])
+            n = len(bucket)
+            bucket.append(word)
+            for pos, letter in enumerate(word):
+                ids.setdefault((len(word), pos, letter), []).append(n)
+        # Bitset z listy id jednym int.from_bytes — OR-owanie dużych intów
+        # bit po bicie jest kwadratowe
+        for k, lista in ids.items():
+            bajty = bytearray((lista[-1] >> 3) + 1)
+            for i in lista:
+                bajty[i >> 3] |= 1 << (i & 7)
+            self.bits[k] = int.from_bytes(bajty, "little")
+
+    # ── Zapytania ─────────────────────────────────────────────────────────────
+
+    def _bitset(self, pattern: str) -> Optional[int]:
+        """AND bitsetów znanych liter; None = wszystkie wyrazy tej długości."""
+        n = len(pattern)
+        wynik = None
+        for pos, letter in enumerate(pattern):
+            if letter == WILDCARD:
+                continue
+            b = self.bits.get((n, pos, letter), 0)
+            wynik = b if wynik is None else wynik & b
+            if not wynik:
+                return 0
+        return wynik
+
+    def find(self, pattern: str) -> List[str]:
+        """Wyrazy pasujące do wzorca, w kolejności źródła."""
+        bucket = self.by_length.get(len(pattern))
+        if not bucket:
+            return []
+        b = self._bitset(pattern)
+        if b is None:
+            return list(bucket)
+        return [bucket[i] for i in _bity(b)] if b else []
+
+    def count(self, pattern: str) -> int:
+        bucket = self.by_length.get(len(pattern))
+        if not bucket:
+            return 0
+        b = self._bitset(pattern)
+        return len(bucket) if b is None else b.bit_count()
+
+    def words_by_length(self, length: int) -> List[str]:
+        return list(self.by_length.get(length, ()))
+
+    # ── Cache binarny ─────────────────────────────────────────────────────────
+
+    def save(self, path: str) -> None:
+        """Zapis atomowy (plik tymczasowy + os.replace)."""
+        dane = marshal.dumps((self.key, self.by_length, self.bits))
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(CACHE_MAGIC)
+            f.write(dane)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, key: Optional[str] = None) -> Optional["PatternIndex"]:
+        """Indeks z cache; None gdy brak pliku, inny format lub inny klucz."""
+        try:
+            with open(path, "rb") as f:
+                if f.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                    return None
+                zapisany, by_length, bits = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if key is not None and zapisany != key:
+            return None
+        index = cls.__new__(cls)
+        index.key, index.by_length, index.bits = zapisany, by_length, bits
+        return index
+
+    @classmethod
+    def cached(cls, words: List[str], path: Optional[str]) -> "PatternIndex":
+        """Z cache, jeśli pasuje do listy słów; inaczej zbuduj i zapisz."""
+        if path:
+            index = cls.load(path, words_key(words))
+            if index is not None:
+                return index
+        index = cls(words)
+        if path:
+            try:
+                index.save(path)
+            except OSError as e:
+                print(f"[PatternIndex] Nie zapisano cache {path}: {e}")
+        return index
+
+
+def slot_pattern(cells: Iterable[Optional[str]]) -> str:
+    """Wzorzec z komórek CrosswordGrid ("" → '?', litera → litera)."""
+    return "".join(c if c else WILDCARD for c in cells)
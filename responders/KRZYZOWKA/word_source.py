@@ -3,11 +3,16 @@
 word_source.py — Obsługa źródła słów do krzyżówek
 Wczytuje słowa z pliku tekstowego (domyślnie dane.txt)
 Format: WYRAZ definicja/podpowiedź
+
+Wyszukiwanie po długości i wzorcu ("?A??E") idzie przez PatternIndex,
+zapisywany w cache binarnym obok pliku słów (<plik>.idx).
 """
 
 from typing import List, Dict, Tuple, Optional
 import os
 
+from .pattern_index import PatternIndex
+
 
 class WordSource:
     """Zarządza źródłem słów do generowania krzyżówek."""
@@ -29,6 +34,7 @@ class WordSource:
         self.filepath = filepath
         self.words: Dict[str, str] = {}  # {word: definition}
         self.loaded = False
+        self._index: Optional[PatternIndex] = None
         
         # Spróbuj załadować — jeśli nie istnieje dane.txt, użyj baza.txt
         if not os.path.exists(filepath):
@@ -53,6 +59,7 @@ class WordSource:
         
         try:
             self.words = {}
+            self._index = None
             with open(self.filepath, 'r', encoding='utf-8') as f:
                 for line_num, line in enumerate(f, 1):
                     line = line.strip()
@@ -92,9 +99,21 @@ class WordSource:
         """Zwróć listę wszystkich słów."""
         return list(self.words.keys())
     
+    @property
+    def index(self) -> PatternIndex:
+        """Indeks wzorców — z cache <plik>.idx albo budowany przy pierwszym użyciu."""
+        if self._index is None:
+            cache = f"{self.filepath}.idx" if self.loaded else None
+            self._index = PatternIndex.cached(list(self.words), cache)
+        return self._index
+    
     def get_words_by_length(self, length: int) -> List[str]:
-        """Zwróć listę słów o danej długości."""
-        return [w for w in self.words.keys() if len(w) == length]
+        """Zwróć listę słów o danej długości (nowa lista — można tasować)."""
+        return self.index.words_by_length(length)
+    
+    def find_pattern(self, pattern: str) -> List[str]:
+        """Słowa pasujące do wzorca, '?' = dowolna litera (np. "?A??E")."""
+        return self.index.find(pattern.upper())
     
     def is_valid(self, word: str) -> bool:
         """Sprawdź czy wyraz istnieje w bazie."""
@@ -19,6 +19,8 @@ from io import BytesIO
 from html import escape
 from typing import Optional, Dict, Any
 
+from core import budget
+
 logger_enabled = True
 
 
@@ -209,7 +211,7 @@ def _generate_jpg_via_graphviz(
             ["dot", "-Tjpg", "-Gdpi=300"],
             input=dot_content.encode(),
             capture_output=True,
-            timeout=10,
+            timeout=budget.timeout(10),
         )
 
         if result.returncode == 0:
@@ -2,9 +2,17 @@
 responders/biznes.py
 Responder biznesowy — Notariusz.
 Wykrywa temat notarialny, generuje odpowiedź, dołącza właściwy PDF.
+
+Temat rozpoznaje lokalny indeks TF-IDF (core/topic_index.py) zbudowany raz
+na proces z tekstów PDF-ów z pdf_biznes i słów kluczowych TOPIC_MAP.
+DeepSeek pyta się tylko, gdy indeks nie jest pewny (BIZNES_TOPIC_MIN_SCORE,
+BIZNES_TOPIC_MIN_MARGIN). Trafność na oznaczonej próbce i oszczędzony czas:
+benchmarks/bench_biznes_topic.py.
 """
 
 import os
+import threading
+import time
 from flask import current_app
 
 from core.ai_client import (
@@ -15,6 +23,8 @@ from core.ai_client import (
 )
 from core.files import read_file_base64, load_prompt
 from core.html_builder import build_html_reply
+from core.metrics import Counter
+from core.topic_index import MIN_MARGIN, MIN_SCORE, TopicIndex
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PDF_DIR = os.path.join(BASE_DIR, "pdf_biznes")
@@ -32,8 +42,88 @@ TOPIC_MAP = {
 }
 FALLBACK_PDF = "kontakt_godziny_pracy_notariusza_podstawowe_informacje"
 
+TOPIC_MIN_SCORE = float(os.getenv("BIZNES_TOPIC_MIN_SCORE", str(MIN_SCORE)))
+TOPIC_MIN_MARGIN = float(os.getenv("BIZNES_TOPIC_MIN_MARGIN", str(MIN_MARGIN)))
+
+BIZNES_TOPIC = Counter(
+    "autoresponder_biznes_topic_total",
+    "Rozpoznanie tematu notarialnego wg źródła (local — indeks TF-IDF, llm — DeepSeek).",
+    ("source",),
+)
+
+_index_lock = threading.Lock()
+_index = None
+
+
+def _pdf_text(path: str) -> str:
+    """Tekst PDF-a (pypdf, potem pdfplumber); uszkodzony lub brak biblioteki → ""."""
+    # Część plików w pdf_biznes to 13-bajtowe zaślepki — bez treści do indeksu
+    if not os.path.isfile(path) or os.path.getsize(path) < 64:
+        return ""
+    try:
+        from pypdf import PdfReader
+
+        return "\n".join(p.extract_text() or "" for p in PdfReader(path).pages)
+    except Exception:
+        pass
+    try:
+        import pdfplumber
+
+        with pdfplumber.open(path) as pdf:
+            return "\n".join(p.extract_text() or "" for p in pdf.pages)
+    except Exception:
+        return ""
+
+
+def topic_index() -> TopicIndex:
+    """Indeks tematów — nazwa tematu + słowa kluczowe + tekst PDF, raz na proces."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            t0 = time.perf_counter()
+            docs = {
+                key: " ".join(
+                    [
+                        key.replace("_", " "),
+                        " ".join(kws),
+                        _pdf_text(os.path.join(PDF_DIR, f"{key}.pdf")),
+                    ]
+                )
+                for key, kws in TOPIC_MAP.items()
+            }
+            _index = TopicIndex(docs, TOPIC_MAP, TOPIC_MIN_SCORE, TOPIC_MIN_MARGIN)
+            current_app.logger.info(
+                "[biznes] Indeks tematów: %d tematów, %d termów, %.0f ms",
+                len(docs),
+                len(_index.idf),
+                (time.perf_counter() - t0) * 1000,
+            )
+        return _index
+
 
 def detect_topic(body_text: str) -> str:
+    """
+    Klucz z TOPIC_MAP lub 'UNKNOWN': lokalnie, gdy indeks jest pewny,
+    inaczej pytanie do modelu.
+    """
+    m = topic_index().classify(body_text or "")
+    if m.confident:
+        BIZNES_TOPIC.inc(source="local")
+        current_app.logger.info(
+            "[biznes] Temat lokalnie: %s (score=%.2f, przewaga=%.2f)", m.topic, m.score, m.margin
+        )
+        return m.topic
+    BIZNES_TOPIC.inc(source="llm")
+    current_app.logger.info(
+        "[biznes] Indeks niepewny (%s, score=%.2f, przewaga=%.2f) — pytam model",
+        m.topic,
+        m.score,
+        m.margin,
+    )
+    return detect_topic_llm(body_text)
+
+
+def detect_topic_llm(body_text: str) -> str:
     """Pyta model o temat notarialny, zwraca klucz z TOPIC_MAP lub 'UNKNOWN'."""
     topics_list = "\n".join(f"- {k}" for k in TOPIC_MAP)
     prompt = (
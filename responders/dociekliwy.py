@@ -31,6 +31,7 @@ import requests
 from flask import current_app
 
 from .analiza_diagram import generate_svg_html_interactive
+from core import budget, pipeline_memo
 from core.logging_reporter import get_logger
 
 logger = logging.getLogger(__name__)
@@ -79,7 +80,7 @@ def _deepseek_call(prompt: str, system: str, max_tokens: int = 3500) -> Optional
                 "max_tokens": max_tokens,
                 "temperature": 0.88,
             },
-            timeout=90,
+            timeout=budget.timeout(90),
         )
 
         duration = time.time() - start_time
@@ -830,6 +831,8 @@ render();
 # ── GŁÓWNA FUNKCJA ────────────────────────────────────────────────────────────
 
 
+# sender_name wystarcza do klucza — sender/data/attachments służą tylko logom
+@pipeline_memo.memoize("analiza", "body", "sender_name")
 def build_dociekliwy_section(
     body: str,
     attachments: list = None,
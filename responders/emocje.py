@@ -2,8 +2,13 @@
 responders/emocje.py
 Empatyczny pocieszyciel — 8 metod pocieszenia.
 
-Strategia: 8 osobnych zapytan do AI (jedno na metode).
+Strategia domyslna ("osobno"): 8 osobnych zapytan do AI (jedno na metode).
 Kazde zapytanie uzywa user_template z emocje.json z wypelnionymi placeholderami.
+
+Tryb "zbiorczo" (EMOCJE_TRYB=zbiorczo): jedno zapytanie w trybie JSON
+(user_template_zbiorczy) zwraca wszystkie metody naraz — mail wysylany raz
+zamiast 8 razy. Metody, ktore nie przejda walidacji, sa dogenerowywane
+pojedynczo (jak w trybie "osobno").
 """
 
 import re
@@ -11,6 +16,8 @@ import os
 import json
 import logging
 
+from core import pipeline_memo
+
 logger = logging.getLogger(__name__)
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -28,6 +35,29 @@ ALL_METODY_KEYS = [
     "cieplo_przez_konkret",
 ]
 
+DOZWOLONE_NASTROJE = {
+    "smutek", "lek", "frustracja", "bol", "neutralna", "zlosc", "samotnosc",
+}
+
+TRYBY = ("osobno", "zbiorczo")
+MAX_TOKENS_METODA = 550
+
+
+def _tryb_domyslny() -> str:
+    tryb = os.getenv("EMOCJE_TRYB", "osobno").strip().lower()
+    return tryb if tryb in TRYBY else "osobno"
+
+
+def _nowe_staty() -> dict:
+    """Liczniki wywolan AI jednego przebiegu (do logu i benchmarku)."""
+    return {
+        "wywolania": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "rate_limit_429": 0,
+        "czas_sec": 0.0,
+    }
+
 
 # ── Ladowanie promptu ─────────────────────────────────────────────────────────
 
@@ -85,15 +115,27 @@ def _buduj_user_msg(
 # ── Bezposrednie wywolanie DeepSeek ──────────────────────────────────────────
 
 
-def _call_ai_raw(system_msg: str, user_msg: str) -> str | None:
+def _call_ai_raw(
+    system_msg: str,
+    user_msg: str,
+    max_tokens: int = MAX_TOKENS_METODA,
+    json_mode: bool = False,
+    staty: dict | None = None,
+) -> str | None:
     """
     Wywoluje DeepSeek bezposrednio przez requests.
     Pomija call_deepseek i sanitize_model_output z ai_client.py
     ktore niszcza JSON przed parsowaniem i crashuja poza kontekstem Flask.
+
+    json_mode=True wymusza po stronie API poprawny obiekt JSON
+    (response_format json_object). staty — opcjonalny dict z _nowe_staty(),
+    uzupelniany o liczbe wywolan, tokeny i 429.
     """
     import time
     import requests as _requests
 
+    from core import budget
+
     api_key = os.getenv("API_KEY_DEEPSEEK", "").strip()
     model_name = os.getenv("MODEL_TYLER", "deepseek-chat")
 
@@ -113,18 +155,35 @@ def _call_ai_raw(system_msg: str, user_msg: str) -> str | None:
             {"role": "user", "content": user_msg},
         ],
         "temperature": 0.0,
-        "max_tokens": 550,
+        "max_tokens": max_tokens,
     }
+    if json_mode:
+        payload["response_format"] = {"type": "json_object"}
+    # Odpowiedz zbiorcza jest kilka razy dluzsza — wiekszy read timeout
+    read_timeout = 30 if max_tokens <= MAX_TOKENS_METODA else 90
 
     resp = None
+    t0 = time.time()
     try:
-        resp = _requests.post(url, headers=headers, json=payload, timeout=(10, 30))
+        resp = _requests.post(
+            url, headers=headers, json=payload, timeout=budget.timeout((10, read_timeout))
+        )
+        if staty is not None:
+            staty["wywolania"] += 1
 
         if resp.status_code == 429:
             logger.warning("[emocje] Rate limit (429) — czekam 5s i powtarzam")
+            if staty is not None:
+                staty["rate_limit_429"] += 1
             resp.close()
-            time.sleep(5)
-            resp = _requests.post(url, headers=headers, json=payload, timeout=(10, 30))
+            budget.sleep(5)
+            resp = _requests.post(
+                url, headers=headers, json=payload, timeout=budget.timeout((10, read_timeout))
+            )
+            if staty is not None:
+                staty["wywolania"] += 1
+                if resp.status_code == 429:
+                    staty["rate_limit_429"] += 1
 
         if resp.status_code != 200:
             logger.error(
@@ -136,11 +195,15 @@ def _call_ai_raw(system_msg: str, user_msg: str) -> str | None:
 
         data = resp.json()
         content = data["choices"][0]["message"]["content"]
+        if staty is not None:
+            usage = data.get("usage") or {}
+            staty["prompt_tokens"] += int(usage.get("prompt_tokens") or 0)
+            staty["completion_tokens"] += int(usage.get("completion_tokens") or 0)
         logger.info("[emocje] API OK — content len=%d", len(content))
         return content
 
     except _requests.exceptions.Timeout:
-        logger.error("[emocje] API timeout po 30s")
+        logger.error("[emocje] API timeout po %ds", read_timeout)
         return None
     except _requests.exceptions.ConnectionError as e:
         logger.error("[emocje] API connection error: %s", e)
@@ -152,6 +215,8 @@ def _call_ai_raw(system_msg: str, user_msg: str) -> str | None:
         logger.exception("[emocje] Nieoczekiwany blad API: %s", e)
         return None
     finally:
+        if staty is not None:
+            staty["czas_sec"] += time.time() - t0
         if resp is not None:
             try:
                 resp.close()
@@ -209,6 +274,7 @@ def _generuj_jedna_metoda(
     sender_name: str,
     metoda: dict,
     prompt_data: dict,
+    staty: dict | None = None,
 ) -> dict | None:
     """Wywoluje AI dla jednej metody. Zwraca dict lub None."""
     system_msg = prompt_data.get("system", "Odpowiadaj WYLACZNIE w JSON.")
@@ -218,7 +284,7 @@ def _generuj_jedna_metoda(
     key = metoda.get("key", "?")
 
     try:
-        raw = _call_ai_raw(system_msg, user_msg)
+        raw = _call_ai_raw(system_msg, user_msg, staty=staty)
     except Exception as e:
         logger.error("[emocje] Wyjątek przy wywolaniu AI dla %s: %s", key, e)
         return None
@@ -245,6 +311,154 @@ def _generuj_jedna_metoda(
     return result
 
 
+# ── Tryb zbiorczy: jedno zapytanie = wszystkie metody ─────────────────────────
+
+
+def _waliduj_metode(obj) -> dict | None:
+    """
+    Sprawdza wynik jednej metody z odpowiedzi zbiorczej.
+    Zwraca znormalizowany dict albo None (metoda do dogenerowania osobno).
+    """
+    if not isinstance(obj, dict):
+        return None
+    pocieszenie = obj.get("pocieszenie")
+    if not isinstance(pocieszenie, str) or len(pocieszenie.strip()) < 10:
+        return None
+    nastroj = str(obj.get("nastroj") or "neutralna").strip().lower()
+    if nastroj not in DOZWOLONE_NASTROJE:
+        nastroj = "neutralna"
+    try:
+        intensywnosc = max(0, min(10, int(obj.get("intensywnosc", 5))))
+    except (TypeError, ValueError):
+        intensywnosc = 5
+    return {
+        "pocieszenie": pocieszenie.strip(),
+        "nastroj": nastroj,
+        "intensywnosc": intensywnosc,
+    }
+
+
+def _buduj_user_msg_zbiorczy(
+    template: str,
+    mail_text: str,
+    sender_name: str,
+    metody: list[dict],
+) -> str:
+    lista = "\n".join(
+        f"- {m.get('key', '')} ({m.get('nazwa', '')}): {m.get('opis', '')}"
+        f" Przyklad: {m.get('przyklad', '')}"
+        for m in metody
+    )
+    msg = template
+    msg = msg.replace("{{METODY_LISTA}}", lista)
+    msg = msg.replace("{{MAIL}}", mail_text[:3000])
+    msg = msg.replace("{{SENDER_NAME}}", sender_name or "nieznany")
+    return msg
+
+
+def _generuj_zbiorczo(
+    mail_text: str,
+    sender_name: str,
+    metody: list[dict],
+    prompt_data: dict,
+    staty: dict | None = None,
+) -> dict:
+    """
+    Jedno zapytanie JSON o wszystkie metody. Zwraca {key: wynik} tylko dla
+    metod, ktore przeszly walidacje — brakujace dogenerowuje wywolujacy.
+    """
+    template = prompt_data.get("user_template_zbiorczy", "")
+    if not template or not metody:
+        return {}
+
+    system_msg = prompt_data.get("system", "Odpowiadaj WYLACZNIE w JSON.")
+    user_msg = _buduj_user_msg_zbiorczy(template, mail_text, sender_name, metody)
+    raw = _call_ai_raw(
+        system_msg,
+        user_msg,
+        max_tokens=MAX_TOKENS_METODA * len(metody),
+        json_mode=True,
+        staty=staty,
+    )
+    if not raw:
+        logger.error("[emocje] Brak odpowiedzi AI w trybie zbiorczym")
+        return {}
+
+    try:
+        data = json.loads(re.sub(r"```(?:json)?", "", raw).strip())
+    except json.JSONDecodeError as e:
+        logger.warning("[emocje] Zbiorczo: JSON nieczytelny (%s): %.300s", e, raw)
+        return {}
+
+    metody_obj = data.get("metody", data) if isinstance(data, dict) else {}
+    if not isinstance(metody_obj, dict):
+        return {}
+
+    wyniki = {}
+    for m in metody:
+        key = m.get("key", "")
+        wynik = _waliduj_metode(metody_obj.get(key))
+        if wynik:
+            wynik["metoda"] = key
+            wyniki[key] = wynik
+        else:
+            logger.warning("[emocje] Zbiorczo: metoda %s nie przeszla walidacji", key)
+    return wyniki
+
+
+def _generuj_metody(
+    mail_text: str,
+    sender_name: str,
+    prompt_data: dict,
+    tryb: str = "osobno",
+    staty: dict | None = None,
+) -> dict:
+    """
+    Generuje wszystkie metody z ALL_METODY_KEYS. Zwraca {key: wynik lub None}.
+    W trybie "zbiorczo" pojedyncze zapytania ida tylko dla metod, ktore
+    nie przeszly walidacji odpowiedzi zbiorczej.
+    """
+    metody_def_map = {
+        m.get("key", m.get("nazwa", "").lower().replace(" ", "_")): m
+        for m in prompt_data.get("metody_pocieszenia", [])
+        if isinstance(m, dict)
+    }
+    metody = [
+        metody_def_map.get(
+            key, {"key": key, "nazwa": key, "opis": "", "przyklad": ""}
+        )
+        for key in ALL_METODY_KEYS
+    ]
+
+    wyniki = {}
+    if tryb == "zbiorczo":
+        try:
+            wyniki = _generuj_zbiorczo(
+                mail_text, sender_name, metody, prompt_data, staty=staty
+            )
+        except Exception as e:
+            logger.error("[emocje] Wyjątek w trybie zbiorczym: %s", e)
+            wyniki = {}
+        logger.info(
+            "[emocje] Zbiorczo: %d/%d metod OK, reszta osobno",
+            len(wyniki), len(metody),
+        )
+
+    for metoda_def in metody:
+        key = metoda_def.get("key")
+        if key in wyniki:
+            continue
+        logger.info("[emocje] Generuje metode: %s", key)
+        try:
+            wyniki[key] = _generuj_jedna_metoda(
+                mail_text, sender_name, metoda_def, prompt_data, staty=staty
+            )
+        except Exception as e:
+            logger.error("[emocje] Wyjątek dla metody %s: %s", key, e)
+            wyniki[key] = None
+    return wyniki
+
+
 # ── Pomocnicy HTML ────────────────────────────────────────────────────────────
 
 
@@ -356,6 +570,7 @@ def _buduj_html_email(
 # ── Glowna funkcja responderu ─────────────────────────────────────────────────
 
 
+@pipeline_memo.memoize("emocje", "body", "sender_name", "sender_email", "gender", "tryb")
 def build_emocje_section(
     body: str,
     sender_name: str = "",
@@ -365,10 +580,13 @@ def build_emocje_section(
     gender: str = "N",
     imie: str = "__BRAK__",
     nazwisko: str = "__BRAK__",
+    tryb: str | None = None,
 ) -> dict:
     """
     Generuje odpowiedzi WSZYSTKIMI 8 metodami pocieszenia.
-    Strategia: 8 osobnych zapytan AI — jedno po drugim.
+    Strategia: tryb "osobno" — 8 zapytan AI jedno po drugim; tryb
+    "zbiorczo" — jedno zapytanie JSON + pojedyncze tylko dla metod, ktore
+    nie przeszly walidacji. Domyslnie z EMOCJE_TRYB.
 
     Zwraca dict z:
       reply_html  — HTML z blokami 8 metod
@@ -389,34 +607,22 @@ def build_emocje_section(
 
     imie = _wyciagnij_imie(sender_name, sender_email)
 
-    # Mapa key -> definicja metody z JSON
-    metody_def_map = {
-        m.get("key", m.get("nazwa", "").lower().replace(" ", "_")): m
-        for m in prompt_data.get("metody_pocieszenia", [])
-        if isinstance(m, dict)
-    }
+    tryb = tryb if tryb in TRYBY else _tryb_domyslny()
+    staty = _nowe_staty()
 
     logger.info(
-        "[emocje] START — imie=%s | mail len=%d | metod=%d",
+        "[emocje] START — imie=%s | mail len=%d | metod=%d | tryb=%s",
         imie or "(brak)",
         len(mail_text),
         len(ALL_METODY_KEYS),
+        tryb,
     )
 
-    # ── 8 osobnych zapytan sekwencyjnie ──────────────────────────────────────
+    wyniki = _generuj_metody(mail_text, imie, prompt_data, tryb=tryb, staty=staty)
+
     metody_results = []
     for key in ALL_METODY_KEYS:
-        metoda_def = metody_def_map.get(
-            key, {"key": key, "nazwa": key, "opis": "", "przyklad": ""}
-        )
-        logger.info("[emocje] Generuje metode: %s", key)
-
-        try:
-            result = _generuj_jedna_metoda(mail_text, imie, metoda_def, prompt_data)
-        except Exception as e:
-            logger.error("[emocje] Wyjątek dla metody %s: %s", key, e)
-            result = None
-
+        result = wyniki.get(key)
         if result and isinstance(result, dict):
             result["metoda"] = key
             metody_results.append(result)
@@ -455,6 +661,16 @@ def build_emocje_section(
         nastroj_dominujacy,
         imie or "(brak)",
     )
+    logger.info(
+        "[emocje] STATY tryb=%s | wywolan=%d | prompt_tokens=%d | "
+        "completion_tokens=%d | 429=%d | czas AI=%.1fs",
+        tryb,
+        staty["wywolania"],
+        staty["prompt_tokens"],
+        staty["completion_tokens"],
+        staty["rate_limit_429"],
+        staty["czas_sec"],
+    )
 
     return {
         "reply_html": reply_html,
@@ -22,11 +22,9 @@ import os
 import io
 import re
 import json
-import time
 import base64
 import logging
 import requests
-
 from datetime import date
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
@@ -36,6 +34,8 @@ from reportlab.lib.units import mm
 from reportlab.lib.utils import simpleSplit
 from reportlab.lib.colors import HexColor, white, black, Color
 
+from core import budget
+
 logger = logging.getLogger(__name__)
 
 # ─────────────────────────────────────────────────────────────
@@ -217,7 +217,7 @@ def _call_deepseek(text: str, n: int, diff: str) -> dict:
                 "https://api.deepseek.com/v1/chat/completions",
                 headers=hdrs,
                 json=payload,
-                timeout=90,
+                timeout=budget.timeout(90),
             )
             r.raise_for_status()
             return _parse_json(r.json()["choices"][0]["message"]["content"])
@@ -228,7 +228,7 @@ def _call_deepseek(text: str, n: int, diff: str) -> dict:
             logger.warning("DeepSeek HTTP err: %s", e)
             if attempt == 3:
                 raise
-        time.sleep(3 * attempt)
+        budget.sleep(3 * attempt)
     raise RuntimeError("DeepSeek: max retries")
 
 
@@ -2,6 +2,13 @@
 responders/scrabble.py
 Responder Scrabble — generuje krzyżówkę na podstawie słów z emaila,
 przy użyciu silnika z katalogu KRZYZOWKA.
+
+CACHE KRZYŻÓWEK (CROSSWORD_CACHE_DIR, plik JSON na wpis, przeżywa restart):
+  klucz = sha1(wersja generatora, wymiary, parametry stopu, posortowany
+  zbiór słów). Powtórka tego samego maila (retry Apps Script, replay)
+  pomija generowanie i od razu renderuje zapisaną siatkę z rozmieszczeniem.
+  Najstarsze wpisy (mtime) ponad CROSSWORD_CACHE_MAX są usuwane.
+  Pusty CROSSWORD_CACHE_DIR wyłącza cache. Trafienia: cache_stats() → /status.
 """
 
 import os
@@ -9,11 +16,17 @@ import io
 import re
 import base64
 import csv
+import hashlib
+import json
+import tempfile
+import threading
 from flask import current_app
 
+from core import pipeline_memo
 from core.html_builder import build_html_reply
-from .KRZYZOWKA.crossword_new import CrosswordGeneratorNew
-from .KRZYZOWKA.crossword_grid import CrosswordGrid
+from core.metrics import Counter, Histogram
+from .KRZYZOWKA.crossword_new import GENERATOR_VERSION, CrosswordGeneratorNew
+from .KRZYZOWKA.crossword_grid import CrosswordGrid, Direction
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "data")
@@ -27,6 +40,34 @@ COLOR_TEXT = (40, 40, 40)
 
 BOARD_DIM = 15
 
+# ── Silnik krzyżówki: limit czasu i kryteria wcześniejszego stopu ────────────
+CROSSWORD_TIME_LIMIT_SEC = float(os.getenv("CROSSWORD_TIME_LIMIT_SEC", "4.0"))
+CROSSWORD_STALL_ATTEMPTS = int(os.getenv("CROSSWORD_STALL_ATTEMPTS", "400"))
+CROSSWORD_TARGET_DENSITY = float(os.getenv("CROSSWORD_TARGET_DENSITY", "0.5"))
+# Pusty = losowo; liczba = powtarzalne krzyżówki (benchmarki, porównania)
+CROSSWORD_SEED = os.getenv("CROSSWORD_SEED", "").strip()
+
+CROSSWORD_CPU_SECONDS = Histogram(
+    "autoresponder_crossword_cpu_seconds",
+    "Czas CPU generowania jednej krzyżówki wg powodu zakończenia.",
+    ("stop_reason",),
+)
+
+# ── Cache gotowych krzyżówek ─────────────────────────────────────────────────
+CROSSWORD_CACHE_DIR = os.getenv(
+    "CROSSWORD_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "autoresponder_crossword_cache"),
+)
+CROSSWORD_CACHE_MAX = int(os.getenv("CROSSWORD_CACHE_MAX", "500"))
+
+CROSSWORD_CACHE = Counter(
+    "autoresponder_crossword_cache_total",
+    "Odczyty cache krzyżówek (hit — bez generowania, miss — nowa siatka).",
+    ("outcome",),
+)
+
+_cache_lock = threading.Lock()
+
 LETTERS_PTS = {
     "A": 1,
     "Ą": 5,
@@ -72,6 +113,20 @@ FONT_CANDIDATES = [
 ]
 
 
+# ── Renderowanie: sprite'y pól i tło planszy, rysowane raz na proces ─────────
+TILE_SZ = 36
+TILE_GAP = 2
+BOARD_MARGIN = 14
+COLOR_BLACK_CELL = (10, 10, 10)
+SPRITE_CACHE_MAX = 4096  # Dowolny tekst maila = dowolne znaki; powyżej rysujemy bez zapamiętywania
+
+_render_lock = threading.Lock()
+_premium_map: dict | None = None
+_fonts: dict = {}
+_sprites: dict = {}
+_backgrounds: dict = {}
+
+
 def _load_premium_map() -> dict:
     """Wczytaj mapę premii z plansza.csv."""
     premium_map = {}
@@ -99,6 +154,16 @@ def _load_premium_map() -> dict:
     return premium_map
 
 
+def _premium() -> dict:
+    """Mapa premii wczytana raz na proces."""
+    global _premium_map
+    if _premium_map is None:
+        with _render_lock:
+            if _premium_map is None:
+                _premium_map = _load_premium_map()
+    return _premium_map
+
+
 def _tile_value(ch: str) -> int:
     return LETTERS_PTS.get(ch.upper(), ord(ch) if ch else 0)
 
@@ -116,22 +181,164 @@ def _try_font(size: int):
     return ImageFont.load_default()
 
 
+def _font(size: int):
+    """_try_font z pamięcią (wołać pod _render_lock)."""
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = _try_font(size)
+    return font
+
+
+def _draw_cell(kind: str, prem, ch):
+    """
+    Jedno pole TILE_SZ×TILE_SZ, tymi samymi prymitywami co dotąd w pętli
+    po planszy, tylko w (0, 0) — wklejone w (x, y) daje te same piksele.
+
+    kind "board" (render_scrabble_image): ch None = puste pole z etykietą
+    premii, " " = puste bez etykiety, litera = kafelek.
+    kind "crossword": ch None = czarne pole, "" = puste, litera = kafelek.
+    """
+    from PIL import Image, ImageDraw
+
+    tile_sz = TILE_SZ
+    img = Image.new("RGB", (tile_sz, tile_sz), COLOR_BG)
+    draw = ImageDraw.Draw(img)
+    x = y = 0
+
+    if kind == "crossword" and ch is None:
+        draw.rectangle([x, y, x + tile_sz - 1, y + tile_sz - 1], fill=COLOR_BLACK_CELL)
+        draw.rectangle(
+            [x, y, x + tile_sz - 1, y + tile_sz - 1], outline=COLOR_GRID, width=1
+        )
+        return img
+
+    # Tło pola
+    bg_col = prem[2] if prem else COLOR_BOARD
+    draw.rectangle([x, y, x + tile_sz - 1, y + tile_sz - 1], fill=bg_col)
+    draw.rectangle(
+        [x, y, x + tile_sz - 1, y + tile_sz - 1], outline=COLOR_GRID, width=1
+    )
+
+    if ch is not None and ch not in (" ", ""):
+        # Kafelek z literą
+        font_letter = _font(int(tile_sz * 0.52))
+        font_pts = _font(int(tile_sz * 0.24))
+        draw.rectangle(
+            [x + 1, y + 1, x + tile_sz - 2, y + tile_sz - 2], fill=COLOR_TILE
+        )
+        draw.rectangle(
+            [x + 1, y + 1, x + tile_sz - 2, y + tile_sz - 2],
+            outline=(0, 0, 0),
+            width=1,
+        )
+        # Litera
+        try:
+            bbox = font_letter.getbbox(ch)
+            lw = bbox[2] - bbox[0]
+            lx = x + (tile_sz - lw) // 2 - bbox[0]
+            ly = y + tile_sz // 10
+        except Exception:
+            lx, ly = x + tile_sz // 4, y + tile_sz // 10
+        draw.text((lx, ly), ch, font=font_letter, fill=COLOR_TEXT)
+
+        # Wartość w prawym dolnym rogu
+        val_str = str(_tile_value(ch))
+        try:
+            vbbox = font_pts.getbbox(val_str)
+            vw = vbbox[2] - vbbox[0]
+            vh = vbbox[3] - vbbox[1]
+        except Exception:
+            vw, vh = 8, 8
+        draw.text(
+            (x + tile_sz - vw - 3, y + tile_sz - vh - 3),
+            val_str,
+            font=font_pts,
+            fill=COLOR_TEXT,
+        )
+
+    elif prem and ch is None:
+        # Etykieta premii na pustym polu
+        font_prem = _font(int(tile_sz * 0.26))
+        label = f"{prem[1]}{prem[0]}"
+        try:
+            pbbox = font_prem.getbbox(label)
+            pw = pbbox[2] - pbbox[0]
+            ph = pbbox[3] - pbbox[1]
+        except Exception:
+            pw, ph = tile_sz // 2, tile_sz // 2
+        draw.text(
+            (x + (tile_sz - pw) // 2, y + (tile_sz - ph) // 2),
+            label,
+            font=font_prem,
+            fill=(255, 255, 255),
+        )
+
+    return img
+
+
+def _sprite(kind: str, prem, ch):
+    """Pole z pamięci sprite'ów; rysowane przy pierwszym użyciu."""
+    key = (kind, prem, ch)
+    img = _sprites.get(key)
+    if img is None:
+        with _render_lock:
+            img = _sprites.get(key)
+            if img is None:
+                img = _draw_cell(kind, prem, ch)
+                if len(_sprites) < SPRITE_CACHE_MAX:
+                    _sprites[key] = img
+    return img
+
+
+def _cell_xy(r: int, c: int) -> tuple[int, int]:
+    cell = TILE_SZ + TILE_GAP
+    return BOARD_MARGIN + c * cell, BOARD_MARGIN + r * cell
+
+
+def _background(kind: str):
+    """
+    Pusta plansza BOARD_DIM×BOARD_DIM — raz na proces. "board": pola
+    premii z etykietami; "crossword": same puste pola.
+    """
+    img = _backgrounds.get(kind)
+    if img is None:
+        from PIL import Image
+
+        premium_map = _premium() if kind == "board" else {}
+        size = 2 * BOARD_MARGIN + BOARD_DIM * (TILE_SZ + TILE_GAP)
+        img = Image.new("RGB", (size, size), COLOR_BG)
+        empty = None if kind == "board" else ""
+        for r in range(BOARD_DIM):
+            for c in range(BOARD_DIM):
+                img.paste(_sprite(kind, premium_map.get((r, c)), empty), _cell_xy(r, c))
+        _backgrounds[kind] = img
+    return img
+
+
+def _reset_render_cache() -> None:
+    """Czyści sprite'y, tła, czcionki i mapę premii (testy, zmiana plansza.csv)."""
+    global _premium_map
+    with _render_lock:
+        _premium_map = None
+        _fonts.clear()
+        _sprites.clear()
+        _backgrounds.clear()
+
+
 def render_scrabble_image(text: str) -> bytes:
     """
     Renderuje tekst jako PNG na planszy Scrabble.
     Każdy znak = jeden kafelek. Zwraca PNG jako bytes.
+
+    Tło planszy i kafelki liter (z punktacją) są sprite'ami rysowanymi raz
+    na proces — tu tylko kopia tła i paste kafelków.
     """
     try:
-        from PIL import Image, ImageDraw
+        from PIL import Image  # noqa: F401
     except ImportError:
         current_app.logger.error("Pillow nie jest zainstalowane!")
         return b""
 
-    tile_sz = 36
-    gap = 2
-    cell = tile_sz + gap
-    margin = 14
-
     # Zawijanie tekstu do wierszy planszy
     chars = list(text)
     rows_chars = []
@@ -139,86 +346,12 @@ def render_scrabble_image(text: str) -> bytes:
         rows_chars.append(chars[:BOARD_DIM])
         chars = chars[BOARD_DIM:]
     rows_chars = rows_chars[:BOARD_DIM]
-    while len(rows_chars) < BOARD_DIM:
-        rows_chars.append([])
-
-    premium_map = _load_premium_map()
-
-    img_w = 2 * margin + BOARD_DIM * cell
-    img_h = 2 * margin + BOARD_DIM * cell
-    img = Image.new("RGB", (img_w, img_h), COLOR_BG)
-    draw = ImageDraw.Draw(img)
-
-    font_letter = _try_font(int(tile_sz * 0.52))
-    font_pts = _try_font(int(tile_sz * 0.24))
-    font_prem = _try_font(int(tile_sz * 0.26))
 
-    for r in range(BOARD_DIM):
-        for c in range(BOARD_DIM):
-            x = margin + c * cell
-            y = margin + r * cell
-            prem = premium_map.get((r, c))
-
-            # Tło pola
-            bg_col = prem[2] if prem else COLOR_BOARD
-            draw.rectangle([x, y, x + tile_sz - 1, y + tile_sz - 1], fill=bg_col)
-            draw.rectangle(
-                [x, y, x + tile_sz - 1, y + tile_sz - 1], outline=COLOR_GRID, width=1
-            )
-
-            row_chars = rows_chars[r]
-            ch = row_chars[c] if c < len(row_chars) else None
-
-            if ch is not None and ch != " ":
-                # Kafelek z literą
-                draw.rectangle(
-                    [x + 1, y + 1, x + tile_sz - 2, y + tile_sz - 2], fill=COLOR_TILE
-                )
-                draw.rectangle(
-                    [x + 1, y + 1, x + tile_sz - 2, y + tile_sz - 2],
-                    outline=(0, 0, 0),
-                    width=1,
-                )
-                # Litera
-                try:
-                    bbox = font_letter.getbbox(ch)
-                    lw = bbox[2] - bbox[0]
-                    lx = x + (tile_sz - lw) // 2 - bbox[0]
-                    ly = y + tile_sz // 10
-                except Exception:
-                    lx, ly = x + tile_sz // 4, y + tile_sz // 10
-                draw.text((lx, ly), ch, font=font_letter, fill=COLOR_TEXT)
-
-                # Wartość w prawym dolnym rogu
-                val_str = str(_tile_value(ch))
-                try:
-                    vbbox = font_pts.getbbox(val_str)
-                    vw = vbbox[2] - vbbox[0]
-                    vh = vbbox[3] - vbbox[1]
-                except Exception:
-                    vw, vh = 8, 8
-                draw.text(
-                    (x + tile_sz - vw - 3, y + tile_sz - vh - 3),
-                    val_str,
-                    font=font_pts,
-                    fill=COLOR_TEXT,
-                )
-
-            elif prem and ch is None:
-                # Etykieta premii na pustym polu
-                label = f"{prem[1]}{prem[0]}"
-                try:
-                    pbbox = font_prem.getbbox(label)
-                    pw = pbbox[2] - pbbox[0]
-                    ph = pbbox[3] - pbbox[1]
-                except Exception:
-                    pw, ph = tile_sz // 2, tile_sz // 2
-                draw.text(
-                    (x + (tile_sz - pw) // 2, y + (tile_sz - ph) // 2),
-                    label,
-                    font=font_prem,
-                    fill=(255, 255, 255),
-                )
+    premium_map = _premium()
+    img = _background("board").copy()
+    for r, row_chars in enumerate(rows_chars):
+        for c, ch in enumerate(row_chars):
+            img.paste(_sprite("board", premium_map.get((r, c)), ch), _cell_xy(r, c))
 
     buf = io.BytesIO()
     img.save(buf, format="PNG")
@@ -248,16 +381,134 @@ class EmailWordSource:
         return [word for word in self.words.keys() if len(word) == length]
 
 
+def _cache_key(words: list[str], width: int, height: int) -> str:
+    klucz = {
+        "v": GENERATOR_VERSION,
+        "size": [width, height],
+        "stop": [CROSSWORD_STALL_ATTEMPTS, CROSSWORD_TARGET_DENSITY],
+        "words": sorted({w.upper() for w in words}),
+    }
+    dane = json.dumps(klucz, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(dane.encode("utf-8")).hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(CROSSWORD_CACHE_DIR, f"{key}.json")
+
+
+def _cache_get(key: str) -> CrosswordGrid | None:
+    """Siatka z cache albo None (brak, wyłączony, uszkodzony wpis)."""
+    if not CROSSWORD_CACHE_DIR:
+        return None
+    try:
+        with open(_cache_path(key), encoding="utf-8") as f:
+            wpis = json.load(f)
+        grid = CrosswordGrid(wpis["width"], wpis["height"])
+        grid.grid = wpis["grid"]
+        grid.placed_words = [
+            (w, r, c, Direction(d), definition) for w, r, c, d, definition in wpis["placed_words"]
+        ]
+        grid.clue_numbers = {(r, c): n for r, c, n in wpis["clue_numbers"]}
+        return grid
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        _log("warning", "[scrabble] Uszkodzony wpis cache krzyżówki %s: %s", key, e)
+        return None
+
+
+def _cache_put(key: str, grid: CrosswordGrid) -> None:
+    if not CROSSWORD_CACHE_DIR or not grid.placed_words:
+        return
+    wpis = {
+        "width": grid.width,
+        "height": grid.height,
+        "grid": grid.grid,
+        "placed_words": [
+            [w, r, c, d.value, definition] for w, r, c, d, definition in grid.placed_words
+        ],
+        "clue_numbers": [[r, c, n] for (r, c), n in grid.clue_numbers.items()],
+    }
+    sciezka = _cache_path(key)
+    tmp = f"{sciezka}.tmp{os.getpid()}.{threading.get_ident()}"
+    with _cache_lock:
+        try:
+            os.makedirs(CROSSWORD_CACHE_DIR, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(wpis, f, ensure_ascii=False)
+            os.replace(tmp, sciezka)
+            _cache_prune()
+        except OSError as e:
+            _log("warning", "[scrabble] Błąd zapisu cache krzyżówki: %s", e)
+
+
+def _cache_prune() -> None:
+    """Usuń najstarsze wpisy ponad CROSSWORD_CACHE_MAX (wołać pod _cache_lock)."""
+    wpisy = [e for e in os.scandir(CROSSWORD_CACHE_DIR) if e.name.endswith(".json")]
+    if len(wpisy) <= CROSSWORD_CACHE_MAX:
+        return
+    wpisy.sort(key=lambda e: e.stat().st_mtime)
+    for e in wpisy[: len(wpisy) - CROSSWORD_CACHE_MAX]:
+        try:
+            os.remove(e.path)
+        except OSError:
+            pass
+
+
+def _log(level: str, msg: str, *args) -> None:
+    """Logger Flaska albo print poza kontekstem aplikacji (benchmarki, testy)."""
+    try:
+        getattr(current_app.logger, level)(msg, *args)
+    except RuntimeError:
+        print(msg % args)
+
+
+def cache_stats() -> dict:
+    """Trafienia cache krzyżówek (do /status)."""
+    hit = CROSSWORD_CACHE.value(outcome="hit")
+    miss = CROSSWORD_CACHE.value(outcome="miss")
+    razem = hit + miss
+    return {
+        "lookups": int(razem),
+        "hit_rate": round(hit / razem, 3) if razem else 0.0,
+        "generations_avoided": int(hit),
+    }
+
+
 def _generate_crossword_grid(
     words: list[str], width: int, height: int
 ) -> CrosswordGrid | None:
     if not words:
         return None
 
+    key = _cache_key(words, width, height)
+    grid = _cache_get(key)
+    if grid is not None:
+        CROSSWORD_CACHE.inc(outcome="hit")
+        _log("info", "[scrabble] Krzyżówka z cache (%s), hit rate %s", key[:12], cache_stats()["hit_rate"])
+        return grid
+    CROSSWORD_CACHE.inc(outcome="miss")
+
     source = EmailWordSource(words)
-    generator = CrosswordGeneratorNew(source)
+    generator = CrosswordGeneratorNew(
+        source, seed=int(CROSSWORD_SEED) if CROSSWORD_SEED else None
+    )
     try:
-        return generator.generate(width, height, time_limit=4.0)
+        grid = generator.generate(
+            width,
+            height,
+            time_limit=CROSSWORD_TIME_LIMIT_SEC,
+            target_density=CROSSWORD_TARGET_DENSITY or None,
+            stall_attempts=CROSSWORD_STALL_ATTEMPTS or None,
+        )
+        stats = generator.last_stats
+        CROSSWORD_CPU_SECONDS.observe(stats["cpu_sec"], stop_reason=stats["stop_reason"])
+        try:
+            current_app.logger.info("[scrabble] Krzyżówka: %s", stats)
+        except RuntimeError:
+            pass
+        _cache_put(key, grid)
+        return grid
     except Exception as e:
         try:
             current_app.logger.warning("_generate_crossword_grid error: %s", e)
@@ -361,84 +612,26 @@ def _build_crossword_html(grid: CrosswordGrid) -> str:
 
 
 def _render_crossword_grid_image(grid: CrosswordGrid) -> bytes:
+    """PNG krzyżówki: kopia pustej planszy + paste czarnych pól i kafelków."""
     try:
-        from PIL import Image, ImageDraw
+        from PIL import Image  # noqa: F401
     except ImportError:
         current_app.logger.error("Pillow nie jest zainstalowane!")
         return b""
 
-    tile_sz = 36
-    gap = 2
-    cell = tile_sz + gap
-    margin = 14
-
-    img_w = 2 * margin + BOARD_DIM * cell
-    img_h = 2 * margin + BOARD_DIM * cell
-    img = Image.new("RGB", (img_w, img_h), COLOR_BG)
-    draw = ImageDraw.Draw(img)
-
-    font_letter = _try_font(int(tile_sz * 0.52))
-    font_pts = _try_font(int(tile_sz * 0.24))
-
+    img = _background("crossword").copy()
     for r in range(BOARD_DIM):
         for c in range(BOARD_DIM):
-            x = margin + c * cell
-            y = margin + r * cell
             cell_value = grid.grid[r][c]
-
-            if cell_value is None:
-                draw.rectangle(
-                    [x, y, x + tile_sz - 1, y + tile_sz - 1], fill=(10, 10, 10)
-                )
-                draw.rectangle(
-                    [x, y, x + tile_sz - 1, y + tile_sz - 1],
-                    outline=COLOR_GRID,
-                    width=1,
-                )
-                continue
-
-            draw.rectangle([x, y, x + tile_sz - 1, y + tile_sz - 1], fill=COLOR_BOARD)
-            draw.rectangle(
-                [x, y, x + tile_sz - 1, y + tile_sz - 1], outline=COLOR_GRID, width=1
-            )
             if cell_value != "":
-                draw.rectangle(
-                    [x + 1, y + 1, x + tile_sz - 2, y + tile_sz - 2], fill=COLOR_TILE
-                )
-                draw.rectangle(
-                    [x + 1, y + 1, x + tile_sz - 2, y + tile_sz - 2],
-                    outline=(0, 0, 0),
-                    width=1,
-                )
-
-                try:
-                    bbox = font_letter.getbbox(cell_value)
-                    lw = bbox[2] - bbox[0]
-                    lx = x + (tile_sz - lw) // 2 - bbox[0]
-                    ly = y + tile_sz // 10
-                except Exception:
-                    lx, ly = x + tile_sz // 4, y + tile_sz // 10
-                draw.text((lx, ly), cell_value, font=font_letter, fill=COLOR_TEXT)
-
-                val_str = str(_tile_value(cell_value))
-                try:
-                    vbbox = font_pts.getbbox(val_str)
-                    vw = vbbox[2] - vbbox[0]
-                    vh = vbbox[3] - vbbox[1]
-                except Exception:
-                    vw, vh = 8, 8
-                draw.text(
-                    (x + tile_sz - vw - 3, y + tile_sz - vh - 3),
-                    val_str,
-                    font=font_pts,
-                    fill=COLOR_TEXT,
-                )
+                img.paste(_sprite("crossword", None, cell_value), _cell_xy(r, c))
 
     buf = io.BytesIO()
     img.save(buf, format="PNG")
     return buf.getvalue()
 
 
+@pipeline_memo.memoize("scrabble", "body")
 def build_scrabble_section(body: str) -> dict:
     """
     Buduje sekcję 'scrabble' odpowiedzi:
@@ -40,6 +40,7 @@ import pandas as pd
 from datetime import date, datetime
 from flask import current_app
 
+from core import budget
 from core.ai_client import call_deepseek, MODEL_TYLER
 from core.hf_token_manager import get_active_tokens, mark_dead, hf_tokens, is_dead
 from core.flux_client import generate_flux_bytes, HfHubHTTPError
@@ -484,13 +485,13 @@ def _generate_flux_image(
         current_app.logger.warning(
             "[smierc-flux] Brak tokenów — warm-up w toku, czekam 5s i próbuję ponownie"
         )
-        time.sleep(5)
+        budget.sleep(5)
         tokens = get_active_tokens()
         if not tokens and not hf_tokens.all_dead():
             current_app.logger.warning(
                 "[smierc-flux] Nadal brak tokenów po 5s — czekam jeszcze 10s"
             )
-            time.sleep(10)
+            budget.sleep(10)
             tokens = get_active_tokens()
 
     if not tokens:
@@ -542,7 +543,7 @@ def _generate_flux_image(
             current_app.logger.info("[flux-attempt] Probuje token: %s", name)
             png_bytes = generate_flux_bytes(
                 prompt, token, seed=seed, steps=HF_STEPS, guidance=HF_GUIDANCE,
-                timeout=TIMEOUT_SEC,
+                timeout=budget.timeout(TIMEOUT_SEC),
             )
 
             attempt["status"] = "SUCCESS"
@@ -651,7 +652,8 @@ def _generate_multiple_flux_images(
     # niezależny od liczby tokenów HF. Bez tego retry-storm na jednym obrazku
     # potrafi zjeść kilka minut i wystawić cały pipeline na SIGTERM w trakcie.
     FLUX_MULTI_BUDGET_SEC = 60.0
-    deadline = time.monotonic() + FLUX_MULTI_BUDGET_SEC
+    # ...i nigdy dłużej niż budżet całej sekcji (core/budget.py)
+    deadline = budget.clamp_deadline(time.monotonic() + FLUX_MULTI_BUDGET_SEC)
 
     images = []
     hf_exhausted = False  # Flaga: wszystkie tokeny martwe, nie próbuj dalej
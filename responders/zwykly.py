@@ -31,12 +31,15 @@ import base64
 import random
 import time
 import logging
+import threading
+from collections import deque
 import requests
 from datetime import datetime
 
 # Bezpieczny logger modułu — działa w wątkach bez kontekstu Flask
 logger = logging.getLogger(__name__)
 
+from core import budget
 from core.logging_reporter import get_logger
 
 execution_logger = get_logger()
@@ -45,9 +48,13 @@ from core.ai_client import (
     call_deepseek,
     extract_clean_text,
     sanitize_model_output,
+    DeepSeekJSONStream,
+    DEEPSEEK_STREAMING,
     MODEL_TYLER,
 )
+from core.metrics import count_deepseek_tokens
 from core.files import read_file_base64
+from core.prompt_layout import zloz_prompt, schemat
 from core.html_builder import build_html_reply
 
 # reportlab — budowanie PDF CV
@@ -150,6 +157,10 @@ from core.config import (
     TYLER_JPG_QUALITY,
     EMOCJA_MAP,
     FALLBACK_EMOT,
+    ZWYKLY_BATCH_ARTEFAKTY,
+    ZWYKLY_BATCH_TOKENY_WYJSCIA,
+    ZWYKLY_BATCH_MAX_TOKENS,
+    ZWYKLY_BATCH_PROBKA_OSOBNO,
 )
 
 from core.hf_token_manager import get_active_tokens, mark_dead, hf_tokens
@@ -694,8 +705,13 @@ def _render_prompt(
     Obsługuje previous_body — poprzednią wiadomość od nadawcy.
     Hard constraints umieszczone NA POCZĄTKU — żeby nie zostały ucięte przy długich emailach.
     sender_name — imię nadawcy przekazane z GAS/webhook (priorytet nad autodetekcją).
+
+    Kolejność pod cache prefiksów (core/prompt_layout.py): wszystkie stałe
+    instrukcje z prompt.json najpierw, treść maila i imię nadawcy na końcu,
+    tuż przed krótkim przypomnieniem.
     """
     lines = []
+    zmienne = []
 
     # ── Hard constraints PIERWSZE — krytyczne zakazy na samym początku ────────
     hard = data.get("hard_constraints", [])
@@ -716,37 +732,6 @@ def _render_prompt(
         lines.append(json.dumps(schema, ensure_ascii=False, indent=2))
         lines.append("")
 
-    # ── Poprzednia wiadomość (jeśli dostępna) ─────────────────────────────────
-    if previous_body and previous_body.strip():
-        lines.append(
-            "### POPRZEDNIA WIADOMOŚĆ OD TEJ OSOBY (Tyler i Sokrates MUSZĄ do niej nawiązać):"
-        )
-        lines.append(previous_body[:2000])
-        lines.append("")
-        # Instrukcja nawiązania z prompt.json
-        poprzednia_instr = data.get("tyler_poprzednia_wiadomosc", "")
-        if poprzednia_instr:
-            lines.append("### INSTRUKCJA NAWIĄZANIA DO POPRZEDNIEJ WIADOMOŚCI:")
-            lines.append(poprzednia_instr)
-            lines.append("")
-
-    # ── Tekst użytkownika ─────────────────────────────────────────────────────
-    lines.append("### OBECNA WIADOMOŚĆ OD NADAWCY (na jej podstawie generuj WSZYSTKO):")
-    lines.append(body)
-    lines.append("")
-    # ── Imię nadawcy — kluczowe! ──────────────────────────────────────────────
-    detected_name = _detect_sender_name(body) or sender_name or ""
-    if detected_name:
-        lines.append("### KRYTYCZNE — IMIĘ NADAWCY TEGO EMAILA:")
-        lines.append(f"Osoba która NAPISAŁA ten email ma na imię: {detected_name}")
-        lines.append(
-            f"Tyler i Sokrates MUSZĄ zwracać się wyłącznie do '{detected_name}' — "
-            f"ZAKAZ zwracania się do innych osób wymienionych w treści emaila "
-            f"(np. jeśli w emailu jest 'Drogi Pawle', to Paweł jest adresatem emaila nadawcy, "
-            f"NIE nadawcą do nas)."
-        )
-        lines.append("")
-
     # ── Sokrates ──────────────────────────────────────────────────────────────
     sokrates = (
         data.get("sokrates_instrukcja")
@@ -819,18 +804,58 @@ def _render_prompt(
             lines.append(fmt)
         lines.append("")
 
-    # ── Końcowe przypomnienie ─────────────────────────────────────────────────
-    lines.append("### PRZYPOMNIENIE PRZED GENEROWANIEM:")
-    lines.append(
-        "Każde zdanie Tylera MUSI nawiązywać do konkretnych słów z wiadomości nadawcy."
+    # ══ Od tego miejsca treść zależy od maila — poza cache prefiksów ══════════
+
+    # ── Poprzednia wiadomość (jeśli dostępna) ─────────────────────────────────
+    if previous_body and previous_body.strip():
+        zmienne.append(
+            "### POPRZEDNIA WIADOMOŚĆ OD TEJ OSOBY (Tyler i Sokrates MUSZĄ do niej nawiązać):"
+        )
+        zmienne.append(previous_body[:2000])
+        zmienne.append("")
+        # Instrukcja nawiązania z prompt.json
+        poprzednia_instr = data.get("tyler_poprzednia_wiadomosc", "")
+        if poprzednia_instr:
+            zmienne.append("### INSTRUKCJA NAWIĄZANIA DO POPRZEDNIEJ WIADOMOŚCI:")
+            zmienne.append(poprzednia_instr)
+            zmienne.append("")
+
+    # ── Tekst użytkownika ─────────────────────────────────────────────────────
+    zmienne.append("### OBECNA WIADOMOŚĆ OD NADAWCY (na jej podstawie generuj WSZYSTKO):")
+    zmienne.append(body)
+    zmienne.append("")
+    # ── Imię nadawcy — kluczowe! ──────────────────────────────────────────────
+    detected_name = _detect_sender_name(body) or sender_name or ""
+    if detected_name:
+        zmienne.append("### KRYTYCZNE — IMIĘ NADAWCY TEGO EMAILA:")
+        zmienne.append(f"Osoba która NAPISAŁA ten email ma na imię: {detected_name}")
+        zmienne.append(
+            f"Tyler i Sokrates MUSZĄ zwracać się wyłącznie do '{detected_name}' — "
+            f"ZAKAZ zwracania się do innych osób wymienionych w treści emaila "
+            f"(np. jeśli w emailu jest 'Drogi Pawle', to Paweł jest adresatem emaila nadawcy, "
+            f"NIE nadawcą do nas)."
+        )
+        zmienne.append("")
+
+    return zloz_prompt(
+        statyczne=["\n".join(lines)],
+        zmienne=["\n".join(zmienne)],
+        zakonczenie=_PRZYPOMNIENIE_ODPOWIEDZI,
     )
-    lines.append("ZAKAZ ogólnych rad, coachingu, pozytywnego myślenia, pocieszania.")
-    lines.append("ZASADA 1 I ZASADA 2 MUSZĄ BYĆ IDENTYCZNE SŁOWO W SŁOWO.")
-    lines.append("ADRESAT: ZAKAZ 'Drogi/Droga' — tylko forma wołacza jak w instrukcji.")
-    lines.append("Zwróć WYŁĄCZNIE poprawny JSON bez żadnego tekstu poza klamrami.")
-    lines.append("")
 
-    return "\n".join(lines)
+
+# Końcowe przypomnienie — stałe, ale celowo PO treści maila (model czyta je
+# tuż przed generowaniem). Kilkadziesiąt tokenów poza cache to akceptowalny koszt.
+_PRZYPOMNIENIE_ODPOWIEDZI = "\n".join(
+    [
+        "### PRZYPOMNIENIE PRZED GENEROWANIEM:",
+        "Każde zdanie Tylera MUSI nawiązywać do konkretnych słów z wiadomości nadawcy.",
+        "ZAKAZ ogólnych rad, coachingu, pozytywnego myślenia, pocieszania.",
+        "ZASADA 1 I ZASADA 2 MUSZĄ BYĆ IDENTYCZNE SŁOWO W SŁOWO.",
+        "ADRESAT: ZAKAZ 'Drogi/Droga' — tylko forma wołacza jak w instrukcji.",
+        "Zwróć WYŁĄCZNIE poprawny JSON bez żadnego tekstu poza klamrami.",
+    ]
+)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -839,14 +864,17 @@ def _render_prompt(
 
 
 def _call_ai_with_fallback(
-    system: str, user: str, max_tokens: int = 6000
+    system: str, user: str, max_tokens: int = 6000, szablon: str = None
 ) -> tuple[str | None, str]:
     """
     DeepSeek jako główny model.
     Zwraca (tekst_odpowiedzi, nazwa_providera).
+    szablon — nazwa w statystykach cache prefiksów (core/metrics.py).
     """
     # Używa tylko DeepSeek
-    result = call_deepseek(system, user, MODEL_TYLER, max_tokens=max_tokens)
+    result = call_deepseek(
+        system, user, MODEL_TYLER, max_tokens=max_tokens, szablon=szablon
+    )
     try:
         execution_logger.log_ai_response(
             "deepseek",
@@ -1111,9 +1139,10 @@ def _extract_nouns_deepseek(body: str) -> dict:
     user_prefix = cfg.get("user_prefix", "Wypisz WSZYSTKIE rzeczowniki z tekstu:\n")
     max_tokens = cfg.get("max_tokens", 3000)
     temperature = cfg.get("temperature", 0.1)
-    user_msg = user_prefix + (body or "")
+    # Stały prefiks instrukcji, mail na końcu — pod cache prefiksów
+    user_msg = zloz_prompt(statyczne=[user_prefix], zmienne=[body or ""])
 
-    raw = call_deepseek(system_msg, user_msg, MODEL_TYLER)
+    raw = call_deepseek(system_msg, user_msg, MODEL_TYLER, szablon="zwykly_rzeczowniki")
 
     if not raw:
         logger.error("[rzeczowniki] Brak odpowiedzi od AI")
@@ -1160,6 +1189,32 @@ def _extract_nouns_deepseek(body: str) -> dict:
         return {}
 
 
+def _append_raport_timings_to_debug_txt(debug_txt_dict: dict, timings: list) -> dict:
+    """
+    Dopisuje rozbicie czasów sekcji raportu psychiatrycznego na końcu _.txt.
+    Zwraca zaktualizowany dict debug_txt.
+    """
+    if not debug_txt_dict or not timings:
+        return debug_txt_dict
+    try:
+        existing = base64.b64decode(debug_txt_dict["base64"]).decode("utf-8")
+        lines = [
+            "",
+            "---------------------------------------------",
+            "RAPORT PSYCHIATRYCZNY — CZASY SEKCJI (graf zależności)",
+            "---------------------------------------------",
+        ]
+        lines += list(timings)
+        lines.append("")
+        appended = existing + "\n".join(lines)
+        debug_txt_dict["base64"] = base64.b64encode(appended.encode("utf-8")).decode(
+            "ascii"
+        )
+    except Exception as e:
+        logger.warning("[psych-raport] Błąd dopisywania czasów do _.txt: %s", e)
+    return debug_txt_dict
+
+
 def _append_nouns_to_debug_txt(debug_txt_dict: dict, nouns_dict: dict) -> dict:
     """
     Dopisuje listę rzeczowników na końcu pliku _.txt (base64).
@@ -2158,7 +2213,7 @@ def _generate_flux_image(
             sleep_for = delay
             if deadline is not None:
                 sleep_for = max(0.0, min(delay, deadline - time.monotonic()))
-            time.sleep(sleep_for)
+            budget.sleep(sleep_for)
             delay = min(delay * 1.6, BACKOFF_CAP)
         try:
             logger.info("[flux-tyler] Próbuję token: %s", name)
@@ -2168,7 +2223,7 @@ def _generate_flux_image(
                 seed=seed,
                 steps=HF_STEPS,
                 guidance=HF_GUIDANCE,
-                timeout=HF_TIMEOUT,
+                timeout=budget.timeout(HF_TIMEOUT),
             )
             logger.info(
                 "[flux-tyler] ✓ Token %s: sukces (PNG %d B)",
@@ -2329,16 +2384,8 @@ def _generate_raw_email_image(body: str, test_mode: bool = False) -> dict | None
         return img
 
 
-def _generate_triptych_prompts_batch(
-    panel_rules: list,
-    session_vars: dict,
-    style_config: dict,
-) -> list:
-    """
-    Generuje prompty FLUX dla wszystkich 7 paneli w JEDNYM wywołaniu DeepSeek.
-    Zamiast 7 osobnych calli → 1 call zwracający JSON z 7 promptami.
-    Zwraca listę 7 stringów (promptów), fallback na puste stringi.
-    """
+def _triptych_batch_msgs(panel_rules: list, session_vars: dict) -> tuple[str, str]:
+    """(system, user) zapytania o 7 promptów FLUX — wspólne dla trybu zwykłego i strumienia."""
     w = _load_panel_wytyczne()
     nouns_str = session_vars.get("USER_OBJECTS", "") or "debris, broken furniture, ash"
     panel_style = random.choice(
@@ -2367,8 +2414,23 @@ def _generate_triptych_prompts_batch(
         f"7 Tyler Durden Rules:\n{zasady_str}\n\n"
         "Generate exactly 7 FLUX prompts as JSON array under key 'prompts'."
     )
+    return system_batch, user_batch
 
-    raw, prov = _call_ai_with_fallback(system_batch, user_batch, max_tokens=2000)
+
+def _generate_triptych_prompts_batch(
+    panel_rules: list,
+    session_vars: dict,
+    style_config: dict,
+) -> list:
+    """
+    Generuje prompty FLUX dla wszystkich 7 paneli w JEDNYM wywołaniu DeepSeek.
+    Zamiast 7 osobnych calli → 1 call zwracający JSON z 7 promptami.
+    Zwraca listę 7 stringów (promptów), fallback na puste stringi.
+    """
+    system_batch, user_batch = _triptych_batch_msgs(panel_rules, session_vars)
+    raw, prov = _call_ai_with_fallback(
+        system_batch, user_batch, max_tokens=2000, szablon="zwykly_tryptyk_prompty"
+    )
     logger.info("[tryptyk-batch] Call %s → %d znaków odpowiedzi", prov, len(raw or ""))
 
     if not raw:
@@ -2420,6 +2482,43 @@ def _generate_triptych_prompts_batch(
     return lines[:7]
 
 
+class _StreamowanePromptyTryptyku:
+    """
+    Zamiennik listy promptów z _generate_triptych_prompts_batch dla trybu
+    DEEPSEEK_STREAMING: [i] czeka tylko na i-ty prompt ze strumienia, więc
+    panel 1 idzie do FLUX, zanim DeepSeek skończy pisać panel 7.
+    Gdy strumień padnie bez żadnego promptu — jedno zwykłe zapytanie.
+    """
+
+    TIMEOUT_PROMPTU_SEC = 60.0
+
+    def __init__(self, panel_rules: list, session_vars: dict, style_config: dict):
+        system_batch, user_batch = _triptych_batch_msgs(panel_rules, session_vars)
+        self._args = (panel_rules, session_vars, style_config)
+        self._fallback = None
+        self.stream = DeepSeekJSONStream(
+            system_batch,
+            user_batch,
+            MODEL_TYLER,
+            klucz_listy="prompts",
+            max_tokens=2000,
+            szablon="zwykly_tryptyk_prompty",
+        ).start()
+
+    def __getitem__(self, i: int) -> str:
+        if self._fallback is not None:
+            return self._fallback[i]
+        item = self.stream.get(i, timeout=self.TIMEOUT_PROMPTU_SEC)
+        if item is None and not self.stream.items and self.stream.wait(0):
+            logger.warning(
+                "[tryptyk-stream] Strumień bez promptów (%s) — zwykłe zapytanie",
+                self.stream.blad or "brak JSON",
+            )
+            self._fallback = _generate_triptych_prompts_batch(*self._args)
+            return self._fallback[i]
+        return str(item or "")[:500]
+
+
 def _generate_triptych(
     response_text: str,
     prompt_data: dict,
@@ -2508,10 +2607,16 @@ def _generate_triptych(
         return [], [], []
 
     # ── 1 CALL: Generuj wszystkie 7 promptów naraz ───────────────────────────
-    logger.info("[zwykly-img] Generuję 7 promptów FLUX w 1 callu DeepSeek")
-    flux_prompts = _generate_triptych_prompts_batch(
-        panel_rules, session_vars, style_config
-    )
+    if DEEPSEEK_STREAMING:
+        logger.info("[zwykly-img] Strumieniuję 7 promptów FLUX — panel 1 rusza od razu")
+        flux_prompts = _StreamowanePromptyTryptyku(
+            panel_rules, session_vars, style_config
+        )
+    else:
+        logger.info("[zwykly-img] Generuję 7 promptów FLUX w 1 callu DeepSeek")
+        flux_prompts = _generate_triptych_prompts_batch(
+            panel_rules, session_vars, style_config
+        )
 
     # ── Generuj obrazki SEKWENCYJNIE (budżet czasowy zamiast równoległości) ──
     # UWAGA / HISTORIA BŁĘDU: pierwotnie tu był tylko komentarz "równolegle"
@@ -2529,7 +2634,8 @@ def _generate_triptych(
     # równoległych requestów do HF.
     PANEL_GLOBAL_BUDGET_SEC = 75.0  # twardy limit na wszystkie 7 paneli łącznie
 
-    deadline = time.monotonic() + PANEL_GLOBAL_BUDGET_SEC
+    # ...i nigdy dłużej niż budżet całej sekcji (core/budget.py)
+    deadline = budget.clamp_deadline(time.monotonic() + PANEL_GLOBAL_BUDGET_SEC)
 
     def _gen_panel(panel_idx):
         rule_text = panel_rules[panel_idx - 1]
@@ -2600,6 +2706,13 @@ def _generate_triptych(
             images.append(img)
 
     logger.info("[zwykly-img] Wygenerowano %d/7 paneli", len(images))
+    if isinstance(flux_prompts, _StreamowanePromptyTryptyku):
+        st = flux_prompts.stream.staty
+        logger.info(
+            "[tryptyk-stream] pierwszy token %ss | pierwszy prompt %ss | całość %ss | %d promptów",
+            st["ttft_sec"], st["ttfi_sec"], st["total_sec"], st["items"],
+        )
+        execution_logger.log_debug_info("DEEPSEEK_STREAM_TRYPTYK", st)
     return images, panel_prompts, panel_assignments
 
 
@@ -3718,12 +3831,8 @@ def _build_cv_pdf(cv_data: dict, photo_b64: str | None) -> str | None:
     }
 
 
-def _build_explanation_txt(res_text: str, body: str) -> dict | None:
-    """
-    Generuje plik wyjaśnienie.txt — DeepSeek tłumaczy każde zdanie
-    Tylera i Sokratesa prostym językiem po polsku.
-    Zwraca dict {base64, content_type, filename} lub None przy błędzie.
-    """
+def _spec_wyjasnienie(body: str, res_text: str) -> dict | None:
+    """Prompt wyjaśnienia (tekst, nie JSON) — patrz _ARTEFAKTY_BATCH."""
     if not res_text or not res_text.strip():
         return None
 
@@ -3738,12 +3847,46 @@ def _build_explanation_txt(res_text: str, body: str) -> dict | None:
         "Nie używaj markdownu. Tylko czysty tekst."
     )
 
-    user_msg = (
-        f"Email który otrzymał program (kontekst):\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-        f"Odpowiedź do wyjaśnienia:\n{res_text}"
+    user_msg = zloz_prompt(
+        statyczne=[],
+        zmienne=[
+            ("Email który otrzymał program (kontekst)", body[:MAX_DLUGOSC_EMAIL]),
+            ("Odpowiedź do wyjaśnienia", res_text),
+        ],
     )
+    return {
+        "system": system_msg,
+        "user": user_msg,
+        "instrukcje": (
+            "Zwróć obiekt {\"tekst\": \"<całe wyjaśnienie>\"}. "
+            "W polu tekst: czysty tekst, bez markdownu, akapity oddzielone \\n."
+        ),
+        "max_tokens": 3000,
+        "json": False,
+        "szablon": "zwykly_wyjasnienie",
+    }
 
-    raw, provider = _call_ai_with_fallback(system_msg, user_msg, max_tokens=3000)
+
+def _build_explanation_txt(
+    res_text: str, body: str, raw: str | None = None
+) -> dict | None:
+    """
+    Generuje plik wyjaśnienie.txt — DeepSeek tłumaczy każde zdanie
+    Tylera i Sokratesa prostym językiem po polsku.
+    raw — tekst pobrany wcześniej zapytaniem zbiorczym (pomija własne wywołanie AI).
+    Zwraca dict {base64, content_type, filename} lub None przy błędzie.
+    """
+    spec = _spec_wyjasnienie(body, res_text)
+    if spec is None:
+        return None
+
+    if raw is None:
+        raw, provider = _call_ai_with_fallback(
+            spec["system"], spec["user"], max_tokens=spec["max_tokens"],
+            szablon=spec["szablon"],
+        )
+    else:
+        provider = "deepseek (zbiorczo)"
 
     if not raw or not raw.strip():
         logger.warning("[zwykly] Brak wyjaśnienia od AI")
@@ -3777,28 +3920,54 @@ def _build_explanation_txt(res_text: str, body: str) -> dict | None:
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
-def _build_ankieta(res_text: str, body: str) -> tuple[dict | None, dict | None]:
-    """
-    Generuje ankietę wiedzy o odpowiedzi Tylera.
-    Zwraca (html_dict, pdf_dict) lub (None, None) przy błędzie.
-    """
+def _spec_ankieta(body: str, res_text: str) -> dict | None:
+    """Prompt ankiety — patrz _ARTEFAKTY_BATCH."""
     try:
         with open(ANKIETA_JSON_PATH, encoding="utf-8") as f:
             cfg = json.load(f)
     except Exception as e:
         logger.warning("[ankieta] Brak JSON: %s", e)
-        return None, None
+        return None
 
-    system_msg = cfg.get("system", "")
     schema = cfg.get("output_schema", {})
-    user_msg = (
-        f"Odpowiedź Tylera do nadawcy:\n{res_text}\n\n"
-        f"Email nadawcy (kontekst):\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-        f"SCHEMAT JSON — użyj DOKŁADNIE tych kluczy:\n{__import__('json').dumps(schema, ensure_ascii=False, indent=2)}\n\n"
+    instrukcje = (
+        f"SCHEMAT JSON — użyj DOKŁADNIE tych kluczy:\n{schemat(schema)}\n\n"
         f"Zwróć TYLKO czysty JSON. Klucz listy pytań MUSI być 'pytania'."
     )
+    user_msg = zloz_prompt(
+        statyczne=[instrukcje],
+        zmienne=[
+            ("Odpowiedź Tylera do nadawcy", res_text),
+            ("Email nadawcy (kontekst)", body[:MAX_DLUGOSC_EMAIL]),
+        ],
+    )
+    return {
+        "system": cfg.get("system", ""),
+        "user": user_msg,
+        "instrukcje": instrukcje,
+        "max_tokens": 4500,
+        "json": True,
+        "szablon": "zwykly_ankieta",
+    }
 
-    raw = call_deepseek(_js(system_msg), _ju(user_msg), MODEL_TYLER, max_tokens=4500)
+
+def _build_ankieta(
+    res_text: str, body: str, raw: str | None = None
+) -> tuple[dict | None, dict | None]:
+    """
+    Generuje ankietę wiedzy o odpowiedzi Tylera.
+    raw — JSON pobrany wcześniej zapytaniem zbiorczym (pomija własne wywołanie AI).
+    Zwraca (html_dict, pdf_dict) lub (None, None) przy błędzie.
+    """
+    spec = _spec_ankieta(body, res_text)
+    if spec is None:
+        return None, None
+
+    if raw is None:
+        raw = call_deepseek(
+            _js(spec["system"]), _ju(spec["user"]), MODEL_TYLER,
+            max_tokens=spec["max_tokens"], szablon=spec["szablon"],
+        )
 
     if not raw:
         logger.warning("[ankieta] Brak danych od AI")
@@ -4104,8 +4273,8 @@ function sprawdz() {{
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
-def _build_horoskop(body: str, res_text: str) -> dict | None:
-    """Generuje horoskop nihilistyczny na 7 dni w stylu gazety lat 60."""
+def _spec_horoskop(body: str, res_text: str) -> dict | None:
+    """Prompt horoskopu — patrz _ARTEFAKTY_BATCH."""
     try:
         with open(HOROSKOP_JSON_PATH, encoding="utf-8") as f:
             cfg = json.load(f)
@@ -4122,18 +4291,47 @@ def _build_horoskop(body: str, res_text: str) -> dict | None:
         for i in range(7)
     ]
 
-    system_msg = cfg.get("system", "")
     schema = cfg.get("output_schema", {})
     daty_str = "\n".join(f"Dzień {i + 1} ({d})" for i, d in enumerate(daty))
-    user_msg = (
-        f"Email nadawcy:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-        f"Odpowiedź Tylera (kontekst):\n{res_text[:MAX_DLUGOSC_EMAIL]}\n\n"
-        f"WAŻNE: W polu 'data' każdego dnia użyj DOKŁADNIE tych dat:\n{daty_str}\n\n"
-        f"SCHEMAT JSON — użyj DOKŁADNIE tych kluczy:\n{json.dumps(schema, ensure_ascii=False, indent=2)}\n\n"
+    instrukcje = (
+        f"SCHEMAT JSON — użyj DOKŁADNIE tych kluczy:\n{schemat(schema)}\n\n"
         f"Zwróć TYLKO czysty JSON. Klucz listy dni MUSI być 'dni'."
     )
+    # Daty zmieniają się codziennie — idą do części zmiennej, nie do instrukcji
+    dane = f"WAŻNE: W polu 'data' każdego dnia użyj DOKŁADNIE tych dat:\n{daty_str}"
+    user_msg = zloz_prompt(
+        statyczne=[instrukcje],
+        zmienne=[
+            ("Email nadawcy", body[:MAX_DLUGOSC_EMAIL]),
+            ("Odpowiedź Tylera (kontekst)", res_text[:MAX_DLUGOSC_EMAIL]),
+            dane,
+        ],
+    )
+    return {
+        "system": cfg.get("system", ""),
+        "user": user_msg,
+        "instrukcje": instrukcje,
+        "dane": dane,
+        "max_tokens": 4000,
+        "json": True,
+        "szablon": "zwykly_horoskop",
+    }
+
+
+def _build_horoskop(body: str, res_text: str, raw: str | None = None) -> dict | None:
+    """
+    Generuje horoskop nihilistyczny na 7 dni w stylu gazety lat 60.
+    raw — JSON pobrany wcześniej zapytaniem zbiorczym (pomija własne wywołanie AI).
+    """
+    spec = _spec_horoskop(body, res_text)
+    if spec is None:
+        return None
 
-    raw = call_deepseek(_js(system_msg), _ju(user_msg), MODEL_TYLER, max_tokens=4000)
+    if raw is None:
+        raw = call_deepseek(
+            _js(spec["system"]), _ju(spec["user"]), MODEL_TYLER,
+            max_tokens=spec["max_tokens"], szablon=spec["szablon"],
+        )
     if not raw:
         return None
 
@@ -4321,8 +4519,8 @@ def _build_horoskop(body: str, res_text: str) -> dict | None:
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
-def _build_karta_rpg(body: str, res_text: str) -> dict | None:
-    """Generuje kartę postaci RPG."""
+def _spec_karta_rpg(body: str, res_text: str) -> dict | None:
+    """Prompt karty RPG — patrz _ARTEFAKTY_BATCH."""
     try:
         with open(KARTA_RPG_JSON_PATH, encoding="utf-8") as f:
             cfg = json.load(f)
@@ -4330,16 +4528,42 @@ def _build_karta_rpg(body: str, res_text: str) -> dict | None:
         logger.warning("[karta-rpg] Brak JSON: %s", e)
         return None
 
-    system_msg = cfg.get("system", "")
     schema = cfg.get("output_schema", {})
-    user_msg = (
-        f"Email:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-        f"Odpowiedź Tylera:\n{res_text[:MAX_DLUGOSC_EMAIL]}\n\n"
-        f"SCHEMAT JSON — użyj DOKŁADNIE tych polskich kluczy:\n{__import__('json').dumps(schema, ensure_ascii=False, indent=2)}\n\n"
+    instrukcje = (
+        f"SCHEMAT JSON — użyj DOKŁADNIE tych polskich kluczy:\n{schemat(schema)}\n\n"
         f"Zwróć TYLKO czysty JSON. ZAKAZ angielskich kluczy (name/stats/age) — używaj nazwa_postaci/statystyki."
     )
+    user_msg = zloz_prompt(
+        statyczne=[instrukcje],
+        zmienne=[
+            ("Email", body[:MAX_DLUGOSC_EMAIL]),
+            ("Odpowiedź Tylera", res_text[:MAX_DLUGOSC_EMAIL]),
+        ],
+    )
+    return {
+        "system": cfg.get("system", ""),
+        "user": user_msg,
+        "instrukcje": instrukcje,
+        "max_tokens": 3500,
+        "json": True,
+        "szablon": "zwykly_karta_rpg",
+    }
 
-    raw = call_deepseek(_js(system_msg), _ju(user_msg), MODEL_TYLER, max_tokens=3500)
+
+def _build_karta_rpg(body: str, res_text: str, raw: str | None = None) -> dict | None:
+    """
+    Generuje kartę postaci RPG.
+    raw — JSON pobrany wcześniej zapytaniem zbiorczym (pomija własne wywołanie AI).
+    """
+    spec = _spec_karta_rpg(body, res_text)
+    if spec is None:
+        return None
+
+    if raw is None:
+        raw = call_deepseek(
+            _js(spec["system"]), _ju(spec["user"]), MODEL_TYLER,
+            max_tokens=spec["max_tokens"], szablon=spec["szablon"],
+        )
     if not raw:
         logger.warning("[karta-rpg] Brak odpowiedzi od AI")
         return None
@@ -4651,7 +4875,7 @@ def _generate_psychiatric_photo(
                 guidance=hf_params.get("guidance_scale", 3.0),
                 width=hf_params.get("width", 768),
                 height=hf_params.get("height", 1024),
-                timeout=HF_TIMEOUT,
+                timeout=budget.timeout(HF_TIMEOUT),
             )
             logger.info("[psych-photo] FLUX OK token=%s (%d B)", name, len(raw_img))
             break
@@ -5031,8 +5255,8 @@ def _build_raport_psychiatryczny(
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
-def _build_plakat_svg(res_text: str, body: str) -> dict | None:
-    """Generuje plakat motywacyjny SVG."""
+def _spec_plakat(body: str, res_text: str) -> dict | None:
+    """Prompt plakatu — patrz _ARTEFAKTY_BATCH."""
     try:
         with open(PLAKAT_JSON_PATH, encoding="utf-8") as f:
             cfg = json.load(f)
@@ -5040,15 +5264,42 @@ def _build_plakat_svg(res_text: str, body: str) -> dict | None:
         logger.warning("[plakat] Brak JSON: %s", e)
         return None
 
-    system_msg = cfg.get("system", "")
     schema = cfg.get("output_schema", {})
-    user_msg = (
-        f"Odpowiedź Tylera:\n{res_text[:MAX_DLUGOSC_EMAIL]}\n\nEmail:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-        f"SCHEMAT JSON — użyj DOKŁADNIE tych kluczy na GÓRNYM POZIOMIE:\n{__import__('json').dumps(schema, ensure_ascii=False, indent=2)}\n\n"
+    instrukcje = (
+        f"SCHEMAT JSON — użyj DOKŁADNIE tych kluczy na GÓRNYM POZIOMIE:\n{schemat(schema)}\n\n"
         f"Zwróć TYLKO czysty JSON. KLUCZ glowne_zdanie MUSI być na górnym poziomie — nie zagnieżdżaj w 'plakat'."
     )
+    user_msg = zloz_prompt(
+        statyczne=[instrukcje],
+        zmienne=[
+            ("Odpowiedź Tylera", res_text[:MAX_DLUGOSC_EMAIL]),
+            ("Email", body[:MAX_DLUGOSC_EMAIL]),
+        ],
+    )
+    return {
+        "system": cfg.get("system", ""),
+        "user": user_msg,
+        "instrukcje": instrukcje,
+        "max_tokens": 3000,
+        "json": True,
+        "szablon": "zwykly_plakat",
+    }
+
 
-    raw = call_deepseek(_js(system_msg), _ju(user_msg), MODEL_TYLER)
+def _build_plakat_svg(res_text: str, body: str, raw: str | None = None) -> dict | None:
+    """
+    Generuje plakat motywacyjny SVG.
+    raw — JSON pobrany wcześniej zapytaniem zbiorczym (pomija własne wywołanie AI).
+    """
+    spec = _spec_plakat(body, res_text)
+    if spec is None:
+        return None
+
+    if raw is None:
+        raw = call_deepseek(
+            _js(spec["system"]), _ju(spec["user"]), MODEL_TYLER,
+            max_tokens=spec["max_tokens"], szablon=spec["szablon"],
+        )
     if not raw:
         logger.warning("[plakat] Brak odpowiedzi od AI")
         return None
@@ -5329,8 +5580,8 @@ def _build_flow_diagram_svg(exec_logger) -> dict | None:
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
-def _build_gra_html(body: str, res_text: str) -> dict | None:
-    """Generuje grę interaktywną HTML z wyborami Tylera."""
+def _spec_gra(body: str, res_text: str) -> dict | None:
+    """Prompt gry HTML — patrz _ARTEFAKTY_BATCH."""
     try:
         with open(GRA_JSON_PATH, encoding="utf-8") as f:
             cfg = json.load(f)
@@ -5338,17 +5589,43 @@ def _build_gra_html(body: str, res_text: str) -> dict | None:
         logger.warning("[gra] Brak JSON: %s", e)
         return None
 
-    system_msg = cfg.get("system", "")
     schema = cfg.get("output_schema", {})
-    user_msg = (
-        f"Email:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-        f"Odpowiedź Tylera:\n{res_text[:MAX_DLUGOSC_EMAIL]}\n\n"
-        f"SCHEMAT JSON — użyj DOKŁADNIE tych kluczy:\n{__import__('json').dumps(schema, ensure_ascii=False, indent=2)}\n\n"
+    instrukcje = (
+        f"SCHEMAT JSON — użyj DOKŁADNIE tych kluczy:\n{schemat(schema)}\n\n"
         f"Zwróć TYLKO czysty JSON. Klucz listy pytań MUSI być 'pytania'."
     )
+    user_msg = zloz_prompt(
+        statyczne=[instrukcje],
+        zmienne=[
+            ("Email", body[:MAX_DLUGOSC_EMAIL]),
+            ("Odpowiedź Tylera", res_text[:MAX_DLUGOSC_EMAIL]),
+        ],
+    )
+    return {
+        "system": cfg.get("system", ""),
+        "user": user_msg,
+        "instrukcje": instrukcje,
+        # max_tokens=4000 — zwiększone, 10 pytań × ~200 tokenów = min 3500 potrzebnych
+        "max_tokens": 4000,
+        "json": True,
+        "szablon": "zwykly_gra",
+    }
+
+
+def _build_gra_html(body: str, res_text: str, raw: str | None = None) -> dict | None:
+    """
+    Generuje grę interaktywną HTML z wyborami Tylera.
+    raw — JSON pobrany wcześniej zapytaniem zbiorczym (pomija własne wywołanie AI).
+    """
+    spec = _spec_gra(body, res_text)
+    if spec is None:
+        return None
 
-    # max_tokens=4000 — zwiększone, 10 pytań × ~200 tokenów = min 3500 potrzebnych
-    raw = call_deepseek(_js(system_msg), _ju(user_msg), MODEL_TYLER, max_tokens=4000)
+    if raw is None:
+        raw = call_deepseek(
+            _js(spec["system"]), _ju(spec["user"]), MODEL_TYLER,
+            max_tokens=spec["max_tokens"], szablon=spec["szablon"],
+        )
     if not raw:
         logger.warning("[gra] Brak odpowiedzi od AI")
         return None
@@ -5582,6 +5859,281 @@ function pokazWynik() {{
     return _to_zip(html.encode("utf-8"), f"gra_{ts}.html", f"gra_{ts}.zip")
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# ZAPYTANIA ZBIORCZE — małe artefakty jednym wywołaniem DeepSeek
+# ═══════════════════════════════════════════════════════════════════════════════
+# Każdy _spec_* zwraca {system, user, instrukcje, max_tokens, json}:
+#   user       — pełny prompt osobnego wywołania (email + odpowiedź + instrukcje)
+#   instrukcje — sam schemat/wymagania, bez emaila — trafia do promptu zbiorczego
+_ARTEFAKTY_BATCH = {
+    "ankieta": _spec_ankieta,
+    "horoskop": _spec_horoskop,
+    "karta_rpg": _spec_karta_rpg,
+    "plakat": _spec_plakat,
+    "gra": _spec_gra,
+    "wyjasnienie": _spec_wyjasnienie,
+}
+
+_BATCH_SYSTEM = (
+    "Przygotowujesz naraz kilka NIEZALEŻNYCH dokumentów dla tego samego nadawcy. "
+    "Każde zadanie ma własną ROLĘ i własny schemat — trzymaj się ich osobno "
+    "i nie mieszaj treści ani kluczy między zadaniami."
+)
+
+# Ostatnie osobne budowania artefaktu: (czas AI + render, tokeny wejścia,
+# tokeny wyjścia) — baza do oszczędności trybu zbiorczego. Wspólne dla procesu;
+# wypełniają je artefakty spoza batcha i pipeline'y-próbki
+# (ZWYKLY_BATCH_PROBKA_OSOBNO), które budują wszystko osobno.
+_CZASY_OSOBNO: dict[str, deque] = {}
+_CZASY_OSOBNO_LOCK = threading.Lock()
+
+
+def _probka_osobno() -> bool:
+    """Czy ten pipeline buduje artefakty osobno — próbka bazy porównawczej."""
+    return random.random() < ZWYKLY_BATCH_PROBKA_OSOBNO
+
+
+def _znaki_osobno(spec: dict) -> int:
+    """Ile znaków wysłałoby osobne wywołanie dla danego spec."""
+    if spec.get("json"):
+        return len(_js(spec["system"])) + len(_ju(spec["user"]))
+    return len(spec["system"]) + len(spec["user"])
+
+
+def _grupy_batch(nazwy: list[str]) -> list[list[str]]:
+    """
+    Dzieli artefakty na grupy, których szacowana odpowiedź mieści się
+    w ZWYKLY_BATCH_MAX_TOKENS. Kolejność artefaktów jest zachowana.
+    """
+    grupy: list[list[str]] = []
+    biezaca: list[str] = []
+    suma = 0
+    for nazwa in nazwy:
+        tokeny = ZWYKLY_BATCH_TOKENY_WYJSCIA.get(nazwa, 2000)
+        if biezaca and suma + tokeny > ZWYKLY_BATCH_MAX_TOKENS:
+            grupy.append(biezaca)
+            biezaca, suma = [], 0
+        biezaca.append(nazwa)
+        suma += tokeny
+    if biezaca:
+        grupy.append(biezaca)
+    return grupy
+
+
+def _nowe_staty_batch() -> dict:
+    return {
+        "wywolania": 0,
+        "znaki_wejscia": 0,
+        "znaki_wejscia_osobno": 0,
+        "tokeny_wejscia": 0,
+        "tokeny_wyjscia": 0,
+        "czas_sec": 0.0,
+        "czas_osobno_szac_sec": 0.0,
+        "tokeny_wejscia_osobno_szac": 0,
+        "tokeny_wyjscia_osobno_szac": 0,
+        "czas_osobno_kompletny": True,
+        "probka_osobno": False,
+        "z_batcha": [],
+        "ponowione": [],
+        "osobno": [],
+    }
+
+
+def _buduj_prompt_zbiorczy(body: str, res_text: str, specs: dict) -> str:
+    klucze = ", ".join(f'"{n}"' for n in specs)
+    zadania = [
+        f'=== ZADANIE "{nazwa}" ===\nROLA:\n{spec["system"]}\n\n{spec["instrukcje"]}'
+        for nazwa, spec in specs.items()
+    ]
+    dane = [
+        (f'DANE DO ZADANIA "{nazwa}"', spec.get("dane"))
+        for nazwa, spec in specs.items()
+    ]
+    return zloz_prompt(
+        statyczne=[
+            f"Zwróć JEDEN obiekt JSON z kluczami najwyższego poziomu: {klucze}. "
+            f"Wartość każdego klucza to kompletny wynik odpowiedniego zadania.",
+            *zadania,
+        ],
+        zmienne=[
+            ("Email nadawcy", body[:MAX_DLUGOSC_EMAIL]),
+            ("Odpowiedź Tylera", res_text[:MAX_DLUGOSC_EMAIL]),
+            *dane,
+        ],
+    )
+
+
+def _pobierz_zbiorczo(body: str, res_text: str, staty: dict) -> dict[str, str]:
+    """
+    Wysyła zapytania zbiorcze dla artefaktów włączonych w ZWYKLY_BATCH_ARTEFAKTY.
+    Zwraca {nazwa: surowy fragment} — walidację każdego fragmentu robi
+    jego builder, więc tu tylko wycinamy poddrzewo spod klucza artefaktu.
+    """
+    nazwy = [n for n in _ARTEFAKTY_BATCH if ZWYKLY_BATCH_ARTEFAKTY.get(n)]
+    wynik: dict[str, str] = {}
+    for grupa in _grupy_batch(nazwy):
+        specs = {n: _ARTEFAKTY_BATCH[n](body, res_text) for n in grupa}
+        specs = {n: spec for n, spec in specs.items() if spec}
+        if len(specs) < 2:
+            # Jednoelementowa grupa nic nie oszczędza — builder zapyta sam
+            continue
+
+        system_msg = _js(_BATCH_SYSTEM)
+        user_msg = _ju(_buduj_prompt_zbiorczy(body, res_text, specs))
+        staty["wywolania"] += 1
+        staty["znaki_wejscia"] += len(system_msg) + len(user_msg)
+        staty["znaki_wejscia_osobno"] += sum(_znaki_osobno(sp) for sp in specs.values())
+
+        t0 = time.monotonic()
+        with count_deepseek_tokens() as tokeny:
+            raw = call_deepseek(
+                system_msg, user_msg, MODEL_TYLER, max_tokens=ZWYKLY_BATCH_MAX_TOKENS,
+                szablon="zwykly_batch_" + "+".join(specs),
+            )
+        staty["czas_sec"] += time.monotonic() - t0
+        _dolicz_tokeny(staty, tokeny)
+        data = _parse_json_safe(raw, "batch") if raw else None
+        if not isinstance(data, dict):
+            logger.warning("[batch] Grupa %s bez JSON — artefakty pójdą osobno", grupa)
+            continue
+
+        for nazwa, spec in specs.items():
+            fragment = data.get(nazwa)
+            if not spec["json"] and isinstance(fragment, dict):
+                fragment = fragment.get("tekst")
+            if spec["json"] and isinstance(fragment, (dict, list)) and fragment:
+                wynik[nazwa] = json.dumps(fragment, ensure_ascii=False)
+            elif not spec["json"] and isinstance(fragment, str) and fragment.strip():
+                wynik[nazwa] = fragment
+            else:
+                logger.warning("[batch] Brak fragmentu '%s' w odpowiedzi", nazwa)
+        logger.info("[batch] Grupa %s → %d/%d fragmentów", grupa, len(wynik), len(specs))
+    return wynik
+
+
+def _wynik_pusty(wynik) -> bool:
+    if isinstance(wynik, tuple):
+        return all(w is None for w in wynik)
+    return wynik is None
+
+
+def _buduj_artefakt(
+    nazwa: str, builder, body: str, res_text: str, fragmenty: dict, staty: dict
+):
+    """
+    Buduje artefakt z fragmentu zapytania zbiorczego. Jeśli fragmentu brak albo
+    builder go odrzuci — ponawia osobnym wywołaniem, tylko dla tego artefaktu.
+    """
+    raw = fragmenty.get(nazwa)
+    if raw is not None:
+        t0 = time.monotonic()
+        wynik = builder(body=body, res_text=res_text, raw=raw)
+        staty["czas_sec"] += time.monotonic() - t0
+        if not _wynik_pusty(wynik):
+            staty["z_batcha"].append(nazwa)
+            _dolicz_czas_osobno(nazwa, staty)
+            return wynik
+        logger.warning("[batch] '%s' — fragment odrzucony, ponawiam osobno", nazwa)
+        staty["ponowione"].append(nazwa)
+    else:
+        staty["osobno"].append(nazwa)
+    _dolicz_czas_osobno(nazwa, staty)
+
+    spec = _ARTEFAKTY_BATCH[nazwa](body, res_text)
+    if spec:
+        staty["wywolania"] += 1
+        staty["znaki_wejscia"] += _znaki_osobno(spec)
+        if raw is None:
+            staty["znaki_wejscia_osobno"] += _znaki_osobno(spec)
+
+    t0 = time.monotonic()
+    with count_deepseek_tokens() as tokeny:
+        wynik = builder(body=body, res_text=res_text)
+    czas = time.monotonic() - t0
+    staty["czas_sec"] += czas
+    _dolicz_tokeny(staty, tokeny)
+    if not _wynik_pusty(wynik):
+        with _CZASY_OSOBNO_LOCK:
+            _CZASY_OSOBNO.setdefault(nazwa, deque(maxlen=20)).append(
+                (czas, tokeny["prompt_tokens"], tokeny["completion_tokens"])
+            )
+    return wynik
+
+
+def _dolicz_tokeny(staty: dict, tokeny: dict):
+    staty["tokeny_wejscia"] += tokeny["prompt_tokens"]
+    staty["tokeny_wyjscia"] += tokeny["completion_tokens"]
+
+
+def _dolicz_czas_osobno(nazwa: str, staty: dict):
+    """Dodaje średni czas i tokeny osobnego budowania artefaktu do bazy porównania."""
+    with _CZASY_OSOBNO_LOCK:
+        historia = list(_CZASY_OSOBNO.get(nazwa) or [])
+    if historia:
+        n = len(historia)
+        staty["czas_osobno_szac_sec"] += sum(h[0] for h in historia) / n
+        staty["tokeny_wejscia_osobno_szac"] += round(sum(h[1] for h in historia) / n)
+        staty["tokeny_wyjscia_osobno_szac"] += round(sum(h[2] for h in historia) / n)
+    else:
+        staty["czas_osobno_kompletny"] = False
+
+
+def _podsumuj_batch(staty: dict) -> list[str]:
+    """Linie podsumowania oszczędności (log + _.txt)."""
+    lines = [
+        f"Wywołania AI: {staty['wywolania']} | z zapytania zbiorczego: "
+        f"{', '.join(staty['z_batcha']) or '-'} | ponowione osobno: "
+        f"{', '.join(staty['ponowione']) or '-'} | osobno: "
+        f"{', '.join(staty['osobno']) or '-'}"
+        + (" | próbka osobno" if staty["probka_osobno"] else ""),
+        f"Wejście: {staty['znaki_wejscia']} znaków vs osobno "
+        f"{staty['znaki_wejscia_osobno']} znaków",
+        f"Tokeny (usage): wejście {staty['tokeny_wejscia']}, wyjście "
+        f"{staty['tokeny_wyjscia']}",
+    ]
+    if staty["czas_osobno_kompletny"]:
+        tok = staty["tokeny_wejscia"] + staty["tokeny_wyjscia"]
+        tok_osobno = (
+            staty["tokeny_wejscia_osobno_szac"] + staty["tokeny_wyjscia_osobno_szac"]
+        )
+        lines.append(
+            f"Czas: {staty['czas_sec']:.2f}s vs osobno (średnia z próbek) "
+            f"{staty['czas_osobno_szac_sec']:.2f}s → oszczędność "
+            f"{staty['czas_osobno_szac_sec'] - staty['czas_sec']:.2f}s; tokeny "
+            f"{tok} vs {tok_osobno} → oszczędność {tok_osobno - tok}"
+        )
+    else:
+        lines.append(
+            f"Czas: {staty['czas_sec']:.2f}s (brak próbek osobnych wywołań dla "
+            f"części artefaktów — ZWYKLY_BATCH_PROBKA_OSOBNO; oszczędność nieznana)"
+        )
+    return lines
+
+
+def _append_batch_to_debug_txt(debug_txt_dict: dict, lines: list) -> dict:
+    """
+    Dopisuje podsumowanie zapytań zbiorczych na końcu _.txt.
+    Zwraca zaktualizowany dict debug_txt.
+    """
+    if not debug_txt_dict or not lines:
+        return debug_txt_dict
+    try:
+        existing = base64.b64decode(debug_txt_dict["base64"]).decode("utf-8")
+        header = [
+            "",
+            "---------------------------------------------",
+            "MAŁE ARTEFAKTY — ZAPYTANIA ZBIORCZE",
+            "---------------------------------------------",
+        ]
+        appended = existing + "\n".join(header + list(lines) + [""])
+        debug_txt_dict["base64"] = base64.b64encode(appended.encode("utf-8")).decode(
+            "ascii"
+        )
+    except Exception as e:
+        logger.warning("[batch] Błąd dopisywania podsumowania do _.txt: %s", e)
+    return debug_txt_dict
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # GŁÓWNA FUNKCJA RESPONDERA
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -5648,7 +6200,7 @@ def build_zwykly_section(
     )
 
     raw, provider = _call_ai_with_fallback(
-        _js(system_msg), _ju(user_msg), max_tokens=6500
+        _js(system_msg), _ju(user_msg), max_tokens=6500, szablon="zwykly_odpowiedz"
     )
     if not raw:
         logger.warning("[zwykly] Brak odpowiedzi AI")
@@ -5726,6 +6278,10 @@ def build_zwykly_section(
         build_html_reply(res_text),
         title="Tyler Durden + Sokrates",
     )
+    # Wynik zdegradowany na wypadek przekroczenia budżetu: sama odpowiedź tekstowa
+    budget.publish_partial(
+        {"reply_html": main_section_html, "triptych": [], "images": [], "docs": []}
+    )
 
     nouns = _extract_nouns_from_body(body)
     nouns_dict = {
@@ -5770,13 +6326,24 @@ def build_zwykly_section(
         cv_photo = _generate_cv_photo(body, cv_data, test_mode=test_mode, gender=gender)
         cv_pdf = _build_cv_pdf(cv_data, cv_photo)
 
-    ankieta_html, ankieta_pdf = _build_ankieta(res_text, body)
-    horoskop_pdf = _build_horoskop(body, res_text)
-    karta_rpg_pdf = _build_karta_rpg(body, res_text)
+    batch_staty = _nowe_staty_batch()
+    if _probka_osobno():
+        batch_staty["probka_osobno"] = True
+        fragmenty = {}
+    else:
+        fragmenty = _pobierz_zbiorczo(body, res_text, batch_staty)
+
+    def _artefakt(nazwa, builder):
+        return _buduj_artefakt(nazwa, builder, body, res_text, fragmenty, batch_staty)
+
+    ankieta_html, ankieta_pdf = _artefakt("ankieta", _build_ankieta)
+    horoskop_pdf = _artefakt("horoskop", _build_horoskop)
+    karta_rpg_pdf = _artefakt("karta_rpg", _build_karta_rpg)
 
     raport_pdf = None
     psych_photo_1 = None
     psych_photo_2 = None
+    raport_timings = []
     try:
         raport_result = build_raport(
             body,
@@ -5791,6 +6358,7 @@ def build_zwykly_section(
             raport_pdf = raport_result.get("raport_pdf")
             psych_photo_1 = raport_result.get("psych_photo_1")
             psych_photo_2 = raport_result.get("psych_photo_2")
+            raport_timings = raport_result.get("timings") or []
         else:
             logger.warning(
                 "[zwykly] build_raport zwrócił %s zamiast dict",
@@ -5799,9 +6367,17 @@ def build_zwykly_section(
     except Exception as e:
         logger.warning("[zwykly] Błąd raportu psychiatrycznego: %s", e)
 
-    plakat_svg = _build_plakat_svg(res_text, body)
-    gra_html = _build_gra_html(body, res_text)
-    explanation_txt = _build_explanation_txt(res_text, body)
+    plakat_svg = _artefakt("plakat", _build_plakat_svg)
+    gra_html = _artefakt("gra", _build_gra_html)
+    explanation_txt = _artefakt("wyjasnienie", _build_explanation_txt)
+
+    batch_lines = _podsumuj_batch(batch_staty)
+    for line in batch_lines:
+        logger.info("[batch] %s", line)
+    execution_logger.log_pipeline_step(
+        "zwykly_batch_artefakty",
+        output_data=batch_staty,
+    )
     debug_txt = _build_debug_txt(
         body,
         provider,
@@ -5815,6 +6391,8 @@ def build_zwykly_section(
         session_vars,
         panel_assignments or [],
     )
+    debug_txt = _append_raport_timings_to_debug_txt(debug_txt, raport_timings)
+    debug_txt = _append_batch_to_debug_txt(debug_txt, batch_lines)
 
     docs: list[dict] = []
     images: list[dict] = []
@@ -5826,12 +6404,15 @@ def build_zwykly_section(
     try:
         from responders.emocje import build_emocje_section
 
+        # Te same argumenty co sekcja emocje w app.py — wspólny wynik
+        # z core/pipeline_memo.py, gdy obie są w pipeline
         emocje_output = build_emocje_section(
             body=body,
             sender_name=sender_name,
             sender_email=sender_email,
             attachments=attachments,
             test_mode=test_mode,
+            gender=gender,
         )
         if isinstance(emocje_output, dict):
             emocje_section_html = _wrap_section_html(
@@ -11,15 +11,19 @@ import base64
 import random
 import time
 import logging
+import threading
 import requests
 from datetime import datetime, timedelta
 from flask import current_app
 
 from core.ai_client import call_deepseek, MODEL_TYLER
+from core.prompt_layout import zloz_prompt, schemat
 from core.config import HF_STEPS, HF_GUIDANCE, HF_TIMEOUT, MAX_DLUGOSC_EMAIL
+from core import budget
 from core.logging_reporter import get_logger
 from core.hf_token_manager import get_active_tokens, mark_dead
 from core.flux_client import generate_flux_bytes, HfHubHTTPError
+from core.task_graph import TaskGraph
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PROMPTS_DIR = os.path.join(BASE_DIR, "prompts")
@@ -326,15 +330,20 @@ def _wrap_section(raw, section_name: str) -> dict:
 # ─────────────────────────────────────────────────────────────────────────────
 
 
-def _call_with_retry(system, user, max_tokens=1000):
-    """Wywołuje DeepSeek z retry gdy odpowiedź jest podejrzanie krótka."""
-    res = call_deepseek(system, user, MODEL_TYLER, max_tokens=max_tokens)
+def _call_with_retry(system, user, max_tokens=1000, szablon=None):
+    """
+    Wywołuje DeepSeek z retry gdy odpowiedź jest podejrzanie krótka.
+    szablon — nazwa sekcji w statystykach cache prefiksów (psych_<klucz cfg>).
+    """
+    res = call_deepseek(system, user, MODEL_TYLER, max_tokens=max_tokens, szablon=szablon)
     # Jeśli odpowiedź < 5 znaków lub to same nawiasy — retry ze zwiększonym limitem
     if not res or len(res.strip()) <= 5 or res.strip() in ("{", "}", "[", "]"):
         current_app.logger.warning(
             "[psych-raport] Odpowiedź ucięta/pusta, retry max_tokens=%d", max_tokens * 2
         )
-        res = call_deepseek(system, user, MODEL_TYLER, max_tokens=max_tokens * 2)
+        res = call_deepseek(
+            system, user, MODEL_TYLER, max_tokens=max_tokens * 2, szablon=szablon
+        )
     return res
 
 
@@ -363,6 +372,25 @@ def _s(system_prompt: str) -> str:
     return system_prompt + "\n" + _JSON_FORCE_SYSTEM
 
 
+def _user_sekcji(instrukcje, schema, nadawca_block, body, *dane) -> str:
+    """
+    User prompt sekcji raportu. INSTRUKCJE i SCHEMAT (stałe z JSON) idą
+    pierwsze, dane nadawcy, email i wyniki wcześniejszych sekcji — na końcu,
+    żeby prefiks promptu był identyczny dla każdego maila (cache DeepSeek).
+    """
+    return zloz_prompt(
+        statyczne=[
+            ("INSTRUKCJE", instrukcje),
+            ("SCHEMAT JSON", schemat(schema) if schema else None),
+        ],
+        zmienne=[
+            nadawca_block,
+            ("EMAIL PACJENTA", body[:MAX_DLUGOSC_EMAIL]),
+            *dane,
+        ],
+    )
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # ŁADOWANIE KONFIGURACJI
 # ─────────────────────────────────────────────────────────────────────────────
@@ -521,14 +549,14 @@ def _sekcja_pacjent(cfg: dict, body: str, sender_name: str, nadawca_block: str =
         schema = pacjent_cfg.get("schema", {})
         instrukcje = pacjent_cfg.get("instrukcje", "")
 
-        user = (
-            f"{nadawca_block}"
-            f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-            f"INSTRUKCJE:\n{instrukcje}\n\n"
-            f"SCHEMAT JSON:\n{json.dumps(schema, ensure_ascii=False, indent=2)}"
+        user = _user_sekcji(
+            instrukcje,
+            schema,
+            nadawca_block,
+            body,
         )
 
-        raw = _call_with_retry(_s(system), _u(user), max_tokens=4000)
+        raw = _call_with_retry(_s(system), _u(user), max_tokens=4000, szablon="psych_1_pacjent")
         if not raw:
             current_app.logger.warning(
                 "[psych-raport] Sekcja pacjent: brak odpowiedzi AI"
@@ -545,7 +573,10 @@ def _sekcja_pacjent(cfg: dict, body: str, sender_name: str, nadawca_block: str =
                 "[psych-raport] dane_pacjenta zbyt krótkie (%d znaków) — retry z max_tokens=5000",
                 len(raw.strip()),
             )
-            raw2 = call_deepseek(_s(system), _u(user), MODEL_TYLER, max_tokens=5000)
+            raw2 = call_deepseek(
+                _s(system), _u(user), MODEL_TYLER, max_tokens=5000,
+                szablon="psych_1_pacjent",
+            )
             if raw2 and len(raw2.strip()) > len(raw.strip()):
                 raw = raw2
 
@@ -613,7 +644,8 @@ def _sekcja_pacjent(cfg: dict, body: str, sender_name: str, nadawca_block: str =
                 + "Jeśli brak danych z emaila — WYMYŚL absurdalnie nawiązując do treści."
             )
             raw_retry = call_deepseek(
-                _s(retry_system), _u(user), MODEL_TYLER, max_tokens=5000
+                _s(retry_system), _u(user), MODEL_TYLER, max_tokens=5000,
+                szablon="psych_1_pacjent_retry",
             )
             if raw_retry:
                 result_retry = _parse_json_safe(raw_retry, "dane_pacjenta")
@@ -712,7 +744,8 @@ def _sekcja_pacjent(cfg: dict, body: str, sender_name: str, nadawca_block: str =
                     + f"np. zamiast '{sender_name}' napisz coś jak 'Mikolaj Xyz' lub absurdalne imię na bazie emaila."
                 )
                 raw_retry = call_deepseek(
-                    _s(retry_system), _u(user), MODEL_TYLER, max_tokens=5000
+                    _s(retry_system), _u(user), MODEL_TYLER, max_tokens=5000,
+                    szablon="psych_1_pacjent_retry",
                 )
                 if raw_retry:
                     result_retry = _parse_json_safe(raw_retry, "dane_pacjenta")
@@ -738,13 +771,16 @@ def _sekcja_pacjent(cfg: dict, body: str, sender_name: str, nadawca_block: str =
                 try:
                     sys_1b = cfg_1b.get("system", "")
                     ins_1b = cfg_1b.get("instrukcje", "")
-                    usr_1b = (
-                        f"{nadawca_block}"
-                        f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-                        f"INSTRUKCJE:\n{ins_1b}\n\n"
-                        f"SCHEMAT JSON:\n{json.dumps(cfg_1b.get('schema', {}), ensure_ascii=False, indent=2)}"
+                    usr_1b = _user_sekcji(
+                        ins_1b,
+                        cfg_1b.get('schema', {}),
+                        nadawca_block,
+                        body,
+                    )
+                    raw_1b = _call_with_retry(
+                        _s(sys_1b), _u(usr_1b), max_tokens=3000,
+                        szablon="psych_1b_powod_przyjecia",
                     )
-                    raw_1b = _call_with_retry(_s(sys_1b), _u(usr_1b), max_tokens=3000)
                     if raw_1b:
                         parsed_1b = _parse_json_safe(raw_1b, "powod_przyjecia")
                         if isinstance(parsed_1b, dict):
@@ -787,13 +823,16 @@ def _sekcja_pacjent(cfg: dict, body: str, sender_name: str, nadawca_block: str =
                 try:
                     sys_1c = cfg_1c.get("system", "")
                     ins_1c = cfg_1c.get("instrukcje", "")
-                    usr_1c = (
-                        f"{nadawca_block}"
-                        f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-                        f"INSTRUKCJE:\n{ins_1c}\n\n"
-                        f"SCHEMAT JSON:\n{json.dumps(cfg_1c.get('schema', {}), ensure_ascii=False, indent=2)}"
+                    usr_1c = _user_sekcji(
+                        ins_1c,
+                        cfg_1c.get('schema', {}),
+                        nadawca_block,
+                        body,
+                    )
+                    raw_1c = _call_with_retry(
+                        _s(sys_1c), _u(usr_1c), max_tokens=4000,
+                        szablon="psych_1c_cytaty",
                     )
-                    raw_1c = _call_with_retry(_s(sys_1c), _u(usr_1c), max_tokens=4000)
                     if raw_1c:
                         parsed_1c = _parse_json_safe(raw_1c, "cytaty_z_przyjecia")
                         if isinstance(parsed_1c, dict):
@@ -926,13 +965,16 @@ def _sekcja_depozyt_leki(cfg: dict, body: str, nouns_dict: dict) -> dict:
     if cfg_2a:
         try:
             ins_2a = cfg_2a.get("instrukcje", "")
-            usr_2a = (
-                f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-                f"RZECZOWNIKI Z EMAILA:\n{nouns_str}\n\n"
-                f"INSTRUKCJE:\n{ins_2a}"
+            usr_2a = _user_sekcji(
+                ins_2a,
+                None,
+                "",
+                body,
+                ("RZECZOWNIKI Z EMAILA", nouns_str),
             )
             raw_2a = _call_with_retry(
-                _s(cfg_2a.get("system", "")), _u(usr_2a), max_tokens=4000
+                _s(cfg_2a.get("system", "")), _u(usr_2a), max_tokens=4000,
+                szablon="psych_2a_depozyt",
             )
             if raw_2a:
                 parsed_2a = _parse_json_safe(raw_2a, "depozyt_2a")
@@ -949,13 +991,16 @@ def _sekcja_depozyt_leki(cfg: dict, body: str, nouns_dict: dict) -> dict:
     if cfg_2b:
         try:
             ins_2b = cfg_2b.get("instrukcje", "")
-            usr_2b = (
-                f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-                f"RZECZOWNIKI Z EMAILA:\n{nouns_str}\n\n"
-                f"INSTRUKCJE:\n{ins_2b}"
+            usr_2b = _user_sekcji(
+                ins_2b,
+                None,
+                "",
+                body,
+                ("RZECZOWNIKI Z EMAILA", nouns_str),
             )
             raw_2b = _call_with_retry(
-                _s(cfg_2b.get("system", "")), _u(usr_2b), max_tokens=4000
+                _s(cfg_2b.get("system", "")), _u(usr_2b), max_tokens=4000,
+                szablon="psych_2b_farmakologia",
             )
             if raw_2b:
                 parsed_2b = _parse_json_safe(raw_2b, "farmakologia_2b")
@@ -988,14 +1033,18 @@ def _sekcja_depozyt_leki(cfg: dict, body: str, nouns_dict: dict) -> dict:
         schema = dep_cfg.get("schema", {})
         instrukcje = dep_cfg.get("instrukcje", "")
 
-        user = (
-            f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-            f"RZECZOWNIKI Z EMAILA:\n{nouns_str}\n\n"
-            f"INSTRUKCJE:\n{instrukcje}\n\n"
-            f"SCHEMAT JSON:\n{json.dumps(schema, ensure_ascii=False, indent=2)}"
+        user = _user_sekcji(
+            instrukcje,
+            schema,
+            "",
+            body,
+            ("RZECZOWNIKI Z EMAILA", nouns_str),
         )
 
-        raw = _call_with_retry(_s(system), _u(user), max_tokens=6000)
+        raw = _call_with_retry(
+            _s(system), _u(user), max_tokens=6000,
+            szablon="psych_2_depozyt_leki",
+        )
         if not raw:
             current_app.logger.warning(
                 "[psych-raport] Sekcja depozyt fallback: brak AI"
@@ -1045,15 +1094,18 @@ def _sekcja_tydzien(
         leki_str = ", ".join(
             [l.get("nazwa", "") for l in (leki or []) if isinstance(l, dict)]
         )[:200]
-        user = (
-            f"{nadawca_block}"
-            f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-            f"TYDZIEN: {tydzien}\nLEKI: {leki_str or 'brak danych'}\nDATA PRZYJECIA: {data_przyjecia}\n\n"
-            f"INSTRUKCJE:\n{instrukcje}\n\n"
-            f"SCHEMAT JSON:\n{json.dumps(schema, ensure_ascii=False, indent=2)}"
+        user = _user_sekcji(
+            instrukcje,
+            schema,
+            nadawca_block,
+            body,
+            f"TYDZIEN: {tydzien}\nLEKI: {leki_str or 'brak danych'}\nDATA PRZYJECIA: {data_przyjecia}",
         )
 
-        raw = _call_with_retry(_s(system), _u(user), max_tokens=4000)
+        raw = _call_with_retry(
+            _s(system), _u(user), max_tokens=4000,
+            szablon="psych_" + tydzien_key[len("deepseek_"):],
+        )
         if not raw:
             current_app.logger.warning(
                 "[psych-raport] %s: brak odpowiedzi AI", tydzien_key
@@ -1146,15 +1198,15 @@ def _sekcja_wypis(cfg: dict, body: str, data_przyjecia: str, nadawca_block: str
         schema = wypis_cfg.get("schema", {})
         instrukcje = wypis_cfg.get("instrukcje", "")
 
-        user = (
-            f"{nadawca_block}"
-            f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-            f"DATA PRZYJECIA: {data_przyjecia}\n\n"
-            f"INSTRUKCJE:\n{instrukcje}\n\n"
-            f"SCHEMAT JSON:\n{json.dumps(schema, ensure_ascii=False, indent=2)}"
+        user = _user_sekcji(
+            instrukcje,
+            schema,
+            nadawca_block,
+            body,
+            f"DATA PRZYJECIA: {data_przyjecia}",
         )
 
-        raw = _call_with_retry(_s(system), _u(user), max_tokens=4000)
+        raw = _call_with_retry(_s(system), _u(user), max_tokens=4000, szablon="psych_5_wypis")
         if not raw:
             current_app.logger.warning(
                 "[psych-raport] Sekcja wypis: brak odpowiedzi AI"
@@ -1221,13 +1273,16 @@ def _sekcja_diagnozy(cfg: dict, body: str, previous_body: str) -> dict:
     if cfg_6a:
         try:
             ins_6a = cfg_6a.get("instrukcje", "")
-            usr_6a = (
-                f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-                f"HISTORIA CHOROBY:\n{historia}\n\n"
-                f"INSTRUKCJE:\n{ins_6a}"
+            usr_6a = _user_sekcji(
+                ins_6a,
+                None,
+                "",
+                body,
+                ("HISTORIA CHOROBY", historia),
             )
             raw_6a = _call_with_retry(
-                _s(cfg_6a.get("system", "")), _u(usr_6a), max_tokens=4000
+                _s(cfg_6a.get("system", "")), _u(usr_6a), max_tokens=4000,
+                szablon="psych_6a_diagnozy_glowne",
             )
             if raw_6a:
                 parsed_6a = _parse_json_safe(raw_6a, "diagnozy_6a")
@@ -1240,12 +1295,14 @@ def _sekcja_diagnozy(cfg: dict, body: str, previous_body: str) -> dict:
     if cfg_6b:
         try:
             ins_6b = cfg_6b.get("instrukcje", "")
-            usr_6b = (
-                f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-                f"INSTRUKCJE:\n{ins_6b}"
+            usr_6b = _user_sekcji(
+                ins_6b,
+                None,
+                "",
+                body,
             )
             raw_6b = _call_with_retry(
-                _s(cfg_6b.get("system", "")), _u(usr_6b), max_tokens=3000
+                _s(cfg_6b.get("system", "")), _u(usr_6b), max_tokens=3000, szablon="psych_6b_objawy"
             )
             if raw_6b:
                 parsed_6b = _parse_json_safe(raw_6b, "objawy_6b")
@@ -1294,14 +1351,18 @@ def _sekcja_diagnozy(cfg: dict, body: str, previous_body: str) -> dict:
             schema = diagnozy_cfg.get("schema", {})
             instrukcje = diagnozy_cfg.get("instrukcje", "")
 
-            user = (
-                f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-                f"HISTORIA CHOROBY:\n{historia}\n\n"
-                f"INSTRUKCJE:\n{instrukcje}\n\n"
-                f"SCHEMAT JSON:\n{json.dumps(schema, ensure_ascii=False, indent=2)}"
+            user = _user_sekcji(
+                instrukcje,
+                schema,
+                "",
+                body,
+                ("HISTORIA CHOROBY", historia),
             )
 
-            raw = _call_with_retry(_s(system), _u(user), max_tokens=4000)
+            raw = _call_with_retry(
+                _s(system), _u(user), max_tokens=4000,
+                szablon="psych_6_diagnozy_lacina",
+            )
             if not raw:
                 current_app.logger.warning(
                     "[psych-raport] Sekcja diagnozy fallback: brak AI"
@@ -1373,15 +1434,18 @@ def _sekcja_zalecenia(cfg: dict, body: str, dni_1_7: list, dni_8_14: list, nadaw
                     f"Dzień {d.get('dzien', '?')}: {d.get('zdarzenie', '')[:100]}\n"
                 )
 
-        user = (
-            f"{nadawca_block}"
-            f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-            f"PRZEBIEG HOSPITALIZACJI:\n{dni_str[:500] or 'brak danych'}\n\n"
-            f"INSTRUKCJE:\n{instrukcje}\n\n"
-            f"SCHEMAT JSON:\n{json.dumps(schema, ensure_ascii=False, indent=2)}"
+        user = _user_sekcji(
+            instrukcje,
+            schema,
+            nadawca_block,
+            body,
+            ("PRZEBIEG HOSPITALIZACJI", dni_str[:500] or 'brak danych'),
         )
 
-        raw = _call_with_retry(_s(system), _u(user), max_tokens=4000)
+        raw = _call_with_retry(
+            _s(system), _u(user), max_tokens=4000,
+            szablon="psych_7_zalecenia_notatki",
+        )
         if not raw:
             current_app.logger.warning(
                 "[psych-raport] Sekcja zalecenia: brak odpowiedzi AI"
@@ -1536,18 +1600,23 @@ def _sekcja_flux_prompty(
             if nouns_dict
             else "przedmioty codzienne"
         )
-        user = (
-            f"{nadawca_block}"
-            f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-            f"RZECZOWNIKI Z EMAILA:\n{nouns_str}\n\n"
-            f"STYL WIZUALNY (DO WKOMPONOWANIA):\n"
-            f"- prompt_pacjent: {styl_pacjent}\n"
-            f"- prompt_przedmioty: {styl_przedmioty}\n\n"
-            f"INSTRUKCJE:\n{instrukcje}\n\n"
-            f"SCHEMAT JSON:\n{json.dumps(schema, ensure_ascii=False, indent=2)}"
+        user = _user_sekcji(
+            instrukcje,
+            schema,
+            nadawca_block,
+            body,
+            ("RZECZOWNIKI Z EMAILA", nouns_str),
+            (
+                f"STYL WIZUALNY (DO WKOMPONOWANIA):\n"
+                f"- prompt_pacjent: {styl_pacjent}\n"
+                f"- prompt_przedmioty: {styl_przedmioty}"
+            ),
         )
 
-        raw = _call_with_retry(_s(system), _u(user), max_tokens=1500)
+        raw = _call_with_retry(
+            _s(system), _u(user), max_tokens=1500,
+            szablon="psych_8_flux_prompty",
+        )
         if not raw:
             current_app.logger.warning("[psych-raport] Sekcja flux: brak odpowiedzi AI")
             return {}
@@ -1622,14 +1691,18 @@ def _sekcja_leczenie_specjalne(
                     f"Dzień {d.get('dzien', '?')}: {d.get('zdarzenie', '')[:100]}\n"
                 )
 
-        user = (
-            f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-            f"PRZEBIEG HOSPITALIZACJI:\n{dni_str[:600] or 'brak danych'}\n\n"
-            f"INSTRUKCJE:\n{instrukcje}\n\n"
-            f"SCHEMAT JSON:\n{json.dumps(schema, ensure_ascii=False, indent=2)}"
+        user = _user_sekcji(
+            instrukcje,
+            schema,
+            "",
+            body,
+            ("PRZEBIEG HOSPITALIZACJI", dni_str[:600] or 'brak danych'),
         )
 
-        raw = _call_with_retry(_s(system), _u(user), max_tokens=3000)
+        raw = _call_with_retry(
+            _s(system), _u(user), max_tokens=3000,
+            szablon="psych_9_leczenie_specjalne",
+        )
         if not raw:
             current_app.logger.warning(
                 "[psych-raport] Sekcja leczenie_specjalne: brak odpowiedzi AI"
@@ -1721,15 +1794,18 @@ def _sekcja_relacje_swiadkow(cfg: dict, body: str, raport: dict, nadawca_block:
         else:
             diagnoza_str = str(diagnoza)
 
-        user = (
-            f"{nadawca_block}"
-            f"EMAIL PACJENTA:\n{body[:MAX_DLUGOSC_EMAIL]}\n\n"
-            f"PACJENT: {pacjent}\nDIAGNOZA: {diagnoza_str or 'nieznana'}\n\n"
-            f"INSTRUKCJE:\n{instrukcje}\n\n"
-            f"SCHEMAT JSON:\n{json.dumps(schema, ensure_ascii=False, indent=2)}"
+        user = _user_sekcji(
+            instrukcje,
+            schema,
+            nadawca_block,
+            body,
+            f"PACJENT: {pacjent}\nDIAGNOZA: {diagnoza_str or 'nieznana'}",
         )
 
-        raw = _call_with_retry(_s(system), _u(user), max_tokens=4000)
+        raw = _call_with_retry(
+            _s(system), _u(user), max_tokens=4000,
+            szablon="psych_3_relacje_swiadkow",
+        )
         if not raw:
             current_app.logger.warning(
                 "[psych-raport] Sekcja świadkowie: brak odpowiedzi AI"
@@ -2000,13 +2076,13 @@ def _generate_flux(
             sleep_for = delay
             if deadline is not None:
                 sleep_for = max(0.0, min(delay, deadline - time.monotonic()))
-            time.sleep(sleep_for)
+            budget.sleep(sleep_for)
             delay = min(delay * 1.6, BACKOFF_CAP)
         try:
             png_bytes = generate_flux_bytes(
                 prompt, token, seed=random.randint(0, 2**32 - 1),
                 steps=steps, guidance=guidance, width=width, height=height,
-                timeout=HF_TIMEOUT,
+                timeout=budget.timeout(HF_TIMEOUT),
             )
             log.info(
                 "[psych-flux] %s OK token=%s (%dB)", label, name, len(png_bytes)
@@ -2141,6 +2217,10 @@ def _generate_photos_parallel(
       nie jest już potrzebny (nie ma równoległości do rozjeżdżania), ale
       zostawiamy różne wartości na wypadek przywrócenia równoległości
       w przyszłości z odpowiednim throttlingiem.
+
+      Od wprowadzenia grafu sekcji (build_raport) ta funkcja jest zadaniem
+      "zdjecia" zależnym tylko od promptów FLUX — działa równolegle
+      z sekcjami DeepSeek, pod semaforem _FLUX_LIMIT (1 request FLUX naraz).
     """
     log = logging.getLogger(__name__)
 
@@ -2164,7 +2244,7 @@ def _generate_photos_parallel(
     # modelu u providera) zjadającym cały czas pipeline'u i wystawiającym
     # go na ryzyko SIGTERM (deploy/health-check/OOM) w trakcie.
     PHOTOS_GLOBAL_BUDGET_SEC = 75.0
-    deadline = time.monotonic() + PHOTOS_GLOBAL_BUDGET_SEC
+    deadline = budget.clamp_deadline(time.monotonic() + PHOTOS_GLOBAL_BUDGET_SEC)
 
     try:
         b64_pacjent = _generate_flux(
@@ -3178,93 +3258,27 @@ def _build_docx_inner(
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# GŁÓWNA FUNKCJA PUBLICZNA
+# GRAF SEKCJI — zależności i wspólne limity współbieżności
 # ─────────────────────────────────────────────────────────────────────────────
 
+# Limity są na poziomie modułu — współdzielone przez wszystkie raporty
+# generowane równolegle w tym procesie (kilka pipeline'ów naraz).
+RAPORT_MAX_ROWNOLEGLYCH_AI = 4
+_DEEPSEEK_LIMIT = threading.BoundedSemaphore(RAPORT_MAX_ROWNOLEGLYCH_AI)
+# FLUX: router HF limituje współbieżność per IP (patrz
+# _generate_photos_parallel) — zdjęcia idą po jednym, ale równolegle
+# z sekcjami DeepSeek, a nie dopiero po nich.
+_FLUX_LIMIT = threading.BoundedSemaphore(1)
 
-def build_raport(
-    body: str,
-    previous_body: str | None,
-    res_text: str,
-    nouns_dict: dict,
-    sender_name: str = "",
-    sender_email: str = "",
-    gender: str = "patient",
-    imie: str = "__BRAK__",
-    nazwisko: str = "__BRAK__",
-    test_mode: bool = False,
-) -> dict:
-    """Buduje kompletny raport psychiatryczny — fallbacki na każdym poziomie."""
-    current_app.logger.info("[psych-raport] START build_raport")
-    cfg = _load_cfg()
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-    # ── Blok danych nadawcy — budowany raz, przekazywany do każdej sekcji ────
-    # gender dla raport używa "M"/"K"/"N", a sygnatura przyjmuje "patient" jako fallback
-    _gender_kod = gender if gender in ("M", "K") else "N"
-    nadawca_block = _build_nadawca_block(
-        sender_name=sender_name,
-        sender_email=sender_email,
-        gender=_gender_kod,
-        imie=imie,
-        nazwisko=nazwisko,
-    )
-    current_app.logger.info(
-        "[psych-raport] nadawca_block: gender=%s imie=%s nazwisko=%s sender=%s",
-        _gender_kod, imie, nazwisko, sender_name,
-    )
-
-    # Runda 1 — sekcje niezależne (równolegle)
-    sekcja_pacjent = {"data": {}, "status": "error"}
-    sekcja_dep_leki = {"data": {}, "status": "error"}
-    sekcja_diagnozy = {"data": {}, "status": "error"}
-    sekcja_flux = {"data": {}, "status": "error"}
-
-    try:
-        sekcja_pacjent = _wrap_section(
-            _sekcja_pacjent(cfg, body, sender_name, nadawca_block=nadawca_block),
-            "pacjent",
-        )
-    except Exception as e:
-        current_app.logger.error("[psych-raport] Runda1 pacjent błąd: %s", e)
-
-    try:
-        sekcja_dep_leki = _wrap_section(
-            _sekcja_depozyt_leki(cfg, body, nouns_dict),
-            "depozyt",
-        )
-    except Exception as e:
-        current_app.logger.error("[psych-raport] Runda1 depozyt błąd: %s", e)
-
-    try:
-        sekcja_diagnozy = _wrap_section(
-            _sekcja_diagnozy(cfg, body, previous_body),
-            "diagnozy",
-        )
-    except Exception as e:
-        current_app.logger.error("[psych-raport] Runda1 diagnozy błąd: %s", e)
 
-    try:
-        sekcja_flux = _wrap_section(
-            _sekcja_flux_prompty(
-                cfg, body, nouns_dict, sender_name, gender, test_mode=test_mode,
-                nadawca_block=nadawca_block,
-            ),
-            "flux",
-        )
-    except Exception as e:
-        current_app.logger.error("[psych-raport] Runda1 flux błąd: %s", e)
+def _data_przyjecia(sekcja_pacjent_data) -> str:
+    """Data przyjęcia z sekcji pacjenta lub dzisiejsza."""
+    _spd = sekcja_pacjent_data if isinstance(sekcja_pacjent_data, dict) else {}
+    return _spd.get("data_przyjecia", datetime.now().strftime("%d.%m.%Y"))
 
-    sekcja_pacjent_data = _unwrap_section(sekcja_pacjent)
-    sekcja_dep_leki_data = _unwrap_section(sekcja_dep_leki)
-    sekcja_diagnozy_data = _unwrap_section(sekcja_diagnozy)
-    sekcja_flux_data = _unwrap_section(sekcja_flux)
 
-    # Wyznaczenie daty przyjęcia
-    _spd = sekcja_pacjent_data if isinstance(sekcja_pacjent_data, dict) else {}
-    data_przyjecia = _spd.get(
-        "data_przyjecia", datetime.now().strftime("%d.%m.%Y")
-    )
+def _leki_lista(sekcja_dep_leki_data) -> list:
+    """Lista leków z sekcji depozytu — pusta gdy AI zwróciło zły typ."""
     # BUGFIX: farmakologia może być stringiem gdy AI zwróci błędny typ — guard przed .get()
     _sdld = sekcja_dep_leki_data if isinstance(sekcja_dep_leki_data, dict) else {}
     _farm_tmp = _sdld.get("farmakologia", {})
@@ -3274,72 +3288,22 @@ def build_raport(
             type(_farm_tmp).__name__,
             _farm_tmp,
         )
-        leki_lista = []
-    else:
-        leki_lista = _farm_tmp.get("leki", [])
-
-    # Runda 2 — dni hospitalizacji
-    dni_1_7 = []
-    dni_8_14 = []
-    sekcja_wypis = {"data": {}, "status": "error"}
-
-    try:
-        dni_1_7 = (
-            _unwrap_section(
-                _wrap_section(
-                    _sekcja_tydzien(cfg, body, leki_lista, 1, data_przyjecia, nadawca_block=nadawca_block),
-                    "tydzien1",
-                )
-            )
-            or []
-        )
-    except Exception as e:
-        current_app.logger.error("[psych-raport] Runda2 tydzien1 błąd: %s", e)
-
-    try:
-        dni_8_14 = (
-            _unwrap_section(
-                _wrap_section(
-                    _sekcja_tydzien(cfg, body, leki_lista, 2, data_przyjecia, nadawca_block=nadawca_block),
-                    "tydzien2",
-                )
-            )
-            or []
-        )
-    except Exception as e:
-        current_app.logger.error("[psych-raport] Runda2 tydzien2 błąd: %s", e)
-
-    try:
-        sekcja_wypis = _wrap_section(
-            _sekcja_wypis(cfg, body, data_przyjecia, nadawca_block=nadawca_block),
-            "wypis",
-        )
-    except Exception as e:
-        current_app.logger.error("[psych-raport] Runda2 wypis błąd: %s", e)
-
-    # Runda 3 — zalecenia + leczenie specjalne
-    sekcja_zalecenia = {"data": {}, "status": "error"}
-    sekcja_leczenie_specjalne = {"data": {}, "status": "error"}
-    try:
-        sekcja_zalecenia = _wrap_section(
-            _sekcja_zalecenia(cfg, body, dni_1_7, dni_8_14, nadawca_block=nadawca_block),
-            "zalecenia",
-        )
-    except Exception as e:
-        current_app.logger.error("[psych-raport] Runda3 zalecenia błąd: %s", e)
-
-    try:
-        sekcja_leczenie_specjalne = _wrap_section(
-            _sekcja_leczenie_specjalne(cfg, body, dni_1_7, dni_8_14, nadawca_block=nadawca_block),
-            "leczenie_specjalne",
-        )
-    except Exception as e:
-        current_app.logger.error("[psych-raport] Runda3 leczenie_specjalne błąd: %s", e)
+        return []
+    return _farm_tmp.get("leki", [])
 
-    sekcja_wypis_data = _unwrap_section(sekcja_wypis)
-    sekcja_zalecenia_data = _unwrap_section(sekcja_zalecenia)
-    sekcja_leczenie_specjalne_data = _unwrap_section(sekcja_leczenie_specjalne)
 
+def _scal_raport(
+    sender_name: str,
+    sekcja_pacjent_data,
+    sekcja_dep_leki_data,
+    sekcja_diagnozy_data,
+    dni_1_7,
+    dni_8_14,
+    sekcja_wypis_data,
+    sekcja_zalecenia_data,
+) -> dict:
+    """Scala wyniki sekcji DeepSeek w jeden dict raportu (bez relacji świadków
+    i leczenia specjalnego — te dokłada build_raport)."""
     # Scalenie całości
     raport = {}
 
@@ -3594,21 +3558,6 @@ def build_raport(
             else:
                 raport[k] = v
 
-    # Relacje świadków (po scaleniu raportu, bo potrzebuje kontekstu)
-    relacje_result = {}
-    try:
-        relacje_result = _sekcja_relacje_swiadkow(cfg, body, raport, nadawca_block=nadawca_block) or {}
-    except Exception as e:
-        current_app.logger.error("[psych-raport] Relacje świadków błąd: %s", e)
-    raport["relacje_swiadkow"] = relacje_result.get("relacje_swiadkow", [])
-
-    # Leczenie specjalne (deepseek_9)
-    if _is_wrapped_section(sekcja_leczenie_specjalne_data):
-        raport["leczenie_specjalne"] = sekcja_leczenie_specjalne_data
-    else:
-        raport["leczenie_specjalne"] = sekcja_leczenie_specjalne_data.get(
-            "leczenie_specjalne", []
-        )
 
     # Twarda walidacja typu dla dane_pacjenta
     dane_pacjenta = raport.get("dane_pacjenta", {})
@@ -3652,12 +3601,216 @@ def build_raport(
                 "numer_ubezpieczenia": "__BRAK__",
             }
 
-    # FLUX — zdjęcia równolegle
-    prompt_pacjent = sekcja_flux_data.get("prompt_pacjent", "") if isinstance(sekcja_flux_data, dict) else ""
-    prompt_przedmioty = sekcja_flux_data.get("prompt_przedmioty", "") if isinstance(sekcja_flux_data, dict) else ""
-    photo_1, photo_2 = _generate_photos_parallel(
-        prompt_pacjent, prompt_przedmioty, test_mode=test_mode
+    return raport
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# GŁÓWNA FUNKCJA PUBLICZNA
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def build_raport(
+    body: str,
+    previous_body: str | None,
+    res_text: str,
+    nouns_dict: dict,
+    sender_name: str = "",
+    sender_email: str = "",
+    gender: str = "patient",
+    imie: str = "__BRAK__",
+    nazwisko: str = "__BRAK__",
+    test_mode: bool = False,
+) -> dict:
+    """Buduje kompletny raport psychiatryczny — fallbacki na każdym poziomie."""
+    current_app.logger.info("[psych-raport] START build_raport")
+    cfg = _load_cfg()
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    # ── Blok danych nadawcy — budowany raz, przekazywany do każdej sekcji ────
+    # gender dla raport używa "M"/"K"/"N", a sygnatura przyjmuje "patient" jako fallback
+    _gender_kod = gender if gender in ("M", "K") else "N"
+    nadawca_block = _build_nadawca_block(
+        sender_name=sender_name,
+        sender_email=sender_email,
+        gender=_gender_kod,
+        imie=imie,
+        nazwisko=nazwisko,
+    )
+    current_app.logger.info(
+        "[psych-raport] nadawca_block: gender=%s imie=%s nazwisko=%s sender=%s",
+        _gender_kod, imie, nazwisko, sender_name,
+    )
+
+    # ── Graf sekcji ──────────────────────────────────────────────────────────
+    # Runda 1 (pacjent, depozyt, diagnozy, flux) nie ma zależności i startuje
+    # od razu. Tygodnie czekają na pacjenta (data przyjęcia) i depozyt (leki),
+    # zalecenia/leczenie na oba tygodnie, relacje świadków na scalony raport.
+    # Zdjęcia FLUX startują zaraz po promptach — równolegle z resztą.
+    _err = {"data": {}, "status": "error"}
+    graph = TaskGraph("psych-raport", max_workers=RAPORT_MAX_ROWNOLEGLYCH_AI + 1)
+    graph.add(
+        "pacjent",
+        lambda r: _wrap_section(
+            _sekcja_pacjent(cfg, body, sender_name, nadawca_block=nadawca_block),
+            "pacjent",
+        ),
+        limit=_DEEPSEEK_LIMIT,
+        default=_err,
+    )
+    graph.add(
+        "depozyt",
+        lambda r: _wrap_section(_sekcja_depozyt_leki(cfg, body, nouns_dict), "depozyt"),
+        limit=_DEEPSEEK_LIMIT,
+        default=_err,
+    )
+    graph.add(
+        "diagnozy",
+        lambda r: _wrap_section(
+            _sekcja_diagnozy(cfg, body, previous_body), "diagnozy"
+        ),
+        limit=_DEEPSEEK_LIMIT,
+        default=_err,
+    )
+    graph.add(
+        "flux",
+        lambda r: _wrap_section(
+            _sekcja_flux_prompty(
+                cfg, body, nouns_dict, sender_name, gender, test_mode=test_mode,
+                nadawca_block=nadawca_block,
+            ),
+            "flux",
+        ),
+        limit=_DEEPSEEK_LIMIT,
+        default=_err,
+    )
+
+    def _zdjecia(r):
+        flux_data = _unwrap_section(r["flux"])
+        if not isinstance(flux_data, dict):
+            flux_data = {}
+        prompt_pacjent = flux_data.get("prompt_pacjent", "")
+        prompt_przedmioty = flux_data.get("prompt_przedmioty", "")
+        photo_1, photo_2 = _generate_photos_parallel(
+            prompt_pacjent, prompt_przedmioty, test_mode=test_mode
+        )
+        return prompt_pacjent, prompt_przedmioty, photo_1, photo_2
+
+    graph.add(
+        "zdjecia", _zdjecia, deps=("flux",), limit=_FLUX_LIMIT,
+        default=("", "", None, None),
+    )
+
+    def _tydzien(nr):
+        def fn(r):
+            return (
+                _unwrap_section(
+                    _wrap_section(
+                        _sekcja_tydzien(
+                            cfg,
+                            body,
+                            _leki_lista(_unwrap_section(r["depozyt"])),
+                            nr,
+                            _data_przyjecia(_unwrap_section(r["pacjent"])),
+                            nadawca_block=nadawca_block,
+                        ),
+                        f"tydzien{nr}",
+                    )
+                )
+                or []
+            )
+
+        return fn
+
+    graph.add(
+        "tydzien1", _tydzien(1), deps=("pacjent", "depozyt"),
+        limit=_DEEPSEEK_LIMIT, default=[],
     )
+    graph.add(
+        "tydzien2", _tydzien(2), deps=("pacjent", "depozyt"),
+        limit=_DEEPSEEK_LIMIT, default=[],
+    )
+    graph.add(
+        "wypis",
+        lambda r: _wrap_section(
+            _sekcja_wypis(
+                cfg, body, _data_przyjecia(_unwrap_section(r["pacjent"])),
+                nadawca_block=nadawca_block,
+            ),
+            "wypis",
+        ),
+        deps=("pacjent",),
+        limit=_DEEPSEEK_LIMIT,
+        default=_err,
+    )
+    graph.add(
+        "zalecenia",
+        lambda r: _wrap_section(
+            _sekcja_zalecenia(
+                cfg, body, r["tydzien1"], r["tydzien2"], nadawca_block=nadawca_block
+            ),
+            "zalecenia",
+        ),
+        deps=("tydzien1", "tydzien2"),
+        limit=_DEEPSEEK_LIMIT,
+        default=_err,
+    )
+    graph.add(
+        "leczenie_specjalne",
+        lambda r: _wrap_section(
+            _sekcja_leczenie_specjalne(
+                cfg, body, r["tydzien1"], r["tydzien2"], nadawca_block=nadawca_block
+            ),
+            "leczenie_specjalne",
+        ),
+        deps=("tydzien1", "tydzien2"),
+        limit=_DEEPSEEK_LIMIT,
+        default=_err,
+    )
+    graph.add(
+        "scalenie",
+        lambda r: _scal_raport(
+            sender_name,
+            _unwrap_section(r["pacjent"]),
+            _unwrap_section(r["depozyt"]),
+            _unwrap_section(r["diagnozy"]),
+            r["tydzien1"],
+            r["tydzien2"],
+            _unwrap_section(r["wypis"]),
+            _unwrap_section(r["zalecenia"]),
+        ),
+        deps=("pacjent", "depozyt", "diagnozy", "tydzien1", "tydzien2", "wypis", "zalecenia"),
+        default={},
+    )
+    # Relacje świadków (po scaleniu raportu, bo potrzebuje kontekstu)
+    graph.add(
+        "relacje_swiadkow",
+        lambda r: _sekcja_relacje_swiadkow(
+            cfg, body, r["scalenie"], nadawca_block=nadawca_block
+        ) or {},
+        deps=("scalenie",),
+        limit=_DEEPSEEK_LIMIT,
+        default={},
+    )
+
+    wyniki = graph.run()
+    timings_lines = graph.format_timings()
+    current_app.logger.info("[psych-raport] %s", timings_lines[0])
+
+    raport = wyniki["scalenie"]
+    raport["relacje_swiadkow"] = wyniki["relacje_swiadkow"].get("relacje_swiadkow", [])
+
+    # Leczenie specjalne (deepseek_9)
+    sekcja_leczenie_specjalne_data = _unwrap_section(wyniki["leczenie_specjalne"])
+    if _is_wrapped_section(sekcja_leczenie_specjalne_data):
+        raport["leczenie_specjalne"] = sekcja_leczenie_specjalne_data
+    elif isinstance(sekcja_leczenie_specjalne_data, dict):
+        raport["leczenie_specjalne"] = sekcja_leczenie_specjalne_data.get(
+            "leczenie_specjalne", []
+        )
+    else:
+        raport["leczenie_specjalne"] = []
+
+    prompt_pacjent, prompt_przedmioty, photo_1, photo_2 = wyniki["zdjecia"]
 
     # Budowanie DOCX
     photo_1_b64 = photo_1["base64"] if photo_1 else None
@@ -3674,7 +3827,12 @@ def build_raport(
 
     if not docx_b64:
         current_app.logger.error("[psych-raport] DOCX nie wygenerowany")
-        return {"raport_pdf": None, "psych_photo_1": photo_1, "psych_photo_2": photo_2}
+        return {
+            "raport_pdf": None,
+            "psych_photo_1": photo_1,
+            "psych_photo_2": photo_2,
+            "timings": timings_lines,
+        }
 
     _dp_tmp = raport.get("dane_pacjenta", {})
     imie = (
@@ -3701,4 +3859,5 @@ def build_raport(
         "raport_pdf": raport_pdf_dict,
         "psych_photo_1": photo_1,
         "psych_photo_2": photo_2,
+        "timings": timings_lines,
     }
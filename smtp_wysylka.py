@@ -43,6 +43,9 @@ from email.mime.base import MIMEBase
 from email import encoders
 from email.utils import formataddr
 from typing import List, Optional
+from core import budget
+from core.metrics import EMAIL_BYTES
+from core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -154,7 +157,7 @@ def _get_access_token_service_account() -> Optional[str]:
                 "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
                 "assertion": token,
             },
-            timeout=15,
+            timeout=budget.timeout(15),
         )
         resp.raise_for_status()
         return resp.json()["access_token"]
@@ -174,7 +177,7 @@ def _get_access_token_refresh() -> Optional[str]:
                 "refresh_token": _REFRESH_TOKEN,
                 "grant_type": "refresh_token",
             },
-            timeout=15,
+            timeout=budget.timeout(15),
         )
         resp.raise_for_status()
         return resp.json()["access_token"]
@@ -198,6 +201,7 @@ def _get_access_token() -> Optional[str]:
 # ── WYSYŁKA ───────────────────────────────────────────────────────────────────
 
 
+@traced("gmail.send", puste_to_blad=True)
 def wyslij_odpowiedz(
     to_email: str,
     to_name: str,
@@ -273,6 +277,7 @@ def wyslij_odpowiedz(
 
     # ── Kodowanie do base64url (wymagane przez Gmail API) ─────────────────────
     raw_bytes = msg.as_bytes()
+    EMAIL_BYTES.observe(len(raw_bytes))
     raw_b64 = base64.urlsafe_b64encode(raw_bytes).decode("ascii")
 
     # ── Pobierz token i wyślij ────────────────────────────────────────────────
@@ -289,7 +294,7 @@ def wyslij_odpowiedz(
                 "Content-Type": "application/json",
             },
             json={"raw": raw_b64},
-            timeout=30,
+            timeout=budget.timeout(30),
         )
         if resp.status_code in (200, 201):
             logger.info(
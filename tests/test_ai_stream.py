@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+tests/test_ai_stream.py
+Testy strumieniowania w core/ai_client.py: IncrementalJSONReader, parsowanie
+SSE i DeepSeekJSONStream na lokalnym serwerze SSE.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("requests")
+
+from core import ai_client  # noqa: E402
+from core.ai_client import IncrementalJSONReader, _iter_sse_deltas  # noqa: E402
+
+
+def _czytaj_po_kawalku(tekst, klucz_listy=None, krok=3):
+    reader = IncrementalJSONReader(klucz_listy)
+    wynik = []
+    for i in range(0, len(tekst), krok):
+        wynik += reader.feed(tekst[i:i + krok])
+    return wynik
+
+
+class TestIncrementalJSONReader:
+    """Testy IncrementalJSONReader."""
+
+    def test_lista_pod_kluczem(self):
+        dane = {"inne": [0], "prompts": ['a "cytat" ,]}', {"x": [1, 2]}, 3, None]}
+        tekst = "```json\n" + json.dumps(dane) + "\n```"
+        for krok in (1, 2, 7):
+            assert _czytaj_po_kawalku(tekst, "prompts", krok) == dane["prompts"]
+
+    def test_lista_w_korzeniu(self):
+        dane = ["p1", "p2", {"a": "}"}, -1.5, True]
+        assert _czytaj_po_kawalku(json.dumps(dane), "prompts") == dane
+
+    def test_pary_obiektu(self):
+        dane = {"a": 1, "b": "x,y", "c": {"d": [1]}, "e": False}
+        assert _czytaj_po_kawalku(json.dumps(dane)) == list(dane.items())
+
+    def test_element_oddany_przed_koncem(self):
+        reader = IncrementalJSONReader("prompts")
+        assert reader.feed('{"prompts": ["pierwszy", "dru') == ["pierwszy"]
+        assert reader.feed('gi"]}') == ["drugi"]
+        assert reader.zakonczony
+
+
+class TestSSE:
+    """Testy _iter_sse_deltas."""
+
+    def test_delty_i_usage(self):
+        linie = [
+            b": keep-alive",
+            b'data: {"choices":[{"delta":{"content":"{\\"a\\""}}]}',
+            b"",
+            b'data: {"choices":[{"delta":{"content":": 1}"}}]}',
+            b'data: {"choices":[],"usage":{"prompt_cache_hit_tokens":5}}',
+            b"data: [DONE]",
+            b'data: {"choices":[{"delta":{"content":"po DONE"}}]}',
+        ]
+        staty = {}
+        assert "".join(_iter_sse_deltas(linie, staty)) == '{"a": 1}'
+        assert staty["usage"] == {"prompt_cache_hit_tokens": 5}
+
+
+class TestDeepSeekJSONStream:
+    """DeepSeekJSONStream na lokalnym serwerze SSE."""
+
+    @pytest.fixture
+    def serwer(self, monkeypatch):
+        tekst = json.dumps({"prompts": ["p1", "p2", "p3"]})
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for i in range(0, len(tekst), 4):
+                    event = {"choices": [{"delta": {"content": tekst[i:i + 4]}}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        monkeypatch.setattr(
+            ai_client, "DEEPSEEK_URL", f"http://127.0.0.1:{srv.server_port}/"
+        )
+        monkeypatch.setattr(ai_client, "API_KEY_DEEPSEEK", "test")
+        yield srv
+        srv.shutdown()
+
+    def test_iteracja(self, serwer):
+        stream = ai_client.DeepSeekJSONStream("s", "u", "m", klucz_listy="prompts")
+        assert list(stream) == ["p1", "p2", "p3"]
+        assert stream.blad is None
+        assert stream.staty["items"] == 3
+        assert stream.staty["ttfi_sec"] <= stream.staty["total_sec"]
+
+    def test_start_i_get(self, serwer):
+        stream = ai_client.DeepSeekJSONStream(
+            "s", "u", "m", klucz_listy="prompts"
+        ).start()
+        assert stream.get(1, timeout=10) == "p2"
+        assert stream.get(5, timeout=10) is None
+        assert stream.wait(10)
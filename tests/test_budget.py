@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+tests/test_budget.py
+Testy core/budget.py: przycinanie timeoutów, zagnieżdżone budżety,
+przerwanie kooperacyjne, porzucenie sekcji i wynik zdegradowany w pipeline.
+"""
+
+import time
+
+import pytest
+
+from core import budget
+from core.budget import BudgetExceeded, SectionOverrun, run_section
+
+
+@pytest.fixture(autouse=True)
+def czyste_liczniki():
+    budget.SECTION_BUDGET._reset()
+    yield
+    budget.SECTION_BUDGET._reset()
+
+
+class TestBudzet:
+    """Budżet w kontekście."""
+
+    def test_bez_budzetu_bez_zmian(self):
+        assert budget.remaining() is None
+        assert budget.timeout((5, 200)) == (5, 200)
+        budget.check()
+
+    def test_timeout_przyciety(self):
+        with budget.budget("s", 2.0):
+            connect, read = budget.timeout((5, 200))
+            assert connect <= 2.0 and read <= 2.0
+            assert budget.timeout(1) == 1
+
+    def test_zagniezdzony_nie_dluzszy_niz_rodzic(self):
+        with budget.budget("sekcja", 1.0):
+            with budget.budget("krok", 60):
+                assert budget.remaining() <= 1.0
+            assert budget.clamp_deadline(time.monotonic() + 75) <= time.monotonic() + 1.0
+
+    def test_po_terminie(self):
+        with budget.budget("s", 0.01):
+            time.sleep(0.02)
+            with pytest.raises(BudgetExceeded):
+                budget.check()
+            with pytest.raises(BudgetExceeded):
+                budget.timeout(90)
+
+    def test_nie_polykany_przez_except_exception(self):
+        def _responder():
+            try:
+                budget.sleep(1)
+            except Exception:
+                return "połknięte"
+
+        with budget.budget("s", 0.01), pytest.raises(BudgetExceeded):
+            _responder()
+
+
+class TestRunSection:
+    """Uruchomienie sekcji z budżetem."""
+
+    def test_ok(self):
+        assert run_section(lambda: {"reply_html": "x"}, "biznes", 5) == {"reply_html": "x"}
+        assert budget.SECTION_BUDGET.value(section="biznes", outcome="ok") == 1
+
+    def test_przekroczenie_z_wynikiem_czesciowym(self):
+        def _sekcja():
+            budget.publish_partial({"reply_html": "<p>tekst</p>", "images": []})
+            while True:
+                budget.sleep(0.05)
+
+        with pytest.raises(SectionOverrun) as e:
+            run_section(_sekcja, "zwykly", 0.1, grace=5)
+        wynik = e.value.degraded_result()
+        assert wynik["degraded"] == "budget"
+        assert wynik["reply_html"].endswith("<p>tekst</p>")
+        assert not e.value.abandoned
+        assert budget.overrun_rates()["zwykly"]["overrun_rate"] == 1.0
+
+    def test_porzucenie_bez_punktu_przerwania(self):
+        with pytest.raises(SectionOverrun) as e:
+            run_section(lambda: time.sleep(1), "generator_pdf", 0.05, grace=0.05)
+        assert e.value.abandoned
+        assert e.value.degraded_result() is None
+        assert budget.SECTION_BUDGET.value(section="generator_pdf", outcome="abandoned") == 1
+
+    def test_blad_sekcji_przechodzi(self):
+        def _sekcja():
+            raise ValueError("zepsute")
+
+        with pytest.raises(ValueError):
+            run_section(_sekcja, "emocje", 5)
+        assert budget.overrun_rates()["emocje"]["overrun_rate"] == 0.0
+
+
+class TestPipeline:
+    """run_pipeline_async z budżetem sekcji."""
+
+    def test_wynik_zdegradowany_i_kolejne_sekcje(self):
+        flask = pytest.importorskip("flask")
+        from core.job_runner import run_pipeline_async
+        from core.logging_reporter import ExecutionLogger
+
+        def _wolna():
+            budget.publish_partial({"reply_html": "częściowy"})
+            budget.sleep(10)
+
+        def _bez_tokenu():
+            raise RuntimeError("test — bez wysyłki")
+
+        wyniki = {}
+        run_pipeline_async(
+            flask_app=flask.Flask("test"),
+            data={},
+            message_id="",
+            tasks={"nawiazanie": _wolna, "biznes": lambda: {"reply_html": "b"}},
+            sender="a@b.pl",
+            sender_name="A",
+            previous_subject="",
+            drive_folder_id="",
+            history_sheet_id="",
+            smierc_sheet_id="",
+            save_to_drive=False,
+            skip_save_to_history=True,
+            logger=ExecutionLogger(session_id="t", upload_to_drive=False),
+            wyslij_fn=None,
+            zbierz_zalaczniki_fn=None,
+            get_token_fn=_bez_tokenu,
+            on_section_done=lambda k, r, d: wyniki.setdefault(k, r),
+            section_budgets={"nawiazanie": 0.1, "default": 5},
+        )
+        assert wyniki["nawiazanie"]["degraded"] == "budget"
+        assert wyniki["biznes"] == {"reply_html": "b"}
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+tests/test_checkpoint.py
+Testy core/checkpoint.py i core/drain.py: stan sekcji na dysku, raport
+wznowienia, zamek między właścicielami, wznowienie w run_pipeline_async
+i drenaż z limitem czasu.
+"""
+
+import os
+
+import pytest
+
+from core import checkpoint, drain
+from core.checkpoint import CheckpointBusy, open_checkpoint
+
+
+@pytest.fixture(autouse=True)
+def katalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoint, "CHECKPOINT_DIR", str(tmp_path / "cp"))
+    monkeypatch.setattr(checkpoint, "CHECKPOINTS_ENABLED", True)
+    checkpoint.reset()
+    drain.reset()
+    yield tmp_path / "cp"
+    checkpoint.reset()
+    drain.reset()
+
+
+def _przerwany(message_id="msg-1"):
+    """Checkpoint po „restarcie”: nawiazanie wysłane, zwykly policzony, biznes w trakcie."""
+    cp = open_checkpoint(message_id, {"message_id": message_id, "sender": "a@b.pl"})
+    cp.start_section("nawiazanie")
+    cp.save_result("nawiazanie", {"reply_html": "n"}, 3.0)
+    cp.finish_section("nawiazanie", "done")
+    cp.start_section("zwykly")
+    cp.save_result("zwykly", {"reply_html": "z", "images": [{"base64": "QUJD"}]}, 40.0)
+    cp.start_section("biznes")
+    cp.mark_interrupted()
+    cp.release()  # proces „umiera” — zamek wolny
+    return cp
+
+
+class TestCheckpoint:
+    """Stan na dysku i raport wznowienia."""
+
+    def test_nowy_pipeline(self):
+        cp = open_checkpoint("msg-1", {"x": 1})
+        assert not cp.resumed
+        assert cp.section_status("zwykly") is None
+        cp.complete()
+        assert not os.path.exists(cp.katalog)
+
+    def test_wznowienie(self):
+        _przerwany()
+        cp = open_checkpoint("msg-1")
+        assert cp.resumed
+        assert cp.data["sender"] == "a@b.pl"
+        assert cp.section_status("nawiazanie") == "done"
+        assert cp.section_status("zwykly") == "computed"
+        assert cp.load_result("zwykly")["images"][0]["base64"] == "QUJD"
+        raport = cp.resume_report
+        assert raport["skipped"] == ["nawiazanie"]
+        assert raport["reused"] == ["zwykly"]
+        assert raport["redone"] == ["biznes"]
+        assert raport["saved_sec"] == 43.0
+        assert checkpoint.stats()["redone_sections"] == 1
+        cp.release()
+
+    def test_zamek_trzymany(self):
+        cp = open_checkpoint("msg-1")
+        with pytest.raises(CheckpointBusy):
+            open_checkpoint("msg-1")
+        cp.release()
+        open_checkpoint("msg-1").release()
+
+    def test_pending_i_resume_only(self):
+        _przerwany("msg-1")
+        assert [m for m, _ in checkpoint.pending()] == ["msg-1"]
+        with pytest.raises(CheckpointBusy):
+            open_checkpoint("msg-2", resume_only=True)
+        assert [m for m, _ in checkpoint.pending()] == ["msg-1"]
+
+    def test_nieudany_zapis_wyniku_zostawia_poprzedni(self):
+        cp = open_checkpoint("msg-1")
+        cp.save_result("zwykly", {"reply_html": "z"}, 1.0)
+        cp.save_result("zwykly", {"zly": lambda: None}, 1.0)  # nie do zapiklowania
+        assert cp.load_result("zwykly") == {"reply_html": "z"}
+        assert not [p for p in os.listdir(cp.katalog) if p.endswith(".tmp")]
+        cp.release()
+
+    def test_wylaczone(self, monkeypatch):
+        monkeypatch.setattr(checkpoint, "CHECKPOINTS_ENABLED", False)
+        assert open_checkpoint("msg-1") is None
+
+
+class TestWznowieniePipeline:
+    """run_pipeline_async z checkpointem po restarcie."""
+
+    def test_pomija_zakonczone_i_bierze_wynik_z_dysku(self):
+        flask = pytest.importorskip("flask")
+        from core.job_runner import run_pipeline_async
+        from core.logging_reporter import ExecutionLogger
+
+        _przerwany()
+        cp = open_checkpoint("msg-1")
+        wywolane = []
+        wyniki = {}
+
+        def _zadanie(nazwa):
+            def fn():
+                wywolane.append(nazwa)
+                return {"reply_html": nazwa}
+
+            return fn
+
+        def _bez_tokenu():
+            raise RuntimeError("test — bez wysyłki")
+
+        run_pipeline_async(
+            flask_app=flask.Flask("test"),
+            data={},
+            message_id="msg-1",
+            tasks={k: _zadanie(k) for k in ("nawiazanie", "zwykly", "biznes")},
+            sender="a@b.pl",
+            sender_name="A",
+            previous_subject="",
+            drive_folder_id="",
+            history_sheet_id="",
+            smierc_sheet_id="",
+            save_to_drive=False,
+            skip_save_to_history=True,
+            logger=ExecutionLogger(session_id="t", upload_to_drive=False),
+            wyslij_fn=None,
+            zbierz_zalaczniki_fn=None,
+            get_token_fn=_bez_tokenu,
+            on_section_done=lambda k, r, d: wyniki.setdefault(k, r),
+            checkpoint=cp,
+        )
+        assert wywolane == ["biznes"]
+        assert wyniki["zwykly"]["images"][0]["base64"] == "QUJD"
+        assert not os.path.exists(cp.katalog)
+
+
+class TestDrain:
+    """Drenaż z limitem czasu."""
+
+    def test_czeka_na_koniec(self, monkeypatch):
+        monkeypatch.setattr(drain, "DRAIN_POLL_SEC", 0.01)
+        w_toku = [3]
+
+        def _aktywne():
+            w_toku[0] = max(0, w_toku[0] - 1)
+            return w_toku[0]
+
+        assert drain.drain(_aktywne, timeout=5)
+        assert drain.draining()
+
+    def test_limit_czasu_zapisuje_przerwanie(self, monkeypatch):
+        monkeypatch.setattr(drain, "DRAIN_POLL_SEC", 0.01)
+        cp = open_checkpoint("msg-1")
+        cp.start_section("zwykly")
+        assert not drain.drain(
+            lambda: 1, timeout=0.05, on_timeout=checkpoint.mark_all_interrupted
+        )
+        assert cp.manifest["interrupted_at"] >= cp.manifest["sections"]["zwykly"]["started_at"]
+        cp.release()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+tests/test_crossword_cache.py
+Testy cache krzyżówek w responders/scrabble.py: klucz z posortowanego zbioru
+słów, odtworzenie siatki bez generowania, uszkodzone wpisy, limit wpisów.
+"""
+
+import pytest
+
+pytest.importorskip("flask")
+
+from responders import scrabble  # noqa: E402
+
+SLOWA = ["KOTEK", "OKNO", "TOREBKA", "KRETA", "ROBOT", "BOKS", "TEKST", "SKOK"]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(scrabble, "CROSSWORD_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(scrabble, "CROSSWORD_SEED", "3")
+    scrabble.CROSSWORD_CACHE._reset()
+    return tmp_path
+
+
+class TestKlucz:
+    def test_kolejnosc_i_wielkosc_liter(self):
+        a = scrabble._cache_key(["kot", "OKNO"], 15, 15)
+        assert a == scrabble._cache_key(["OKNO", "KOT", "kot"], 15, 15)
+        assert a != scrabble._cache_key(["OKNO", "KOT"], 11, 11)
+
+    def test_wersja_generatora(self, monkeypatch):
+        a = scrabble._cache_key(SLOWA, 15, 15)
+        monkeypatch.setattr(scrabble, "GENERATOR_VERSION", "inna")
+        assert scrabble._cache_key(SLOWA, 15, 15) != a
+
+
+class TestCache:
+    def test_trafienie_bez_generowania(self, cache, monkeypatch):
+        pierwsza = scrabble._generate_crossword_grid(SLOWA, 15, 15)
+        assert pierwsza.placed_words
+        assert len(list(cache.glob("*.json"))) == 1
+
+        def bez_generowania(*a, **kw):
+            raise AssertionError("generate() przy trafieniu w cache")
+
+        monkeypatch.setattr(scrabble.CrosswordGeneratorNew, "generate", bez_generowania)
+        druga = scrabble._generate_crossword_grid(list(reversed(SLOWA)), 15, 15)
+        assert druga.grid == pierwsza.grid
+        assert druga.placed_words == pierwsza.placed_words
+        assert druga.clue_numbers == pierwsza.clue_numbers
+        assert scrabble.cache_stats() == {"lookups": 2, "hit_rate": 0.5, "generations_avoided": 1}
+        assert scrabble._build_crossword_html(druga)
+
+    def test_uszkodzony_wpis(self, cache):
+        klucz = scrabble._cache_key(SLOWA, 15, 15)
+        (cache / f"{klucz}.json").write_text("{niepełny", encoding="utf-8")
+        assert scrabble._generate_crossword_grid(SLOWA, 15, 15).placed_words
+        assert scrabble.CROSSWORD_CACHE.value(outcome="miss") == 1
+        assert scrabble._cache_get(klucz) is not None  # Nadpisany poprawnym
+
+    def test_wylaczony(self, cache, monkeypatch):
+        monkeypatch.setattr(scrabble, "CROSSWORD_CACHE_DIR", "")
+        scrabble._generate_crossword_grid(SLOWA, 15, 15)
+        assert list(cache.iterdir()) == []
+
+    def test_limit_wpisow(self, cache, monkeypatch):
+        monkeypatch.setattr(scrabble, "CROSSWORD_CACHE_MAX", 2)
+        for i in range(4):
+            scrabble._generate_crossword_grid(SLOWA[i:], 15, 15)
+        assert len(list(cache.glob("*.json"))) == 2
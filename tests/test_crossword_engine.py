@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+tests/test_crossword_engine.py
+Testy silnika krzyżówki (responders/KRZYZOWKA/crossword_new.py):
+powtarzalność z seedem, wcześniejszy stop przed time_limit, statystyki.
+"""
+
+from responders.KRZYZOWKA.crossword_new import CrosswordGeneratorNew
+
+SLOWA = [
+    "KOT", "PIES", "OKNO", "DOM", "MORZE", "RZEKA", "LAS", "DRZEWO", "SOSNA",
+    "KAMIEN", "PIASEK", "ZAMEK", "KLUCZ", "STOL", "KRZESLO", "LAMPA", "OGIEN",
+    "WODA", "ZIEMIA", "NIEBO", "SLONCE", "KSIEZYC", "GWIAZDA", "CHMURA",
+]
+
+
+class _Zrodlo:
+    def __init__(self, slowa):
+        self.slowa = list(slowa)
+
+    def get_word(self, word):
+        return f"def {word}" if word in self.slowa else None
+
+    def get_words_by_length(self, length):
+        return [w for w in self.slowa if len(w) == length]
+
+
+def _siatka(seed, slowa=SLOWA, **kw):
+    gen = CrosswordGeneratorNew(_Zrodlo(slowa), seed=seed)
+    grid = gen.generate(15, 15, time_limit=kw.pop("time_limit", 5.0), **kw)
+    return gen, grid
+
+
+class TestSeed:
+    """Ten sam seed → ta sama krzyżówka."""
+
+    def test_powtarzalnosc(self):
+        g1, a = _siatka(7)
+        g2, b = _siatka(7)
+        assert g1.last_stats["stop_reason"] != "time_limit"
+        assert a.grid == b.grid
+        assert g1.last_stats["attempts"] == g2.last_stats["attempts"]
+
+    def test_rozne_seedy(self):
+        siatki = {str(_siatka(s)[1].grid) for s in range(5)}
+        assert len(siatki) > 1
+
+
+class TestWczesnyStop:
+    """Kryteria zbieżności zamiast kręcenia się do time_limit."""
+
+    def test_wszystkie_wyrazy(self):
+        gen, grid = _siatka(1, slowa=["KOT", "TOR", "ROK"])
+        assert gen.last_stats["stop_reason"] == "all_placed"
+        assert gen.last_stats["words"] == 3
+        assert gen.last_stats["wall_sec"] < 1.0
+        assert {w[0] for w in grid.placed_words} >= {"KOT", "TOR", "ROK"}
+
+    def test_cel_wyrazow(self):
+        gen, _ = _siatka(3, target_words=5, stall_attempts=None)
+        assert gen.last_stats["stop_reason"] == "target_words"
+        assert gen.last_stats["words"] >= 5
+
+    def test_cel_gestosci(self):
+        gen, _ = _siatka(3, target_density=0.1, stall_attempts=None)
+        assert gen.last_stats["stop_reason"] == "target_density"
+        assert gen.last_stats["density"] >= 0.1
+
+    def test_brak_poprawy(self):
+        gen, _ = _siatka(3, stall_attempts=20)
+        s = gen.last_stats
+        assert s["stop_reason"] in ("stall", "all_placed")
+        assert s["attempts"] >= 1
+        assert s["cpu_sec"] >= 0.0
+
+    def test_brak_slow(self):
+        gen, grid = _siatka(1, slowa=[])
+        assert gen.last_stats["stop_reason"] == "no_words"
+        assert gen.last_stats["attempts"] == 0
+        assert grid.placed_words == []
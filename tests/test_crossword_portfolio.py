@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+tests/test_crossword_portfolio.py
+Testy trybu portfolio MultiStrategyGenerator (crossword_strategies.py):
+anulowanie StrategyBasedGenerator, stop na celu i na budżecie czasu.
+"""
+
+from responders.KRZYZOWKA.crossword_strategies import (
+    MultiStrategyGenerator,
+    StrategyBasedGenerator,
+)
+from responders.KRZYZOWKA.word_source import WordSource
+
+SLOWA = (
+    "KOT KOTY OKO OKNO TOK TOR ROK RAK KRA ARKA KASA OSA SOK SOKI LAS LIS ALE "
+    "OKA TAK TRAKT KRET TRAKTOR ROTA KARTA MATA MAK KOSA ROSA RAMA MOST STO"
+).split()
+
+
+def _source(tmp_path):
+    plik = tmp_path / "baza.txt"
+    plik.write_text("".join(f"{w} def\n" for w in SLOWA), encoding="utf-8")
+    return WordSource(str(plik))
+
+
+class TestAnulowanie:
+    """should_stop / on_best w StrategyBasedGenerator."""
+
+    def test_stop_przed_pierwsza_iteracja(self, tmp_path):
+        gen = MultiStrategyGenerator(_source(tmp_path))
+        grid = StrategyBasedGenerator(gen.word_source, gen.strategies[0]).generate(
+            7, 7, should_stop=lambda: True
+        )
+        assert grid.placed_words == []
+
+    def test_stop_w_trakcie_backtrackingu(self, tmp_path):
+        gen = MultiStrategyGenerator(_source(tmp_path))
+        wywolania = []
+
+        def stop():
+            wywolania.append(1)
+            return len(wywolania) > 1  # Przepuszcza tylko pierwszą iterację
+
+        grid = StrategyBasedGenerator(gen.word_source, gen.strategies[0]).generate(
+            7, 7, should_stop=stop
+        )
+        assert len(grid.placed_words) <= 1  # Sam wyraz startowy
+
+    def test_on_best_rosnaco(self, tmp_path):
+        gen = MultiStrategyGenerator(_source(tmp_path))
+        gestosci = []
+        StrategyBasedGenerator(gen.word_source, gen.strategies[0]).generate(
+            7, 7, on_best=gestosci.append
+        )
+        assert gestosci and gestosci == sorted(gestosci)
+
+
+class TestPortfolio:
+    """Pula procesów ze wspólną flagą i najlepszym wynikiem."""
+
+    def test_cel_gestosci(self, tmp_path):
+        gen = MultiStrategyGenerator(_source(tmp_path))
+        wyniki = gen.generate_portfolio(5, 5, target_density=30, time_budget=30, max_workers=2)
+        info = gen.last_portfolio
+        assert info["stop_reason"] == "target"
+        assert info["best_density"] >= 30
+        assert wyniki and wyniki[0].density >= 30
+        assert [r.density for r in wyniki] == sorted((r.density for r in wyniki), reverse=True)
+
+    def test_budzet_czasu(self, tmp_path):
+        gen = MultiStrategyGenerator(_source(tmp_path))
+        gen.generate_portfolio(9, 9, time_budget=0.0, max_workers=1)
+        assert gen.last_portfolio["stop_reason"] == "time_budget"
+        assert gen.last_portfolio["wall_sec"] < 10
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+tests/test_emocje.py
+Testy trybu zbiorczego responders/emocje.py (bez prawdziwego API).
+"""
+
+import json
+
+import pytest
+from responders import emocje
+
+
+def _odpowiedz_zbiorcza(pomin=()):
+    return json.dumps(
+        {
+            "metody": {
+                k: {
+                    "pocieszenie": f"<p>Pocieszenie metoda {k}.</p>",
+                    "nastroj": "smutek",
+                    "intensywnosc": 6,
+                }
+                for k in emocje.ALL_METODY_KEYS
+                if k not in pomin
+            }
+        }
+    )
+
+
+class TestWalidacjaMetody:
+    """Testy _waliduj_metode."""
+
+    def test_poprawna(self):
+        wynik = emocje._waliduj_metode(
+            {"pocieszenie": "<p>Jestem tutaj.</p>", "nastroj": "lek", "intensywnosc": 3}
+        )
+        assert wynik == {"pocieszenie": "<p>Jestem tutaj.</p>", "nastroj": "lek", "intensywnosc": 3}
+
+    def test_normalizacja_pol(self):
+        wynik = emocje._waliduj_metode(
+            {"pocieszenie": "<p>Jestem tutaj.</p>", "nastroj": "euforia", "intensywnosc": "99"}
+        )
+        assert wynik["nastroj"] == "neutralna"
+        assert wynik["intensywnosc"] == 10
+
+    def test_brak_pocieszenia(self):
+        assert emocje._waliduj_metode({"nastroj": "lek"}) is None
+        assert emocje._waliduj_metode("tekst") is None
+
+
+class TestTrybZbiorczy:
+    """Testy _generuj_metody w trybie zbiorczym."""
+
+    def test_jedno_zapytanie_gdy_wszystko_ok(self, monkeypatch):
+        wywolania = []
+
+        def fake(system_msg, user_msg, max_tokens=550, json_mode=False, staty=None):
+            wywolania.append(json_mode)
+            return _odpowiedz_zbiorcza()
+
+        monkeypatch.setattr(emocje, "_call_ai_raw", fake)
+        wyniki = emocje._generuj_metody("mail", "Ala", emocje._load_prompt(), tryb="zbiorczo")
+        assert wywolania == [True]
+        assert all(wyniki[k] for k in emocje.ALL_METODY_KEYS)
+
+    def test_dogenerowanie_tylko_brakujacych(self, monkeypatch):
+        brakujace = ("obecnosc", "normalizacja")
+        pojedyncze = []
+
+        def fake(system_msg, user_msg, max_tokens=550, json_mode=False, staty=None):
+            if json_mode:
+                return _odpowiedz_zbiorcza(pomin=brakujace)
+            pojedyncze.append(user_msg)
+            return '{"pocieszenie": "<p>Osobno.</p>", "nastroj": "bol", "intensywnosc": 4}'
+
+        monkeypatch.setattr(emocje, "_call_ai_raw", fake)
+        wyniki = emocje._generuj_metody("mail", "Ala", emocje._load_prompt(), tryb="zbiorczo")
+        assert len(pojedyncze) == len(brakujace)
+        for k in brakujace:
+            assert wyniki[k]["pocieszenie"] == "<p>Osobno.</p>"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+tests/test_flat_grid.py
+Testy responders/KRZYZOWKA/flat_grid.py: reguły sprawdzania jak w
+CrosswordGeneratorNew, wpisywanie z dziennikiem cofnięć, eksport do list.
+"""
+
+import pytest
+
+from responders.KRZYZOWKA.crossword_grid import CrosswordGrid, Direction
+from responders.KRZYZOWKA.flat_grid import FlatGrid
+
+
+def _siatka():
+    flat = FlatGrid(7, 5)
+    flat.place(flat.encode("KOTEK"), 2, 1, False)  # Wiersz 2, kolumny 1-5
+    return flat
+
+
+class TestSprawdzanie:
+    """check(): przecięcia, granice, sąsiedzi."""
+
+    def test_przeciecie(self):
+        flat = _siatka()
+        assert flat.check(flat.encode("KOS"), 1, 2, True) == 1
+        assert flat.check(flat.encode("KOS"), 1, 3, True) == 0  # O na T
+        assert flat.check(flat.encode("ETA"), 2, 4, True) == 1
+
+    def test_granice_i_konce(self):
+        flat = _siatka()
+        assert flat.check(flat.encode("KOT"), 3, 6, False) == 0  # Poza prawą krawędzią
+        assert flat.check(flat.encode("AKO"), 2, 0, False) == 0  # Konflikt liter
+        assert flat.check(flat.encode("KOS"), -1, 2, True) == 0
+
+    def test_sasiad_w_poprzek(self):
+        flat = _siatka()
+        # Równolegle tuż pod KOTEK — pola mają sąsiadów z góry
+        assert flat.check(flat.encode("ALA"), 3, 1, False) == 0
+        # Z odstępem — OK, bez przecięć
+        assert flat.check(flat.encode("ALA"), 4, 1, False) == 1
+
+    def test_przedluzenie_wyrazu(self):
+        flat = _siatka()
+        # Pole przed wyrazem zajęte → nie wolno zaczynać tuż za nim
+        assert flat.check(flat.encode("A"), 2, 6, False) == 0
+
+
+class TestCofanie:
+    """place()/undo() bez alokacji; cofnięcie zeruje tylko swoje pola."""
+
+    def test_undo_zostawia_przeciecia(self):
+        flat = _siatka()
+        przed = bytes(flat.cells)
+        flat.place(flat.encode("KOS"), 1, 2, True)
+        assert flat.filled == 7 and flat.words == 2
+        flat.undo()
+        assert bytes(flat.cells) == przed
+        assert flat.filled == 5 and flat.words == 1
+
+    def test_undo_na_pustej(self):
+        flat = FlatGrid(3, 3)
+        flat.undo()
+        assert flat.filled == 0
+
+    def test_clear_zachowuje_kody(self):
+        flat = _siatka()
+        kod = flat.encode("K")[0]
+        flat.clear()
+        assert flat.cells == bytearray(35) and flat.words == 0
+        assert flat.encode("K")[0] == kod
+
+    def test_pozycje_i_wiersze(self):
+        flat = _siatka()
+        k = flat.encode("K")[0]
+        assert list(flat.positions(k)) == [2 * 7 + 1, 2 * 7 + 5]
+        wiersze = flat.to_rows(empty="")
+        assert "".join(wiersze[2]) == "KOTEK"
+        assert flat.to_rows()[0] == [None] * 7
+
+    def test_limit_liter(self):
+        flat = FlatGrid(2, 2)
+        with pytest.raises(ValueError):
+            flat.encode("".join(chr(0x100 + i) for i in range(300)))
+
+
+class TestKopia:
+    def test_copy_niezalezna(self):
+        g = CrosswordGrid(5, 5)
+        g.place_word("KOT", 0, 0, Direction.HORIZONTAL, "zwierzę")
+        kopia = g.copy()
+        kopia.place_word("KRA", 0, 0, Direction.VERTICAL, "lód")
+        assert g.grid[1][0] == "" and kopia.grid[1][0] == "R"
+        assert len(g.placed_words) == 1 and len(kopia.clue_numbers) == 1
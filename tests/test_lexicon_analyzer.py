@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+tests/test_lexicon_analyzer.py
+Testy core/lexicon_analyzer.py: automat Aho-Corasick nad tematami (frazy,
+nakładające się wzorce), normalizacja snowball i cechy do promptów.
+"""
+
+import pytest
+
+from core import lexicon_analyzer
+from core.lexicon_analyzer import LexiconAnalyzer
+
+
+class TestAutomat:
+    """Dopasowanie bez stemmera — dokładne formy."""
+
+    def _analyzer(self):
+        return LexiconAnalyzer(
+            {
+                "formalne": ["niemniej jednak", "oraz", "niniejszym"],
+                "watpliwosc": ["jednak", "chyba"],
+                "krotkie": ["i"],
+            },
+            stemmer=None,
+        )
+
+    def test_fraza_i_sufiks(self):
+        wynik = self._analyzer().analyze("Niemniej jednak, chyba oraz NINIEJSZYM.")
+        assert wynik["counts"] == {"formalne": 3, "watpliwosc": 2}
+        assert wynik["tokens"] == 5
+
+    def test_przerwana_fraza(self):
+        wynik = self._analyzer().analyze("niemniej wczoraj jednak")
+        assert wynik["counts"] == {"watpliwosc": 1}
+
+    def test_krotkie_wzorce_pominiete(self):
+        a = self._analyzer()
+        assert a.patterns == 5
+        assert a.analyze("ja i ty")["counts"] == {}
+
+    def test_pusty_tekst(self):
+        assert self._analyzer().analyze("") == {"tokens": 0, "counts": {}, "density": {}}
+
+
+class TestBiblioteka:
+    """Słowniki z biblioteka/ ze stemmerem snowball."""
+
+    def test_odmiana_przez_temat(self):
+        pytest.importorskip("snowballstemmer")
+        a = LexiconAnalyzer({"dotyk": ["dotykać"]}, stemmer=lexicon_analyzer._stemmer())
+        assert a.analyze("Dotykał mnie i dotyku nie chciałem")["counts"] == {"dotyk": 2}
+
+    def test_cechy_i_podpowiedz(self):
+        pytest.importorskip("snowballstemmer")
+        tekst = (
+            "Szanowni Państwo, niniejszym uprzejmie informuję, że niemniej jednak "
+            "przedmiotowy wniosek oraz załączniki składam odpowiednio w terminie."
+        )
+        cechy = lexicon_analyzer.features(tekst)
+        assert cechy["formal"]
+        assert cechy["dominant"][0] == "formalne"
+        assert set(cechy["axes"]) == set(lexicon_analyzer.OSIE)
+        assert lexicon_analyzer.prompt_hint(tekst).startswith(
+            "Cechy leksykalne (analiza lokalna): styl formalny"
+        )
+        assert len(lexicon_analyzer.get_analyzer().categories) == 23
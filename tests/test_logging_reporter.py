@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+tests/test_logging_reporter.py
+Testy core/logging_reporter.py: izolacja loggerów równoległych pipeline'ów
+(contextvars), zapis wpisów do pliku tymczasowego i ograniczona pamięć.
+"""
+
+import os
+import threading
+
+from core import logging_reporter
+from core.logging_reporter import (
+    ExecutionLogger,
+    bind_logger,
+    current_logger,
+    get_logger,
+    init_logger,
+)
+from core.task_graph import TaskGraph
+
+# Tak jak w responders/zwykly.py — zapamiętany na poziomie modułu
+execution_logger = get_logger()
+
+
+class TestIzolacjaPipelineow:
+    """Równoległe pipeline'y nie widzą nawzajem swoich wpisów."""
+
+    def test_brak_przeciekow_miedzy_watkami(self):
+        n = 8
+        bariera = threading.Barrier(n)
+        teksty = {}
+        bledy = []
+
+        def pipeline(i):
+            try:
+                lg = init_logger(session_id=f"s{i}", upload_to_drive=False)
+                with bind_logger(lg):
+                    bariera.wait()
+                    for krok in range(20):
+                        execution_logger.log_step(f"PIPE-{i}-KROK-{krok}")
+                        get_logger().log_api_call(f"api-{i}", success=True)
+
+                    graf = TaskGraph(f"graf{i}", max_workers=3)
+                    for k in range(3):
+                        graf.add(
+                            f"t{k}",
+                            lambda deps, k=k: execution_logger.log_debug_info(
+                                "GRAF", f"PIPE-{i}-ZADANIE-{k}"
+                            ),
+                        )
+                    graf.run()
+                    bariera.wait()
+                teksty[i] = lg._build_log_text()
+                lg.finalize()
+            except Exception as e:  # pragma: no cover — raport z wątku
+                bledy.append(e)
+
+        watki = [threading.Thread(target=pipeline, args=(i,)) for i in range(n)]
+        for w in watki:
+            w.start()
+        for w in watki:
+            w.join(30)
+
+        assert not bledy
+        for i, tekst in teksty.items():
+            assert tekst.count(f"PIPE-{i}-KROK-") == 20
+            assert tekst.count(f"PIPE-{i}-ZADANIE-") == 3
+            assert tekst.count(f"api-{i}") == 40  # wpis + podsumowanie
+            for j in range(n):
+                if j != i:
+                    assert f"PIPE-{j}-" not in tekst
+                    assert f"api-{j}" not in tekst
+
+    def test_bind_logger_przywraca_poprzedni(self):
+        a = ExecutionLogger(session_id="a", upload_to_drive=False)
+        b = ExecutionLogger(session_id="b", upload_to_drive=False)
+        with bind_logger(a):
+            with bind_logger(b):
+                assert current_logger() is b
+            assert current_logger() is a
+        a.finalize()
+        b.finalize()
+
+    def test_nowy_watek_bez_kontekstu_uzywa_loggera_procesu(self):
+        wynik = []
+        with bind_logger(ExecutionLogger(upload_to_drive=False)) as lg:
+            w = threading.Thread(target=lambda: wynik.append(current_logger()))
+            w.start()
+            w.join()
+            assert wynik[0] is not lg
+            assert wynik[0] is logging_reporter._global_logger
+            lg.finalize()
+
+    def test_init_logger_nie_przypina(self):
+        lg = init_logger(session_id="bez", upload_to_drive=False)
+        assert current_logger() is not lg
+        lg.finalize()
+
+    def test_logger_procesu_bez_pliku(self):
+        proces = current_logger()
+        for i in range(200):
+            proces.log_step(f"poza-{i}")
+        assert proces.spill_path is None
+        assert len(proces.entries) == logging_reporter.MAX_WPISOW_W_PAMIECI
+
+
+class TestZapisDoPliku:
+    """Wpisy trafiają do pliku od razu, w pamięci tylko ogon."""
+
+    def test_pamiec_ograniczona_a_log_kompletny(self):
+        lg = ExecutionLogger(session_id="duzy", upload_to_drive=False)
+        for i in range(1000):
+            lg.log_step(f"krok-{i:04d}")
+        lg.log_error("ValueError", "zły krok")
+
+        assert len(lg.entries) == logging_reporter.MAX_WPISOW_W_PAMIECI
+        assert lg.liczba_wpisow == 1001
+        with open(lg.spill_path, encoding="utf-8") as f:
+            assert sum(1 for _ in f) == 1001
+
+        tekst = lg._build_log_text()
+        assert "krok-0000" in tekst and "krok-0999" in tekst
+        assert "Liczba wpisów: 1001" in tekst
+        assert "✗ ValueError: zły krok" in tekst
+
+    def test_finalize_kasuje_plik(self):
+        lg = ExecutionLogger(session_id="tmp", upload_to_drive=False)
+        lg.log_step("x")
+        sciezka = lg.spill_path
+        assert os.path.exists(sciezka)
+        lg.finalize()
+        assert not os.path.exists(sciezka)
+        lg.log_step("po finalize")  # ignorowany, bez wyjątku
+        assert lg.spill_path is None
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+tests/test_metrics_prometheus.py
+Testy metryk Prometheus z core/metrics.py: Counter, Histogram, gauge_fn
+i format tekstowy /metrics.
+"""
+
+import threading
+
+import pytest
+
+from core import metrics
+from core.metrics import Counter, Histogram
+
+
+@pytest.fixture(autouse=True)
+def czyste_metryki():
+    metrics.reset_prometheus()
+    yield
+    metrics.reset_prometheus()
+
+
+@pytest.fixture
+def rejestr(monkeypatch):
+    """Metryki tworzone w teście nie zostają w globalnym rejestrze."""
+    monkeypatch.setattr(metrics, "_REJESTR", [])
+    monkeypatch.setattr(metrics, "_GAUGE_FN", {})
+
+
+class TestHistogram:
+    """Testy Histogram."""
+
+    def test_kubelki_kumulowane(self, rejestr):
+        h = Histogram("t_seconds", "test", ("status",), buckets=(1, 5))
+        for v in (0.5, 1, 3, 10):
+            h.observe(v, status="ok")
+        tekst = metrics.render_prometheus()
+        assert 't_seconds_bucket{status="ok",le="1"} 2' in tekst
+        assert 't_seconds_bucket{status="ok",le="5"} 3' in tekst
+        assert 't_seconds_bucket{status="ok",le="+Inf"} 4' in tekst
+        assert 't_seconds_sum{status="ok"} 14.5' in tekst
+        assert 't_seconds_count{status="ok"} 4' in tekst
+        assert "# TYPE t_seconds histogram" in tekst
+
+    def test_timed_status(self, rejestr):
+        h = Histogram("call_seconds", "test", ("api", "status"))
+
+        @h.timed(puste_to_blad=True, api="drive")
+        def upload(ok):
+            return {"id": 1} if ok else None
+
+        upload(True)
+        upload(False)
+        assert h.count(api="drive", status="ok") == 1
+        assert h.count(api="drive", status="error") == 1
+
+    def test_rownolegle_obserwacje(self, rejestr):
+        h = Histogram("r_seconds", "test")
+
+        def praca():
+            for _ in range(1000):
+                h.observe(0.2)
+
+        watki = [threading.Thread(target=praca) for _ in range(8)]
+        for w in watki:
+            w.start()
+        for w in watki:
+            w.join()
+        assert h.count() == 8000
+
+
+class TestRender:
+    """Testy render_prometheus."""
+
+    def test_counter_i_escape_etykiet(self, rejestr):
+        c = Counter("flux_total", "test", ("provider", "outcome"))
+        c.inc(provider='fal"ai', outcome="ok")
+        c.inc(2, provider='fal"ai', outcome="ok")
+        assert 'flux_total{provider="fal\\"ai",outcome="ok"} 3' in metrics.render_prometheus()
+
+    def test_gauge_fn_z_bledem_pominiety(self, rejestr):
+        metrics.gauge_fn("ok_gauge", "test", lambda: 7)
+        metrics.gauge_fn("zly_gauge", "test", lambda: 1 / 0)
+        tekst = metrics.render_prometheus()
+        assert "ok_gauge 7" in tekst
+        assert "zly_gauge" not in tekst
+
+    def test_metryki_aplikacji_zarejestrowane(self):
+        metrics.SECTION_SECONDS.observe(1.5, section="zwykly", status="ok")
+        tekst = metrics.render_prometheus()
+        assert 'autoresponder_section_seconds_count{section="zwykly",status="ok"} 1' in tekst
+        assert "# TYPE autoresponder_deepseek_tokens_total counter" in tekst
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+tests/test_pattern_index.py
+Testy responders/KRZYZOWKA/pattern_index.py: wzorce "?A??E", cache
+binarny obok pliku słów i kandydaci generatora zgodni z can_place_word.
+"""
+
+import random
+
+from responders.KRZYZOWKA.crossword_generator import CrosswordGenerator
+from responders.KRZYZOWKA.crossword_grid import CrosswordGrid, Direction
+from responders.KRZYZOWKA.pattern_index import PatternIndex
+from responders.KRZYZOWKA.word_source import WordSource
+
+SLOWA = ["KOT", "KOSZ", "LAS", "KASA", "MASA", "OSA", "KAWA", "LAWA", "SOK", "ŻABA"]
+
+
+def _source(tmp_path, slowa=SLOWA):
+    plik = tmp_path / "dane.txt"
+    plik.write_text("".join(f"{w} def {w}\n" for w in slowa), encoding="utf-8")
+    return WordSource(str(plik))
+
+
+class TestWzorce:
+    """Przecięcie bitsetów zamiast skanu."""
+
+    def test_znane_litery(self):
+        index = PatternIndex(SLOWA)
+        assert index.find("?A?A") == ["KASA", "MASA", "KAWA", "LAWA", "ŻABA"]
+        assert index.find("KA?A") == ["KASA", "KAWA"]
+        assert index.count("?A?A") == 5
+
+    def test_same_wieloznaczniki_i_brak(self):
+        index = PatternIndex(SLOWA)
+        assert index.find("???") == ["KOT", "LAS", "OSA", "SOK"]
+        assert index.find("X??") == []
+        assert index.find("?????") == []
+        assert index.count("??") == 0
+
+    def test_zgodnosc_ze_skanem(self):
+        rng = random.Random(3)
+        slowa = list({"".join(rng.choices("ABKLO", k=rng.randint(2, 6))) for _ in range(400)})
+        index = PatternIndex(slowa)
+        for _ in range(200):
+            w = rng.choice(slowa)
+            wzorzec = "".join(c if rng.random() < 0.4 else "?" for c in w)
+            oczekiwane = [
+                s for s in slowa
+                if len(s) == len(w) and all(p in ("?", c) for p, c in zip(wzorzec, s))
+            ]
+            assert index.find(wzorzec) == oczekiwane
+
+
+class TestCache:
+    """Cache binarny <plik>.idx."""
+
+    def test_zapis_i_odczyt(self, tmp_path):
+        src = _source(tmp_path)
+        assert src.find_pattern("?o?") == ["KOT", "SOK"]
+        cache = tmp_path / "dane.txt.idx"
+        assert cache.exists()
+        z_cache = PatternIndex.load(str(cache), src.index.key)
+        assert z_cache.find("?A?A") == src.index.find("?A?A")
+
+    def test_inna_lista_slow(self, tmp_path):
+        _source(tmp_path).index
+        src = _source(tmp_path, SLOWA + ["KOTY"])
+        assert src.find_pattern("KOT?") == ["KOTY"]
+        assert PatternIndex.load(str(tmp_path / "dane.txt.idx"), PatternIndex(SLOWA).key) is None
+
+    def test_uszkodzony_plik(self, tmp_path):
+        cache = tmp_path / "x.idx"
+        cache.write_bytes(b"KRZIDX1\nsmieci")
+        assert PatternIndex.load(str(cache)) is None
+
+    def test_lista_do_tasowania(self, tmp_path):
+        src = _source(tmp_path)
+        src.get_words_by_length(3).clear()
+        assert src.get_words_by_length(3) == ["KOT", "LAS", "OSA", "SOK"]
+
+
+class TestGenerator:
+    """Kandydaci z indeksu = dotychczasowy skan z can_place_word."""
+
+    def test_find_matching_words(self, tmp_path):
+        src = _source(tmp_path)
+        gen = CrosswordGenerator(src)
+        grid = CrosswordGrid(6, 6)
+        grid.place_word("KASA", 1, 0, Direction.HORIZONTAL, "def")
+        grid.grid[4][1] = None
+
+        def skan(row, col, direction):
+            wynik = []
+            limit = (grid.width - col) if direction == Direction.HORIZONTAL else (grid.height - row)
+            for n in range(2, limit + 1):
+                for w in SLOWA:
+                    if len(w) == n and grid.can_place_word(w, row, col, direction):
+                        wynik.append((w, gen._count_intersections(grid, w, row, col, direction)))
+            return wynik
+
+        for row in range(6):
+            for col in range(6):
+                for kierunek in Direction:
+                    oczekiwane = sorted(
+                        skan(row, col, kierunek),
+                        key=lambda x: x[1] * 10 + max(0, len(x[0]) - 4),
+                        reverse=True,
+                    )
+                    oczekiwane = [
+                        w for w, k in oczekiwane if not (k == 0 and grid.get_filled_count() > 5)
+                    ]
+                    assert gen._find_matching_words(grid, row, col, kierunek) == oczekiwane
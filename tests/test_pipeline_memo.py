@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+tests/test_pipeline_memo.py
+Testy core/pipeline_memo.py: wspólny wynik w obrębie pipeline'u, klucz
+z argumentów, brak zapamiętywania błędów i równoległe wywołania.
+"""
+
+import contextvars
+import threading
+import time
+
+import pytest
+
+from core import pipeline_memo
+from core.pipeline_memo import MEMO_AVOIDED, PipelineMemo, memoize
+
+
+@pytest.fixture(autouse=True)
+def czyste_liczniki():
+    MEMO_AVOIDED._reset()
+    yield
+    MEMO_AVOIDED._reset()
+
+
+def _responder(wywolania):
+    @memoize("emocje", "body", "gender")
+    def build(body, sender_email="", gender="N"):
+        wywolania.append(body)
+        return {"reply_html": f"{body}/{gender}", "images": []}
+
+    return build
+
+
+class TestMemo:
+    """Memo w obrębie scope()."""
+
+    def test_bez_scope_zawsze_liczy(self):
+        wywolania = []
+        build = _responder(wywolania)
+        build("a")
+        build("a")
+        assert wywolania == ["a", "a"]
+
+    def test_drugie_wywolanie_z_memo(self):
+        wywolania = []
+        build = _responder(wywolania)
+        with pipeline_memo.scope() as memo:
+            pierwszy = build("a", sender_email="x@y.pl")
+            drugi = build(body="a", gender="N")  # domyślne == jawne, e-mail poza kluczem
+            assert drugi == pierwszy and drugi is not pierwszy
+            build("a", gender="K")
+        assert wywolania == ["a", "a"]
+        assert memo.report()["avoided_calls"] == 1
+        assert memo.report()["hits"] == {"emocje": 1}
+        assert MEMO_AVOIDED.value(responder="emocje") == 1
+
+    def test_trafienie_oznacza_pomiar_sekcji(self, tmp_path, monkeypatch):
+        section_memory = pytest.importorskip("core.section_memory")
+        monkeypatch.setattr(
+            section_memory, "MEMORY_HISTORY_PATH", str(tmp_path / "mem.jsonl")
+        )
+        section_memory.reset()
+        build = _responder([])
+        with pipeline_memo.scope():
+            with section_memory.measure_section("zwykly") as zwykly:
+                build("a")
+                build("a")  # Trafienie wewnątrz innej sekcji — bez oznaczenia
+            with section_memory.measure_section("emocje") as emocje:
+                build("a")
+        assert "memo_hit" not in zwykly.wynik
+        assert emocje.wynik["memo_hit"] is True
+        section_memory.reset()
+
+    def test_blad_i_wynik_zdegradowany_nie_zapamietane(self):
+        licznik = []
+
+        @memoize("analiza", "body")
+        def build(body):
+            licznik.append(1)
+            if len(licznik) == 1:
+                raise ValueError("AI nie odpowiada")
+            return {"reply_html": "x", "degraded": "budget"}
+
+        with pipeline_memo.scope() as memo:
+            with pytest.raises(ValueError):
+                build("a")
+            build("a")
+            build("a")
+        assert len(licznik) == 3
+        assert memo.report()["avoided_calls"] == 0
+
+    def test_rownolegle_liczone_raz(self):
+        wywolania = []
+
+        @memoize("scrabble", "body")
+        def build(body):
+            wywolania.append(body)
+            time.sleep(0.1)
+            return {"reply_html": body}
+
+        wyniki = []
+        with pipeline_memo.scope() as memo:
+            watki = [
+                threading.Thread(
+                    target=contextvars.copy_context().run,
+                    args=(lambda: wyniki.append(build("a")),),
+                )
+                for _ in range(3)
+            ]
+            for w in watki:
+                w.start()
+            for w in watki:
+                w.join()
+        assert wywolania == ["a"]
+        assert wyniki == [{"reply_html": "a"}] * 3
+        assert memo.report()["avoided_calls"] == 2
+
+    def test_stan_dla_procesu_potomnego(self):
+        wywolania = []
+        build = _responder(wywolania)
+        rodzic = PipelineMemo()
+        with pipeline_memo.scope(rodzic):
+            build("a")
+        potomek = PipelineMemo()
+        potomek.merge_state(rodzic.export_state())
+        with pipeline_memo.scope(potomek):
+            build("a")
+        rodzic.add_hits(potomek.report())
+        assert wywolania == ["a"]
+        assert rodzic.report()["avoided_calls"] == 1
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+tests/test_process_isolation.py
+Testy core/process_isolation.py: wynik z procesu potomnego, przekazanie
+błędu, scalanie logów potomka i tryb bez izolacji.
+"""
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("psutil")
+
+from core import process_isolation  # noqa: E402
+from core.logging_reporter import ExecutionLogger, bind_logger  # noqa: E402
+from core.process_isolation import (  # noqa: E402
+    IsolatedSectionError,
+    run_isolated,
+    section_fn,
+)
+
+
+@pytest.fixture
+def logger():
+    lg = ExecutionLogger(session_id="test", upload_to_drive=False)
+    with bind_logger(lg):
+        yield lg
+    lg._close()
+
+
+class TestRunIsolated:
+    """Sekcja w procesie potomnym."""
+
+    def test_wynik_wraca_z_potomka(self, logger):
+        wynik = run_isolated("json", "json", "dumps", {"obj": {"a": [1, 2]}}, 60)
+        assert wynik == '{"a": [1, 2]}'
+        wpisy = [
+            e["data"]["data"]
+            for e in logger._iter_entries()
+            if e["type"] == "DEBUG_INFO" and e["data"]["category"] == "ISOLATED_SECTION"
+        ]
+        assert wpisy and wpisy[0]["exitcode"] == 0
+        assert wpisy[0]["child_peak_rss_mb"] > 0
+
+    def test_blad_potomka(self, logger):
+        with pytest.raises(IsolatedSectionError, match="JSONDecodeError"):
+            run_isolated("json", "json", "loads", {"s": "{"}, 60)
+        bledy = [e for e in logger._iter_entries() if e["type"] == "ERROR"]
+        assert bledy and "JSONDecodeError" in str(bledy[-1]["data"])
+
+
+class TestSectionFn:
+    """Wybór trybu wg ISOLATE_SECTIONS."""
+
+    def test_bez_izolacji_w_procesie(self, monkeypatch):
+        monkeypatch.setattr(process_isolation, "ISOLATE_SECTIONS", set())
+        fn = section_fn("json", "json", "dumps", {"obj": [1]})
+        assert fn() == "[1]"
+
+    def test_z_izolacja(self, monkeypatch, logger):
+        monkeypatch.setattr(process_isolation, "ISOLATE_SECTIONS", {"json"})
+        fn = section_fn("json", "json", "dumps", {"obj": [2]})
+        assert fn() == "[2]"
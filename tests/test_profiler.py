@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+tests/test_profiler.py
+Testy core/profiler.py: próbkowanie stosów, format collapsed, limity i sesja.
+"""
+
+import threading
+import time
+
+import pytest
+
+from core import profiler
+from core.profiler import ProfilerBusy, collapsed, sample
+
+
+def _goraca_petla(stop):
+    x = 0
+    while not stop.is_set():
+        x += 1
+
+
+def _czeka_na_lock(lock, stop):
+    while not stop.is_set():
+        with lock:
+            pass
+        lock.acquire(timeout=0.05)
+
+
+class TestSample:
+    """Testy sample()."""
+
+    def test_stos_z_funkcja_projektu(self):
+        stop = threading.Event()
+        w = threading.Thread(target=_goraca_petla, args=(stop,), name="bench worker")
+        w.start()
+        try:
+            wynik = sample(0.3, hz=100)
+        finally:
+            stop.set()
+            w.join()
+        tekst = collapsed(wynik["stacks"])
+        linia = next(l for l in tekst.splitlines() if "_goraca_petla" in l)
+        stos, n = linia.rsplit(" ", 1)
+        assert stos.startswith("bench_worker;")
+        assert "threading.py:run;test_profiler.py:_goraca_petla" in stos
+        assert int(n) > 0
+        assert wynik["samples"] > 5
+
+    def test_czekanie_na_lock_widoczne(self):
+        lock, stop = threading.Lock(), threading.Event()
+        lock.acquire()
+        w = threading.Thread(target=_czeka_na_lock, args=(lock, stop))
+        w.start()
+        try:
+            tekst = collapsed(sample(0.2, hz=100)["stacks"])
+        finally:
+            stop.set()
+            lock.release()
+            w.join()
+        assert "test_profiler.py:_czeka_na_lock" in tekst
+
+    def test_limity(self, monkeypatch):
+        monkeypatch.setattr(profiler, "PROFILER_MAX_SEKUND", 0.2)
+        t0 = time.monotonic()
+        wynik = sample(100, hz=10_000)
+        assert wynik["hz"] == profiler.PROFILER_MAX_HZ
+        assert time.monotonic() - t0 < 1.0
+
+    def test_jedna_sesja_naraz(self):
+        w = threading.Thread(target=sample, args=(0.5,))
+        w.start()
+        time.sleep(0.1)
+        try:
+            with pytest.raises(ProfilerBusy):
+                sample(0.1)
+        finally:
+            w.join()
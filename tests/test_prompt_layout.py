@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+tests/test_prompt_layout.py
+Testy core/prompt_layout.py i statystyk cache w core/metrics.py.
+"""
+
+from core import metrics
+from core.prompt_layout import zloz_prompt
+
+
+class TestZlozPrompt:
+    """Testy zloz_prompt."""
+
+    def test_statyczne_przed_zmiennymi(self):
+        wynik = zloz_prompt(
+            statyczne=[("INSTRUKCJE", "rób X")],
+            zmienne=[("EMAIL", "treść maila")],
+            zakonczenie="KONIEC",
+        )
+        assert wynik == "INSTRUKCJE:\nrób X\n\nEMAIL:\ntreść maila\n\nKONIEC"
+
+    def test_wspolny_prefiks_dla_roznych_maili(self):
+        stat = [("INSTRUKCJE", "rób X"), ("SCHEMAT JSON", "{}")]
+        a = zloz_prompt(stat, [("EMAIL", "pierwszy")])
+        b = zloz_prompt(stat, [("EMAIL", "drugi, dłuższy mail")])
+        prefiks = "INSTRUKCJE:\nrób X\n\nSCHEMAT JSON:\n{}\n\nEMAIL:\n"
+        assert a.startswith(prefiks) and b.startswith(prefiks)
+
+    def test_puste_bloki_pomijane(self):
+        wynik = zloz_prompt(
+            statyczne=["", None, ("SCHEMAT", None)],
+            zmienne=[("EMAIL", "x"), ("DANE", "  ")],
+        )
+        assert wynik == "EMAIL:\nx"
+
+
+class TestDeepseekCacheStats:
+    """Testy record_deepseek_usage / deepseek_cache_stats."""
+
+    def setup_method(self):
+        metrics.reset()
+
+    def teardown_method(self):
+        metrics.reset()
+
+    def test_hit_ratio_per_szablon(self):
+        metrics.record_deepseek_usage(
+            "a", {"prompt_cache_hit_tokens": 300, "prompt_cache_miss_tokens": 100}
+        )
+        metrics.record_deepseek_usage(
+            "a", {"prompt_cache_hit_tokens": 100, "prompt_cache_miss_tokens": 0}
+        )
+        metrics.record_deepseek_usage(
+            "b", {"prompt_cache_hit_tokens": 0, "prompt_cache_miss_tokens": 50}
+        )
+        stats = metrics.deepseek_cache_stats()
+        assert stats["szablony"]["a"]["wywolania"] == 2
+        assert stats["szablony"]["a"]["hit_ratio"] == 0.8
+        assert stats["szablony"]["b"]["hit_ratio"] == 0.0
+        assert list(stats["szablony"]) == ["a", "b"]
+        assert stats["razem"]["cache_hit_tokens"] == 400
+        assert stats["razem"]["hit_ratio"] == round(400 / 550, 3)
+
+    def test_brak_usage_ignorowany(self):
+        metrics.record_deepseek_usage("a", None)
+        assert metrics.deepseek_cache_stats()["szablony"] == {}
+
+    def test_szablon_z_promptu_stabilny(self):
+        assert metrics.szablon_z_promptu("abc") == metrics.szablon_z_promptu("abc")
+        assert metrics.szablon_z_promptu("abc") != metrics.szablon_z_promptu("abd")
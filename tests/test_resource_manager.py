@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+tests/test_resource_manager.py
+Testy kontroli przyjęć w core/resource_manager.py: prognoza szczytu pamięci,
+decyzje start/shed/delay i błąd prognozy.
+"""
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("psutil")
+
+from core import section_memory  # noqa: E402
+from core.logging_reporter import ExecutionLogger  # noqa: E402
+from core.resource_manager import ADMISSION_DECISIONS, ResourceManager  # noqa: E402
+
+RSS_MB = 200.0
+
+
+@pytest.fixture(autouse=True)
+def historia(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        section_memory, "MEMORY_HISTORY_PATH", str(tmp_path / "mem.jsonl")
+    )
+    section_memory.reset()
+    yield
+    section_memory.reset()
+
+
+@pytest.fixture
+def rm(monkeypatch):
+    r = ResourceManager(
+        memory_threshold_mb=400,
+        section_peak_defaults_mb={"zwykly": 120, "smierc": 180, "biznes": 20},
+        sheddable_sections=["smierc"],
+        max_delay_sec=2,
+    )
+    monkeypatch.setattr(
+        r, "get_memory_usage", lambda: {"rss_mb": RSS_MB, "vms_mb": 0, "percent": 0}
+    )
+    return r
+
+
+def _pomiar(sekcja, peak_delta, delta=0.0):
+    section_memory.record(
+        {"section": sekcja, "ts": time.time(), "rss_peak_mb": RSS_MB + peak_delta,
+         "peak_delta_mb": peak_delta, "delta_mb": delta}
+    )
+
+
+class TestPrognoza:
+    """Testy forecast_pipeline_mb."""
+
+    def test_z_configu_gdy_brak_historii(self, rm):
+        assert rm.forecast_pipeline_mb(["zwykly", "biznes"]) == 120
+
+    def test_z_historii_p95_i_retained(self, rm):
+        for d in (50, 60, 70):
+            _pomiar("zwykly", d, delta=10)
+        prognoza = rm.section_peak_mb("zwykly")
+        assert prognoza["source"] == "history"
+        assert prognoza["peak_mb"] == 70
+        # max szczyt (smierc z configu) + retained zwykłego
+        assert rm.forecast_pipeline_mb(["zwykly", "smierc"]) == 190
+
+
+class TestAdmit:
+    """Testy admit / wait_for_admission."""
+
+    def test_start_gdy_miesci_sie(self, rm):
+        d = rm.admit(["zwykly", "biznes"])
+        assert d["decision"] == "start"
+        assert d["projected_mb"] == 320
+
+    def test_shed_ciezkiej_sekcji(self, rm):
+        rm.memory_threshold_mb = 350
+        d = rm.admit(["zwykly", "smierc"])
+        assert d["decision"] == "shed"
+        assert d["sections"] == ["zwykly"] and d["shed"] == ["smierc"]
+        assert d["projected_all_mb"] == 380 and d["projected_mb"] == 320
+
+    def test_delay_i_start_po_zwolnieniu(self, rm):
+        bilet = rm.pipeline_start(rm.admit(["zwykly"]))
+        bilet2 = rm.pipeline_start(rm.admit(["biznes"]))
+        assert rm.admit(["zwykly"])["decision"] == "delay"
+
+        threading.Timer(0.2, rm.pipeline_end, args=(bilet,)).start()
+        t0 = time.monotonic()
+        d = rm.wait_for_admission(["zwykly"])
+        assert d["decision"] == "start"
+        assert time.monotonic() - t0 < 1.5
+        rm.pipeline_end(bilet2)
+
+    def test_ponowienia_delay_liczone_raz(self, rm):
+        ADMISSION_DECISIONS._reset()
+        bilet = rm.pipeline_start(rm.admit(["zwykly"]))
+        bilet2 = rm.pipeline_start(rm.admit(["biznes"]))
+        assert rm.admit(["zwykly"])["decision"] == "delay"
+        # Timeout — ponowne sprawdzenia nie liczą się jako kolejne delay
+        d = rm.wait_for_admission(["zwykly"], timeout=0.3)
+        assert d["decision"] == "start"
+        assert ADMISSION_DECISIONS.value(decision="delay") == 1
+        assert ADMISSION_DECISIONS.value(decision="start") == 3
+        rm.pipeline_end(bilet)
+        rm.pipeline_end(bilet2)
+
+    def test_rezerwacja_bez_zajetej_juz_czesci(self, rm):
+        bilet = rm.pipeline_start(rm.admit(["zwykly"]))
+        assert rm.admit(["biznes"])["reserved_mb"] == 120
+        # Pipeline w toku urósł o 80 MB — to już jest w RSS, rezerwujemy resztę
+        rm.record_section_memory(bilet, {"rss_peak_mb": RSS_MB + 80})
+        assert rm.admit(["biznes"])["reserved_mb"] == 40
+        rm.record_section_memory(bilet, {"rss_peak_mb": RSS_MB + 150})
+        assert rm.admit(["biznes"])["reserved_mb"] == 0
+        rm.pipeline_end(bilet)
+
+    def test_oczekujacy_liczony_do_limitu(self, rm):
+        rm.max_concurrent = 2
+        bilet = rm.pipeline_start(rm.admit(["zwykly"]))
+        rm.pipeline_delayed()
+        assert rm.waiting_pipelines() == 1
+        assert not rm.can_start_pipeline()
+        bilet2 = rm.pipeline_start(rm.admit(["biznes"]), delayed=True)
+        assert rm.waiting_pipelines() == 0 and not rm.can_start_pipeline()
+        rm.pipeline_end(bilet)
+        rm.pipeline_end(bilet2)
+        rm.pipeline_delayed()
+        rm.delay_abandoned()
+        assert rm.can_start_pipeline() and rm.waiting_pipelines() == 0
+
+    def test_bez_pipelineow_w_toku_zawsze_start(self, rm):
+        rm.memory_threshold_mb = 350
+        assert rm.admit(["smierc", "zwykly", "biznes"])["decision"] == "shed"
+        rm.sheddable_sections = []
+        assert rm.admit(["smierc", "zwykly"])["decision"] == "start"
+
+
+class TestBladPrognozy:
+    """Testy forecast_stats."""
+
+    def test_blad_prognozy_po_zakonczeniu(self, rm):
+        bilet = rm.pipeline_start(rm.admit(["zwykly"]))
+        rm.record_section_memory(bilet, {"rss_peak_mb": RSS_MB + 150})
+        rm.pipeline_end(bilet)
+        stats = rm.forecast_stats()
+        assert stats["pipelines"] == 1
+        assert stats["last_error_mb"] == -30
+        assert stats["under_forecasts"] == 1
+        assert stats["active_reservations"] == 0
+
+    def test_blad_prognozy_do_loggera_pipelineu(self, rm):
+        lg = ExecutionLogger(upload_to_drive=False)
+        bilet = rm.pipeline_start(rm.admit(["zwykly"], logger=lg), logger=lg)
+        rm.record_section_memory(bilet, {"rss_peak_mb": RSS_MB + 100})
+        assert rm.report_forecast(bilet, lg) == 20
+        lg.finalize()
+        rm.pipeline_end(bilet)  # Już zgłoszony — nie liczony drugi raz
+        assert rm.forecast_stats()["pipelines"] == 1
+        kategorie = [e["data"].get("decision") or e["data"].get("category") for e in lg.entries]
+        assert kategorie == ["admission", "pipeline", "ADMISSION_FORECAST"]
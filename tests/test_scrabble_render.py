@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+tests/test_scrabble_render.py
+Testy renderowania planszy w responders/scrabble.py: obraz złożony ze
+sprite'ów ma w każdym polu te same piksele co pole rysowane prymitywami,
+a tło w pamięci nie jest zmieniane przez kolejne rendery.
+"""
+
+import io
+
+import pytest
+
+pytest.importorskip("flask")
+Image = pytest.importorskip("PIL.Image")
+
+from flask import Flask  # noqa: E402
+
+from responders import scrabble  # noqa: E402
+from responders.KRZYZOWKA.crossword_grid import CrosswordGrid, Direction  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    scrabble._reset_render_cache()
+    with Flask("test").app_context():
+        yield
+    scrabble._reset_render_cache()
+
+
+def _pole(img, r, c):
+    x, y = scrabble._cell_xy(r, c)
+    return img.crop((x, y, x + scrabble.TILE_SZ, y + scrabble.TILE_SZ)).tobytes()
+
+
+def _png(data):
+    return Image.open(io.BytesIO(data)).convert("RGB")
+
+
+class TestPlansza:
+    def test_pola_jak_prymitywy(self, app):
+        tekst = "KOT Zażółć!"
+        img = _png(scrabble.render_scrabble_image(tekst))
+        premie = scrabble._premium()
+        for r in range(scrabble.BOARD_DIM):
+            for c in range(scrabble.BOARD_DIM):
+                ch = tekst[c] if r == 0 and c < len(tekst) else None
+                wzor = scrabble._draw_cell("board", premie.get((r, c)), ch)
+                assert _pole(img, r, c) == wzor.tobytes(), (r, c)
+
+    def test_tlo_niezmienione(self, app):
+        pusta = scrabble.render_scrabble_image("")
+        scrabble.render_scrabble_image("A" * 300)
+        assert scrabble.render_scrabble_image("") == pusta
+        scrabble._reset_render_cache()
+        assert scrabble.render_scrabble_image("") == pusta
+
+
+class TestKrzyzowka:
+    def test_pola_jak_prymitywy(self, app):
+        grid = CrosswordGrid(scrabble.BOARD_DIM, scrabble.BOARD_DIM)
+        grid.place_word("KOTEK", 2, 1, Direction.HORIZONTAL, "zwierzę")
+        grid.grid[0][0] = None
+        img = _png(scrabble._render_crossword_grid_image(grid))
+        for r in range(scrabble.BOARD_DIM):
+            for c in range(scrabble.BOARD_DIM):
+                wzor = scrabble._draw_cell("crossword", None, grid.grid[r][c])
+                assert _pole(img, r, c) == wzor.tobytes(), (r, c)
+        assert _pole(img, 0, 0) != _pole(img, 0, 1)  # Czarne pole ≠ puste
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+tests/test_section_memory.py
+Testy core/section_memory.py: pomiar RSS sekcji, tracemalloc, historia i ranking.
+"""
+
+import json
+import time
+
+import pytest
+
+pytest.importorskip("psutil")
+
+from core import section_memory  # noqa: E402
+from core.section_memory import measure_section, ranking  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def czysta_historia(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        section_memory, "MEMORY_HISTORY_PATH", str(tmp_path / "mem.jsonl")
+    )
+    monkeypatch.setattr(section_memory, "MEMORY_SAMPLE_SEC", 0.01)
+    section_memory.reset()
+    yield tmp_path / "mem.jsonl"
+    section_memory.reset()
+
+
+class TestPomiar:
+    """Testy SectionMemory."""
+
+    def test_szczyt_w_trakcie_sekcji(self):
+        zebrane = []
+        with measure_section("smierc", on_done=lambda s, m: zebrane.append((s, m))) as p:
+            bufor = bytearray(64 * 1024 * 1024)
+            bufor[::4096] = b"x" * len(bufor[::4096])  # dotknij stron
+            time.sleep(0.1)
+            del bufor
+        wynik = p.wynik
+        assert zebrane == [("smierc", wynik)]
+        assert wynik["peak_delta_mb"] >= 50
+        assert wynik["rss_peak_mb"] >= wynik["rss_after_mb"]
+        assert wynik["status"] == "ok"
+
+    def test_wyjatek_zapisany_i_przepuszczony(self):
+        with pytest.raises(RuntimeError):
+            with measure_section("zwykly") as p:
+                raise RuntimeError("x")
+        assert p.wynik["status"] == "error"
+
+    def test_szczyt_procesu_potomnego(self):
+        with measure_section("smierc") as p:
+            section_memory.record_child_peak(300.0)
+        section_memory.record_child_peak(900.0)  # Poza pomiarem — ignorowany
+        assert p.wynik["child_peak_rss_mb"] == 300.0
+        assert p.wynik["peak_delta_mb"] >= 299
+        assert section_memory.history("smierc")[-1]["peak_delta_mb"] >= 299
+
+    def test_tracemalloc_top_alokacji(self):
+        with measure_section("scrabble", tracemalloc_enabled=True) as p:
+            trzymane = [str(i) * 50 for i in range(20000)]
+        assert p.wynik["py_peak_mb"] > 0.5
+        assert any(
+            "test_section_memory.py" in a["site"] for a in p.wynik["top_allocations"]
+        )
+        del trzymane
+
+
+class TestRanking:
+    """Testy historii i rankingu."""
+
+    def test_ranking_po_szczycie(self, czysta_historia):
+        for sekcja, delta in [("zwykly", 40), ("smierc", 150), ("zwykly", 60)]:
+            section_memory.record(
+                {
+                    "section": sekcja,
+                    "ts": time.time(),
+                    "rss_peak_mb": 200 + delta,
+                    "peak_delta_mb": delta,
+                    "delta_mb": 5,
+                }
+            )
+        rows = ranking()
+        assert [r["section"] for r in rows] == ["smierc", "zwykly"]
+        assert rows[1]["runs"] == 2
+        assert rows[1]["peak_delta_avg_mb"] == 50
+        assert len(czysta_historia.read_text("utf-8").splitlines()) == 3
+        assert "smierc" in section_memory.format_ranking(rows)
+
+    def test_historia_wczytywana_z_pliku(self, czysta_historia):
+        wpis = {"section": "biznes", "ts": time.time(), "rss_peak_mb": 300,
+                "peak_delta_mb": 20, "delta_mb": 1}
+        czysta_historia.write_text(json.dumps(wpis) + "\n", "utf-8")
+        section_memory._wczytana = False
+        assert ranking()[0]["section"] == "biznes"
+
+    def test_okno_czasowe(self):
+        section_memory.record({"section": "stary", "ts": time.time() - 7200,
+                               "rss_peak_mb": 1, "peak_delta_mb": 1, "delta_mb": 0})
+        assert ranking(since_sec=3600) == []
+
+    def test_plik_przycinany(self, czysta_historia, monkeypatch):
+        monkeypatch.setattr(section_memory, "MAX_HISTORIA", 5)
+        for i in range(23):
+            section_memory.record({"section": f"s{i}", "ts": time.time(),
+                                   "rss_peak_mb": 1, "peak_delta_mb": 1, "delta_mb": 0})
+        linie = czysta_historia.read_text("utf-8").splitlines()
+        assert 5 <= len(linie) <= 10
+        assert json.loads(linie[-1])["section"] == "s22"
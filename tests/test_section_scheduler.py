@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+tests/test_section_scheduler.py
+Testy core/section_scheduler.py: polityki kolejności, oczekiwany czas
+z historii sekcji i czas do pierwszego maila w run_pipeline_async.
+"""
+
+import pytest
+
+from core import section_memory
+from core.section_scheduler import expected_durations, order_sections
+
+STALA = ["nawiazanie", "analiza", "zwykly", "smierc", "biznes", "scrabble", "emocje"]
+
+
+@pytest.fixture(autouse=True)
+def czysta_historia(tmp_path, monkeypatch):
+    monkeypatch.setattr(section_memory, "MEMORY_HISTORY_PATH", str(tmp_path / "h.jsonl"))
+    section_memory.reset()
+    yield
+    section_memory.reset()
+
+
+class TestKolejnosc:
+    """order_sections wg polityki."""
+
+    def test_fixed_bez_zmian(self):
+        assert order_sections(["biznes", "zwykly"], STALA) == ["zwykly", "biznes"]
+        assert order_sections(["biznes", "zwykly"], STALA, policy="nieznana") == [
+            "zwykly",
+            "biznes",
+        ]
+
+    def test_shortest_first(self):
+        czasy = {"zwykly": 240, "biznes": 30, "smierc": 120}
+        assert order_sections(
+            ["zwykly", "smierc", "biznes"], STALA, "shortest_first", czasy
+        ) == ["biznes", "smierc", "zwykly"]
+
+    def test_bez_maila_na_koncu(self):
+        czasy = {"zwykly": 240, "emocje": 5, "biznes": 30}
+        assert order_sections(
+            ["zwykly", "emocje", "biznes"], STALA, "shortest_first", czasy, bez_maila={"emocje"}
+        ) == ["biznes", "zwykly", "emocje"]
+
+    def test_priority_remis_krotsza(self):
+        czasy = {"zwykly": 240, "smierc": 120, "biznes": 30, "scrabble": 25}
+        prio = {"smierc": 10, "zwykly": 10}
+        assert order_sections(
+            ["zwykly", "smierc", "biznes", "scrabble"], STALA, "priority", czasy, prio
+        ) == ["smierc", "zwykly", "scrabble", "biznes"]
+
+
+class TestOczekiwanyCzas:
+    """expected_durations z historii section_memory."""
+
+    def test_mediana_z_historii(self):
+        for czas in (10, 12, 50):
+            section_memory.record({"section": "biznes", "duration_sec": czas, "status": "ok"})
+        section_memory.record({"section": "biznes", "duration_sec": 900, "status": "error"})
+        assert expected_durations(["biznes"], {"biznes": 99}) == {"biznes": 12}
+
+    def test_bez_trafien_memo(self):
+        for czas in (40, 45, 50):
+            section_memory.record({"section": "emocje", "duration_sec": czas, "status": "ok"})
+        for _ in range(5):
+            section_memory.record(
+                {"section": "emocje", "duration_sec": 0.01, "status": "ok", "memo_hit": True}
+            )
+        assert expected_durations(["emocje"]) == {"emocje": 45}
+
+    def test_za_malo_pomiarow_prior(self):
+        section_memory.record({"section": "zwykly", "duration_sec": 5, "status": "ok"})
+        wynik = expected_durations(["zwykly", "emocje"], {"zwykly": 240})
+        assert wynik == {"zwykly": 240.0, "emocje": 60.0}
+
+
+class TestPipeline:
+    """Kolejność i czas do pierwszego maila w run_pipeline_async."""
+
+    def test_krotsza_sekcja_wysylana_pierwsza(self, monkeypatch):
+        flask = pytest.importorskip("flask")
+        import smtp_wysylka
+        from core.job_runner import build_section_order, run_pipeline_async
+        from core.logging_reporter import ExecutionLogger
+        from core.metrics import TIME_TO_FIRST_EMAIL, TIME_TO_LAST_EMAIL
+
+        TIME_TO_FIRST_EMAIL._reset()
+        TIME_TO_LAST_EMAIL._reset()
+        wyslane = []
+        monkeypatch.setattr(
+            smtp_wysylka, "wyslij_odpowiedz", lambda **kw: wyslane.append(kw) or True
+        )
+        monkeypatch.setattr(smtp_wysylka, "zbierz_zalaczniki_z_response", lambda r: [])
+        kolejnosc = {"policy": "shortest_first", "expected_sec": {"zwykly": 240, "biznes": 30}}
+        assert build_section_order(["zwykly", "biznes"]) == ["zwykly", "biznes"]
+        assert build_section_order(["zwykly", "biznes"], kolejnosc) == ["biznes", "zwykly"]
+
+        wykonane = []
+        run_pipeline_async(
+            flask_app=flask.Flask("test"),
+            data={},
+            message_id="",
+            tasks={
+                k: (lambda k=k: wykonane.append(k) or {"reply_html": k})
+                for k in ("zwykly", "biznes")
+            },
+            sender="a@b.pl",
+            sender_name="A",
+            previous_subject="",
+            drive_folder_id="",
+            history_sheet_id="",
+            smierc_sheet_id="",
+            save_to_drive=False,
+            skip_save_to_history=True,
+            logger=ExecutionLogger(session_id="t", upload_to_drive=False),
+            wyslij_fn=None,
+            zbierz_zalaczniki_fn=None,
+            get_token_fn=lambda: None,
+            section_order=kolejnosc,
+        )
+        assert wykonane == ["biznes", "zwykly"]
+        assert TIME_TO_FIRST_EMAIL.count() == 1
+        assert TIME_TO_LAST_EMAIL.count() == 1
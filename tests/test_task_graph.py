@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+tests/test_task_graph.py
+Testy grafu zależności zadań (core/task_graph.py).
+"""
+
+import threading
+import time
+
+import pytest
+from core.task_graph import TaskGraph
+
+
+class TestTaskGraph:
+    """Testy TaskGraph."""
+
+    def test_dependencies_receive_results(self):
+        """Zadanie dostaje wyniki swoich zależności."""
+        graph = TaskGraph("t")
+        graph.add("a", lambda r: 2)
+        graph.add("b", lambda r: 3)
+        graph.add("suma", lambda r: r["a"] + r["b"], deps=("a", "b"))
+        wyniki = graph.run()
+        assert wyniki["suma"] == 5
+
+    def test_independent_tasks_run_concurrently(self):
+        """Niezależne zadania wykonują się równolegle."""
+        graph = TaskGraph("t", max_workers=4)
+        for name in ("a", "b", "c", "d"):
+            graph.add(name, lambda r: time.sleep(0.2))
+        t0 = time.monotonic()
+        graph.run()
+        assert time.monotonic() - t0 < 0.6
+
+    def test_shared_limit(self):
+        """Semafor ogranicza liczbę jednocześnie działających zadań."""
+        limit = threading.BoundedSemaphore(1)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def task(r):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+
+        graph = TaskGraph("t", max_workers=4)
+        for name in ("a", "b", "c"):
+            graph.add(name, task, limit=limit)
+        graph.run()
+        assert max(peak) == 1
+
+    def test_error_uses_default(self):
+        """Wyjątek w zadaniu daje wartość domyślną, zależne zadania działają dalej."""
+        def boom(r):
+            raise RuntimeError("x")
+
+        graph = TaskGraph("t")
+        graph.add("a", boom, default=[])
+        graph.add("b", lambda r: len(r["a"]), deps=("a",))
+        wyniki = graph.run()
+        assert wyniki["b"] == 0
+        assert graph.timings["a"]["status"] == "error"
+        assert graph.timings["b"]["status"] == "ok"
+
+    def test_unknown_dependency(self):
+        """Zależność od nieistniejącego zadania to błąd konfiguracji."""
+        graph = TaskGraph("t")
+        graph.add("a", lambda r: 1, deps=("brak",))
+        with pytest.raises(ValueError):
+            graph.run()
+
+    def test_cycle_detected(self):
+        """Cykl zależności jest wykrywany zamiast zawieszenia."""
+        graph = TaskGraph("t")
+        graph.add("a", lambda r: 1, deps=("b",))
+        graph.add("b", lambda r: 1, deps=("a",))
+        with pytest.raises(RuntimeError):
+            graph.run()
+
+    def test_format_timings(self):
+        """Rozbicie czasów zawiera każde zadanie."""
+        graph = TaskGraph("t")
+        graph.add("a", lambda r: 1)
+        graph.add("b", lambda r: 1, deps=("a",))
+        graph.run()
+        lines = graph.format_timings()
+        assert lines[0].startswith("Graf: t")
+        assert any("zależy od: a" in l for l in lines)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
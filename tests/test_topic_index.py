@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+tests/test_topic_index.py
+Testy core/topic_index.py i wykrywania tematu w responders/biznes.py:
+normalizacja, próg pewności, fallback do modelu tylko przy niepewności.
+"""
+
+import pytest
+
+from core.topic_index import TopicIndex, normalize
+
+
+def _index():
+    return TopicIndex(
+        {
+            "darowizna": "Darowizna mieszkania wymaga aktu notarialnego. Obdarowany zglasza darowizne.",
+            "spadek": "Dzial spadku miedzy spadkobiercami, stwierdzenie nabycia spadku.",
+            "kontakt": "Godziny pracy kancelarii, adres, telefon, parking.",
+        },
+        keywords={"darowizna": ["darowiz"], "spadek": ["spad"], "kontakt": ["kontakt", "godzin"]},
+    )
+
+
+class TestTopicIndex:
+    """Indeks TF-IDF + słowa kluczowe."""
+
+    def test_normalizacja(self):
+        assert normalize("Żółć ŁĄKA") == "zolc laka"
+
+    def test_pewny_temat(self):
+        m = _index().classify("Chcę przekazać mieszkanie w darowiźnie córce.")
+        assert (m.topic, m.confident) == ("darowizna", True)
+        assert m.margin >= 0.1
+
+    def test_odmiana_przez_slowo_kluczowe(self):
+        assert _index().classify("Jak podzielić spadek po dziadku?").topic == "spadek"
+
+    def test_niepewny_bez_trafien(self):
+        m = _index().classify("Proszę o fakturę za hosting.")
+        assert not m.confident
+        assert m.score == 0.0
+
+
+class TestBiznesDetectTopic:
+    """detect_topic: lokalnie albo DeepSeek."""
+
+    @pytest.fixture
+    def biznes(self, monkeypatch):
+        flask = pytest.importorskip("flask")
+        from responders import biznes
+
+        llm = []
+        monkeypatch.setattr(biznes, "detect_topic_llm", lambda body: llm.append(body) or "UNKNOWN")
+        biznes.BIZNES_TOPIC._reset()
+        with flask.Flask("test").app_context():
+            yield biznes, llm
+
+    def test_lokalnie_bez_modelu(self, biznes):
+        mod, llm = biznes
+        temat = mod.detect_topic("Bierzemy ślub i chcemy podpisać intercyzę. Ile to kosztuje?")
+        assert temat == "intercyza_umowa_majatkowa_malzenska_wyjasnienie_i_koszty"
+        assert llm == []
+        assert mod.BIZNES_TOPIC.value(source="local") == 1
+
+    def test_niepewny_do_modelu(self, biznes):
+        mod, llm = biznes
+        assert mod.detect_topic("Jaka będzie jutro pogoda?") == "UNKNOWN"
+        assert len(llm) == 1
+        assert mod.BIZNES_TOPIC.value(source="llm") == 1
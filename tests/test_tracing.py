@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+tests/test_tracing.py
+Testy core/tracing.py: zagnieżdżanie spanów, propagacja do wątków TaskGraph,
+statusy błędów i eksport JSONL.
+"""
+
+import json
+
+import pytest
+
+from core import tracing
+from core.task_graph import TaskGraph
+from core.tracing import recent_traces, span, traced
+
+
+@pytest.fixture(autouse=True)
+def czysty_tracing(tmp_path, monkeypatch):
+    tracing.reset()
+    monkeypatch.setattr(tracing, "TRACE_JSONL_PATH", str(tmp_path / "traces.jsonl"))
+    yield tmp_path / "traces.jsonl"
+    tracing.reset()
+
+
+class TestSpany:
+    """Zagnieżdżanie i statusy."""
+
+    def test_dzieci_w_tym_samym_sladzie(self):
+        with span("pipeline", sender="a@b.pl") as root:
+            with span("section.zwykly") as sec:
+                with span("deepseek"):
+                    pass
+        spany = {d["name"]: d for d in tracing.get_trace(root.trace_id)}
+        assert spany["pipeline"]["parent_id"] is None
+        assert spany["section.zwykly"]["parent_id"] == root.span_id
+        assert spany["deepseek"]["parent_id"] == sec.span_id
+        assert spany["pipeline"]["attrs"] == {"sender": "a@b.pl"}
+        assert spany["pipeline"]["duration_sec"] >= spany["deepseek"]["duration_sec"]
+
+    def test_wyjatek_oznacza_blad(self):
+        with pytest.raises(ValueError):
+            with span("zly"):
+                raise ValueError("nie tak")
+        (d,) = recent_traces(1)[0]["spans"]
+        assert d["status"] == "error"
+        assert "ValueError: nie tak" in d["error"]
+
+    def test_traced_puste_to_blad(self):
+        @traced("sheets.append", puste_to_blad=True)
+        def append(ok):
+            return ok
+
+        append(True)
+        append(False)
+        statusy = [t["spans"][0]["status"] for t in recent_traces(2)]
+        assert statusy == ["error", "ok"]
+
+    def test_propagacja_do_watkow_task_graph(self):
+        graf = TaskGraph("g", max_workers=2)
+        graf.add("a", lambda deps: _span_w_zadaniu("a.api"))
+        graf.add("b", lambda deps: _span_w_zadaniu("b.api"), deps=["a"])
+        with span("pipeline") as root:
+            graf.run()
+        spany = {d["name"]: d for d in tracing.get_trace(root.trace_id)}
+        assert spany["g.a"]["parent_id"] == root.span_id
+        assert spany["a.api"]["parent_id"] == spany["g.a"]["span_id"]
+        assert spany["b.api"]["parent_id"] == spany["g.b"]["span_id"]
+        assert spany["g.a"]["thread"] != spany["pipeline"]["thread"]
+
+
+def _span_w_zadaniu(nazwa):
+    with span(nazwa):
+        return nazwa
+
+
+class TestEksport:
+    """Eksport JSONL i ślady w pamięci."""
+
+    def test_jsonl_linia_na_span(self, czysty_tracing):
+        with span("pipeline"):
+            with span("drive.upload", filename="x.pdf"):
+                pass
+        linie = [json.loads(l) for l in czysty_tracing.read_text("utf-8").splitlines()]
+        assert [d["name"] for d in linie] == ["drive.upload", "pipeline"]
+        assert linie[0]["attrs"]["filename"] == "x.pdf"
+
+    def test_limit_sladow_w_pamieci(self, monkeypatch):
+        monkeypatch.setattr(tracing, "TRACE_MAX_SLADOW", 3)
+        for i in range(5):
+            with span(f"p{i}"):
+                pass
+        assert [t["root"]["name"] for t in recent_traces(10)] == ["p4", "p3", "p2"]
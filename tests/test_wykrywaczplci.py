@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+tests/test_wykrywaczplci.py
+Testy core/wykrywaczplci.py: leksykon imion bez DeepSeek, cache tożsamości
+(adres + hash podpisu) i brak utrwalania fallbacku, gdy DeepSeek milczy.
+"""
+
+import pytest
+
+from core import wykrywaczplci
+from core.wykrywaczplci import IDENTITY_LLM_AVOIDED, IDENTITY_LOOKUPS, detect_sender_identity
+
+
+@pytest.fixture(autouse=True)
+def czysty_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(wykrywaczplci, "IDENTITY_CACHE_PATH", str(tmp_path / "id.json"))
+    IDENTITY_LOOKUPS._reset()
+    IDENTITY_LLM_AVOIDED._reset()
+    wykrywaczplci.reset()
+    yield
+    wykrywaczplci.reset()
+
+
+@pytest.fixture
+def deepseek(monkeypatch):
+    """Zlicza wywołania DeepSeek; odpowiada weryfikacją z pewnym wynikiem."""
+    wywolania = []
+
+    def _call(system, user, max_tokens=800):
+        wywolania.append(user)
+        return (
+            '{"wynik": {"imie": "Robin", "nazwisko": "__BRAK__", '
+            '"imie_nazwisko_pelne": "Robin", "plec": "N", "pewnosc": 70, "zrodlo": "podpis"}}'
+        )
+
+    monkeypatch.setattr(wykrywaczplci, "_deepseek_call", _call)
+    monkeypatch.setattr(wykrywaczplci, "_save_report_to_drive", lambda **kw: "")
+    return wywolania
+
+
+class TestLeksykon:
+    """Pewne przypadki rozstrzygane bez DeepSeek."""
+
+    def test_podpis_i_from_zgodne(self, deepseek):
+        wynik = detect_sender_identity(
+            "jan.kowalski@x.pl", "Jan Kowalski", "Dzień dobry,\nmam pytanie.\nPozdrawiam, Jan"
+        )
+        assert wynik["gender"] == "M"
+        assert wynik["sender_name"] == "Jan Kowalski"
+        assert wynik["zrodlo"] == "leksykon:podpis_koniec"
+        assert wynik["pewnosc"] >= wykrywaczplci.LEKSYKON_PROG
+        assert deepseek == []
+        assert IDENTITY_LLM_AVOIDED.value() == 2
+
+    def test_zdrobnienie_kobiece(self, deepseek):
+        wynik = detect_sender_identity("k@x.pl", "", "Hej\nco słychać?\n- Kasia")
+        assert (wynik["imie"], wynik["gender"]) == ("Kasia", "K")
+        assert deepseek == []
+
+    def test_sprzeczni_kandydaci_do_deepseek(self, deepseek):
+        detect_sender_identity("anna@x.pl", "Anna Nowak", "Treść\nPozdrawiam, Tomek")
+        assert len(deepseek) == 2
+
+    def test_sam_email_lokalny_za_slaby(self, deepseek):
+        detect_sender_identity("ewa.nowak@x.pl", "", "krótka wiadomość bez podpisu, dzięki.")
+        assert len(deepseek) == 2
+
+
+class TestCache:
+    """Cache tożsamości po adresie i podpisie."""
+
+    def test_drugi_mail_z_cache(self, deepseek):
+        body = "Treść\nRobin"
+        detect_sender_identity("Robin+news@X.pl", "", body)
+        wynik = detect_sender_identity("robin@x.pl", "", body)
+        assert len(deepseek) == 2
+        assert wynik["sender_name"] == "Robin"
+        assert wykrywaczplci.stats()["cache_hit_rate"] == 0.5
+        # Po restarcie cache z pliku
+        wykrywaczplci.reset()
+        detect_sender_identity("robin@x.pl", "", body)
+        assert len(deepseek) == 2
+
+    def test_nowy_podpis_nowa_detekcja(self, deepseek):
+        detect_sender_identity("robin@x.pl", "", "Treść\nRobin")
+        detect_sender_identity("robin@x.pl", "", "Treść\nRobin Hood")
+        assert len(deepseek) == 4
+
+    def test_deepseek_milczy_bez_zapisu(self, monkeypatch):
+        monkeypatch.setattr(wykrywaczplci, "_deepseek_call", lambda *a, **kw: None)
+        monkeypatch.setattr(wykrywaczplci, "_save_report_to_drive", lambda **kw: "")
+        detect_sender_identity("robin@x.pl", "", "Treść\nRobin")
+        assert wykrywaczplci.stats()["cache_entries"] == 0
+
+
+class TestBudzet:
+    """Timeout DeepSeek przycięty do reszty budżetu sekcji."""
+
+    def test_timeout_z_budzetu(self, monkeypatch):
+        from core import budget
+
+        timeouty = []
+
+        class _Odp:
+            status_code = 200
+
+            def json(self):
+                return {"choices": [{"message": {"content": "ok"}}]}
+
+        def _post(url, **kwargs):
+            timeouty.append(kwargs["timeout"])
+            return _Odp()
+
+        monkeypatch.setattr(wykrywaczplci, "_DEEPSEEK_KEY", "klucz")
+        monkeypatch.setattr(wykrywaczplci.requests, "post", _post)
+        assert wykrywaczplci._deepseek_call("s", "u") == "ok"
+        with budget.budget("identity", 2.0):
+            assert wykrywaczplci._deepseek_call("s", "u") == "ok"
+        assert timeouty[0] == 45
+        assert timeouty[1] <= 2.0
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+tests/test_zwykly_batch.py
+Testy zapytań zbiorczych małych artefaktów w responders/zwykly.py (bez API).
+"""
+
+import json
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("reportlab")
+
+from core import metrics  # noqa: E402
+from responders import zwykly  # noqa: E402
+
+
+class TestGrupyBatch:
+    """Testy _grupy_batch."""
+
+    def test_limit_tokenow(self, monkeypatch):
+        monkeypatch.setattr(zwykly, "ZWYKLY_BATCH_MAX_TOKENS", 5000)
+        monkeypatch.setattr(
+            zwykly,
+            "ZWYKLY_BATCH_TOKENY_WYJSCIA",
+            {"a": 3000, "b": 1500, "c": 1000, "d": 200},
+        )
+        assert zwykly._grupy_batch(["a", "b", "c", "d"]) == [["a", "b"], ["c", "d"]]
+
+    def test_zachowuje_kolejnosc(self):
+        nazwy = list(zwykly._ARTEFAKTY_BATCH)
+        plaskie = [n for g in zwykly._grupy_batch(nazwy) for n in g]
+        assert plaskie == nazwy
+
+
+class TestBudujArtefakt:
+    """Testy _buduj_artefakt — ponawianie tylko odrzuconych fragmentów."""
+
+    def _builder(self, wywolania):
+        def builder(body, res_text, raw=None):
+            wywolania.append(raw)
+            if raw is None:
+                return {"filename": "osobno"}
+            data = json.loads(raw)
+            return {"filename": "batch"} if data.get("ok") else None
+
+        return builder
+
+    def test_fragment_przyjety(self):
+        wywolania = []
+        staty = zwykly._nowe_staty_batch()
+        wynik = zwykly._buduj_artefakt(
+            "plakat", self._builder(wywolania), "mail", "odp",
+            {"plakat": json.dumps({"ok": True})}, staty,
+        )
+        assert wynik == {"filename": "batch"}
+        assert len(wywolania) == 1
+        assert staty["z_batcha"] == ["plakat"]
+        assert staty["wywolania"] == 0
+
+    def test_fragment_odrzucony_ponawia_osobno(self):
+        wywolania = []
+        staty = zwykly._nowe_staty_batch()
+        wynik = zwykly._buduj_artefakt(
+            "plakat", self._builder(wywolania), "mail", "odp",
+            {"plakat": json.dumps({"ok": False})}, staty,
+        )
+        assert wynik == {"filename": "osobno"}
+        assert wywolania[-1] is None
+        assert staty["ponowione"] == ["plakat"]
+        assert staty["wywolania"] == 1
+
+    def test_brak_fragmentu(self):
+        wywolania = []
+        staty = zwykly._nowe_staty_batch()
+        zwykly._buduj_artefakt(
+            "gra", self._builder(wywolania), "mail", "odp", {}, staty
+        )
+        assert wywolania == [None]
+        assert staty["osobno"] == ["gra"]
+        assert staty["znaki_wejscia"] == staty["znaki_wejscia_osobno"]
+
+    def test_osobne_budowanie_zapisuje_probke_tokenow(self, monkeypatch):
+        monkeypatch.setattr(zwykly, "_CZASY_OSOBNO", {})
+
+        def builder(body, res_text, raw=None):
+            metrics.record_deepseek_usage(
+                "test_osobno", {"prompt_tokens": 900, "completion_tokens": 300}
+            )
+            return {"filename": "osobno"}
+
+        staty = zwykly._nowe_staty_batch()
+        zwykly._buduj_artefakt("gra", builder, "mail", "odp", {}, staty)
+        assert staty["tokeny_wejscia"] == 900
+        assert staty["tokeny_wyjscia"] == 300
+        assert zwykly._CZASY_OSOBNO["gra"][0][1:] == (900, 300)
+
+        kolejne = zwykly._nowe_staty_batch()
+        zwykly._dolicz_czas_osobno("gra", kolejne)
+        assert kolejne["czas_osobno_kompletny"]
+        assert kolejne["tokeny_wejscia_osobno_szac"] == 900
+        assert kolejne["tokeny_wyjscia_osobno_szac"] == 300
+
+    def test_brak_probek_oszczednosc_nieznana(self, monkeypatch):
+        monkeypatch.setattr(zwykly, "_CZASY_OSOBNO", {})
+        staty = zwykly._nowe_staty_batch()
+        zwykly._dolicz_czas_osobno("gra", staty)
+        assert not staty["czas_osobno_kompletny"]
+        assert "oszczędność nieznana" in zwykly._podsumuj_batch(staty)[-1]
+
+
+class TestProbkaOsobno:
+    """Próbkowanie pipeline'ów budujących artefakty osobno."""
+
+    def test_odsetek_zero(self, monkeypatch):
+        monkeypatch.setattr(zwykly, "ZWYKLY_BATCH_PROBKA_OSOBNO", 0)
+        assert not any(zwykly._probka_osobno() for _ in range(50))
+
+    def test_odsetek_jeden(self, monkeypatch):
+        monkeypatch.setattr(zwykly, "ZWYKLY_BATCH_PROBKA_OSOBNO", 1)
+        assert all(zwykly._probka_osobno() for _ in range(50))
+
+
+class TestPobierzZbiorczo:
+    """Testy _pobierz_zbiorczo z podstawionym call_deepseek."""
+
+    def test_wycina_fragmenty(self, monkeypatch):
+        monkeypatch.setattr(
+            zwykly,
+            "ZWYKLY_BATCH_ARTEFAKTY",
+            {"karta_rpg": True, "plakat": True, "wyjasnienie": True},
+        )
+        wyslane = []
+
+        def fake_deepseek(system, user, model, max_tokens=3000, **kwargs):
+            wyslane.append(user)
+            metrics.record_deepseek_usage(
+                kwargs.get("szablon", ""),
+                {"prompt_tokens": 1200, "completion_tokens": 450},
+            )
+            return json.dumps(
+                {
+                    "karta_rpg": {"nazwa_postaci": "Tyler"},
+                    "plakat": "zły typ",
+                    "wyjasnienie": {"tekst": "Wyjaśnienie."},
+                }
+            )
+
+        monkeypatch.setattr(zwykly, "call_deepseek", fake_deepseek)
+        staty = zwykly._nowe_staty_batch()
+        body = "TRESC-MAILA-42 " + "długi mail " * 500
+        fragmenty = zwykly._pobierz_zbiorczo(body, "odpowiedź", staty)
+
+        assert len(wyslane) == 1
+        assert wyslane[0].count("TRESC-MAILA-42") == 1
+        assert json.loads(fragmenty["karta_rpg"]) == {"nazwa_postaci": "Tyler"}
+        assert "plakat" not in fragmenty
+        assert fragmenty["wyjasnienie"] == "Wyjaśnienie."
+        assert staty["znaki_wejscia"] < staty["znaki_wejscia_osobno"]
+        assert staty["tokeny_wejscia"] == 1200
+        assert staty["tokeny_wyjscia"] == 450
+        assert "wejście 1200, wyjście 450" in "\n".join(zwykly._podsumuj_batch(staty))